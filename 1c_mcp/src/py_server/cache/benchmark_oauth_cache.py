@@ -0,0 +1,152 @@
+"""
+Бенчмарк OAuthTokenCache на 100k токенов
+
+Измеряет пропускную способность и задержки проверки токенов при параллельных
+запросах (asyncio-задачи и потоки), сохранение с вытеснением на заполненном
+кэше и очистку истекших токенов.
+
+Запуск (из каталога py_server):
+    python -m cache.benchmark_oauth_cache
+    python -m cache.benchmark_oauth_cache --tokens 100000 --concurrency 64 --strategy lfu
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from cache.oauth_cache import CacheStrategy, OAuthTokenCache, SecureStorage, SecurityLevel
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p99 задержек в микросекундах."""
+    samples = sorted(samples)
+    return {
+        "p50_us": round(samples[len(samples) // 2] * 1e6, 2),
+        "p99_us": round(samples[int(len(samples) * 0.99)] * 1e6, 2),
+        "mean_us": round(statistics.fmean(samples) * 1e6, 2)
+    }
+
+
+async def _fill(cache: OAuthTokenCache, tokens: int, expired_share: float = 0.0):
+    """Заполнение кэша; доля expired_share токенов истекает почти сразу."""
+    expired_count = int(tokens * expired_share)
+    for i in range(tokens):
+        await cache.store_token(
+            user_id=f"user_{i}",
+            access_token=f"access_{i}",
+            refresh_token=f"refresh_{i}",
+            expires_in=0.01 if i < expired_count else 3600
+        )
+
+
+async def bench_concurrent_get(cache: OAuthTokenCache, tokens: int, concurrency: int, operations: int) -> Dict[str, float]:
+    """Параллельные проверки токенов из asyncio-задач."""
+    per_task = operations // concurrency
+    latencies: List[float] = []
+    
+    async def worker(seed: int):
+        rng = random.Random(seed)
+        local = []
+        for _ in range(per_task):
+            key = f"access_{rng.randrange(tokens)}"
+            started = time.perf_counter()
+            await cache.get_token(key)
+            local.append(time.perf_counter() - started)
+            if len(local) % 256 == 0:
+                await asyncio.sleep(0)
+        latencies.extend(local)
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(seed) for seed in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {"ops_per_sec": round(len(latencies) / elapsed), **_percentiles(latencies)}
+
+
+def bench_threaded_get(cache: OAuthTokenCache, tokens: int, threads: int, operations: int) -> Dict[str, float]:
+    """Параллельные проверки токенов из потоков (по event loop на поток)."""
+    per_thread = operations // threads
+    
+    def worker(seed: int) -> int:
+        async def run():
+            rng = random.Random(seed)
+            for _ in range(per_thread):
+                await cache.get_token(f"access_{rng.randrange(tokens)}")
+        asyncio.run(run())
+        return per_thread
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        done = sum(pool.map(worker, range(threads)))
+    return {"ops_per_sec": round(done / (time.perf_counter() - started))}
+
+
+async def bench_store_with_eviction(cache: OAuthTokenCache, operations: int) -> Dict[str, float]:
+    """Сохранение новых токенов в заполненный кэш (каждое сохранение вытесняет токен)."""
+    latencies = []
+    for i in range(operations):
+        started = time.perf_counter()
+        await cache.store_token(user_id=f"new_user_{i}", access_token=f"new_access_{i}")
+        latencies.append(time.perf_counter() - started)
+    return {"ops_per_sec": round(len(latencies) / sum(latencies)), **_percentiles(latencies)}
+
+
+async def bench_cleanup(tokens: int, strategy: CacheStrategy, expired_share: float) -> Dict[str, float]:
+    """Очистка истекших токенов колесом таймеров."""
+    cache = _make_cache(tokens, strategy)
+    await _fill(cache, tokens, expired_share)
+    await asyncio.sleep(1.1)
+    
+    started = time.perf_counter()
+    cleaned = await cache.cleanup()
+    elapsed = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    await cache.cleanup()
+    idle = time.perf_counter() - started
+    return {"cleaned": cleaned, "cleanup_ms": round(elapsed * 1000, 2), "idle_cleanup_ms": round(idle * 1000, 3)}
+
+
+def _make_cache(tokens: int, strategy: CacheStrategy) -> OAuthTokenCache:
+    return OAuthTokenCache(
+        max_size=tokens,
+        strategy=strategy,
+        auto_cleanup=False,
+        secure_storage=SecureStorage(master_password="benchmark", security_level=SecurityLevel.BASIC)
+    )
+
+
+async def main(tokens: int, concurrency: int, operations: int, threads: int, strategy: CacheStrategy):
+    cache = _make_cache(tokens, strategy)
+    
+    started = time.perf_counter()
+    await _fill(cache, tokens)
+    fill_seconds = time.perf_counter() - started
+    
+    results = {
+        "fill": {"tokens": tokens, "seconds": round(fill_seconds, 2)},
+        "concurrent_get": await bench_concurrent_get(cache, tokens, concurrency, operations),
+        "threaded_get": bench_threaded_get(cache, tokens, threads, operations),
+        "store_with_eviction": await bench_store_with_eviction(cache, min(operations, tokens) // 10),
+        "cleanup": await bench_cleanup(tokens, strategy, expired_share=0.1)
+    }
+    
+    stats = await cache.get_stats()
+    print(f"OAuthTokenCache: {tokens} токенов, стратегия {strategy.name}, шардов {stats['shards']}")
+    for name, values in results.items():
+        print(f"  {name:22s} " + ", ".join(f"{key}={value}" for key, value in values.items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк OAuthTokenCache")
+    parser.add_argument("--tokens", type=int, default=100_000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--operations", type=int, default=200_000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--strategy", choices=[s.value for s in CacheStrategy], default="lru")
+    args = parser.parse_args()
+    
+    asyncio.run(main(args.tokens, args.concurrency, args.operations, args.threads, CacheStrategy(args.strategy)))
@@ -25,7 +25,7 @@ from dataclasses import asdict, dataclass
 from datetime import datetime, timedelta
 from enum import Enum
 from hashlib import sha256
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from cryptography.fernet import Fernet
 from cryptography.hazmat.backends import default_backend
@@ -320,18 +320,188 @@ class SecureStorage:
             }
 
 
+class _ExpiryWheel:
+    """
+    Колесо таймеров истечения токенов.
+    Токены раскладываются по слотам-тикам дедлайна, продвижение колеса
+    возвращает истекшие ключи за O(истекших + пройденных тиков).
+    """
+    
+    __slots__ = ("resolution", "_slots", "_cursor")
+    
+    def __init__(self, resolution: float = 1.0):
+        self.resolution = resolution
+        self._slots: Dict[int, Set[str]] = {}
+        self._cursor: Optional[int] = None  # первый еще не обработанный тик
+    
+    def _tick(self, deadline: float) -> int:
+        return int(deadline // self.resolution)
+    
+    def add(self, key: str, deadline: float):
+        """Запланировать истечение ключа."""
+        tick = self._tick(deadline)
+        if self._cursor is not None and tick < self._cursor:
+            tick = self._cursor
+        slot = self._slots.get(tick)
+        if slot is None:
+            slot = self._slots[tick] = set()
+        slot.add(key)
+    
+    def discard(self, key: str, deadline: float):
+        """Снять ключ с колеса (при удалении токена до истечения)."""
+        tick = self._tick(deadline)
+        if self._cursor is not None and tick < self._cursor:
+            tick = self._cursor
+        slot = self._slots.get(tick)
+        if slot is not None:
+            slot.discard(key)
+            if not slot:
+                del self._slots[tick]
+    
+    def advance(self, now: float) -> List[str]:
+        """Продвинуть колесо до текущего момента и вернуть ключи прошедших тиков."""
+        current = self._tick(now)
+        start = self._cursor if self._cursor is not None else min(self._slots, default=current)
+        if current - start > len(self._slots):
+            ticks = sorted(tick for tick in self._slots if tick < current)
+        else:
+            ticks = range(start, current)
+        
+        due: List[str] = []
+        for tick in ticks:
+            slot = self._slots.pop(tick, None)
+            if slot:
+                due.extend(slot)
+        self._cursor = max(current, start)
+        return due
+
+
+class _TokenShard:
+    """
+    Шард кэша токенов: своя блокировка, своя политика вытеснения и колесо истечения.
+    LRU и TTL (FIFO) держат порядок в OrderedDict, LFU - в корзинах частот;
+    все операции над шардом выполняются за O(1).
+    """
+    
+    def __init__(self, strategy: CacheStrategy, wheel_resolution: float):
+        self.lock = threading.Lock()
+        self.strategy = strategy
+        self.tokens: OrderedDict[str, CachedToken] = OrderedDict()
+        self.deadlines: Dict[str, float] = {}
+        self.wheel = _ExpiryWheel(wheel_resolution)
+        
+        # LFU: частота ключа и корзины ключей одной частоты в порядке добавления
+        self.freq: Dict[str, int] = {}
+        self.buckets: Dict[int, OrderedDict[str, None]] = {}
+        self.min_freq = 0
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+    
+    def insert(self, key: str, token: CachedToken, deadline: float, evict: bool) -> List[Tuple[str, CachedToken]]:
+        """Добавить токен, при evict вытеснив один токен шарда. Возвращает удаленные (ключ, токен)."""
+        removed: List[Tuple[str, CachedToken]] = []
+        
+        previous = self.remove(key)
+        if previous is not None:
+            removed.append((key, previous))
+        elif evict and self.tokens:
+            removed.append(self.evict())
+        
+        self.tokens[key] = token
+        self.deadlines[key] = deadline
+        self.wheel.add(key, deadline)
+        if self.strategy == CacheStrategy.LFU:
+            self.freq[key] = 1
+            self.buckets.setdefault(1, OrderedDict())[key] = None
+            self.min_freq = 1
+        return removed
+    
+    def touch(self, key: str):
+        """Учесть обращение к токену в политике вытеснения."""
+        if self.strategy == CacheStrategy.LRU:
+            self.tokens.move_to_end(key)
+        elif self.strategy == CacheStrategy.LFU:
+            count = self.freq[key]
+            bucket = self.buckets[count]
+            del bucket[key]
+            if not bucket:
+                del self.buckets[count]
+                if self.min_freq == count:
+                    self.min_freq = count + 1
+            self.freq[key] = count + 1
+            self.buckets.setdefault(count + 1, OrderedDict())[key] = None
+    
+    def remove(self, key: str) -> Optional[CachedToken]:
+        """Синхронно удалить токен из шарда."""
+        token = self.tokens.pop(key, None)
+        if token is None:
+            return None
+        
+        self.wheel.discard(key, self.deadlines.pop(key))
+        if self.strategy == CacheStrategy.LFU:
+            count = self.freq.pop(key)
+            bucket = self.buckets[count]
+            del bucket[key]
+            if not bucket:
+                del self.buckets[count]
+                if self.min_freq == count:
+                    # Следующая непустая корзина найдется при очередном вытеснении
+                    self.min_freq = 0
+        return token
+    
+    def expire(self, now: float) -> List[Tuple[str, CachedToken]]:
+        """Удалить токены, дедлайн которых прошел."""
+        removed: List[Tuple[str, CachedToken]] = []
+        for key in self.wheel.advance(now):
+            deadline = self.deadlines.get(key)
+            if deadline is None:
+                continue
+            if deadline > now:
+                self.wheel.add(key, deadline)
+                continue
+            removed.append((key, self.remove(key)))
+        self.expired += len(removed)
+        return removed
+    
+    def evict(self) -> Tuple[str, CachedToken]:
+        """Вытеснить токен согласно стратегии."""
+        if self.strategy == CacheStrategy.LFU:
+            if self.min_freq not in self.buckets:
+                self.min_freq = min(self.buckets)
+            victim = next(iter(self.buckets[self.min_freq]))
+        else:
+            # LRU: наименее недавно использованный; TTL: самый ранний по добавлению
+            victim = next(iter(self.tokens))
+        self.evictions += 1
+        return victim, self.remove(victim)
+
+
 class OAuthTokenCache:
     """
     Кэш для OAuth2 токенов с автоматической очисткой и стратегиями управления.
     Поддерживает TTL, LRU/LFU алгоритмы и автоматическое обновление.
+    
+    Токены распределены по шардам со своими блокировками, так что проверки
+    токенов не сериализуются одной глобальной блокировкой. Лимит max_size
+    общий: при его достижении вытесняется токен того шарда, куда идет запись
+    (LRU, LFU на корзинах частот, FIFO для TTL). Вытеснение и истечение по
+    колесу таймеров работают за O(1) на токен, удаление синхронное.
     """
     
+    # Минимум токенов на шард: маленький кэш не дробится, чтобы вытеснение было точным
+    MIN_SHARD_CAPACITY = 256
+    
     def __init__(self, 
                  max_size: int = 1000,
                  default_ttl: int = 3600,
                  strategy: CacheStrategy = CacheStrategy.LRU,
                  auto_cleanup: bool = True,
-                 secure_storage: Optional[SecureStorage] = None):
+                 secure_storage: Optional[SecureStorage] = None,
+                 num_shards: int = 16,
+                 wheel_resolution: float = 1.0):
         """
         Инициализация кэша токенов.
         
@@ -341,6 +511,8 @@ class OAuthTokenCache:
             strategy: Стратегия кэширования
             auto_cleanup: Автоматическая очистка
             secure_storage: Безопасное хранилище
+            num_shards: Максимальное количество шардов
+            wheel_resolution: Шаг колеса таймеров истечения в секундах
         """
         self.max_size = max_size
         self.default_ttl = default_ttl
@@ -348,30 +520,40 @@ class OAuthTokenCache:
         self.auto_cleanup = auto_cleanup
         self.secure_storage = secure_storage or SecureStorage()
         
-        # Основное хранилище токенов
-        self._tokens: OrderedDict[str, CachedToken] = OrderedDict()
-        
-        # Статистика использования для LFU
-        self._access_counts: Dict[str, int] = defaultdict(int)
+        # Шарды токенов
+        shard_count = max(1, min(num_shards, max_size // self.MIN_SHARD_CAPACITY))
+        self._shards = [_TokenShard(strategy, wheel_resolution) for _ in range(shard_count)]
         
-        # Поисковые индексы
+        # Поисковые индексы (под отдельной блокировкой, не пересекающейся с блокировками шардов)
+        self._index_lock = threading.Lock()
         self._token_by_user: Dict[str, str] = {}  # user_id -> access_token
+        self._user_by_token: Dict[str, str] = {}  # access_token -> user_id
         self._refresh_to_access: Dict[str, str] = {}  # refresh_token -> access_token
         
-        # Синхронизация
-        self._lock = asyncio.Lock()
         self._cleanup_task: Optional[asyncio.Task] = None
         
-        # Статистика
+        # Статистика (попадания, промахи и вытеснения считаются в шардах)
         self._stats = {
-            "hits": 0,
-            "misses": 0,
-            "evictions": 0,
             "cleanups": 0,
             "total_tokens": 0
         }
         
-        logger.info(f"OAuthTokenCache инициализирован (max_size={max_size}, strategy={strategy.name})")
+        logger.info(f"OAuthTokenCache инициализирован (max_size={max_size}, strategy={strategy.name}, shards={shard_count})")
+    
+    @property
+    def size(self) -> int:
+        """Текущее количество токенов в кэше."""
+        return sum(len(shard.tokens) for shard in self._shards)
+    
+    def _shard_for(self, access_token: str) -> _TokenShard:
+        """Шард, в котором хранится токен."""
+        shards = self._shards
+        return shards[hash(access_token) % len(shards)] if len(shards) > 1 else shards[0]
+    
+    async def initialize(self) -> bool:
+        """Инициализация кэша: запуск фоновой очистки при auto_cleanup."""
+        await self.start_cleanup_task()
+        return True
     
     async def start_cleanup_task(self, interval: int = 300):
         """Запуск задачи автоматической очистки."""
@@ -387,6 +569,7 @@ class OAuthTokenCache:
                 await self._cleanup_task
             except asyncio.CancelledError:
                 pass
+            self._cleanup_task = None
             logger.info("Задача очистки кэша остановлена")
     
     async def _cleanup_loop(self, interval: int):
@@ -404,39 +587,26 @@ class OAuthTokenCache:
                 logger.error(f"Ошибка в цикле очистки: {e}")
     
     async def _cleanup_expired(self) -> int:
-        """Очистка истекших токенов."""
-        async with self._lock:
-            now = datetime.now()
-            expired_tokens = []
-            
-            for token_key, token_data in self._tokens.items():
-                if token_data.is_expired:
-                    expired_tokens.append(token_key)
-            
-            for token_key in expired_tokens:
-                await self._remove_token_internal(token_key)
-            
-            return len(expired_tokens)
+        """Очистка истекших токенов по колесам таймеров шардов."""
+        now = time.monotonic()
+        cleaned = 0
+        for shard in self._shards:
+            with shard.lock:
+                expired = shard.expire(now)
+            if expired:
+                self._unindex(expired)
+                cleaned += len(expired)
+        return cleaned
     
-    def _apply_eviction_strategy(self):
-        """Применение стратегии вытеснения при превышении лимита."""
-        if len(self._tokens) <= self.max_size:
-            return
-        
-        if self.strategy == CacheStrategy.LRU:
-            # Удаляем наименее недавно используемые
-            while len(self._tokens) > self.max_size:
-                oldest_key = next(iter(self._tokens))
-                asyncio.create_task(self._remove_token_internal(oldest_key))
-        
-        elif self.strategy == CacheStrategy.LFU:
-            # Удаляем наименее часто используемые
-            while len(self._tokens) > self.max_size:
-                min_access_key = min(self._tokens.keys(), 
-                                   key=lambda k: self._access_counts.get(k, 0))
-                asyncio.create_task(self._remove_token_internal(min_access_key))
-        
-        self._stats["evictions"] += 1
+    def _unindex(self, removed: List[Tuple[str, CachedToken]]):
+        """Удаление токенов из поисковых индексов."""
+        with self._index_lock:
+            for access_token, token_data in removed:
+                user_id = self._user_by_token.pop(access_token, None)
+                if user_id is not None and self._token_by_user.get(user_id) == access_token:
+                    del self._token_by_user[user_id]
+                if token_data.refresh_token and self._refresh_to_access.get(token_data.refresh_token) == access_token:
+                    del self._refresh_to_access[token_data.refresh_token]
     
     async def store_token(self, 
                          user_id: str,
@@ -459,42 +629,53 @@ class OAuthTokenCache:
         Returns:
             True если успешно
         """
-        async with self._lock:
-            try:
-                # Создаем объект токена
-                token_data = CachedToken(
-                    access_token=access_token,
-                    refresh_token=refresh_token,
-                    token_type=token_type,
-                    expires_in=expires_in or self.default_ttl,
-                    created_at=datetime.now(),
-                    last_accessed=datetime.now(),
-                    access_count=1,
-                    user_data=user_data
+        try:
+            now = datetime.now()
+            token_data = CachedToken(
+                access_token=access_token,
+                refresh_token=refresh_token,
+                token_type=token_type,
+                expires_in=expires_in or self.default_ttl,
+                created_at=now,
+                last_accessed=now,
+                access_count=1,
+                user_data=user_data
+            )
+            
+            # Если у пользователя уже есть другой токен, удаляем старый
+            with self._index_lock:
+                old_token = self._token_by_user.get(user_id)
+            if old_token is not None and old_token != access_token:
+                self._remove_token_sync(old_token)
+            
+            # Сохраняем новый токен; вытеснение происходит сразу, внутри шарда
+            shard = self._shard_for(access_token)
+            with shard.lock:
+                removed = shard.insert(
+                    access_token,
+                    token_data,
+                    time.monotonic() + token_data.expires_in,
+                    evict=self.size >= self.max_size
                 )
-                
-                # Если у пользователя уже есть токен, удаляем старый
-                if user_id in self._token_by_user:
-                    old_token = self._token_by_user[user_id]
-                    if old_token in self._tokens:
-                        await self._remove_token_internal(old_token)
-                
-                # Сохраняем новый токен
-                self._tokens[access_token] = token_data
+            # Шард записи был пуст или лимит превышен параллельными записями
+            while self.size > self.max_size:
+                removed.extend(self._evict_from_largest_shard())
+            if removed:
+                self._unindex(removed)
+            
+            with self._index_lock:
                 self._token_by_user[user_id] = access_token
-                
+                self._user_by_token[access_token] = user_id
                 if refresh_token:
                     self._refresh_to_access[refresh_token] = access_token
-                
-                # Применяем стратегию вытеснения при необходимости
-                self._apply_eviction_strategy()
-                
-                logger.debug(f"Токен сохранен для пользователя {user_id}")
-                return True
-                
-            except Exception as e:
-                logger.error(f"Ошибка сохранения токена: {e}")
-                return False
+            
+            self._stats["total_tokens"] += 1
+            logger.debug(f"Токен сохранен для пользователя {user_id}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Ошибка сохранения токена: {e}")
+            return False
     
     async def get_token(self, access_token: str) -> Optional[CachedToken]:
         """
@@ -506,30 +687,29 @@ class OAuthTokenCache:
         Returns:
             CachedToken или None
         """
-        async with self._lock:
-            token_data = self._tokens.get(access_token)
+        shard = self._shard_for(access_token)
+        with shard.lock:
+            token_data = shard.tokens.get(access_token)
             
-            if not token_data:
-                self._stats["misses"] += 1
+            if token_data is None:
+                shard.misses += 1
                 return None
             
             # Проверяем истечение
-            if token_data.is_expired:
-                await self._remove_token_internal(access_token)
-                self._stats["misses"] += 1
-                return None
-            
-            # Обновляем статистику использования
-            token_data.last_accessed = datetime.now()
-            token_data.access_count += 1
-            self._access_counts[access_token] += 1
-            
-            # Перемещаем в конец для LRU
-            if self.strategy == CacheStrategy.LRU:
-                self._tokens.move_to_end(access_token)
+            if shard.deadlines[access_token] > time.monotonic():
+                # Обновляем статистику использования
+                shard.touch(access_token)
+                token_data.last_accessed = datetime.now()
+                token_data.access_count += 1
+                shard.hits += 1
+                return token_data
             
-            self._stats["hits"] += 1
-            return token_data
+            shard.remove(access_token)
+            shard.misses += 1
+            shard.expired += 1
+        
+        self._unindex([(access_token, token_data)])
+        return None
     
     async def get_token_by_user(self, user_id: str) -> Optional[CachedToken]:
         """
@@ -541,11 +721,11 @@ class OAuthTokenCache:
         Returns:
             CachedToken или None
         """
-        async with self._lock:
+        with self._index_lock:
             access_token = self._token_by_user.get(user_id)
-            if access_token:
-                return await self.get_token(access_token)
-            return None
+        if access_token:
+            return await self.get_token(access_token)
+        return None
     
     async def refresh_token(self, refresh_token: str) -> Optional[CachedToken]:
         """
@@ -557,12 +737,11 @@ class OAuthTokenCache:
         Returns:
             Обновленный CachedToken или None
         """
-        async with self._lock:
+        with self._index_lock:
             access_token = self._refresh_to_access.get(refresh_token)
-            if access_token:
-                token_data = await self.get_token(access_token)
-                return token_data
-            return None
+        if access_token:
+            return await self.get_token(access_token)
+        return None
     
     async def revoke_token(self, access_token: str) -> bool:
         """
@@ -574,8 +753,7 @@ class OAuthTokenCache:
         Returns:
             True если успешно
         """
-        async with self._lock:
-            return await self._remove_token_internal(access_token)
+        return self._remove_token_sync(access_token)
     
     async def revoke_user_tokens(self, user_id: str) -> bool:
         """
@@ -587,14 +765,11 @@ class OAuthTokenCache:
         Returns:
             True если успешно
         """
-        async with self._lock:
+        with self._index_lock:
             access_token = self._token_by_user.get(user_id)
-            if access_token:
-                result = await self._remove_token_internal(access_token)
-                if access_token in self._token_by_user:
-                    del self._token_by_user[user_id]
-                return result
-            return False
+        if access_token:
+            return self._remove_token_sync(access_token)
+        return False
     
     async def _remove_token(self, access_token: str) -> bool:
         """
@@ -606,54 +781,51 @@ class OAuthTokenCache:
         Returns:
             True если успешно
         """
-        async with self._lock:
-            return await self._remove_token_internal(access_token)
-    
-    async def _remove_token_internal(self, access_token: str) -> bool:
-        """Внутренний метод удаления токена."""
-        try:
-            token_data = self._tokens.pop(access_token, None)
-            if token_data:
-                # Удаляем из индексов
-                for user_id, token in list(self._token_by_user.items()):
-                    if token == access_token:
-                        del self._token_by_user[user_id]
-                        break
-                
-                if token_data.refresh_token:
-                    self._refresh_to_access.pop(token_data.refresh_token, None)
-                
-                # Удаляем из статистики
-                self._access_counts.pop(access_token, None)
-                self._stats["total_tokens"] -= 1
-                
-                return True
-            return False
-            
-        except Exception as e:
-            logger.error(f"Ошибка удаления токена {access_token}: {e}")
+        return self._remove_token_sync(access_token)
+    
+    def _evict_from_largest_shard(self) -> List[Tuple[str, CachedToken]]:
+        """Вытеснение токена из самого заполненного шарда."""
+        shard = max(self._shards, key=lambda item: len(item.tokens))
+        with shard.lock:
+            return [shard.evict()] if shard.tokens else []
+    
+    def _remove_token_sync(self, access_token: str) -> bool:
+        """Синхронное удаление токена из шарда и индексов."""
+        shard = self._shard_for(access_token)
+        with shard.lock:
+            token_data = shard.remove(access_token)
+        if token_data is None:
             return False
+        self._unindex([(access_token, token_data)])
+        return True
     
     async def get_stats(self) -> Dict[str, Any]:
         """Получение статистики кэша."""
-        async with self._lock:
-            hit_rate = (self._stats["hits"] / 
-                       (self._stats["hits"] + self._stats["misses"]) * 100 
-                       if (self._stats["hits"] + self._stats["misses"]) > 0 else 0)
-            
-            return {
-                **self._stats,
-                "current_size": len(self._tokens),
-                "max_size": self.max_size,
-                "hit_rate": round(hit_rate, 2),
-                "memory_usage_mb": self._calculate_memory_usage()
-            }
+        hits = sum(shard.hits for shard in self._shards)
+        misses = sum(shard.misses for shard in self._shards)
+        hit_rate = hits / (hits + misses) * 100 if (hits + misses) > 0 else 0
+        
+        return {
+            **self._stats,
+            "hits": hits,
+            "misses": misses,
+            "evictions": sum(shard.evictions for shard in self._shards),
+            "expired": sum(shard.expired for shard in self._shards),
+            "current_size": self.size,
+            "max_size": self.max_size,
+            "shards": len(self._shards),
+            "hit_rate": round(hit_rate, 2),
+            "memory_usage_mb": self._calculate_memory_usage()
+        }
     
     def _calculate_memory_usage(self) -> float:
         """Расчет использования памяти в MB."""
         total_size = 0
-        for token_data in self._tokens.values():
-            total_size += len(pickle.dumps(token_data))
+        for shard in self._shards:
+            with shard.lock:
+                tokens = list(shard.tokens.values())
+            for token_data in tokens:
+                total_size += len(pickle.dumps(token_data))
         return round(total_size / (1024 * 1024), 2)
     
     async def cleanup(self) -> int:
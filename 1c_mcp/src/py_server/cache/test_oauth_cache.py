@@ -192,15 +192,15 @@ class TestOAuthTokenCache:
         )
         
         # Проверяем что токен есть
-        token = await cache.get_token("token_to_revoke")
+        token = await token_cache.get_token("token_to_revoke")
         assert token is not None
         
         # Отзываем токен
-        result = await cache.revoke_token("token_to_revoke")
+        result = await token_cache.revoke_token("token_to_revoke")
         assert result == True
         
         # Проверяем что токен удален
-        token = await cache.get_token("token_to_revoke")
+        token = await token_cache.get_token("token_to_revoke")
         assert token is None
     
     async def test_stats(self, token_cache):
@@ -222,6 +222,75 @@ class TestOAuthTokenCache:
         assert stats["misses"] == 1
         assert stats["current_size"] == 1
         assert 0 <= stats["hit_rate"] <= 100
+    
+    async def test_lfu_eviction(self):
+        """Тест LFU стратегии: вытесняется наименее часто используемый токен."""
+        cache = OAuthTokenCache(max_size=3, strategy=CacheStrategy.LFU, auto_cleanup=False)
+        
+        for i in range(3):
+            await cache.store_token(user_id=f"user{i}", access_token=f"token{i}")
+        for _ in range(3):
+            await cache.get_token("token0")
+        await cache.get_token("token2")
+        
+        await cache.store_token(user_id="user3", access_token="token3")
+        
+        assert await cache.get_token("token1") is None
+        assert await cache.get_token_by_user("user1") is None
+        for token in ("token0", "token2", "token3"):
+            assert await cache.get_token(token) is not None
+    
+    async def test_eviction_is_synchronous(self):
+        """Тест: размер кэша не превышает max_size сразу после сохранения."""
+        cache = OAuthTokenCache(max_size=1000, num_shards=4, auto_cleanup=False)
+        
+        for i in range(1500):
+            await cache.store_token(user_id=f"user{i}", access_token=f"token{i}", refresh_token=f"refresh{i}")
+            assert cache.size <= 1000
+        
+        stats = await cache.get_stats()
+        assert stats["shards"] == 3
+        assert stats["evictions"] == 500
+        assert len(cache._token_by_user) == len(cache._refresh_to_access) == 1000
+    
+    async def test_store_replaces_previous_user_token(self, token_cache):
+        """Тест: новый токен пользователя заменяет старый во всех индексах."""
+        await token_cache.store_token(user_id="user6", access_token="old", refresh_token="old_refresh")
+        await token_cache.store_token(user_id="user6", access_token="new", refresh_token="new_refresh")
+        
+        assert await token_cache.get_token("old") is None
+        assert await token_cache.refresh_token("old_refresh") is None
+        assert (await token_cache.refresh_token("new_refresh")).access_token == "new"
+        assert token_cache.size == 1
+    
+    async def test_expiry_wheel_cleanup(self):
+        """Тест: очистка удаляет только истекшие токены по колесу таймеров."""
+        cache = OAuthTokenCache(max_size=100, auto_cleanup=False, wheel_resolution=0.05)
+        await cache.store_token(user_id="short", access_token="short_token", expires_in=0.1)
+        await cache.store_token(user_id="long", access_token="long_token", expires_in=3600)
+        
+        assert await cache.cleanup() == 0
+        await asyncio.sleep(0.2)
+        
+        assert await cache.cleanup() == 1
+        assert await cache.get_token_by_user("short") is None
+        assert await cache.get_token("long_token") is not None
+    
+    async def test_concurrent_validation(self):
+        """Тест: параллельные проверки токенов не теряют обращений."""
+        cache = OAuthTokenCache(max_size=5000, auto_cleanup=False)
+        for i in range(1000):
+            await cache.store_token(user_id=f"user{i}", access_token=f"token{i}")
+        
+        async def worker(offset):
+            for i in range(1000):
+                assert await cache.get_token(f"token{(i + offset) % 1000}") is not None
+        
+        await asyncio.gather(*(worker(offset) for offset in range(0, 1000, 100)))
+        
+        stats = await cache.get_stats()
+        assert stats["hits"] == 10000
+        assert stats["shards"] == 16
 
 
 class TestSessionManager:
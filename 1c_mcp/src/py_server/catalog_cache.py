@@ -0,0 +1,137 @@
+"""Кэш каталогов инструментов, ресурсов и промптов 1С."""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Загрузчик каталога: принимает известную версию (etag), возвращает пару
+# (элементы или None, если каталог не изменился; новая версия)
+CatalogFetcher = Callable[[Optional[str]], Awaitable[Tuple[Optional[List[Any]], Optional[str]]]]
+
+
+@dataclass
+class CatalogEntry:
+	"""Закэшированный каталог."""
+	items: List[Any]
+	etag: Optional[str]
+	fetched_at: float
+
+
+class CatalogCache:
+	"""Кэш каталогов 1С, общий для всех MCP-сессий.
+	
+	Свежий каталог (моложе ttl) отдается из памяти. Устаревший отдается сразу,
+	а в фоне ревалидируется по версии (etag). Каталог старше ttl + stale_ttl
+	запрашивается синхронно, но если 1С не ответила за refresh_timeout,
+	отдается старая копия. Одновременные загрузки одного каталога объединяются.
+	"""
+	
+	def __init__(self, ttl: float = 60.0, stale_ttl: float = 600.0, refresh_timeout: float = 2.0):
+		"""Инициализация кэша.
+		
+		Args:
+			ttl: Время свежести каталога в секундах (0 - без кэширования)
+			stale_ttl: Сколько секунд после ttl отдавать каталог без ожидания ревалидации
+			refresh_timeout: Сколько ждать 1С, прежде чем отдать старую копию
+		"""
+		self.ttl = ttl
+		self.stale_ttl = stale_ttl
+		self.refresh_timeout = refresh_timeout
+		self._entries: Dict[Hashable, CatalogEntry] = {}
+		self._inflight: Dict[Hashable, asyncio.Task] = {}
+		self.stats = {"hits": 0, "stale": 0, "misses": 0, "fetches": 0, "not_modified": 0, "errors": 0}
+	
+	async def get(self, key: Hashable, fetch: CatalogFetcher) -> List[Any]:
+		"""Получить каталог.
+		
+		Args:
+			key: Ключ каталога (вид каталога, база и пользователь 1С)
+			fetch: Загрузчик каталога из 1С
+			
+		Returns:
+			Элементы каталога
+		"""
+		if self.ttl <= 0:
+			items, _ = await fetch(None)
+			return items or []
+		
+		entry = self._entries.get(key)
+		if entry is not None:
+			age = time.monotonic() - entry.fetched_at
+			if age < self.ttl:
+				self.stats["hits"] += 1
+				return entry.items
+			if age < self.ttl + self.stale_ttl:
+				self.stats["stale"] += 1
+				self._refresh(key, fetch, entry)
+				return entry.items
+		
+		self.stats["misses"] += 1
+		task = self._refresh(key, fetch, entry)
+		if entry is None:
+			return await asyncio.shield(task)
+		
+		try:
+			return await asyncio.wait_for(asyncio.shield(task), self.refresh_timeout)
+		except asyncio.TimeoutError:
+			logger.warning(f"1С не вернула каталог {key} за {self.refresh_timeout} с, отдаю устаревшую копию")
+		except Exception as e:
+			logger.warning(f"Ошибка обновления каталога {key}, отдаю устаревшую копию: {e}")
+		return entry.items
+	
+	def invalidate(self, key: Optional[Hashable] = None):
+		"""Сбросить каталог по ключу или все каталоги.
+		
+		Args:
+			key: Ключ каталога (None - все)
+		"""
+		if key is None:
+			self._entries.clear()
+		else:
+			self._entries.pop(key, None)
+	
+	def get_stats(self) -> Dict[str, Any]:
+		"""Получить статистику кэша."""
+		return {**self.stats, "entries": len(self._entries), "inflight": len(self._inflight)}
+	
+	def _refresh(self, key: Hashable, fetch: CatalogFetcher, entry: Optional[CatalogEntry]) -> asyncio.Task:
+		"""Запустить загрузку каталога или присоединиться к уже идущей."""
+		task = self._inflight.get(key)
+		if task is None:
+			task = asyncio.get_running_loop().create_task(self._fetch(key, fetch, entry))
+			self._inflight[key] = task
+			task.add_done_callback(self._fetch_done)
+		return task
+	
+	async def _fetch(self, key: Hashable, fetch: CatalogFetcher, entry: Optional[CatalogEntry]) -> List[Any]:
+		"""Загрузить каталог из 1С с ревалидацией по версии."""
+		try:
+			self.stats["fetches"] += 1
+			items, etag = await fetch(entry.etag if entry is not None else None)
+			
+			if items is None and entry is not None:
+				# Каталог не изменился: продлеваем свежесть без передачи содержимого
+				self.stats["not_modified"] += 1
+				entry.etag = etag or entry.etag
+				entry.fetched_at = time.monotonic()
+				return entry.items
+			
+			items = items or []
+			self._entries[key] = CatalogEntry(items=items, etag=etag, fetched_at=time.monotonic())
+			logger.debug(f"Каталог {key} обновлен: {len(items)} элементов")
+			return items
+		except Exception:
+			self.stats["errors"] += 1
+			raise
+		finally:
+			self._inflight.pop(key, None)
+	
+	@staticmethod
+	def _fetch_done(task: asyncio.Task):
+		"""Залогировать ошибку фоновой загрузки, которую никто не ожидает."""
+		if not task.cancelled() and task.exception() is not None:
+			logger.debug(f"Фоновое обновление каталога завершилось ошибкой: {task.exception()}")
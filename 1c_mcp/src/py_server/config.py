@@ -21,6 +21,21 @@ class Config(BaseSettings):
 	onec_password: str = Field(..., description="Пароль пользователя 1С")
 	onec_service_root: str = Field(default="mcp", description="Корневой URL HTTP-сервиса в 1С")
 	
+	# Настройки HTTP-клиента 1С
+	onec_timeout: float = Field(default=30.0, description="Таймаут HTTP-запроса к 1С в секундах")
+	onec_http2: bool = Field(default=False, description="Использовать HTTP/2 (нужен пакет h2)")
+	onec_max_connections: int = Field(default=20, description="Максимум соединений в пуле")
+	onec_max_keepalive_connections: int = Field(default=10, description="Максимум keep-alive соединений в пуле")
+	onec_keepalive_expiry: float = Field(default=30.0, description="Время жизни простаивающего соединения в секундах")
+	onec_max_concurrency: int = Field(default=8, description="Максимум одновременных HTTP-запросов к одной базе 1С")
+	onec_batch_window: float = Field(default=0.005, description="Окно сбора JSON-RPC вызовов в пакет в секундах (0 - без пакетов)")
+	onec_max_batch_size: int = Field(default=16, description="Максимум JSON-RPC вызовов в одном пакете")
+	
+	# Настройки кэша каталогов (tools/resources/prompts)
+	catalog_cache_ttl: float = Field(default=60.0, description="Время свежести каталога в секундах (0 - без кэширования)")
+	catalog_cache_stale_ttl: float = Field(default=600.0, description="Сколько секунд после TTL отдавать каталог, ревалидируя его в фоне")
+	catalog_refresh_timeout: float = Field(default=2.0, description="Сколько секунд ждать 1С, прежде чем отдать устаревший каталог")
+	
 	# Настройки MCP
 	server_name: str = Field(default="1C Configuration Data Tools", description="Имя MCP-сервера")
 	server_version: str = Field(default="1.0.0", description="Версия MCP-сервера")
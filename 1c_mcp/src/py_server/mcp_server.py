@@ -12,6 +12,7 @@ from mcp.server import Server
 from mcp.server.lowlevel import NotificationOptions
 from mcp.server.models import InitializationOptions
 
+from .catalog_cache import CatalogCache
 from .config import Config
 from .onec_client import OneCClient
 
@@ -36,6 +37,13 @@ class MCPProxy:
 		self.config = config
 		self.onec_client: Optional[OneCClient] = None
 		
+		# Каталоги инструментов, ресурсов и промптов, общие для всех сессий
+		self.catalog_cache = CatalogCache(
+			ttl=config.catalog_cache_ttl,
+			stale_ttl=config.catalog_cache_stale_ttl,
+			refresh_timeout=config.catalog_refresh_timeout
+		)
+		
 		# Создаем MCP сервер
 		self.server = Server(
 			name=config.server_name,
@@ -74,7 +82,15 @@ class MCPProxy:
 			base_url=self.config.onec_url,
 			username=username,
 			password=password,
-			service_root=self.config.onec_service_root
+			service_root=self.config.onec_service_root,
+			timeout=self.config.onec_timeout,
+			http2=self.config.onec_http2,
+			max_connections=self.config.onec_max_connections,
+			max_keepalive_connections=self.config.onec_max_keepalive_connections,
+			keepalive_expiry=self.config.onec_keepalive_expiry,
+			max_concurrency=self.config.onec_max_concurrency,
+			batch_window=self.config.onec_batch_window,
+			max_batch_size=self.config.onec_max_batch_size
 		)
 		
 		logger.debug(f"Подключение к 1С: {self.config.onec_url}")
@@ -103,7 +119,7 @@ class MCPProxy:
 			onec_client: OneCClient = ctx.lifespan_context["onec_client"]
 			
 			try:
-				tools = await onec_client.list_tools()
+				tools = await self._get_catalog(onec_client, "tools")
 				logger.debug(f"Получено инструментов: {len(tools)}")
 				return tools
 			except Exception as e:
@@ -138,7 +154,7 @@ class MCPProxy:
 			onec_client: OneCClient = ctx.lifespan_context["onec_client"]
 			
 			try:
-				resources = await onec_client.list_resources()
+				resources = await self._get_catalog(onec_client, "resources")
 				logger.debug(f"Получено ресурсов: {len(resources)}")
 				return resources
 			except Exception as e:
@@ -175,7 +191,7 @@ class MCPProxy:
 			onec_client: OneCClient = ctx.lifespan_context["onec_client"]
 			
 			try:
-				prompts = await onec_client.list_prompts()
+				prompts = await self._get_catalog(onec_client, "prompts")
 				logger.debug(f"Получено промптов: {len(prompts)}")
 				return prompts
 			except Exception as e:
@@ -199,6 +215,21 @@ class MCPProxy:
 					messages=[]
 				)
 	
+	async def _get_catalog(self, onec_client: OneCClient, kind: str) -> List[Any]:
+		"""Получить каталог из кэша, при необходимости загрузив его из 1С.
+		
+		Args:
+			onec_client: Клиент 1С текущей сессии
+			kind: Вид каталога: "tools", "resources" или "prompts"
+			
+		Returns:
+			Элементы каталога
+		"""
+		return await self.catalog_cache.get(
+			onec_client.catalog_key(kind),
+			lambda etag: onec_client.fetch_catalog(kind, etag)
+		)
+	
 	def get_capabilities(self) -> Dict[str, Any]:
 		"""Получить capabilities сервера."""
 		return {
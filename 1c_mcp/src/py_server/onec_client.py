@@ -2,22 +2,93 @@
 
 """Клиент для взаимодействия с 1С."""
 
+import asyncio
 import base64
+import hashlib
+import hmac
+import itertools
 import json
 import logging
-from typing import Any, Dict, List, Optional
+import secrets
+import weakref
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
 
 import httpx
 from mcp import types
 from mcp.server.lowlevel.helper_types import ReadResourceContents
 
+try:
+	import h2  # noqa: F401
+	HTTP2_AVAILABLE = True
+except ImportError:
+	HTTP2_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Семафоры ограничения параллельных запросов к базам 1С: event loop -> base_url -> семафор.
+# Общие для всех клиентов процесса (в режиме oauth2 у каждой сессии свой клиент)
+_base_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+
+# Ключ отпечатков учетных данных: случайный на процесс, пароль в кэше не восстановить
+_CREDENTIALS_KEY = secrets.token_bytes(32)
+
+
+def _credentials_fingerprint(username: str, password: str) -> str:
+	"""Отпечаток пары логин/пароль для ключей кэша (HMAC-SHA256)."""
+	message = f"{username}:{password}".encode("utf-8")
+	return hmac.new(_CREDENTIALS_KEY, message, hashlib.sha256).hexdigest()
+
+
+def _base_semaphore(base_url: str, limit: int) -> asyncio.Semaphore:
+	"""Получить семафор базы 1С для текущего event loop.
+	
+	Args:
+		base_url: Базовый URL 1С
+		limit: Максимум одновременных HTTP-запросов (учитывается при создании)
+		
+	Returns:
+		Семафор, общий для всех клиентов этой базы
+	"""
+	semaphores = _base_semaphores.setdefault(asyncio.get_running_loop(), {})
+	semaphore = semaphores.get(base_url)
+	if semaphore is None:
+		semaphore = semaphores[base_url] = asyncio.Semaphore(limit)
+	return semaphore
+
+
+class JSONRPCError(Exception):
+	"""Ошибка, возвращенная 1С в JSON-RPC ответе."""
+	
+	def __init__(self, code: Any, message: str, data: Any = None):
+		super().__init__(f"JSON-RPC ошибка {code}: {message}")
+		self.code = code
+		self.message = message
+		self.data = data
+
 
 class OneCClient:
-	"""Клиент для взаимодействия с HTTP-сервисом 1С."""
+	"""Клиент для взаимодействия с HTTP-сервисом 1С.
 	
-	def __init__(self, base_url: str, username: str, password: str, service_root: str = "mcp"):
+	JSON-RPC вызовы, сделанные в пределах короткого окна, объединяются в пакет
+	JSON-RPC 2.0 и отправляются одним HTTP-запросом. Число одновременных
+	HTTP-запросов к одной базе 1С ограничено.
+	"""
+	
+	def __init__(
+		self,
+		base_url: str,
+		username: str,
+		password: str,
+		service_root: str = "mcp",
+		timeout: float = 30.0,
+		http2: bool = False,
+		max_connections: int = 20,
+		max_keepalive_connections: int = 10,
+		keepalive_expiry: float = 30.0,
+		max_concurrency: int = 8,
+		batch_window: float = 0.005,
+		max_batch_size: int = 16
+	):
 		"""Инициализация клиента.
 		
 		Args:
@@ -25,19 +96,52 @@ class OneCClient:
 			username: Имя пользователя
 			password: Пароль
 			service_root: Корневой URL HTTP-сервиса (по умолчанию "mcp")
+			timeout: Таймаут HTTP-запроса в секундах
+			http2: Использовать HTTP/2 (нужен пакет h2)
+			max_connections: Максимум соединений в пуле
+			max_keepalive_connections: Максимум keep-alive соединений в пуле
+			keepalive_expiry: Время жизни простаивающего соединения в секундах
+			max_concurrency: Максимум одновременных HTTP-запросов к базе 1С
+			batch_window: Окно сбора вызовов в пакет в секундах (0 - без пакетов)
+			max_batch_size: Максимум вызовов в одном пакете
 		"""
 		self.base_url = base_url.rstrip('/')
 		self.service_root = service_root.strip('/')
+		self.username = username
 		self.auth = httpx.BasicAuth(username, password)
+		self._credentials_fingerprint = _credentials_fingerprint(username, password)
+		
+		if http2 and not HTTP2_AVAILABLE:
+			logger.warning("HTTP/2 недоступен (пакет h2 не установлен), используется HTTP/1.1")
+			http2 = False
+		
 		self.client = httpx.AsyncClient(
 			auth=self.auth,
-			timeout=30.0,
-			headers={"Content-Type": "application/json"}
+			timeout=timeout,
+			headers={"Content-Type": "application/json"},
+			http2=http2,
+			limits=httpx.Limits(
+				max_connections=max_connections,
+				max_keepalive_connections=max_keepalive_connections,
+				keepalive_expiry=keepalive_expiry
+			)
 		)
 		
 		# Формируем базовый URL для HTTP-сервиса
 		self.service_base_url = f"{self.base_url}/hs/{self.service_root}"
 		logger.debug(f"Базовый URL HTTP-сервиса: {self.service_base_url}")
+		
+		# Пакетирование JSON-RPC вызовов
+		self.max_concurrency = max(1, max_concurrency)
+		self.batch_window = batch_window
+		self.max_batch_size = max(1, max_batch_size)
+		self._ids = itertools.count(1)
+		self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+		self._flush_handle: Optional[asyncio.TimerHandle] = None
+		self._dispatch_tasks: Set[asyncio.Task] = set()
+		# None - еще неизвестно, принимает ли HTTP-сервис 1С пакеты
+		self._batch_supported: Optional[bool] = None
+		self.stats = {"calls": 0, "http_requests": 0, "batches": 0}
 	
 	async def check_health(self) -> bool:
 		"""Проверить состояние HTTP-сервиса 1С.
@@ -72,6 +176,8 @@ class OneCClient:
 	async def call_rpc(self, method: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
 		"""Выполнить JSON-RPC запрос к 1С.
 		
+		Вызовы, сделанные в пределах batch_window, отправляются одним пакетом.
+		
 		Args:
 			method: Имя метода
 			params: Параметры метода
@@ -79,31 +185,111 @@ class OneCClient:
 		Returns:
 			Результат выполнения метода
 		"""
-		try:
-			url = f"{self.service_base_url}/rpc"
-			
-			# Формируем JSON-RPC запрос
-			rpc_request = {
-				"jsonrpc": "2.0",
-				"id": 1,
-				"method": method,
-				"params": params or {}
-			}
+		request = self._build_request(method, params)
+		self.stats["calls"] += 1
+		
+		if self.batch_window <= 0 or self.max_batch_size == 1 or self._batch_supported is False:
+			response = await self._post_single(request)
+			return self._unwrap(response)
+		
+		loop = asyncio.get_running_loop()
+		future = loop.create_future()
+		self._pending.append((request, future))
+		if len(self._pending) >= self.max_batch_size:
+			self._flush_pending()
+		elif self._flush_handle is None:
+			self._flush_handle = loop.call_later(self.batch_window, self._flush_pending)
+		
+		return await future
+	
+	async def call_rpc_batch(
+		self,
+		calls: Sequence[Tuple[str, Optional[Dict[str, Any]]]],
+		return_exceptions: bool = False
+	) -> List[Any]:
+		"""Выполнить несколько JSON-RPC запросов пакетами, не дожидаясь окна.
+		
+		Args:
+			calls: Пары (метод, параметры)
+			return_exceptions: Возвращать ошибки вызовов в списке вместо исключения
 			
-			logger.debug(f"JSON-RPC запрос: {rpc_request}")
+		Returns:
+			Результаты в порядке вызовов
+		"""
+		loop = asyncio.get_running_loop()
+		pending = [(self._build_request(method, params), loop.create_future()) for method, params in calls]
+		self.stats["calls"] += len(pending)
+		
+		await asyncio.gather(*(
+			self._dispatch(pending[start:start + self.max_batch_size])
+			for start in range(0, len(pending), self.max_batch_size)
+		))
+		return await asyncio.gather(*(future for _, future in pending), return_exceptions=return_exceptions)
+	
+	def get_stats(self) -> Dict[str, Any]:
+		"""Получить статистику JSON-RPC вызовов."""
+		return {
+			**self.stats,
+			"pending": len(self._pending),
+			"batch_supported": self._batch_supported
+		}
+	
+	def _build_request(self, method: str, params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+		"""Сформировать JSON-RPC запрос с уникальным id."""
+		return {
+			"jsonrpc": "2.0",
+			"id": next(self._ids),
+			"method": method,
+			"params": params or {}
+		}
+	
+	@staticmethod
+	def _unwrap(rpc_response: Dict[str, Any]) -> Dict[str, Any]:
+		"""Извлечь результат из JSON-RPC ответа или вызвать JSONRPCError."""
+		if "error" in rpc_response:
+			error = rpc_response["error"] or {}
+			raise JSONRPCError(
+				error.get("code", "unknown"),
+				error.get("message", "Unknown error"),
+				error.get("data")
+			)
+		return rpc_response.get("result", {})
+	
+	def _flush_pending(self):
+		"""Отправить накопленные вызовы одним пакетом."""
+		if self._flush_handle is not None:
+			self._flush_handle.cancel()
+			self._flush_handle = None
+		
+		pending, self._pending = self._pending, []
+		if not pending:
+			return
+		
+		task = asyncio.get_running_loop().create_task(self._dispatch(pending))
+		self._dispatch_tasks.add(task)
+		task.add_done_callback(self._dispatch_tasks.discard)
+	
+	async def _post(self, payload: Any) -> Any:
+		"""Отправить JSON-RPC запрос или пакет в 1С с учетом лимита базы.
+		
+		Args:
+			payload: Запрос (объект) или пакет (массив)
 			
-			response = await self.client.post(url, json=rpc_request)
+		Returns:
+			Разобранный JSON ответа
+		"""
+		url = f"{self.service_base_url}/rpc"
+		logger.debug(f"JSON-RPC запрос: {payload}")
+		
+		try:
+			async with _base_semaphore(self.base_url, self.max_concurrency):
+				response = await self.client.post(url, json=payload)
+			self.stats["http_requests"] += 1
 			response.raise_for_status()
 			
 			rpc_response = response.json()
 			logger.debug(f"JSON-RPC ответ: {rpc_response}")
-			
-			# Проверяем на ошибки JSON-RPC
-			if "error" in rpc_response:
-				error = rpc_response["error"]
-				raise Exception(f"JSON-RPC ошибка {error.get('code', 'unknown')}: {error.get('message', 'Unknown error')}")
-			
-			return rpc_response.get("result", {})
+			return rpc_response
 			
 		except httpx.HTTPError as e:
 			logger.error(f"Ошибка HTTP при вызове RPC: {e}")
@@ -112,6 +298,72 @@ class OneCClient:
 			logger.error(f"Ошибка парсинга JSON ответа RPC: {e}")
 			raise
 	
+	async def _post_single(self, request: Dict[str, Any]) -> Dict[str, Any]:
+		"""Отправить одиночный JSON-RPC запрос."""
+		rpc_response = await self._post(request)
+		if isinstance(rpc_response, list):
+			rpc_response = next((item for item in rpc_response if item.get("id") == request["id"]), {})
+		return rpc_response
+	
+	async def _dispatch(self, pending: List[Tuple[Dict[str, Any], asyncio.Future]]):
+		"""Выполнить вызовы и разложить ответы по future согласно id."""
+		if len(pending) == 1 or self._batch_supported is False:
+			await asyncio.gather(*(self._resolve_single(request, future) for request, future in pending))
+			return
+		
+		try:
+			rpc_response = await self._post([request for request, _ in pending])
+		except Exception as e:
+			for _, future in pending:
+				if not future.done():
+					future.set_exception(e)
+			return
+		
+		self.stats["batches"] += 1
+		if isinstance(rpc_response, list):
+			self._batch_supported = True
+			responses = {item.get("id"): item for item in rpc_response if isinstance(item, dict)}
+		else:
+			# Расширение 1С без поддержки пакетов отвечает одним объектом:
+			# разрешаем вызов с совпавшим id, остальные повторяем по одному
+			if self._batch_supported is not False:
+				logger.warning("HTTP-сервис 1С не поддерживает JSON-RPC пакеты, запросы будут отправляться по одному")
+			self._batch_supported = False
+			responses = {rpc_response.get("id"): rpc_response} if isinstance(rpc_response, dict) else {}
+		
+		retry = []
+		for request, future in pending:
+			response = responses.get(request["id"])
+			if response is None:
+				retry.append((request, future))
+			elif not future.done():
+				self._settle(future, response)
+		
+		if retry and self._batch_supported:
+			for request, future in retry:
+				if not future.done():
+					future.set_exception(JSONRPCError(-32603, f"Нет ответа на запрос id={request['id']} в пакете"))
+		elif retry:
+			await asyncio.gather(*(self._resolve_single(request, future) for request, future in retry))
+	
+	async def _resolve_single(self, request: Dict[str, Any], future: asyncio.Future):
+		"""Выполнить одиночный вызов и передать результат в future."""
+		try:
+			response = await self._post_single(request)
+		except Exception as e:
+			if not future.done():
+				future.set_exception(e)
+			return
+		if not future.done():
+			self._settle(future, response)
+	
+	def _settle(self, future: asyncio.Future, response: Dict[str, Any]):
+		"""Установить результат или ошибку JSON-RPC ответа в future."""
+		try:
+			future.set_result(self._unwrap(response))
+		except JSONRPCError as e:
+			future.set_exception(e)
+	
 	async def list_tools(self) -> List[types.Tool]:
 		"""Получить список доступных инструментов.
 		
@@ -119,6 +371,40 @@ class OneCClient:
 			Список инструментов MCP
 		"""
 		result = await self.call_rpc("tools/list")
+		return self._parse_tools(result)
+	
+	def catalog_key(self, kind: str) -> Tuple[str, str, str, str]:
+		"""Ключ каталога в кэше: каталог зависит от базы и прав пользователя 1С.
+		
+		В ключе отпечаток логина и пароля, а не только логин: иначе клиент с
+		неверным паролем получил бы каталог из кэша, не дойдя до 1С.
+		"""
+		return (kind, self.base_url, self.service_root, self._credentials_fingerprint)
+	
+	async def fetch_catalog(self, kind: str, etag: Optional[str] = None) -> Tuple[Optional[List[Any]], Optional[str]]:
+		"""Получить каталог с ревалидацией по версии.
+		
+		Args:
+			kind: Вид каталога: "tools", "resources" или "prompts"
+			etag: Версия каталога, полученная ранее
+			
+		Returns:
+			Пара (элементы каталога, версия). Элементы равны None, если каталог
+			не изменился с версии etag
+		"""
+		parsers = {
+			"tools": self._parse_tools,
+			"resources": self._parse_resources,
+			"prompts": self._parse_prompts
+		}
+		result = await self.call_rpc(f"{kind}/list", {"etag": etag} if etag else None)
+		if result.get("notModified"):
+			return None, result.get("etag", etag)
+		return parsers[kind](result), result.get("etag")
+	
+	@staticmethod
+	def _parse_tools(result: Dict[str, Any]) -> List[types.Tool]:
+		"""Преобразовать ответ tools/list в инструменты MCP."""
 		tools_data = result.get("tools", [])
 		
 		tools = []
@@ -186,6 +472,11 @@ class OneCClient:
 			Список ресурсов MCP
 		"""
 		result = await self.call_rpc("resources/list")
+		return self._parse_resources(result)
+	
+	@staticmethod
+	def _parse_resources(result: Dict[str, Any]) -> List[types.Resource]:
+		"""Преобразовать ответ resources/list в ресурсы MCP."""
 		resources_data = result.get("resources", [])
 		
 		resources = []
@@ -261,6 +552,11 @@ class OneCClient:
 			Список промптов MCP
 		"""
 		result = await self.call_rpc("prompts/list")
+		return self._parse_prompts(result)
+	
+	@staticmethod
+	def _parse_prompts(result: Dict[str, Any]) -> List[types.Prompt]:
+		"""Преобразовать ответ prompts/list в промпты MCP."""
 		prompts_data = result.get("prompts", [])
 		
 		prompts = []
@@ -319,5 +615,8 @@ class OneCClient:
 		)
 	
 	async def close(self):
-		"""Закрыть клиент."""
-		await self.client.aclose() 
\ No newline at end of file
+		"""Закрыть клиент, дождавшись отправки накопленных вызовов."""
+		self._flush_pending()
+		if self._dispatch_tasks:
+			await asyncio.gather(*self._dispatch_tasks, return_exceptions=True)
+		await self.client.aclose()
\ No newline at end of file
@@ -0,0 +1,121 @@
+"""
+Тесты кэша каталогов 1С
+
+Тестирует:
+- CatalogCache: свежие, устаревшие и ревалидируемые по etag каталоги
+- OneCClient.catalog_key: изоляцию каталогов по учетным данным
+"""
+
+import asyncio
+
+import pytest
+
+from catalog_cache import CatalogCache
+from onec_client import OneCClient
+
+
+class Fetcher:
+    """Загрузчик каталога с подсчетом вызовов."""
+
+    def __init__(self, items=("tool",), etag="v1"):
+        self.items = list(items)
+        self.etag = etag
+        self.calls = []
+
+    async def __call__(self, etag):
+        self.calls.append(etag)
+        if etag is not None and etag == self.etag:
+            return None, self.etag
+        return list(self.items), self.etag
+
+
+class TestCatalogCache:
+    """Тесты для CatalogCache."""
+
+    async def test_fresh_catalog_served_from_memory(self):
+        """Тест: свежий каталог не запрашивается повторно."""
+        cache = CatalogCache(ttl=60.0)
+        fetch = Fetcher()
+
+        assert await cache.get("key", fetch) == ["tool"]
+        assert await cache.get("key", fetch) == ["tool"]
+
+        assert fetch.calls == [None]
+        assert cache.get_stats()["hits"] == 1
+
+    async def test_stale_catalog_revalidated_by_etag(self):
+        """Тест: устаревший каталог отдается сразу и ревалидируется в фоне."""
+        cache = CatalogCache(ttl=0.01, stale_ttl=60.0)
+        fetch = Fetcher()
+        await cache.get("key", fetch)
+        await asyncio.sleep(0.02)
+
+        assert await cache.get("key", fetch) == ["tool"]
+        await asyncio.sleep(0.01)
+
+        assert fetch.calls == [None, "v1"]
+        assert cache.get_stats()["not_modified"] == 1
+
+    async def test_concurrent_misses_share_one_fetch(self):
+        """Тест: одновременные промахи объединяются в одну загрузку."""
+        cache = CatalogCache(ttl=60.0)
+        fetch = Fetcher()
+
+        results = await asyncio.gather(*(cache.get("key", fetch) for _ in range(5)))
+
+        assert results == [["tool"]] * 5
+        assert fetch.calls == [None]
+
+    async def test_expired_catalog_returned_when_refresh_fails(self):
+        """Тест: при ошибке 1С отдается устаревшая копия."""
+        cache = CatalogCache(ttl=0.01, stale_ttl=0.0)
+        await cache.get("key", Fetcher())
+        await asyncio.sleep(0.02)
+
+        async def failing(etag):
+            raise ConnectionError("1C unavailable")
+
+        assert await cache.get("key", failing) == ["tool"]
+        assert cache.get_stats()["errors"] == 1
+
+
+class TestCatalogKey:
+    """Тесты ключа каталога OneCClient."""
+
+    @pytest.fixture
+    async def clients(self):
+        """Фикстура: клиенты одной базы с разными учетными данными."""
+        created = []
+
+        def make(username, password):
+            client = OneCClient("http://localhost/base/", username, password)
+            created.append(client)
+            return client
+
+        yield make
+        for client in created:
+            await client.client.aclose()
+
+    async def test_same_credentials_share_key(self, clients):
+        """Тест: одинаковые учетные данные - один ключ."""
+        assert clients("user", "secret").catalog_key("tools") == clients("user", "secret").catalog_key("tools")
+
+    async def test_key_does_not_contain_password(self, clients):
+        """Тест: пароль не хранится в ключе в открытом виде."""
+        key = clients("user", "secret").catalog_key("tools")
+
+        assert all("secret" not in str(part) for part in key)
+
+    async def test_different_password_misses_cache(self, clients):
+        """Тест: другой пароль не получает каталог из кэша."""
+        cache = CatalogCache(ttl=60.0)
+        owner = clients("user", "secret")
+        await cache.get(owner.catalog_key("tools"), Fetcher(items=["private_tool"]))
+
+        async def rejected(etag):
+            raise PermissionError("401 Unauthorized")
+
+        intruder = clients("user", "wrong")
+        with pytest.raises(PermissionError):
+            await cache.get(intruder.catalog_key("tools"), rejected)
+        assert cache.get_stats()["hits"] == 0
@@ -0,0 +1,146 @@
+"""
+Тесты пакетирования JSON-RPC вызовов OneCClient
+
+Тестирует:
+- сопоставление ответов пакета запросам по id
+- откат на одиночные запросы для расширения 1С без поддержки пакетов
+- ограничение одновременных HTTP-запросов к базе
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from onec_client import JSONRPCError, OneCClient
+
+
+class FakeOneC:
+    """HTTP-сервис 1С: отвечает на tools/call эхом аргумента."""
+
+    def __init__(self, batch_supported=True, delay=0.0):
+        self.batch_supported = batch_supported
+        self.delay = delay
+        self.bodies = []
+        self.active = 0
+        self.peak = 0
+
+    def answer(self, request):
+        if request["method"] == "fail":
+            return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32000, "message": "boom"}}
+        return {"jsonrpc": "2.0", "id": request["id"], "result": {"echo": request["params"].get("value")}}
+
+    async def __call__(self, http_request):
+        body = json.loads(http_request.content)
+        self.bodies.append(body)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+
+        if isinstance(body, list):
+            if not self.batch_supported:
+                # Старое расширение: массив - не объект запроса
+                error = {"code": -32600, "message": "Invalid Request"}
+                return httpx.Response(200, json={"jsonrpc": "2.0", "id": None, "error": error})
+            # Порядок ответов в пакете не гарантирован
+            return httpx.Response(200, json=[self.answer(item) for item in reversed(body)])
+        return httpx.Response(200, json=self.answer(body))
+
+
+@pytest.fixture
+async def make_client():
+    """Фикстура: клиент 1С поверх FakeOneC."""
+    created = []
+
+    def make(server, base_url="http://localhost/base", **kwargs):
+        client = OneCClient(base_url, "user", "secret", **kwargs)
+        client.client = httpx.AsyncClient(transport=httpx.MockTransport(server))
+        created.append(client)
+        return client
+
+    yield make
+    for client in created:
+        await client.close()
+        await client.client.aclose()
+
+
+class TestBatching:
+    """Тесты пакетной отправки вызовов."""
+
+    async def test_batch_responses_matched_by_id(self, make_client):
+        """Тест: ответы пакета раскладываются по вызовам по id, а не по порядку."""
+        server = FakeOneC()
+        client = make_client(server, batch_window=0.01)
+
+        results = await asyncio.gather(*(
+            client.call_rpc("tools/call", {"value": n}) for n in range(5)
+        ))
+
+        assert results == [{"echo": n} for n in range(5)]
+        assert len(server.bodies) == 1 and len(server.bodies[0]) == 5
+        assert client.get_stats()["batch_supported"] is True
+
+    async def test_batch_error_reaches_only_its_call(self, make_client):
+        """Тест: ошибка одного вызова пакета не затрагивает остальные."""
+        client = make_client(FakeOneC())
+
+        results = await client.call_rpc_batch(
+            [("tools/call", {"value": 1}), ("fail", None), ("tools/call", {"value": 3})],
+            return_exceptions=True
+        )
+
+        assert results[0] == {"echo": 1} and results[2] == {"echo": 3}
+        assert isinstance(results[1], JSONRPCError) and results[1].code == -32000
+
+    async def test_fallback_when_extension_rejects_batches(self, make_client):
+        """Тест: ошибка с id null на пакет - вызовы повторяются по одному."""
+        server = FakeOneC(batch_supported=False)
+        client = make_client(server, batch_window=0.01)
+
+        results = await asyncio.gather(*(
+            client.call_rpc("tools/call", {"value": n}) for n in range(3)
+        ))
+
+        assert results == [{"echo": n} for n in range(3)]
+        assert client.get_stats()["batch_supported"] is False
+        assert isinstance(server.bodies[0], list)
+        assert all(isinstance(body, dict) for body in server.bodies[1:])
+
+        # Дальше пакеты не отправляются
+        server.bodies.clear()
+        await asyncio.gather(client.call_rpc("tools/call", {"value": 7}), client.call_rpc("tools/call", {"value": 8}))
+        assert all(isinstance(body, dict) for body in server.bodies)
+
+
+class TestConcurrencyLimit:
+    """Тесты ограничения одновременных запросов к базе."""
+
+    async def test_requests_to_base_limited(self, make_client):
+        """Тест: не больше max_concurrency HTTP-запросов одновременно."""
+        server = FakeOneC(delay=0.01)
+        client = make_client(server, batch_window=0, max_concurrency=2)
+
+        results = await asyncio.gather(*(
+            client.call_rpc("tools/call", {"value": n}) for n in range(6)
+        ))
+
+        assert results == [{"echo": n} for n in range(6)]
+        assert server.peak == 2
+
+    async def test_limit_shared_by_clients_of_one_base(self, make_client):
+        """Тест: лимит общий для всех клиентов одной базы."""
+        server = FakeOneC(delay=0.01)
+        clients = [
+            make_client(server, base_url="http://localhost/shared", batch_window=0, max_concurrency=2)
+            for _ in range(3)
+        ]
+
+        await asyncio.gather(*(
+            client.call_rpc("tools/call", {"value": n}) for n, client in enumerate(clients * 2)
+        ))
+
+        assert server.peak == 2
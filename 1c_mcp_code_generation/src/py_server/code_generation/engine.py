@@ -11,12 +11,13 @@
 Обеспечивает генерацию кода 1С с использованием LLM и шаблонов.
 """
 
+import asyncio
 import json
 import logging
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
 # Импорт внутренних модулей
 from .llm.client import LLMClient
@@ -74,6 +75,17 @@ class CodeGenerationResult:
     execution_time: float
     validation_score: Optional[int] = None
     security_status: str = "pending"
+    stage_timings: Dict[str, float] = field(default_factory=dict)  # секунды по этапам
+
+@dataclass
+class PipelineStage:
+    """Этап DAG-конвейера генерации"""
+    name: str
+    run: Callable[..., Awaitable[Any]]  # получает результаты зависимостей в порядке depends_on
+    depends_on: Tuple[str, ...] = ()
+
+class PipelineAborted(Exception):
+    """Этап конвейера не может продолжить работу, зависимые этапы не выполняются"""
 
 class CodeGenerationEngine:
     """Основной движок генерации кода 1С"""
@@ -87,12 +99,18 @@ class CodeGenerationEngine:
         """
         self.config = config
         
+        # Режим конвейера: sequential - этапы по очереди, dag - независимые этапы параллельно
+        self.pipeline_mode = config.get('pipeline_mode', 'sequential')
+        
+        # В режиме dag аудит по умолчанию пишется в фоне и не задерживает ответ
+        audit_config = {'background': self.pipeline_mode == 'dag', **config.get('audit', {})}
+        
         # Инициализация компонентов
         self.llm_client = LLMClient(config.get('llm', {}))
         self.template_manager = TemplateManager(config.get('templates', {}))
         self.code_validator = CodeValidator(config.get('validation', {}))
         self.security_manager = SecurityManager(config.get('security', {}))
-        self.audit_logger = AuditLogger(config.get('audit', {}))
+        self.audit_logger = AuditLogger(audit_config)
         self.context_collector = ContextCollector(config.get('context', {}))
         
         # Статистика
@@ -104,6 +122,9 @@ class CodeGenerationEngine:
             'average_execution_time': 0.0
         }
         
+        # Суммарное время и число выполнений по этапам конвейера
+        self.stage_totals: Dict[str, List[float]] = {}
+        
         logger.info("CodeGenerationEngine инициализирован")
     
     async def generate_code(self, request: CodeGenerationRequest) -> CodeGenerationResult:
@@ -133,85 +154,10 @@ class CodeGenerationEngine:
         )
         
         try:
-            # Логирование начала операции
-            await self.audit_logger.log_generation_start(request)
-            
-            # Обновление статуса
-            result.status = CodeGenerationStatus.IN_PROGRESS
-            
-            # 1. Валидация входных данных
-            validation_result = self._validate_input(request)
-            if not validation_result['valid']:
-                result.errors.extend(validation_result['errors'])
-                result.status = CodeGenerationStatus.FAILED
-                return result
-            
-            # 2. Сбор контекста из 1С
-            context = await self._collect_context(request)
-            
-            # 3. Выбор оптимального шаблона
-            template = await self.template_manager.get_template(request.object_type, request.prompt)
-            
-            # 4. Формирование промпта для LLM
-            prompt = await self._build_llm_prompt(request, template, context)
-            
-            # 5. Генерация кода через LLM
-            generated_code = await self._generate_code_via_llm(prompt, template)
-            
-            if not generated_code:
-                result.errors.append("LLM не вернул код")
-                result.status = CodeGenerationStatus.FAILED
-                return result
-            
-            # 6. Валидация сгенерированного кода
-            validation_result = await self.code_validator.validate_code(
-                generated_code, context
-            )
-            
-            if not validation_result['valid']:
-                result.errors.extend(validation_result['errors'])
-                result.warnings.extend(validation_result['warnings'])
-                result.status = CodeGenerationStatus.VALIDATION_FAILED
-                self.stats['validation_failures'] += 1
-                return result
-            
-            # 7. Проверка безопасности
-            security_result = await self.security_manager.analyze_security(
-                generated_code, request
-            )
-            
-            if security_result['risk_level'] == 'critical':
-                result.errors.append(f"Код отклонен по соображениям безопасности: {security_result['description']}")
-                result.status = CodeGenerationStatus.SECURITY_REJECTED
-                self.stats['security_rejections'] += 1
-                return result
-            
-            # 8. Пост-обработка кода
-            processed_code = await self._post_process_code(generated_code, template)
-            
-            # 9. Формирование результата
-            result.success = True
-            result.status = CodeGenerationStatus.COMPLETED
-            result.generated_code = processed_code
-            result.metadata = {
-                'generation_time': time.time() - start_time,
-                'template_used': template['id'] if template else 'none',
-                'context_size': len(context),
-                'validation_score': validation_result.get('score', 0),
-                'security_risk': security_result['risk_level']
-            }
-            result.validation_score = validation_result.get('score')
-            result.security_status = security_result['risk_level']
-            
-            # 10. Генерация рекомендаций
-            result.recommendations = self._generate_recommendations(
-                validation_result, security_result, processed_code
-            )
-            
-            self.stats['successful_generations'] += 1
-            
-            # Логирование успешного завершения
-            await self.audit_logger.log_generation_success(request, result)
+            if self.pipeline_mode == 'dag':
+                await self._run_dag_pipeline(request, result, start_time)
+            else:
+                await self._run_sequential_pipeline(request, result, start_time)
             
         except Exception as e:
             # Обработка исключений
@@ -231,9 +177,229 @@ class CodeGenerationEngine:
                 (self.stats['average_execution_time'] * (self.stats['total_requests'] - 1) + execution_time) 
                 / self.stats['total_requests']
             )
+            
+            for stage, elapsed in result.stage_timings.items():
+                totals = self.stage_totals.setdefault(stage, [0.0, 0])
+                totals[0] += elapsed
+                totals[1] += 1
         
         return result
     
+    async def _run_sequential_pipeline(self, request: CodeGenerationRequest, result: CodeGenerationResult,
+                                       start_time: float):
+        """Последовательное выполнение этапов генерации"""
+        timings = result.stage_timings
+        
+        # Логирование начала операции
+        await self._timed(timings, 'audit_start', self.audit_logger.log_generation_start(request))
+        
+        # Обновление статуса
+        result.status = CodeGenerationStatus.IN_PROGRESS
+        
+        # 1. Валидация входных данных
+        if not self._check_input(request, result):
+            return
+        
+        # 2. Сбор контекста из 1С
+        context = await self._timed(timings, 'context', self._collect_context(request))
+        
+        # 3. Выбор оптимального шаблона
+        template = await self._timed(
+            timings, 'template', self.template_manager.get_template(request.object_type, request.prompt)
+        )
+        
+        # 4. Формирование промпта для LLM
+        prompt = await self._timed(timings, 'prompt', self._build_llm_prompt(request, template, context))
+        
+        # 5. Генерация кода через LLM
+        generated_code = await self._timed(timings, 'llm', self._generate_code_via_llm(prompt, template))
+        
+        if not generated_code:
+            result.errors.append("LLM не вернул код")
+            result.status = CodeGenerationStatus.FAILED
+            return
+        
+        # 6. Валидация сгенерированного кода
+        validation_result = await self._timed(
+            timings, 'validation', self.code_validator.validate_code(generated_code, context)
+        )
+        
+        if not self._check_validation(validation_result, result):
+            return
+        
+        # 7. Проверка безопасности
+        security_result = await self._timed(
+            timings, 'security', self.security_manager.analyze_security(generated_code, request)
+        )
+        
+        if not self._check_security(security_result, result):
+            return
+        
+        # 8. Пост-обработка кода
+        processed_code = await self._timed(
+            timings, 'post_process', self._post_process_code(generated_code, template)
+        )
+        
+        # 9-10. Формирование результата и рекомендаций
+        self._complete_result(result, start_time, template, context, validation_result,
+                              security_result, processed_code)
+        
+        # Логирование успешного завершения
+        await self._timed(timings, 'audit_success', self.audit_logger.log_generation_success(request, result))
+    
+    async def _run_dag_pipeline(self, request: CodeGenerationRequest, result: CodeGenerationResult,
+                                start_time: float):
+        """
+        Выполнение этапов генерации как DAG
+        
+        Сбор контекста идет параллельно с выбором шаблона, а валидация,
+        проверка безопасности и пост-обработка - параллельно после ответа
+        LLM. Результаты проверяются в том же порядке, что и в
+        последовательном режиме, поэтому итоговый статус не меняется.
+        """
+        timings = result.stage_timings
+        
+        # Аудит в этом режиме только ставит событие в очередь
+        await self._timed(timings, 'audit_start', self.audit_logger.log_generation_start(request))
+        result.status = CodeGenerationStatus.IN_PROGRESS
+        
+        if not self._check_input(request, result):
+            return
+        
+        async def generate(prompt, template):
+            generated_code = await self._generate_code_via_llm(prompt, template)
+            if not generated_code:
+                raise PipelineAborted("LLM не вернул код")
+            return generated_code
+        
+        stages = [
+            PipelineStage('context', lambda: self._collect_context(request)),
+            PipelineStage('template', lambda: self.template_manager.get_template(request.object_type, request.prompt)),
+            PipelineStage('prompt', lambda context, template: self._build_llm_prompt(request, template, context),
+                          ('context', 'template')),
+            PipelineStage('llm', generate, ('prompt', 'template')),
+            PipelineStage('validation', lambda code, context: self.code_validator.validate_code(code, context),
+                          ('llm', 'context')),
+            PipelineStage('security', lambda code: self.security_manager.analyze_security(code, request),
+                          ('llm',)),
+            PipelineStage('post_process', lambda code, template: self._post_process_code(code, template),
+                          ('llm', 'template')),
+        ]
+        
+        tasks = self._start_dag(stages, timings)
+        try:
+            try:
+                await tasks['llm']
+            except PipelineAborted as e:
+                result.errors.append(str(e))
+                result.status = CodeGenerationStatus.FAILED
+                return
+            
+            validation_result = await tasks['validation']
+            if not self._check_validation(validation_result, result):
+                return
+            
+            security_result = await tasks['security']
+            if not self._check_security(security_result, result):
+                return
+            
+            self._complete_result(result, start_time, await tasks['template'], await tasks['context'],
+                                  validation_result, security_result, await tasks['post_process'])
+        finally:
+            # Этапы, результат которых уже не нужен, отменяются
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+        
+        await self._timed(timings, 'audit_success', self.audit_logger.log_generation_success(request, result))
+    
+    def _start_dag(self, stages: List[PipelineStage], timings: Dict[str, float]) -> Dict[str, 'asyncio.Task']:
+        """
+        Запуск этапов DAG: каждый этап стартует, как только готовы его зависимости
+        
+        Этапы передаются в топологическом порядке. Исключение этапа
+        передается всем зависимым от него этапам.
+        """
+        tasks: Dict[str, asyncio.Task] = {}
+        
+        async def run_stage(stage: PipelineStage, dependencies: List[asyncio.Task]):
+            values = [await dependency for dependency in dependencies]
+            return await self._timed(timings, stage.name, stage.run(*values))
+        
+        for stage in stages:
+            dependencies = [tasks[name] for name in stage.depends_on]
+            tasks[stage.name] = asyncio.ensure_future(run_stage(stage, dependencies))
+        
+        return tasks
+    
+    @staticmethod
+    async def _timed(timings: Dict[str, float], stage: str, awaitable: Awaitable[Any]) -> Any:
+        """Выполнение этапа с замером времени"""
+        stage_start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            timings[stage] = time.perf_counter() - stage_start
+    
+    def _check_input(self, request: CodeGenerationRequest, result: CodeGenerationResult) -> bool:
+        """Валидация входных данных с записью ошибок в результат"""
+        stage_start = time.perf_counter()
+        validation_result = self._validate_input(request)
+        result.stage_timings['input_validation'] = time.perf_counter() - stage_start
+        
+        if not validation_result['valid']:
+            result.errors.extend(validation_result['errors'])
+            result.status = CodeGenerationStatus.FAILED
+            return False
+        return True
+    
+    def _check_validation(self, validation_result: Dict[str, Any], result: CodeGenerationResult) -> bool:
+        """Проверка результата валидации сгенерированного кода"""
+        if not validation_result['valid']:
+            result.errors.extend(validation_result['errors'])
+            result.warnings.extend(validation_result['warnings'])
+            result.status = CodeGenerationStatus.VALIDATION_FAILED
+            self.stats['validation_failures'] += 1
+            return False
+        return True
+    
+    def _check_security(self, security_result: Dict[str, Any], result: CodeGenerationResult) -> bool:
+        """Проверка результата анализа безопасности"""
+        if security_result['risk_level'] == 'critical':
+            result.errors.append(f"Код отклонен по соображениям безопасности: {security_result['description']}")
+            result.status = CodeGenerationStatus.SECURITY_REJECTED
+            self.stats['security_rejections'] += 1
+            return False
+        return True
+    
+    def _complete_result(self, result: CodeGenerationResult, start_time: float, template: Optional[Dict[str, Any]],
+                         context: Dict[str, Any], validation_result: Dict[str, Any],
+                         security_result: Dict[str, Any], processed_code: Dict[str, str]):
+        """Формирование успешного результата и рекомендаций"""
+        result.success = True
+        result.status = CodeGenerationStatus.COMPLETED
+        result.generated_code = processed_code
+        result.metadata = {
+            'generation_time': time.time() - start_time,
+            'template_used': template['id'] if template else 'none',
+            'context_size': len(context),
+            'validation_score': validation_result.get('score', 0),
+            'security_risk': security_result['risk_level'],
+            'pipeline_mode': self.pipeline_mode
+        }
+        result.validation_score = validation_result.get('score')
+        result.security_status = security_result['risk_level']
+        
+        result.recommendations = self._generate_recommendations(
+            validation_result, security_result, processed_code
+        )
+        
+        self.stats['successful_generations'] += 1
+    
+    async def close(self):
+        """Завершение работы: запись оставшихся событий аудита"""
+        await self.audit_logger.close()
+    
     async def validate_code(self, code: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         Валидация существующего кода
@@ -310,6 +476,11 @@ class CodeGenerationEngine:
             stats['validation_failure_rate'] = 0.0
             stats['security_rejection_rate'] = 0.0
         
+        # Среднее время этапов конвейера
+        stats['average_stage_timings'] = {
+            stage: total / count for stage, (total, count) in self.stage_totals.items()
+        }
+        
         # Добавление информации о компонентах
         stats['components'] = {
             'llm_client': self.llm_client.get_status(),
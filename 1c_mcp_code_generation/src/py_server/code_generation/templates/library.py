@@ -11,7 +11,7 @@ import logging
 from dataclasses import asdict, dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 
 
 @dataclass
@@ -90,6 +90,14 @@ class TemplateLibrary:
         
         # Загружаем все шаблоны
         self._templates_cache: Dict[str, CodeTemplate] = {}
+        
+        # Индексы для поиска: триграммы полей, имена и порядок добавления шаблонов
+        self._search_fields: Dict[str, Tuple[str, str, Tuple[str, ...]]] = {}
+        self._trigram_index: Dict[str, Set[str]] = {}
+        self._name_index: Dict[str, Set[str]] = {}
+        self._indexed_names: Dict[str, str] = {}
+        self._order: Dict[str, int] = {}
+        
         self._load_all_templates()
     
     def _ensure_directories(self):
@@ -111,6 +119,7 @@ class TemplateLibrary:
                     template = CodeTemplate.from_dict(template_data)
                     template_key = f"{obj_type}.{template.metadata.name}"
                     self._templates_cache[template_key] = template
+                    self._index_template(template_key, template)
                     
                     self.logger.info(f"Загружен шаблон: {template_key}")
                     
@@ -134,19 +143,95 @@ class TemplateLibrary:
         return [template for template in self._templates_cache.values() 
                 if template.metadata.complexity_level == complexity_level]
     
+    def get_template_by_name(self, name: str) -> Optional[CodeTemplate]:
+        """Возвращает шаблон по имени."""
+        template_keys = self._name_index.get(name)
+        if not template_keys:
+            return None
+        
+        # При совпадении имен у разных типов - первый добавленный шаблон
+        return self._templates_cache[min(template_keys, key=self._order.__getitem__)]
+    
     def search_templates(self, query: str) -> List[CodeTemplate]:
-        """Поиск шаблонов по названию, описанию или тегам."""
+        """
+        Поиск шаблонов по названию, описанию или тегам.
+        
+        Кандидаты берутся из инвертированного индекса триграмм, после чего
+        вхождение подстроки проверяется по заранее приведенным к нижнему
+        регистру полям.
+        """
         query_lower = query.lower()
-        results = []
         
-        for template in self._templates_cache.values():
-            metadata = template.metadata
-            if (query_lower in metadata.name.lower() or 
-                query_lower in metadata.description.lower() or
-                any(query_lower in tag.lower() for tag in metadata.tags)):
-                results.append(template)
+        if len(query_lower) < 3:
+            candidates = self._search_fields.keys()
+        else:
+            postings = []
+            for trigram in self._trigrams(query_lower):
+                posting = self._trigram_index.get(trigram)
+                if not posting:
+                    return []
+                postings.append(posting)
+            postings.sort(key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+        
+        matched = []
+        for template_key in candidates:
+            name, description, tags = self._search_fields[template_key]
+            if (query_lower in name or
+                query_lower in description or
+                any(query_lower in tag for tag in tags)):
+                matched.append(template_key)
+        
+        matched.sort(key=self._order.__getitem__)
+        return [self._templates_cache[template_key] for template_key in matched]
+    
+    def _index_template(self, template_key: str, template: CodeTemplate):
+        """Добавляет шаблон в поисковые индексы (или обновляет его записи)."""
+        self._unindex_template(template_key)
+        
+        metadata = template.metadata
+        fields = (
+            metadata.name.lower(),
+            metadata.description.lower(),
+            tuple(tag.lower() for tag in metadata.tags)
+        )
+        self._search_fields[template_key] = fields
+        self._indexed_names[template_key] = metadata.name
+        self._name_index.setdefault(metadata.name, set()).add(template_key)
+        self._order.setdefault(template_key, len(self._order))
+        
+        # Триграммы считаются по каждому полю отдельно: запрос не может
+        # совпасть на стыке названия и описания или двух тегов
+        trigrams = set()
+        for text in (fields[0], fields[1], *fields[2]):
+            trigrams.update(self._trigrams(text))
+        for trigram in trigrams:
+            self._trigram_index.setdefault(trigram, set()).add(template_key)
+    
+    def _unindex_template(self, template_key: str):
+        """Удаляет записи шаблона из поисковых индексов."""
+        fields = self._search_fields.pop(template_key, None)
+        if fields is None:
+            return
+        
+        name = self._indexed_names.pop(template_key)
+        template_keys = self._name_index[name]
+        template_keys.discard(template_key)
+        if not template_keys:
+            del self._name_index[name]
         
-        return results
+        for text in (fields[0], fields[1], *fields[2]):
+            for trigram in self._trigrams(text):
+                posting = self._trigram_index.get(trigram)
+                if posting is not None:
+                    posting.discard(template_key)
+                    if not posting:
+                        del self._trigram_index[trigram]
+    
+    @staticmethod
+    def _trigrams(text: str) -> Set[str]:
+        """Множество триграмм строки."""
+        return {text[i:i + 3] for i in range(len(text) - 2)}
     
     def save_template(self, template: CodeTemplate) -> bool:
         """Сохраняет шаблон в файл."""
@@ -164,6 +249,7 @@ class TemplateLibrary:
             # Обновляем кэш
             template_key = f"{obj_type}.{template.metadata.name}"
             self._templates_cache[template_key] = template
+            self._index_template(template_key, template)
             
             self.logger.info(f"Шаблон сохранен: {template_key}")
             return True
@@ -8,9 +8,53 @@
 
 import logging
 import re
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+# Плейсхолдер {имя}: имя не содержит фигурных скобок
+_PLACEHOLDER_PATTERN = re.compile(r'\{([^{}]*)\}')
+
+# Комментарии TODO, заменяемые сгенерированным кодом, и методы генерации
+_TODO_GENERATORS = {
+    '// TODO: Добавить основную логику здесь': '_generate_main_logic',
+    '// TODO: Добавить проверки': '_generate_validation_logic',
+    '// TODO: Добавить обработку ошибок': '_generate_error_handling',
+    '// TODO: Добавить текст запроса СКД': '_generate_skd_query',
+    '// TODO: Добавить заполнение других реквизитов': '_generate_field_filling',
+    '// TODO: Добавить дополнительные проверки': '_generate_additional_checks',
+    '// TODO: Добавить движения по необходимым регистрам': '_generate_movements',
+    '// TODO: Реализовать запись в систему аудита': '_generate_audit_code',
+}
+_TODO_PATTERN = re.compile('|'.join(
+    re.escape(marker) for marker in sorted(_TODO_GENERATORS, key=len, reverse=True)
+))
+
+
+@lru_cache(maxsize=512)
+def compile_template(text: str) -> Tuple[str, ...]:
+    """
+    Компилирует текст шаблона в список сегментов.
+    
+    Четные элементы - литеральный текст, нечетные - имена плейсхолдеров.
+    Результат кэшируется по тексту, поэтому каждый шаблон разбирается один раз.
+    """
+    return tuple(_PLACEHOLDER_PATTERN.split(text))
+
+
+def render_template(segments: Tuple[str, ...], variables: Dict[str, str]) -> str:
+    """
+    Подставляет переменные в скомпилированный шаблон за один проход.
+    
+    Плейсхолдеры неизвестных переменных остаются в тексте как есть.
+    """
+    parts = list(segments)
+    for i in range(1, len(parts), 2):
+        name = parts[i]
+        parts[i] = variables[name] if name in variables else f"{{{name}}}"
+    return ''.join(parts)
 
 
 @dataclass
@@ -47,16 +91,22 @@ class GeneratedCode:
 class TemplateProcessor:
     """Процессор для генерации кода из шаблонов."""
     
-    def __init__(self, template_library):
+    def __init__(self, template_library, render_cache_size: int = 256):
         """
         Инициализация процессора.
         
         Args:
             template_library: Экземпляр TemplateLibrary
+            render_cache_size: Число обработанных модулей в кэше (0 - без кэша)
         """
         self.template_library = template_library
         self.logger = logging.getLogger(__name__)
         
+        # Кэш обработанного кода по (текст модуля, набор переменных)
+        self.render_cache_size = render_cache_size
+        self._render_cache: "OrderedDict[Tuple[str, frozenset], str]" = OrderedDict()
+        self.cache_stats = {'hits': 0, 'misses': 0}
+        
         # Встроенные переменные для всех шаблонов
         self.builtin_variables = {
             'current_date': datetime.now().strftime('%d.%m.%Y'),
@@ -148,13 +198,29 @@ class TemplateProcessor:
             raise ValueError(f"Некорректные значения переменных: {', '.join(invalid_values)}")
     
     def _process_module_code(self, code: str, variables: Dict[str, str]) -> str:
-        """Обрабатывает код модуля."""
-        processed_code = code
+        """Обрабатывает код модуля (результат кэшируется для одинаковых переменных)."""
+        if self.render_cache_size <= 0:
+            return self._render_module_code(code, variables)
+        
+        cache_key = (code, frozenset(variables.items()))
+        processed_code = self._render_cache.get(cache_key)
+        if processed_code is not None:
+            self._render_cache.move_to_end(cache_key)
+            self.cache_stats['hits'] += 1
+            return processed_code
+        
+        self.cache_stats['misses'] += 1
+        processed_code = self._render_module_code(code, variables)
+        self._render_cache[cache_key] = processed_code
+        while len(self._render_cache) > self.render_cache_size:
+            self._render_cache.popitem(last=False)
         
+        return processed_code
+    
+    def _render_module_code(self, code: str, variables: Dict[str, str]) -> str:
+        """Подставляет переменные, заменяет TODO и форматирует код модуля."""
         # Заменяем переменные
-        for var_name, var_value in variables.items():
-            placeholder = f"{{{var_name}}}"
-            processed_code = processed_code.replace(placeholder, var_value)
+        processed_code = render_template(compile_template(code), variables)
         
         # Заменяем комментарии TODO
         processed_code = self._replace_todo_comments(processed_code, variables)
@@ -166,34 +232,24 @@ class TemplateProcessor:
     
     def _process_form_layout(self, layout: str, variables: Dict[str, str]) -> str:
         """Обрабатывает макет формы."""
-        processed_layout = layout
-        
         # Заменяем переменные в макете
-        for var_name, var_value in variables.items():
-            placeholder = f"{{{var_name}}}"
-            processed_layout = processed_layout.replace(placeholder, var_value)
-        
-        return processed_layout
+        return render_template(compile_template(layout), variables)
     
     def _replace_todo_comments(self, code: str, variables: Dict[str, str]) -> str:
         """Заменяет комментарии TODO на реальный код."""
-        # Словарь замен для TODO комментариев
-        todo_replacements = {
-            r'// TODO: Добавить основную логику здесь': self._generate_main_logic(variables),
-            r'// TODO: Добавить проверки': self._generate_validation_logic(variables),
-            r'// TODO: Добавить обработку ошибок': self._generate_error_handling(variables),
-            r'// TODO: Добавить текст запроса СКД': self._generate_skd_query(variables),
-            r'// TODO: Добавить заполнение других реквизитов': self._generate_field_filling(variables),
-            r'// TODO: Добавить дополнительные проверки': self._generate_additional_checks(variables),
-            r'// TODO: Добавить движения по необходимым регистрам': self._generate_movements(variables),
-            r'// TODO: Реализовать запись в систему аудита': self._generate_audit_code(),
-        }
+        if '// TODO:' not in code:
+            return code
         
-        processed_code = code
-        for todo_pattern, replacement in todo_replacements.items():
-            processed_code = re.sub(todo_pattern, replacement, processed_code, flags=re.MULTILINE)
+        # Каждый вид TODO генерируется не более одного раза за вызов
+        generated = {}
         
-        return processed_code
+        def replacement(match):
+            marker = match.group(0)
+            if marker not in generated:
+                generated[marker] = getattr(self, _TODO_GENERATORS[marker])(variables)
+            return generated[marker]
+        
+        return _TODO_PATTERN.sub(replacement, code)
     
     def _generate_main_logic(self, variables: Dict[str, str]) -> str:
         """Генерирует основную логику."""
@@ -340,7 +396,7 @@ class TemplateProcessor:
         Движение.Количество = СтрокаТЧ.Количество;
     КонецЦикла;"""
     
-    def _generate_audit_code(self) -> str:
+    def _generate_audit_code(self, variables: Dict[str, str] = None) -> str:
         """Генерирует код аудита."""
         return """
     // Запись в систему аудита
@@ -491,16 +547,3 @@ class TemplateProcessor:
             ))
         
         return variables
-
-
-# Расширение TemplateLibrary для совместимости
-def get_template_by_name(self, name: str) -> Optional[Any]:
-    """Возвращает шаблон по имени."""
-    for template in self._templates_cache.values():
-        if template.metadata.name == name:
-            return template
-    return None
-
-
-# Добавляем метод к классу TemplateLibrary
-TemplateLibrary.get_template_by_name = get_template_by_name
\ No newline at end of file
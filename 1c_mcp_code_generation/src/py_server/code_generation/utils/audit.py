@@ -10,6 +10,7 @@ Audit Logger для 1C AI MCP Code Generation
 Дата: 30.10.2025
 """
 
+import asyncio
 import json
 import logging
 import os
@@ -17,7 +18,7 @@ import time
 import uuid
 from dataclasses import asdict, dataclass
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 
 @dataclass
@@ -52,6 +53,14 @@ class AuditLogger:
         self.retention_days = config.get('retention_days', 30)
         self.max_file_size = config.get('max_file_size', 10 * 1024 * 1024)  # 10MB
         
+        # Фоновая запись: события ставятся в очередь и пишутся пачками, не блокируя вызывающего
+        self.background = config.get('background', False)
+        self.queue_size = config.get('queue_size', 10000)
+        self.batch_size = config.get('batch_size', 100)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        
         # Создание директории для логов
         if self.enabled and self.log_file:
             os.makedirs(os.path.dirname(self.log_file), exist_ok=True)
@@ -63,6 +72,7 @@ class AuditLogger:
         self.stats = {
             'events_logged': 0,
             'errors_logged': 0,
+            'events_dropped': 0,
             'total_execution_time': 0.0
         }
         
@@ -295,7 +305,11 @@ class AuditLogger:
         await self._log_event(event)
     
     async def _log_event(self, event: AuditEvent):
-        """Запись события в лог"""
+        """Запись события в лог (или постановка в очередь фоновой записи)"""
+        
+        if self.background:
+            self._enqueue_event(event)
+            return
         
         try:
             # Преобразование события в JSON
@@ -317,6 +331,86 @@ class AuditLogger:
             # Логирование ошибки логгера (осторожно с рекурсией)
             print(f"Ошибка записи в аудит лог: {e}")
     
+    def _enqueue_event(self, event: AuditEvent):
+        """Постановка события в очередь фоновой записи"""
+        
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop:
+            # Очередь и задача записи привязаны к циклу событий
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._loop = loop
+            self._worker = None
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._drain_queue())
+        
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Переполнение означает, что диск не успевает: событие теряется, а не блокирует генерацию
+            self.stats['events_dropped'] += 1
+            self.logger.warning(f"Очередь аудита переполнена, событие {event.event_type} пропущено")
+    
+    async def _drain_queue(self):
+        """Фоновая запись событий из очереди пачками"""
+        
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            
+            try:
+                lines = [
+                    json.dumps(asdict(event), default=self._json_serializer, ensure_ascii=False)
+                    for event in batch
+                ]
+                if self.log_file:
+                    await asyncio.to_thread(self._append_lines, lines)
+                
+                for event, event_json in zip(batch, lines):
+                    self.logger.info(f"AUDIT: {event_json}")
+                    self.stats['events_logged'] += 1
+                    if event.execution_time:
+                        self.stats['total_execution_time'] += event.execution_time
+                
+            except Exception as e:
+                self.logger.error(f"Ошибка фоновой записи аудита: {e}")
+            
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+    
+    def _append_lines(self, lines: List[str]):
+        """Дозапись пачки событий в файл с ротацией (выполняется в потоке)"""
+        
+        try:
+            if os.path.exists(self.log_file) and os.path.getsize(self.log_file) > self.max_file_size:
+                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                os.rename(self.log_file, f"{self.log_file}.{timestamp}.bak")
+            
+            with open(self.log_file, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+                
+        except Exception as e:
+            self.logger.error(f"Ошибка записи в файл аудита: {e}")
+    
+    async def flush(self):
+        """Ожидание записи всех событий из очереди"""
+        
+        if self._queue is not None and self._worker is not None and not self._worker.done():
+            await self._queue.join()
+    
+    async def close(self):
+        """Запись оставшихся событий и остановка фоновой записи"""
+        
+        await self.flush()
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+    
     async def _write_to_file(self, event_json: str):
         """Запись события в файл с ротацией"""
         
@@ -526,6 +620,8 @@ class AuditLogger:
             'log_file': self.log_file,
             'log_level': self.log_level,
             'retention_days': self.retention_days,
+            'background': self.background,
+            'queue_size': self._queue.qsize() if self._queue is not None else 0,
             'statistics': self.get_statistics(),
             'version': '1.0'
         }
\ No newline at end of file
@@ -10,13 +10,15 @@ Validation Package для 1C AI MCP Code Generation
 Дата: 30.10.2025
 """
 
-from .validator import (CodeValidator, SecurityAnalysisResult,
-                        StandardComplianceResult, SyntaxValidationResult,
-                        ValidationResult)
+from .validator import (CodeValidator, CodeView, ProcedureSpan,
+                        SecurityAnalysisResult, StandardComplianceResult,
+                        SyntaxValidationResult, ValidationResult)
 
 __version__ = "1.0.0"
 __all__ = [
     'CodeValidator', 
+    'CodeView',
+    'ProcedureSpan',
     'ValidationResult', 
     'SyntaxValidationResult', 
     'StandardComplianceResult', 
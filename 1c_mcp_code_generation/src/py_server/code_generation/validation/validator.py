@@ -10,15 +10,81 @@ Code Validator для 1C AI MCP Code Generation
 Дата: 30.10.2025
 """
 
+import asyncio
+import copy
 import hashlib
 import logging
 import re
-from dataclasses import dataclass
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
 from datetime import datetime
-from typing import Any, Dict, List
+from functools import cached_property
+from typing import Any, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Порядок проверок определяет порядок ошибок и предупреждений в результате
+VALIDATION_CHECKS = ('syntax', 'standards', 'security', 'performance')
+
+# Паттерны компилируются один раз при загрузке модуля, а не на каждой строке
+_PROCEDURE_NAME_PATTERN = re.compile(r'(?:Процедура|Функция)\s+(\w+)')
+_PROCEDURE_DECLARATION_PATTERN = re.compile(r'Процедура\s+([a-zA-Zа-яА-Я_][a-zA-Zа-яА-Я0-9_]*)\s*\(')
+_FUNCTION_DECLARATION_PATTERN = re.compile(r'Функция\s+([a-zA-Zа-яА-Я_][a-zA-Zа-яА-Я0-9_]*)\s*\(')
+_VARIABLE_DECLARATION_PATTERN = re.compile(r'Перем\s+([a-zA-Zа-яА-Я_][a-zA-Zа-яА-Я0-9_]*)')
+_WORD_PATTERN = re.compile(r'\w+')
+
+_SQL_INJECTION_PATTERNS = [
+    re.compile(r'Выполнить\s*\(\s*["\'].*\+.*["\']', re.IGNORECASE),  # Выполнить с конкатенацией
+    re.compile(r'Запрос\s*\.\s*Текст\s*=.*\+', re.IGNORECASE),        # Конкатенация в тексте запроса
+    re.compile(r'СтрЗаменить.*["\']\s*\+', re.IGNORECASE),            # СтрЗаменить с конкатенацией
+]
+
+_XSS_PATTERNS = [
+    re.compile(r'ЭлементыФормы\.[^.]+\.Значение\s*=.*\+', re.IGNORECASE),  # Присваивание с конкатенацией
+    re.compile(r'ТекстHTML\s*=.*\+', re.IGNORECASE),                        # Установка HTML с конкатенацией
+    re.compile(r'НавигационнаяСсылка\s*=.*\+', re.IGNORECASE),            # Установка ссылки с конкатенацией
+]
+
+_DANGEROUS_FUNCTIONS = {
+    'Выполнить': {'severity': 'high', 'description': 'Выполнение произвольного кода'},
+    'ЗагрузитьИзФайла': {'severity': 'medium', 'description': 'Загрузка произвольного файла'},
+    'ПолучитьФайл': {'severity': 'medium', 'description': 'Получение файла из внешнего источника'},
+    'ПодключитьВнешнююОбработку': {'severity': 'high', 'description': 'Подключение внешней обработки'},
+}
+_DANGEROUS_FUNCTION_PATTERNS = [
+    (name, info, re.compile(r'\b' + name + r'\s*\(', re.IGNORECASE))
+    for name, info in _DANGEROUS_FUNCTIONS.items()
+]
+
+_INFORMATION_LEAK_PATTERNS = [
+    re.compile(r'Сообщить\s*\(\s*.*[Пп]ароль.*\)', re.IGNORECASE),       # Вывод паролей
+    re.compile(r'Сообщить\s*\(\s*.*[Кк]люч.*\)', re.IGNORECASE),        # Вывод ключей
+    re.compile(r'ЗаписьЛога.*пароль', re.IGNORECASE),                    # Запись паролей в лог
+    re.compile(r'ЗаписьЛога.*ключ', re.IGNORECASE),                      # Запись ключей в лог
+]
+
+# Ключевые слова, увеличивающие цикломатическую сложность (в нижнем регистре)
+_COMPLEXITY_KEYWORDS = frozenset({
+    'если', 'иначеесли', 'иначе', 'для', 'по', 'пока',
+    'попытка', 'исключение', 'и', 'или', 'не'
+})
+
+# Паттерны проблем производительности и слова, без которых паттерн не совпадет
+_PERFORMANCE_PATTERNS = [
+    (re.compile(r'Для\s+.*\s+Цикл\s*\n.*\n.*Запрос', re.MULTILINE | re.IGNORECASE),
+     ('цикл', 'запрос'), 'Запрос внутри цикла'),
+    (re.compile(r'Получить\s*\([^)]*\)\s*\.\s*\w+\s*.*\n.*\n.*Для', re.MULTILINE | re.IGNORECASE),
+     ('получить', 'для'), 'Чтение в цикле'),
+    (re.compile(r'\w+\s*=\s*\w+\s*\.\s*Найти\([^)]*\)\s*\n.*\n.*\w+\s*=', re.MULTILINE | re.IGNORECASE),
+     ('найти(',), 'Повторный поиск в цикле'),
+]
+
+_GLOBAL_OBJECTS = [
+    'Метаданные', 'ЭтотОбъект', 'Константы', 'Справочники',
+    'Документы', 'Регистры', 'Обработки', 'Отчеты'
+]
+
 @dataclass
 class ValidationResult:
     """Результат валидации"""
@@ -54,6 +120,78 @@ class SecurityAnalysisResult:
     vulnerabilities: List[Dict[str, Any]]
     security_score: int
 
+@dataclass
+class ProcedureSpan:
+    """Процедура или функция в индексе строк кода"""
+    name: str
+    start: int  # индекс строки объявления (с нуля)
+    end: Optional[int]  # индекс строки КонецПроцедуры/КонецФункции, None - не закрыта
+
+class CodeView:
+    """
+    Разобранное представление кода, общее для всех проверок
+
+    Код делится на строки, очищается от отступов и индексируется по
+    процедурам один раз; проверки работают с готовыми списками вместо
+    повторного split и поиска границ процедур.
+    """
+
+    def __init__(self, code: str, code_hash: str = None):
+        self.code = code
+        self.code_hash = code_hash or hashlib.md5(code.encode('utf-8')).hexdigest()
+        self.lines = code.split('\n')
+        self.stripped = [line.strip() for line in self.lines]
+        self.procedures = self._index_procedures()
+
+    @cached_property
+    def words(self) -> frozenset:
+        """Множество слов кода (границы как у \\b в регулярных выражениях)"""
+        return frozenset(_WORD_PATTERN.findall(self.code))
+
+    @cached_property
+    def segments(self) -> List[Tuple[int, int, str]]:
+        """
+        Деление строк на сегменты: каждая процедура и промежутки между ними
+
+        Returns:
+            Список (начало, конец, хэш текста) полуинтервалов индексов строк
+        """
+        bounds = []
+        position = 0
+        for span in self.procedures:
+            if span.start > position:
+                bounds.append((position, span.start))
+            stop = len(self.lines) if span.end is None else span.end + 1
+            bounds.append((span.start, stop))
+            position = stop
+        if position < len(self.lines):
+            bounds.append((position, len(self.lines)))
+        return [
+            (start, stop, hashlib.md5('\n'.join(self.lines[start:stop]).encode('utf-8')).hexdigest())
+            for start, stop in bounds
+        ]
+
+    def _index_procedures(self) -> List[ProcedureSpan]:
+        """Поиск границ процедур и функций за один проход"""
+        procedures = []
+        stripped = self.stripped
+        i = 0
+        while i < len(stripped):
+            line = stripped[i]
+            if line.startswith('Процедура ') or line.startswith('Функция '):
+                match = _PROCEDURE_NAME_PATTERN.search(line)
+                end = None
+                j = i + 1
+                while j < len(stripped):
+                    if stripped[j] in ('КонецПроцедуры', 'КонецФункции'):
+                        end = j
+                        break
+                    j += 1
+                procedures.append(ProcedureSpan(match.group(1) if match else '', i, end))
+                i = j
+            i += 1
+        return procedures
+
 class CodeValidator:
     """Валидатор кода 1С"""
     
@@ -72,6 +210,23 @@ class CodeValidator:
         self.auto_fix = config.get('auto_fix', False)
         self.timeout = config.get('timeout', 10)
         
+        # Кэширование и параллельный запуск проверок
+        self.cache_size = config.get('cache_size', 256)
+        self.incremental = config.get('incremental', True)
+        self.segment_cache_size = config.get('segment_cache_size', 4096)
+        self.parallel_threshold = config.get('parallel_threshold', 200)
+        
+        # Результаты по (code_hash, набор проверок) и построчные находки по хэшу сегмента
+        self._result_cache: "OrderedDict[Tuple[str, frozenset], Dict[str, Any]]" = OrderedDict()
+        self._segment_cache: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_stats = {
+            'hits': 0,
+            'misses': 0,
+            'segments_scanned': 0,
+            'segments_reused': 0
+        }
+        
         # Статистика
         self.validation_stats = {
             'total_validations': 0,
@@ -92,6 +247,11 @@ class CodeValidator:
         """
         Основная функция валидации кода
         
+        Повторная валидация того же кода с тем же набором проверок отдается
+        из кэша. Независимые проверки большого кода выполняются параллельно
+        в потоках, а в инкрементальном режиме построчные проверки заново
+        выполняются только для изменившихся процедур.
+        
         Args:
             code: Код для валидации
             context: Контекст валидации
@@ -102,6 +262,16 @@ class CodeValidator:
         start_time = datetime.now()
         self.validation_stats['total_validations'] += 1
         
+        code_hash = hashlib.md5(code.encode('utf-8')).hexdigest()
+        checks = [name for name in VALIDATION_CHECKS if name in self.enabled_checks]
+        cache_key = (code_hash, frozenset(checks))
+        
+        cached = self._get_cached_result(cache_key)
+        if cached is not None:
+            cached['metadata']['validation_time'] = (datetime.now() - start_time).total_seconds()
+            self._update_validation_stats(cached)
+            return cached
+        
         # Результат по умолчанию
         result = {
             'valid': True,
@@ -112,35 +282,30 @@ class CodeValidator:
             'metadata': {
                 'validation_time': 0,
                 'checks_performed': [],
-                'code_hash': hashlib.md5(code.encode('utf-8')).hexdigest(),
+                'code_hash': code_hash,
                 'code_size': len(code),
-                'lines_count': len(code.split('\n'))
+                'lines_count': code.count('\n') + 1,
+                'cached': False
             }
         }
         
         try:
+            view = CodeView(code, code_hash)
+            
             # Выполнение проверок
-            check_results = {}
+            check_results = await self._run_checks(checks, view, context)
             
-            if 'syntax' in self.enabled_checks:
-                syntax_result = await self._validate_syntax(code)
-                check_results['syntax'] = syntax_result
-                self._update_result_with_syntax(result, syntax_result)
+            if 'syntax' in check_results:
+                self._update_result_with_syntax(result, check_results['syntax'])
             
-            if 'standards' in self.enabled_checks:
-                standards_result = await self._validate_standards(code, context)
-                check_results['standards'] = standards_result
-                self._update_result_with_standards(result, standards_result)
+            if 'standards' in check_results:
+                self._update_result_with_standards(result, check_results['standards'])
             
-            if 'security' in self.enabled_checks:
-                security_result = await self._validate_security(code)
-                check_results['security'] = security_result
-                self._update_result_with_security(result, security_result)
+            if 'security' in check_results:
+                self._update_result_with_security(result, check_results['security'])
             
-            if 'performance' in self.enabled_checks:
-                performance_result = await self._validate_performance(code, context)
-                check_results['performance'] = performance_result
-                self._update_result_with_performance(result, performance_result)
+            if 'performance' in check_results:
+                self._update_result_with_performance(result, check_results['performance'])
             
             # Обновление метаданных
             execution_time = (datetime.now() - start_time).total_seconds()
@@ -157,6 +322,8 @@ class CodeValidator:
             if self.auto_fix and not result['valid']:
                 result['fixed_code'] = await self._auto_fix_code(code, result['errors'])
             
+            self._store_cached_result(cache_key, result)
+            
             # Обновление статистики
             self._update_validation_stats(result)
             
@@ -169,31 +336,169 @@ class CodeValidator:
         
         return result
     
-    async def _validate_syntax(self, code: str) -> List[SyntaxValidationResult]:
+    async def _run_checks(self, checks: List[str], view: CodeView,
+                          context: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Запуск проверок над общим представлением кода
+        
+        Небольшой код проверяется последовательно: переключение на потоки
+        обходится дороже самих проверок.
+        """
+        if len(checks) > 1 and len(view.lines) >= self.parallel_threshold:
+            outcomes = await asyncio.gather(*(
+                asyncio.to_thread(self._run_check, name, view, context) for name in checks
+            ))
+        else:
+            outcomes = [self._run_check(name, view, context) for name in checks]
+        
+        return dict(zip(checks, outcomes))
+    
+    def _run_check(self, name: str, view: CodeView, context: Dict[str, Any]) -> Any:
+        """Выполнение одной проверки по имени"""
+        if name == 'syntax':
+            return self._validate_syntax(view)
+        if name == 'standards':
+            return self._validate_standards(view, context)
+        if name == 'security':
+            return self._validate_security(view)
+        return self._validate_performance(view, context)
+    
+    def _get_cached_result(self, key: Tuple[str, frozenset]) -> Optional[Dict[str, Any]]:
+        """Копия закэшированного результата или None"""
+        with self._cache_lock:
+            cached = self._result_cache.get(key)
+            if cached is None:
+                self.cache_stats['misses'] += 1
+                return None
+            self._result_cache.move_to_end(key)
+            self.cache_stats['hits'] += 1
+        
+        result = copy.deepcopy(cached)
+        result['metadata']['cached'] = True
+        return result
+    
+    def _store_cached_result(self, key: Tuple[str, frozenset], result: Dict[str, Any]):
+        """Сохранение результата в LRU-кэш"""
+        if self.cache_size <= 0:
+            return
+        
+        snapshot = copy.deepcopy(result)
+        with self._cache_lock:
+            self._result_cache[key] = snapshot
+            self._result_cache.move_to_end(key)
+            while len(self._result_cache) > self.cache_size:
+                self._result_cache.popitem(last=False)
+    
+    def clear_cache(self):
+        """Очистка кэшей результатов и сегментов"""
+        with self._cache_lock:
+            self._result_cache.clear()
+            self._segment_cache.clear()
+    
+    def _segment_findings(self, view: CodeView, check: str) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        Построчные находки проверки по сегментам кода
+        
+        Находки сегмента зависят только от его текста, поэтому кэшируются по
+        хэшу сегмента с номерами строк от его начала. В инкрементальном
+        режиме сегментами являются процедуры и промежутки между ними, и после
+        правки одной процедуры заново сканируется только она.
+        
+        Returns:
+            Список пар (смещение сегмента в строках, находки)
+        """
+        scanner = getattr(self, f'_scan_{check}')
+        
+        if not self.incremental or self.segment_cache_size <= 0:
+            return [(0, scanner(view.lines, view.stripped))]
+        
+        findings = []
+        for start, stop, segment_hash in view.segments:
+            key = (check, segment_hash)
+            with self._cache_lock:
+                segment = self._segment_cache.get(key)
+                if segment is not None:
+                    self._segment_cache.move_to_end(key)
+                    self.cache_stats['segments_reused'] += 1
+            
+            if segment is None:
+                segment = scanner(view.lines[start:stop], view.stripped[start:stop])
+                with self._cache_lock:
+                    self.cache_stats['segments_scanned'] += 1
+                    self._segment_cache[key] = segment
+                    while len(self._segment_cache) > self.segment_cache_size:
+                        self._segment_cache.popitem(last=False)
+            
+            findings.append((start, segment))
+        
+        return findings
+    
+    @staticmethod
+    def _shifted_syntax(findings: List[Tuple[int, Dict[str, Any]]], rule: str) -> List[SyntaxValidationResult]:
+        """Синтаксические ошибки сегментов с номерами строк от начала кода"""
+        return [
+            replace(error, line_number=error.line_number + offset)
+            for offset, segment in findings for error in segment[rule]
+        ]
+    
+    @staticmethod
+    def _shifted_vulnerabilities(findings: List[Tuple[int, Dict[str, Any]]], rule: str) -> List[Dict[str, Any]]:
+        """Уязвимости сегментов с номерами строк от начала кода"""
+        return [
+            dict(vuln, line=vuln['line'] + offset)
+            for offset, segment in findings for vuln in segment[rule]
+        ]
+    
+    def _scan_syntax(self, lines: List[str], stripped: List[str]) -> Dict[str, Any]:
+        """Построчные синтаксические проверки сегмента"""
+        return {
+            'brackets': self._check_bracket_balance(lines),
+            'strings': self._check_string_syntax(lines),
+            'comments': self._check_comment_syntax(lines)
+        }
+    
+    def _scan_standards(self, lines: List[str], stripped: List[str]) -> Dict[str, Any]:
+        """Построчные проверки стандартов сегмента"""
+        return {'naming': self._find_naming_violations(stripped)}
+    
+    def _scan_security(self, lines: List[str], stripped: List[str]) -> Dict[str, Any]:
+        """Построчные проверки безопасности сегмента"""
+        return {
+            'sql': self._check_sql_injections(lines, stripped),
+            'xss': self._check_xss_vulnerabilities(lines, stripped),
+            'dangerous': self._check_dangerous_functions(lines, stripped),
+            'leaks': self._check_information_leaks(lines, stripped)
+        }
+    
+    def _scan_performance(self, lines: List[str], stripped: List[str]) -> Dict[str, Any]:
+        """Подсчет ключевых слов сложности в сегменте"""
+        return {'complexity': self._count_complexity_keywords('\n'.join(lines))}
+    
+    def _validate_syntax(self, view: CodeView) -> List[SyntaxValidationResult]:
         """Синтаксическая валидация"""
         
         errors = []
         
         try:
+            findings = self._segment_findings(view, 'syntax')
+            
             # Проверка баланса скобок
-            bracket_errors = self._check_bracket_balance(code)
-            errors.extend(bracket_errors)
+            errors.extend(self._shifted_syntax(findings, 'brackets'))
+            errors.extend(self._check_unclosed_brackets(view))
             
             # Проверка корректности процедур и функций
-            procedure_errors = self._check_procedures_functions(code)
+            procedure_errors = self._check_procedures_functions(view)
             errors.extend(procedure_errors)
             
             # Проверка синтаксиса областей
-            region_errors = self._check_regions(code)
+            region_errors = self._check_regions(view)
             errors.extend(region_errors)
             
             # Проверка корректности строк
-            string_errors = self._check_string_syntax(code)
-            errors.extend(string_errors)
+            errors.extend(self._shifted_syntax(findings, 'strings'))
             
             # Проверка комментариев
-            comment_errors = self._check_comment_syntax(code)
-            errors.extend(comment_errors)
+            errors.extend(self._shifted_syntax(findings, 'comments'))
             
         except Exception as e:
             logger.error(f"Ошибка синтаксической валидации: {e}")
@@ -204,50 +509,38 @@ class CodeValidator:
         
         return errors
     
-    async def _validate_standards(self, code: str, context: Dict[str, Any]) -> List[StandardComplianceResult]:
+    def _validate_standards(self, view: CodeView, context: Dict[str, Any]) -> List[StandardComplianceResult]:
         """Проверка соответствия стандартам"""
         
         results = []
         
         # Проверка именования
-        naming_result = self._check_naming_standards(code)
+        naming_result = self._check_naming_standards(view)
         results.append(naming_result)
         
         # Проверка структуры кода
-        structure_result = self._check_code_structure(code)
+        structure_result = self._check_code_structure(view)
         results.append(structure_result)
         
         # Проверка документирования
-        documentation_result = self._check_documentation_standards(code)
+        documentation_result = self._check_documentation_standards(view)
         results.append(documentation_result)
         
         # Проверка архитектурных принципов
-        architecture_result = self._check_architecture_standards(code)
+        architecture_result = self._check_architecture_standards(view)
         results.append(architecture_result)
         
         return results
     
-    async def _validate_security(self, code: str) -> SecurityAnalysisResult:
+    def _validate_security(self, view: CodeView) -> SecurityAnalysisResult:
         """Проверка безопасности"""
         
         vulnerabilities = []
-        risk_factors = []
+        findings = self._segment_findings(view, 'security')
         
-        # Проверка SQL-инъекций
-        sql_vulnerabilities = self._check_sql_injections(code)
-        vulnerabilities.extend(sql_vulnerabilities)
-        
-        # Проверка XSS уязвимостей
-        xss_vulnerabilities = self._check_xss_vulnerabilities(code)
-        vulnerabilities.extend(xss_vulnerabilities)
-        
-        # Проверка опасных функций
-        dangerous_functions = self._check_dangerous_functions(code)
-        vulnerabilities.extend(dangerous_functions)
-        
-        # Проверка утечек информации
-        information_leaks = self._check_information_leaks(code)
-        vulnerabilities.extend(information_leaks)
+        # SQL-инъекции, XSS, опасные функции и утечки информации
+        for rule in ('sql', 'xss', 'dangerous', 'leaks'):
+            vulnerabilities.extend(self._shifted_vulnerabilities(findings, rule))
         
         # Вычисление уровня риска
         risk_level = self._calculate_security_risk_level(vulnerabilities)
@@ -259,32 +552,32 @@ class CodeValidator:
             security_score=security_score
         )
     
-    async def _validate_performance(self, code: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    def _validate_performance(self, view: CodeView, context: Dict[str, Any]) -> Dict[str, Any]:
         """Проверка производительности"""
         
         issues = []
         metrics = {}
         
         # Анализ цикломатической сложности
-        complexity = self._calculate_cyclomatic_complexity(code)
+        complexity = self._calculate_cyclomatic_complexity(view)
         metrics['cyclomatic_complexity'] = complexity
         
         if complexity > 20:
             issues.append(f"Высокая цикломатическая сложность: {complexity}")
         
         # Анализ глубины вложенности
-        nesting_depth = self._calculate_nesting_depth(code)
+        nesting_depth = self._calculate_nesting_depth(view)
         metrics['nesting_depth'] = nesting_depth
         
         if nesting_depth > 5:
             issues.append(f"Большая глубина вложенности: {nesting_depth}")
         
         # Проверка на потенциальные проблемы производительности
-        performance_issues = self._check_performance_issues(code)
+        performance_issues = self._check_performance_issues(view)
         issues.extend(performance_issues)
         
         # Анализ размера функций
-        function_sizes = self._analyze_function_sizes(code)
+        function_sizes = self._analyze_function_sizes(view)
         metrics['function_sizes'] = function_sizes
         
         large_functions = [f for f in function_sizes if f > 50]
@@ -297,61 +590,72 @@ class CodeValidator:
             'performance_score': self._calculate_performance_score(issues, metrics)
         }
     
-    def _check_bracket_balance(self, code: str) -> List[SyntaxValidationResult]:
-        """Проверка баланса скобок"""
+    def _match_brackets(self, line_num: int, line: str) -> Tuple[List[SyntaxValidationResult], List[Tuple[str, int]]]:
+        """Сопоставление скобок в строке: ошибки и оставшиеся открытыми скобки"""
         
         errors = []
-        lines = code.split('\n')
+        bracket_stack = []
         
-        for line_num, line in enumerate(lines, 1):
-            bracket_stack = []
-            
-            for col, char in enumerate(line):
-                if char in '([{':
-                    bracket_stack.append((char, col))
-                elif char in ')]}':
-                    if not bracket_stack:
+        for col, char in enumerate(line):
+            if char in '([{':
+                bracket_stack.append((char, col))
+            elif char in ')]}':
+                if not bracket_stack:
+                    errors.append(SyntaxValidationResult(
+                        line_number=line_num,
+                        column=col,
+                        error_type="unmatched_bracket",
+                        message=f"Незакрытая закрывающая скобка: {char}",
+                        severity="error"
+                    ))
+                else:
+                    opening_bracket, opening_col = bracket_stack.pop()
+                    if not self._brackets_match(opening_bracket, char):
                         errors.append(SyntaxValidationResult(
                             line_number=line_num,
                             column=col,
-                            error_type="unmatched_bracket",
-                            message=f"Незакрытая закрывающая скобка: {char}",
+                            error_type="mismatched_brackets",
+                            message=f"Несоответствующие скобки: {opening_bracket} и {char}",
                             severity="error"
                         ))
-                    else:
-                        opening_bracket, opening_col = bracket_stack.pop()
-                        if not self._brackets_match(opening_bracket, char):
-                            errors.append(SyntaxValidationResult(
-                                line_number=line_num,
-                                column=col,
-                                error_type="mismatched_brackets",
-                                message=f"Несоответствующие скобки: {opening_bracket} и {char}",
-                                severity="error"
-                            ))
-        
-        # Проверка незакрытых скобок
-        for bracket, col in bracket_stack:
-            errors.append(SyntaxValidationResult(
-                line_number=len(lines),
+        
+        return errors, bracket_stack
+    
+    def _check_bracket_balance(self, lines: List[str]) -> List[SyntaxValidationResult]:
+        """Проверка баланса скобок"""
+        
+        errors = []
+        
+        for line_num, line in enumerate(lines, 1):
+            if ')' in line or ']' in line or '}' in line:
+                errors.extend(self._match_brackets(line_num, line)[0])
+        
+        return errors
+    
+    def _check_unclosed_brackets(self, view: CodeView) -> List[SyntaxValidationResult]:
+        """Проверка незакрытых скобок (скобки сопоставляются построчно, учитывается последняя строка)"""
+        
+        _, bracket_stack = self._match_brackets(len(view.lines), view.lines[-1])
+        
+        return [
+            SyntaxValidationResult(
+                line_number=len(view.lines),
                 column=col,
                 error_type="unclosed_bracket",
                 message=f"Незакрытая скобка: {bracket}",
                 severity="error"
-            ))
-        
-        return errors
+            )
+            for bracket, col in bracket_stack
+        ]
     
-    def _check_procedures_functions(self, code: str) -> List[SyntaxValidationResult]:
+    def _check_procedures_functions(self, view: CodeView) -> List[SyntaxValidationResult]:
         """Проверка процедур и функций"""
         
         errors = []
-        lines = code.split('\n')
         
         procedure_stack = []
         
-        for line_num, line in enumerate(lines, 1):
-            line_stripped = line.strip()
-            
+        for line_num, line_stripped in enumerate(view.stripped, 1):
             # Поиск начал процедур/функций
             if line_stripped.startswith('Процедура ') or line_stripped.startswith('Функция '):
                 procedure_stack.append((line_num, line_stripped.split()[1]))
@@ -381,17 +685,14 @@ class CodeValidator:
         
         return errors
     
-    def _check_regions(self, code: str) -> List[SyntaxValidationResult]:
+    def _check_regions(self, view: CodeView) -> List[SyntaxValidationResult]:
         """Проверка областей"""
         
         errors = []
-        lines = code.split('\n')
         
         region_stack = []
         
-        for line_num, line in enumerate(lines, 1):
-            line_stripped = line.strip()
-            
+        for line_num, line_stripped in enumerate(view.stripped, 1):
             if line_stripped.startswith('#Область '):
                 region_name = line_stripped[9:].strip()
                 region_stack.append((line_num, region_name))
@@ -420,15 +721,18 @@ class CodeValidator:
         
         return errors
     
-    def _check_string_syntax(self, code: str) -> List[SyntaxValidationResult]:
+    def _check_string_syntax(self, lines: List[str]) -> List[SyntaxValidationResult]:
         """Проверка синтаксиса строк"""
         
         errors = []
-        lines = code.split('\n')
         
         for line_num, line in enumerate(lines, 1):
             quote_count = line.count('"')
             
+            # Строки без кавычек проверять не нужно
+            if not quote_count:
+                continue
+            
             # Проверка нечетного количества кавычек
             if quote_count % 2 != 0:
                 errors.append(SyntaxValidationResult(
@@ -460,11 +764,10 @@ class CodeValidator:
         
         return errors
     
-    def _check_comment_syntax(self, code: str) -> List[SyntaxValidationResult]:
+    def _check_comment_syntax(self, lines: List[str]) -> List[SyntaxValidationResult]:
         """Проверка синтаксиса комментариев"""
         
         errors = []
-        lines = code.split('\n')
         
         for line_num, line in enumerate(lines, 1):
             # Проверка корректности комментариев
@@ -484,39 +787,44 @@ class CodeValidator:
         
         return errors
     
-    def _check_naming_standards(self, code: str) -> StandardComplianceResult:
-        """Проверка стандартов именования"""
+    def _find_naming_violations(self, stripped: List[str]) -> List[Tuple[int, str]]:
+        """Поиск некорректных имен: пары (номер строки, описание нарушения)"""
         
         violations = []
-        recommendations = []
-        
-        # Паттерны для проверки именования
-        procedure_pattern = r'Процедура\s+([a-zA-Zа-яА-Я_][a-zA-Zа-яА-Я0-9_]*)\s*\('
-        function_pattern = r'Функция\s+([a-zA-Zа-яА-Я_][a-zA-Zа-яА-Я0-9_]*)\s*\('
-        variable_pattern = r'Перем\s+([a-zA-Zа-яА-Я_][a-zA-Zа-яА-Я0-9_]*)'
-        
-        lines = code.split('\n')
         
-        for line_num, line in enumerate(lines, 1):
-            line_stripped = line.strip()
-            
+        for line_num, line_stripped in enumerate(stripped, 1):
             # Проверка процедур
-            for match in re.finditer(procedure_pattern, line_stripped):
-                proc_name = match.group(1)
-                if not self._is_valid_procedure_name(proc_name):
-                    violations.append(f"Строка {line_num}: Некорректное имя процедуры '{proc_name}'")
+            if 'Процедура' in line_stripped:
+                for match in _PROCEDURE_DECLARATION_PATTERN.finditer(line_stripped):
+                    proc_name = match.group(1)
+                    if not self._is_valid_procedure_name(proc_name):
+                        violations.append((line_num, f"Некорректное имя процедуры '{proc_name}'"))
             
             # Проверка функций
-            for match in re.finditer(function_pattern, line_stripped):
-                func_name = match.group(1)
-                if not self._is_valid_function_name(func_name):
-                    violations.append(f"Строка {line_num}: Некорректное имя функции '{func_name}'")
+            if 'Функция' in line_stripped:
+                for match in _FUNCTION_DECLARATION_PATTERN.finditer(line_stripped):
+                    func_name = match.group(1)
+                    if not self._is_valid_function_name(func_name):
+                        violations.append((line_num, f"Некорректное имя функции '{func_name}'"))
             
             # Проверка переменных
-            for match in re.finditer(variable_pattern, line_stripped):
-                var_name = match.group(1)
-                if not self._is_valid_variable_name(var_name):
-                    violations.append(f"Строка {line_num}: Некорректное имя переменной '{var_name}'")
+            if 'Перем' in line_stripped:
+                for match in _VARIABLE_DECLARATION_PATTERN.finditer(line_stripped):
+                    var_name = match.group(1)
+                    if not self._is_valid_variable_name(var_name):
+                        violations.append((line_num, f"Некорректное имя переменной '{var_name}'"))
+        
+        return violations
+    
+    def _check_naming_standards(self, view: CodeView) -> StandardComplianceResult:
+        """Проверка стандартов именования"""
+        
+        violations = [
+            f"Строка {line_num + offset}: {violation}"
+            for offset, segment in self._segment_findings(view, 'standards')
+            for line_num, violation in segment['naming']
+        ]
+        recommendations = []
         
         # Рекомендации
         if violations:
@@ -533,21 +841,21 @@ class CodeValidator:
             recommendations=recommendations
         )
     
-    def _check_code_structure(self, code: str) -> StandardComplianceResult:
+    def _check_code_structure(self, view: CodeView) -> StandardComplianceResult:
         """Проверка структуры кода"""
         
         violations = []
         recommendations = []
         
-        lines = code.split('\n')
         has_regions = False
         has_program_interface = False
         
-        for line in lines:
-            if line.strip().startswith('#Область'):
+        for line_stripped in view.stripped:
+            if line_stripped.startswith('#Область'):
                 has_regions = True
-            if line.strip().startswith('#Область ПрограммныйИнтерфейс'):
-                has_program_interface = True
+                if line_stripped.startswith('#Область ПрограммныйИнтерфейс'):
+                    has_program_interface = True
+                    break
         
         # Проверка использования областей
         if not has_regions:
@@ -561,8 +869,8 @@ class CodeValidator:
         
         # Проверка пустых строк
         consecutive_empty_lines = 0
-        for line in lines:
-            if not line.strip():
+        for line_stripped in view.stripped:
+            if not line_stripped:
                 consecutive_empty_lines += 1
                 if consecutive_empty_lines > 2:
                     violations.append(f"Слишком много пустых строк подряд: {consecutive_empty_lines}")
@@ -580,31 +888,24 @@ class CodeValidator:
             recommendations=recommendations
         )
     
-    def _check_documentation_standards(self, code: str) -> StandardComplianceResult:
+    def _check_documentation_standards(self, view: CodeView) -> StandardComplianceResult:
         """Проверка стандартов документирования"""
         
         violations = []
         recommendations = []
         
-        lines = code.split('\n')
         procedure_count = 0
         documented_procedures = 0
         
-        for line in lines:
-            line_stripped = line.strip()
-            
+        for line_index, line_stripped in enumerate(view.stripped):
             if line_stripped.startswith('Процедура ') or line_stripped.startswith('Функция '):
                 procedure_count += 1
                 
-                # Проверка наличия комментария перед процедурой
-                line_index = lines.index(line)
-                has_comment = False
-                
                 # Поиск комментария в предыдущих строках
-                for i in range(max(0, line_index - 3), line_index):
-                    if lines[i].strip().startswith('//'):
-                        has_comment = True
-                        break
+                has_comment = any(
+                    view.stripped[i].startswith('//')
+                    for i in range(max(0, line_index - 3), line_index)
+                )
                 
                 if has_comment:
                     documented_procedures += 1
@@ -627,20 +928,20 @@ class CodeValidator:
             recommendations=recommendations
         )
     
-    def _check_architecture_standards(self, code: str) -> StandardComplianceResult:
+    def _check_architecture_standards(self, view: CodeView) -> StandardComplianceResult:
         """Проверка архитектурных стандартов"""
         
         violations = []
         recommendations = []
         
         # Проверка принципа единственной ответственности
-        large_procedures = self._find_large_procedures(code)
+        large_procedures = self._find_large_procedures(view)
         if large_procedures:
             violations.append(f"Найдены слишком большие процедуры: {len(large_procedures)}")
             recommendations.append("Разбейте большие процедуры на более мелкие")
         
         # Проверка зависимостей
-        global_usage = self._analyze_global_usage(code)
+        global_usage = self._analyze_global_usage(view)
         if global_usage['count'] > 5:
             violations.append(f"Слишком много глобальных обращений: {global_usage['count']}")
             recommendations.append("Избегайте избыточного использования глобальных объектов")
@@ -655,146 +956,112 @@ class CodeValidator:
             recommendations=recommendations
         )
     
-    def _check_sql_injections(self, code: str) -> List[Dict[str, Any]]:
+    def _check_sql_injections(self, lines: List[str], stripped: List[str]) -> List[Dict[str, Any]]:
         """Проверка SQL-инъекций"""
         
         vulnerabilities = []
         
-        # Паттерны потенциальных SQL-инъекций
-        dangerous_patterns = [
-            r'Выполнить\s*\(\s*["\'].*\+.*["\']',  # Выполнить с конкатенацией
-            r'Запрос\s*\.\s*Текст\s*=.*\+',        # Конкатенация в тексте запроса
-            r'СтрЗаменить.*["\']\s*\+',            # СтрЗаменить с конкатенацией
-        ]
-        
-        lines = code.split('\n')
-        
         for line_num, line in enumerate(lines, 1):
-            for pattern in dangerous_patterns:
-                if re.search(pattern, line, re.IGNORECASE):
+            # Все паттерны ищут конкатенацию
+            if '+' not in line:
+                continue
+            for pattern in _SQL_INJECTION_PATTERNS:
+                if pattern.search(line):
                     vulnerabilities.append({
                         'type': 'sql_injection',
                         'line': line_num,
                         'description': 'Потенциальная SQL-инъекция через конкатенацию строк',
                         'severity': 'high',
-                        'line_content': line.strip()
+                        'line_content': stripped[line_num - 1]
                     })
         
         return vulnerabilities
     
-    def _check_xss_vulnerabilities(self, code: str) -> List[Dict[str, Any]]:
+    def _check_xss_vulnerabilities(self, lines: List[str], stripped: List[str]) -> List[Dict[str, Any]]:
         """Проверка XSS уязвимостей"""
         
         vulnerabilities = []
         
-        # Паттерны XSS уязвимостей
-        xss_patterns = [
-            r'ЭлементыФормы\.[^.]+\.Значение\s*=.*\+',  # Присваивание с конкатенацией
-            r'ТекстHTML\s*=.*\+',                        # Установка HTML с конкатенацией
-            r'НавигационнаяСсылка\s*=.*\+',            # Установка ссылки с конкатенацией
-        ]
-        
-        lines = code.split('\n')
-        
         for line_num, line in enumerate(lines, 1):
-            for pattern in xss_patterns:
-                if re.search(pattern, line, re.IGNORECASE):
+            # Все паттерны ищут конкатенацию
+            if '+' not in line:
+                continue
+            for pattern in _XSS_PATTERNS:
+                if pattern.search(line):
                     vulnerabilities.append({
                         'type': 'xss',
                         'line': line_num,
                         'description': 'Потенциальная XSS уязвимость через конкатенацию',
                         'severity': 'medium',
-                        'line_content': line.strip()
+                        'line_content': stripped[line_num - 1]
                     })
         
         return vulnerabilities
     
-    def _check_dangerous_functions(self, code: str) -> List[Dict[str, Any]]:
+    def _check_dangerous_functions(self, lines: List[str], stripped: List[str]) -> List[Dict[str, Any]]:
         """Проверка опасных функций"""
         
         vulnerabilities = []
         
-        # Опасные функции
-        dangerous_functions = {
-            'Выполнить': {'severity': 'high', 'description': 'Выполнение произвольного кода'},
-            'ЗагрузитьИзФайла': {'severity': 'medium', 'description': 'Загрузка произвольного файла'},
-            'ПолучитьФайл': {'severity': 'medium', 'description': 'Получение файла из внешнего источника'},
-            'ПодключитьВнешнююОбработку': {'severity': 'high', 'description': 'Подключение внешней обработки'},
-        }
-        
-        lines = code.split('\n')
-        
         for line_num, line in enumerate(lines, 1):
-            for func_name, func_info in dangerous_functions.items():
-                if re.search(r'\b' + func_name + r'\s*\(', line, re.IGNORECASE):
+            # Все опасные функции ищутся по вызову
+            if '(' not in line:
+                continue
+            for func_name, func_info, pattern in _DANGEROUS_FUNCTION_PATTERNS:
+                if pattern.search(line):
                     vulnerabilities.append({
                         'type': 'dangerous_function',
                         'function': func_name,
                         'line': line_num,
                         'description': f"Использование опасной функции: {func_info['description']}",
                         'severity': func_info['severity'],
-                        'line_content': line.strip()
+                        'line_content': stripped[line_num - 1]
                     })
         
         return vulnerabilities
     
-    def _check_information_leaks(self, code: str) -> List[Dict[str, Any]]:
+    def _check_information_leaks(self, lines: List[str], stripped: List[str]) -> List[Dict[str, Any]]:
         """Проверка утечек информации"""
         
         vulnerabilities = []
         
-        # Паттерны утечек информации
-        leak_patterns = [
-            r'Сообщить\s*\(\s*.*[Пп]ароль.*\)',       # Вывод паролей
-            r'Сообщить\s*\(\s*.*[Кк]люч.*\)',        # Вывод ключей
-            r'ЗаписьЛога.*пароль',                    # Запись паролей в лог
-            r'ЗаписьЛога.*ключ',                      # Запись ключей в лог
-        ]
-        
-        lines = code.split('\n')
-        
         for line_num, line in enumerate(lines, 1):
-            for pattern in leak_patterns:
-                if re.search(pattern, line, re.IGNORECASE):
+            lowered = line.lower()
+            if 'сообщить' not in lowered and 'записьлога' not in lowered:
+                continue
+            for pattern in _INFORMATION_LEAK_PATTERNS:
+                if pattern.search(line):
                     vulnerabilities.append({
                         'type': 'information_leak',
                         'line': line_num,
                         'description': 'Потенциальная утечка конфиденциальной информации',
                         'severity': 'high',
-                        'line_content': line.strip()
+                        'line_content': stripped[line_num - 1]
                     })
         
         return vulnerabilities
     
-    def _calculate_cyclomatic_complexity(self, code: str) -> int:
+    def _count_complexity_keywords(self, text: str) -> int:
+        """Количество ключевых слов ветвления в тексте"""
+        return sum(1 for word in _WORD_PATTERN.findall(text) if word.lower() in _COMPLEXITY_KEYWORDS)
+    
+    def _calculate_cyclomatic_complexity(self, view: CodeView) -> int:
         """Вычисление цикломатической сложности"""
         
         complexity = 1  # Базовое значение
         
-        # Ключевые слова, увеличивающие сложность
-        complexity_keywords = [
-            r'\bЕсли\b', r'\bИначеЕсли\b', r'\bИначе\b',
-            r'\bДля\b', r'\bПо\b', r'\bПока\b',
-            r'\bПопытка\b', r'\bИсключение\b',
-            r'\bИ\b', r'\bИЛИ\b', r'\bНЕ\b'
-        ]
-        
-        for keyword in complexity_keywords:
-            complexity += len(re.findall(keyword, code, re.IGNORECASE))
+        for _, segment in self._segment_findings(view, 'performance'):
+            complexity += segment['complexity']
         
         return complexity
     
-    def _calculate_nesting_depth(self, code: str) -> int:
+    def _calculate_nesting_depth(self, view: CodeView) -> int:
         """Вычисление максимальной глубины вложенности"""
         
         max_depth = 0
         current_depth = 0
         
-        lines = code.split('\n')
-        
-        for line in lines:
-            line_stripped = line.strip()
-            
+        for line_stripped in view.stripped:
             # Увеличение глубины
             if any(keyword in line_stripped for keyword in ['Если', 'Для', 'Пока', 'Попытка']):
                 current_depth += 1
@@ -806,103 +1073,49 @@ class CodeValidator:
         
         return max_depth
     
-    def _check_performance_issues(self, code: str) -> List[str]:
+    def _check_performance_issues(self, view: CodeView) -> List[str]:
         """Проверка проблем производительности"""
         
         issues = []
+        lowered = view.code.lower()
         
-        # Паттерны проблем производительности
-        performance_patterns = [
-            (r'Для\s+.*\s+Цикл\s*\n.*\n.*Запрос', 'Запрос внутри цикла'),
-            (r'Получить\s*\([^)]*\)\s*\.\s*\w+\s*.*\n.*\n.*Для', 'Чтение в цикле'),
-            (r'\w+\s*=\s*\w+\s*\.\s*Найти\([^)]*\)\s*\n.*\n.*\w+\s*=', 'Повторный поиск в цикле'),
-        ]
-        
-        for pattern, issue_description in performance_patterns:
-            if re.search(pattern, code, re.MULTILINE | re.IGNORECASE):
+        for pattern, required_words, issue_description in _PERFORMANCE_PATTERNS:
+            if not all(word in lowered for word in required_words):
+                continue
+            if pattern.search(view.code):
                 issues.append(issue_description)
         
         return issues
     
-    def _analyze_function_sizes(self, code: str) -> List[int]:
+    def _analyze_function_sizes(self, view: CodeView) -> List[int]:
         """Анализ размеров функций"""
         
-        function_sizes = []
-        lines = code.split('\n')
-        current_function_lines = 0
-        
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            
-            if line.startswith('Процедура ') or line.startswith('Функция '):
-                current_function_lines = 0
-                # Считаем строки до конца процедуры/функции
-                j = i + 1
-                while j < len(lines):
-                    inner_line = lines[j].strip()
-                    if inner_line in ['КонецПроцедуры', 'КонецФункции']:
-                        function_sizes.append(current_function_lines)
-                        break
-                    current_function_lines += 1
-                    j += 1
-                i = j
-            
-            i += 1
-        
-        return function_sizes
+        return [
+            span.end - span.start - 1
+            for span in view.procedures if span.end is not None
+        ]
     
-    def _find_large_procedures(self, code: str) -> List[str]:
+    def _find_large_procedures(self, view: CodeView) -> List[str]:
         """Поиск слишком больших процедур"""
         
         large_procedures = []
-        lines = code.split('\n')
         
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            
-            if line.startswith('Процедура ') or line.startswith('Функция '):
-                proc_name = re.search(r'(?:Процедура Функция)\s+(\w+)', line)
-                if proc_name:
-                    name = proc_name.group(1)
-                    
-                    # Подсчет строк процедуры
-                    current_lines = 0
-                    j = i + 1
-                    
-                    while j < len(lines):
-                        inner_line = lines[j].strip()
-                        if inner_line in ['КонецПроцедуры', 'КонецФункции']:
-                            break
-                        current_lines += 1
-                        j += 1
-                    
-                    if current_lines > 30:  # Порог для больших процедур
-                        large_procedures.append(f"{name}: {current_lines} строк")
+        for span in view.procedures:
+            end = len(view.lines) if span.end is None else span.end
+            current_lines = end - span.start - 1
             
-            i += 1
+            if span.name and current_lines > 30:  # Порог для больших процедур
+                large_procedures.append(f"{span.name}: {current_lines} строк")
         
         return large_procedures
     
-    def _analyze_global_usage(self, code: str) -> Dict[str, Any]:
+    def _analyze_global_usage(self, view: CodeView) -> Dict[str, Any]:
         """Анализ использования глобальных объектов"""
         
-        global_objects = [
-            'Метаданные', 'ЭтотОбъект', 'Константы', 'Справочники', 
-            'Документы', 'Регистры', 'Обработки', 'Отчеты'
-        ]
-        
-        usage_count = 0
-        found_objects = []
-        
-        for obj in global_objects:
-            if re.search(r'\b' + obj + r'\b', code):
-                usage_count += 1
-                found_objects.append(obj)
+        found_objects = [obj for obj in _GLOBAL_OBJECTS if obj in view.words]
         
         return {
-            'count': usage_count,
+            'count': len(found_objects),
             'objects': found_objects
         }
     
@@ -1130,5 +1343,6 @@ class CodeValidator:
             'strict_mode': self.strict_mode,
             'auto_fix': self.auto_fix,
             'validation_stats': self.validation_stats.copy(),
+            'cache_stats': self.cache_stats.copy(),
             'version': '1.0'
         }
\ No newline at end of file
@@ -0,0 +1,124 @@
+"""
+Тесты для валидатора кода: общее представление кода, кэш и инкрементальный режим.
+"""
+
+
+import pytest
+
+from src.py_server.code_generation.validation.validator import (CodeValidator,
+                                                                CodeView)
+
+
+def make_procedure(index, extra=""):
+    """Документированная процедура с запросом и сообщением."""
+    return (
+        f"// Описание {index}\n"
+        f"Процедура Обработка{index}(Параметр) Экспорт\n"
+        f"    Если Параметр > 0 И Параметр < 10 Тогда\n"
+        f"        Запрос.Текст = \"ВЫБРАТЬ\" + Параметр;{extra}\n"
+        f"        Сообщить(\"Пароль \" + Строка(Параметр));\n"
+        f"    КонецЕсли;\n"
+        f"КонецПроцедуры\n"
+    )
+
+
+def make_module(count, edited=None):
+    """Модуль из нескольких процедур внутри области ПрограммныйИнтерфейс."""
+    procedures = [
+        make_procedure(i, "\n        Выполнить(Параметр);" if i == edited else "")
+        for i in range(count)
+    ]
+    return "#Область ПрограммныйИнтерфейс\n" + "\n".join(procedures) + "\n#КонецОбласти"
+
+
+class TestCodeView:
+    """Тесты для представления кода."""
+
+    def test_procedure_index_and_segments(self):
+        """Тест индекса процедур и деления на сегменты."""
+        view = CodeView(make_module(2))
+
+        assert [(p.name, p.start, p.end) for p in view.procedures] == [
+            ("Обработка0", 2, 7), ("Обработка1", 10, 15)
+        ]
+        assert [(start, stop) for start, stop, _ in view.segments] == [
+            (0, 2), (2, 8), (8, 10), (10, 16), (16, 18)
+        ]
+
+    def test_unclosed_procedure_spans_to_end(self):
+        """Тест незакрытой процедуры."""
+        view = CodeView("Процедура Тест()\n    А = 1;")
+
+        assert view.procedures[0].end is None
+        assert [(start, stop) for start, stop, _ in view.segments] == [(0, 2)]
+
+
+class TestCodeValidatorCache:
+    """Тесты для кэширования результатов валидации."""
+
+    @pytest.mark.asyncio
+    async def test_repeated_validation_served_from_cache(self):
+        """Тест повторной валидации того же кода."""
+        validator = CodeValidator({})
+        code = make_module(3)
+
+        first = await validator.validate_code(code)
+        second = await validator.validate_code(code)
+
+        assert first["metadata"]["cached"] is False
+        assert second["metadata"]["cached"] is True
+        assert second["errors"] == first["errors"]
+        assert second["warnings"] == first["warnings"]
+        assert validator.cache_stats["hits"] == 1
+
+        # Изменение возвращенного результата не портит кэш
+        second["errors"].append("изменено")
+        third = await validator.validate_code(code)
+        assert third["errors"] == first["errors"]
+
+    @pytest.mark.asyncio
+    async def test_cache_key_includes_enabled_checks(self):
+        """Тест ключа кэша по набору проверок."""
+        code = make_module(1)
+        full = CodeValidator({})
+        syntax_only = CodeValidator({"enabled_checks": ["syntax"]})
+
+        full_result = await full.validate_code(code)
+        syntax_result = await syntax_only.validate_code(code)
+
+        assert syntax_result["metadata"]["checks_performed"] == ["syntax"]
+        assert full_result["metadata"]["checks_performed"] == [
+            "syntax", "standards", "security", "performance"
+        ]
+
+    @pytest.mark.asyncio
+    async def test_incremental_rescans_only_changed_procedure(self):
+        """Тест инкрементальной валидации после правки одной процедуры."""
+        validator = CodeValidator({})
+        await validator.validate_code(make_module(20))
+        scanned = validator.cache_stats["segments_scanned"]
+
+        code = make_module(20, edited=7)
+        result = await validator.validate_code(code)
+        expected = await CodeValidator({"incremental": False}).validate_code(code)
+
+        # Заново сканируется одна процедура для каждой из четырех проверок
+        assert validator.cache_stats["segments_scanned"] - scanned == 4
+        assert ("Безопасность: Использование опасной функции: Выполнение произвольного кода (строка 62)"
+                in result["errors"])
+        assert result["errors"] == expected["errors"]
+        assert result["warnings"] == expected["warnings"]
+
+    @pytest.mark.asyncio
+    async def test_incremental_and_parallel_modes_match_full_scan(self):
+        """Тест совпадения результатов всех режимов."""
+        code = make_module(5) + "\nФункция плохоеИмя()\n    Х = (1;\n    Выполнить(Х);"
+
+        results = []
+        for config in ({"incremental": False}, {}, {"parallel_threshold": 1}):
+            result = await CodeValidator(config).validate_code(code)
+            result["metadata"].pop("validation_time")
+            results.append(result)
+
+        assert results[0] == results[1] == results[2]
+        assert not results[0]["valid"]
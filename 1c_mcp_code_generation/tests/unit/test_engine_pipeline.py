@@ -0,0 +1,153 @@
+"""
+Тесты для конвейера генерации: DAG-режим, замеры этапов и фоновый аудит.
+"""
+
+
+import asyncio
+import json
+
+import pytest
+
+from src.py_server.code_generation import engine as engine_module
+from src.py_server.code_generation.engine import (CodeGenerationEngine,
+                                                  CodeGenerationRequest,
+                                                  CodeGenerationStatus)
+
+LLM_RESPONSE = json.dumps({
+    "manager_module": "Функция Получить() Экспорт\n    Возврат 1;\nКонецФункции",
+    "object_module": "Процедура ПередЗаписью(Отказ)\nКонецПроцедуры",
+})
+
+
+class SlowComponent:
+    """Компонент с задержкой и журналом вызовов."""
+
+    def __init__(self, config=None, delay=0.05, value=None, log=None, name=""):
+        self.delay = delay
+        self.value = value
+        self.log = log if log is not None else []
+        self.name = name
+
+    async def _call(self):
+        self.log.append(("start", self.name))
+        await asyncio.sleep(self.delay)
+        self.log.append(("end", self.name))
+        return self.value
+
+    def get_status(self):
+        return {}
+
+
+def make_engine(monkeypatch, tmp_path, mode, risk_level="low", valid=True, log=None):
+    """Движок с подмененными компонентами."""
+    log = log if log is not None else []
+
+    class Context(SlowComponent):
+        async def collect_context(self, request):
+            return await self._call()
+
+    class Templates(SlowComponent):
+        async def get_template(self, object_type, prompt):
+            return await self._call()
+
+    class LLM(SlowComponent):
+        async def generate_code(self, prompt):
+            return await self._call()
+
+    class Validator(SlowComponent):
+        async def validate_code(self, code, context=None):
+            return await self._call()
+
+    class Security(SlowComponent):
+        async def analyze_security(self, code, request):
+            return await self._call()
+
+    components = {
+        "ContextCollector": lambda config: Context(value={"objects": []}, log=log, name="context"),
+        "TemplateManager": lambda config: Templates(value=None, log=log, name="template"),
+        "LLMClient": lambda config: LLM(value=LLM_RESPONSE, log=log, name="llm"),
+        "CodeValidator": lambda config: Validator(
+            value={"valid": valid, "errors": [] if valid else ["ошибка"], "warnings": [], "score": 90},
+            log=log, name="validation"),
+        "SecurityManager": lambda config: Security(
+            value={"risk_level": risk_level, "description": "риск"}, log=log, name="security"),
+    }
+    for name, factory in components.items():
+        monkeypatch.setattr(engine_module, name, factory)
+
+    return CodeGenerationEngine({
+        "pipeline_mode": mode,
+        "audit": {"log_file": str(tmp_path / f"{mode}.log")},
+    })
+
+
+def make_request():
+    return CodeGenerationRequest(prompt="Создать функцию получения значения", request_id="req_1")
+
+
+class TestEnginePipeline:
+    """Тесты для режимов конвейера генерации."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("risk_level, valid, status", [
+        ("low", True, CodeGenerationStatus.COMPLETED),
+        ("critical", True, CodeGenerationStatus.SECURITY_REJECTED),
+        ("critical", False, CodeGenerationStatus.VALIDATION_FAILED),
+    ])
+    async def test_dag_matches_sequential(self, monkeypatch, tmp_path, risk_level, valid, status):
+        """Тест совпадения результатов последовательного и DAG-режимов."""
+        results = []
+        for mode in ("sequential", "dag"):
+            engine = make_engine(monkeypatch, tmp_path, mode, risk_level, valid)
+            results.append(await engine.generate_code(make_request()))
+            await engine.close()
+
+        sequential, dag = results
+        assert sequential.status == dag.status == status
+        assert sequential.generated_code == dag.generated_code
+        assert sequential.errors == dag.errors
+        assert sequential.recommendations == dag.recommendations
+
+    @pytest.mark.asyncio
+    async def test_dag_runs_independent_stages_concurrently(self, monkeypatch, tmp_path):
+        """Тест параллельного выполнения независимых этапов."""
+        log = []
+        engine = make_engine(monkeypatch, tmp_path, "dag", log=log)
+
+        result = await engine.generate_code(make_request())
+        await engine.close()
+
+        assert result.success
+        # Контекст и шаблон, затем валидация и безопасность стартуют вместе
+        assert log[:2] == [("start", "context"), ("start", "template")]
+        assert log.index(("start", "security")) < log.index(("end", "validation"))
+        assert result.metadata["pipeline_mode"] == "dag"
+
+    @pytest.mark.asyncio
+    async def test_stage_timings_reported(self, monkeypatch, tmp_path):
+        """Тест замеров времени этапов."""
+        engine = make_engine(monkeypatch, tmp_path, "sequential")
+
+        result = await engine.generate_code(make_request())
+        stats = await engine.get_statistics()
+
+        assert set(result.stage_timings) == {
+            "audit_start", "input_validation", "context", "template", "prompt",
+            "llm", "validation", "security", "post_process", "audit_success",
+        }
+        assert result.stage_timings["llm"] >= 0.04
+        assert set(stats["average_stage_timings"]) == set(result.stage_timings)
+
+    @pytest.mark.asyncio
+    async def test_background_audit_written_on_close(self, monkeypatch, tmp_path):
+        """Тест фоновой записи аудита в DAG-режиме."""
+        engine = make_engine(monkeypatch, tmp_path, "dag")
+        await engine.generate_code(make_request())
+
+        assert engine.audit_logger.background
+        await engine.close()
+
+        with open(tmp_path / "dag.log", encoding="utf-8") as f:
+            # В тот же файл пишет и стандартный логгер аудита
+            events = [json.loads(line)["event_type"] for line in f if line.startswith("{")]
+        assert events == ["generation_start", "generation_success"]
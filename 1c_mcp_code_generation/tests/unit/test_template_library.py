@@ -311,6 +311,42 @@ class TestTemplateLibrary:
         results = mock_template_library.search_templates("nonexistent")
         assert len(results) == 0
     
+    def test_search_index_updated_on_save(self, mock_template_library):
+        """Тест обновления поискового индекса при сохранении шаблона."""
+        mock_template_library.initialize_library()
+        template = mock_template_library.get_template("processing", "basic_processing")
+        
+        template.metadata.tags = ["bulk-update"]
+        template.metadata.description = "Массовое изменение"
+        mock_template_library.save_template(template)
+        
+        assert mock_template_library.search_templates("BULK") == [template]
+        assert mock_template_library.search_templates("обработки") == []
+        # Короткие запросы проверяются без индекса триграмм
+        assert template not in mock_template_library.search_templates("ба")
+        assert len(mock_template_library.search_templates("ба")) == 3
+        # Запрос не совпадает на стыке двух полей
+        assert mock_template_library.search_templates("processingмасс") == []
+    
+    def test_search_keeps_library_order(self, mock_template_library):
+        """Тест порядка результатов поиска."""
+        mock_template_library.initialize_library()
+        
+        results = mock_template_library.search_templates("basic_")
+        
+        assert [t.metadata.name for t in results] == [
+            "basic_processing", "basic_report", "basic_catalog", "basic_document"
+        ]
+    
+    def test_get_template_by_name(self, mock_template_library):
+        """Тест получения шаблона по имени."""
+        mock_template_library.initialize_library()
+        
+        template = mock_template_library.get_template_by_name("basic_report")
+        
+        assert template is mock_template_library.get_template("report", "basic_report")
+        assert mock_template_library.get_template_by_name("nonexistent") is None
+    
     def test_save_template(self, mock_template_library):
         """Тест сохранения шаблона."""
         template = mock_template_library.create_processing_template()
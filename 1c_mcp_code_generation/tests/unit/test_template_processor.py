@@ -270,6 +270,32 @@ class TestTemplateProcessor:
         assert "TODO" not in processed_code
         assert "Основная логика обработки данных" in processed_code
     
+    def test_process_module_code_single_pass(self, mock_template_library):
+        """Тест подстановки переменных за один проход."""
+        processor = TemplateProcessor(mock_template_library)
+        
+        code = "Процедура {name}()\n    // {unknown} {{name}}\n    Сообщить(\"{value}\");\nКонецПроцедуры"
+        variables = {"name": "Тест", "value": "{name}"}
+        
+        processed_code = processor._process_module_code(code, variables)
+        
+        assert processed_code == (
+            "Процедура Тест()\n    // {unknown} {Тест}\n    Сообщить(\"{name}\");\nКонецПроцедуры"
+        )
+    
+    def test_process_module_code_cached(self, mock_template_library):
+        """Тест кэширования обработанного кода."""
+        processor = TemplateProcessor(mock_template_library)
+        code = "Процедура {name}()\n    // TODO: Добавить проверки\nКонецПроцедуры"
+        
+        first = processor._process_module_code(code, {"name": "Тест"})
+        second = processor._process_module_code(code, {"name": "Тест"})
+        other = processor._process_module_code(code, {"name": "Другой"})
+        
+        assert first == second
+        assert "Процедура Другой()" in other
+        assert processor.cache_stats == {"hits": 1, "misses": 2}
+    
     def test_apply_code_formatting(self, mock_template_library):
         """Тест применения форматирования кода."""
         processor = TemplateProcessor(mock_template_library)
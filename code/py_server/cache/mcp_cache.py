@@ -10,7 +10,7 @@ MCP Tools Cache - Модуль кэширования результатов MCP
 - Кэширование результатов MCP tools с TTL стратегиями
 - LRU и TTL-based стратегии кэширования
 - Механизмы инвалидации кэша
-- Persistent cache на диске
+- Persistent cache на диске (один файл SQLite WAL, вытеснение с учётом стоимости)
 - Метрики попаданий/промахов
 - Интеграция с mcp_server.py и onec_client.py
 
@@ -22,6 +22,7 @@ import hashlib
 import json
 import logging
 import pickle
+import sqlite3
 import time
 from abc import ABC, abstractmethod
 from collections import OrderedDict
@@ -29,7 +30,8 @@ from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
 from pathlib import Path
 from threading import RLock
-from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
+from typing import (Any, AsyncIterator, Callable, Dict, Iterator, List,
+                    Optional, Set, Tuple, Union)
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
@@ -45,6 +47,7 @@ class CacheEntry:
     last_access: float = field(default_factory=time.time)
     size_bytes: int = 0
     metadata: Dict[str, Any] = field(default_factory=dict)
+    compute_cost: float = 0.0  # Сколько стоило получить данные (секунды)
     
     @property
     def is_expired(self) -> bool:
@@ -238,49 +241,102 @@ class CacheInvalidation:
         return remaining_key.endswith(pattern_parts[-1])
 
 
+@dataclass
+class _StoredEntryInfo:
+    """Метаданные записи persistent cache, которые держатся в памяти (без данных)"""
+    timestamp: float
+    ttl: float
+    size_bytes: int
+    stored_bytes: int
+    compute_cost: float
+    access_count: int
+    last_access: float
+    priority: float = 0.0
+    
+    @property
+    def is_expired(self) -> bool:
+        """Проверяет, истёк ли TTL записи"""
+        return time.time() - self.timestamp > self.ttl
+
+
 class PersistentCache:
-    """Persistent cache для долговременного хранения на диске"""
+    """
+    Persistent cache для долговременного хранения на диске
+    
+    Все записи лежат в одном файле SQLite (режим WAL), а в памяти держится
+    только индекс метаданных: размер, стоимость пересчёта, частота обращений.
+    Учёт занятого места и выбор записей для вытеснения не обращаются к диску,
+    данные читаются только при load().
+    
+    Вытеснение - GreedyDual-Size-Frequency: приоритет записи равен
+    clock + (1 + access_count) * compute_cost / stored_bytes, вытесняются записи
+    с минимальным приоритетом, а clock поднимается до приоритета последней
+    вытесненной записи (старение давно не используемых записей).
+    """
+    
+    DB_FILENAME = "cache.db"
+    # Стоимость пересчёта по умолчанию, если она не была измерена (секунды)
+    DEFAULT_COMPUTE_COST = 0.01
+    # Сколько накопленных обращений сбрасывать на диск одним UPDATE
+    ACCESS_FLUSH_THRESHOLD = 256
+    # До какой доли лимита освобождать место при вытеснении
+    EVICTION_LOW_WATERMARK = 0.9
     
     def __init__(self, cache_dir: Union[str, Path], max_size_mb: int = 100):
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.max_size_bytes = max_size_mb * 1024 * 1024
-        self._index_file = self.cache_dir / "cache_index.json"
+        self.db_path = self.cache_dir / self.DB_FILENAME
         self._lock = RLock()
+        self._index: Dict[str, _StoredEntryInfo] = {}
+        self._total_size = 0
+        self._clock = 0.0
+        self._dirty_access: Set[str] = set()
+        self._conn = self._connect()
         self._load_index()
+        self._import_legacy_files()
     
     def store(self, key: str, entry: CacheEntry) -> bool:
         """Сохраняет запись на диск"""
         try:
+            blob = pickle.dumps({'data': entry.data, 'metadata': entry.metadata},
+                                protocol=pickle.HIGHEST_PROTOCOL)
+            stored_bytes = len(blob)
+            if stored_bytes > self.max_size_bytes:
+                logger.warning(f"Запись {key} ({stored_bytes}B) больше лимита persistent cache")
+                return False
+            
             with self._lock:
-                # Проверяем размер кэша
-                if self._get_total_size() + entry.size_bytes > self.max_size_bytes:
-                    self._cleanup_oldest()
-                
-                # Создаём файл для записи
-                file_path = self.cache_dir / f"{self._hash_key(key)}.cache"
-                
-                # Сериализуем данные
-                data = {
-                    'data': entry.data,
-                    'timestamp': entry.timestamp,
-                    'ttl': entry.ttl,
-                    'access_count': entry.access_count,
-                    'last_access': entry.last_access,
-                    'size_bytes': entry.size_bytes,
-                    'metadata': entry.metadata
-                }
+                previous = self._index.get(key)
+                freed = previous.stored_bytes if previous else 0
+                self._make_room(stored_bytes - freed, keep=key)
                 
-                with open(file_path, 'wb') as f:
-                    pickle.dump(data, f)
+                access_count = max(entry.access_count,
+                                   previous.access_count if previous else 0)
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO cache_entries "
+                        "(key, data, timestamp, ttl, access_count, last_access, "
+                        "size_bytes, stored_bytes, compute_cost) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (key, blob, entry.timestamp, entry.ttl, access_count,
+                         entry.last_access, entry.size_bytes, stored_bytes,
+                         entry.compute_cost)
+                    )
+                self._dirty_access.discard(key)
                 
-                # Обновляем индекс
-                self._index[key] = {
-                    'file': str(file_path),
-                    'timestamp': entry.timestamp,
-                    'size_bytes': entry.size_bytes
-                }
-                self._save_index()
+                info = _StoredEntryInfo(
+                    timestamp=entry.timestamp,
+                    ttl=entry.ttl,
+                    size_bytes=entry.size_bytes,
+                    stored_bytes=stored_bytes,
+                    compute_cost=entry.compute_cost,
+                    access_count=access_count,
+                    last_access=entry.last_access
+                )
+                info.priority = self._priority(info)
+                self._index[key] = info
+                self._total_size += stored_bytes - freed
                 
                 return True
                 
@@ -288,43 +344,65 @@ class PersistentCache:
             logger.error(f"Ошибка при сохранении кэша для ключа {key}: {e}")
             return False
     
-    def load(self, key: str) -> Optional[CacheEntry]:
-        """Загружает запись с диска"""
+    def load(self, key: str, record_access: bool = True) -> Optional[CacheEntry]:
+        """
+        Загружает запись с диска
+        
+        Args:
+            key: Ключ кэша
+            record_access: Учитывать ли чтение в частоте обращений
+        """
         try:
             with self._lock:
-                if key not in self._index:
+                info = self._index.get(key)
+                if info is None:
                     return None
                 
-                entry_info = self._index[key]
-                file_path = Path(entry_info['file'])
-                
-                if not file_path.exists():
-                    # Удаляем из индекса, если файл не найден
-                    del self._index[key]
-                    self._save_index()
+                row = self._conn.execute(
+                    "SELECT data FROM cache_entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    # Индекс разошёлся с файлом - забываем запись
+                    self._forget(key)
                     return None
                 
-                # Загружаем данные
-                with open(file_path, 'rb') as f:
-                    data = pickle.load(f)
+                if record_access:
+                    self.record_access(key)
                 
-                # Создаём объект записи
-                entry = CacheEntry(
-                    data=data['data'],
-                    timestamp=data['timestamp'],
-                    ttl=data['ttl'],
-                    access_count=data['access_count'],
-                    last_access=data['last_access'],
-                    size_bytes=data['size_bytes'],
-                    metadata=data['metadata']
+                payload = pickle.loads(row[0])
+                return CacheEntry(
+                    data=payload['data'],
+                    timestamp=info.timestamp,
+                    ttl=info.ttl,
+                    access_count=info.access_count,
+                    last_access=info.last_access,
+                    size_bytes=info.size_bytes,
+                    metadata=payload['metadata'],
+                    compute_cost=info.compute_cost
                 )
                 
-                return entry
-                
         except Exception as e:
             logger.error(f"Ошибка при загрузке кэша для ключа {key}: {e}")
             return None
     
+    def record_access(self, key: str) -> None:
+        """
+        Учитывает обращение к записи (в том числе попадание в памяти)
+        
+        Счётчики копятся в индексе и сбрасываются на диск пачкой,
+        чтобы чтение не превращалось в запись.
+        """
+        with self._lock:
+            info = self._index.get(key)
+            if info is None:
+                return
+            info.access_count += 1
+            info.last_access = time.time()
+            info.priority = self._priority(info)
+            self._dirty_access.add(key)
+            if len(self._dirty_access) >= self.ACCESS_FLUSH_THRESHOLD:
+                self.flush()
+    
     def delete(self, key: str) -> bool:
         """Удаляет запись с диска"""
         try:
@@ -332,16 +410,9 @@ class PersistentCache:
                 if key not in self._index:
                     return False
                 
-                entry_info = self._index[key]
-                file_path = Path(entry_info['file'])
-                
-                # Удаляем файл
-                if file_path.exists():
-                    file_path.unlink()
-                
-                # Удаляем из индекса
-                del self._index[key]
-                self._save_index()
+                with self._conn:
+                    self._conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+                self._forget(key)
                 
                 return True
                 
@@ -353,57 +424,212 @@ class PersistentCache:
         """Очищает весь кэш"""
         try:
             with self._lock:
-                for file_path in self.cache_dir.glob("*.cache"):
-                    file_path.unlink()
-                
+                with self._conn:
+                    self._conn.execute("DELETE FROM cache_entries")
                 self._index.clear()
-                self._save_index()
+                self._dirty_access.clear()
+                self._total_size = 0
+                self._clock = 0.0
                 
         except Exception as e:
             logger.error(f"Ошибка при очистке кэша: {e}")
     
-    def _hash_key(self, key: str) -> str:
-        """Создаёт хеш для ключа (безопасные имена файлов)"""
-        return hashlib.sha256(key.encode()).hexdigest()
+    def hot_entries(self, max_bytes: Optional[int] = None,
+                    limit: Optional[int] = None) -> Iterator[Tuple[str, CacheEntry]]:
+        """
+        Возвращает самые ценные неистёкшие записи для прогрева памяти
+        
+        Порядок определяется тем же приоритетом, что и вытеснение, поэтому
+        холодные записи не читаются с диска вовсе.
+        
+        Args:
+            max_bytes: Бюджет по оценке размера в памяти (size_bytes)
+            limit: Максимальное количество записей
+        """
+        with self._lock:
+            candidates = sorted(
+                ((key, info) for key, info in self._index.items() if not info.is_expired),
+                key=lambda item: item[1].priority,
+                reverse=True
+            )
+        
+        budget = max_bytes if max_bytes is not None else float('inf')
+        loaded = 0
+        for key, info in candidates:
+            if limit is not None and loaded >= limit:
+                break
+            if info.size_bytes > budget:
+                continue
+            entry = self.load(key, record_access=False)
+            if entry is None:
+                continue
+            budget -= info.size_bytes
+            loaded += 1
+            yield key, entry
+    
+    def flush(self) -> None:
+        """Сбрасывает накопленные счётчики обращений на диск"""
+        with self._lock:
+            if not self._dirty_access:
+                return
+            rows = [
+                (self._index[key].access_count, self._index[key].last_access, key)
+                for key in self._dirty_access if key in self._index
+            ]
+            try:
+                with self._conn:
+                    self._conn.executemany(
+                        "UPDATE cache_entries SET access_count = ?, last_access = ? "
+                        "WHERE key = ?", rows
+                    )
+                self._dirty_access.clear()
+            except Exception as e:
+                logger.error(f"Ошибка при сохранении счётчиков обращений: {e}")
+    
+    def close(self) -> None:
+        """Сбрасывает счётчики и закрывает файл"""
+        with self._lock:
+            self.flush()
+            self._conn.close()
+    
+    def entry_count(self) -> int:
+        """Возвращает количество записей на диске"""
+        return len(self._index)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Открывает файл кэша в режиме WAL"""
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            "key TEXT PRIMARY KEY, "
+            "data BLOB NOT NULL, "
+            "timestamp REAL NOT NULL, "
+            "ttl REAL NOT NULL, "
+            "access_count INTEGER NOT NULL DEFAULT 0, "
+            "last_access REAL NOT NULL, "
+            "size_bytes INTEGER NOT NULL, "
+            "stored_bytes INTEGER NOT NULL, "
+            "compute_cost REAL NOT NULL DEFAULT 0)"
+        )
+        return conn
+    
+    def _priority(self, info: _StoredEntryInfo) -> float:
+        """Приоритет GreedyDual-Size-Frequency"""
+        cost = info.compute_cost or self.DEFAULT_COMPUTE_COST
+        return self._clock + (1 + info.access_count) * cost / max(info.stored_bytes, 1)
+    
+    def _forget(self, key: str) -> None:
+        """Убирает запись из индекса в памяти"""
+        info = self._index.pop(key, None)
+        if info is not None:
+            self._total_size -= info.stored_bytes
+        self._dirty_access.discard(key)
     
     def _get_total_size(self) -> int:
         """Возвращает общий размер кэша в байтах"""
-        return sum(info['size_bytes'] for info in self._index.values())
+        return self._total_size
     
-    def _cleanup_oldest(self) -> None:
-        """Удаляет самые старые записи до освобождения места"""
-        if not self._index:
+    def _make_room(self, needed: int, keep: Optional[str] = None) -> None:
+        """Освобождает место под needed байт: сначала истёкшие, затем по приоритету"""
+        if self._total_size + needed <= self.max_size_bytes:
             return
         
-        # Сортируем по timestamp (самые старые первые)
-        sorted_keys = sorted(self._index.keys(), 
-                           key=lambda k: self._index[k]['timestamp'])
+        victims = [key for key, info in self._index.items()
+                   if key != keep and info.is_expired]
+        freed = sum(self._index[key].stored_bytes for key in victims)
+        
+        target = self.max_size_bytes * self.EVICTION_LOW_WATERMARK - needed
+        if self._total_size - freed > target:
+            expired = set(victims)
+            for key, info in sorted(self._index.items(), key=lambda item: item[1].priority):
+                if self._total_size - freed <= target:
+                    break
+                if key == keep or key in expired:
+                    continue
+                victims.append(key)
+                freed += info.stored_bytes
+                self._clock = max(self._clock, info.priority)
         
-        # Удаляем 25% самых старых записей
-        keys_to_remove = sorted_keys[:max(1, len(sorted_keys) // 4)]
+        with self._conn:
+            self._conn.executemany("DELETE FROM cache_entries WHERE key = ?",
+                                   [(key,) for key in victims])
+        for key in victims:
+            self._forget(key)
         
-        for key in keys_to_remove:
-            self.delete(key)
+        logger.debug(f"Persistent cache: вытеснено {len(victims)} записей")
     
     def _load_index(self) -> None:
-        """Загружает индекс из файла"""
+        """Строит индекс в памяти по метаданным записей (без чтения данных)"""
         try:
-            if self._index_file.exists():
-                with open(self._index_file, 'r') as f:
-                    self._index = json.load(f)
-            else:
-                self._index = {}
+            with self._conn:
+                self._conn.execute("DELETE FROM cache_entries WHERE timestamp + ttl < ?",
+                                   (time.time(),))
+            rows = self._conn.execute(
+                "SELECT key, timestamp, ttl, access_count, last_access, "
+                "size_bytes, stored_bytes, compute_cost FROM cache_entries"
+            ).fetchall()
         except Exception as e:
             logger.error(f"Ошибка при загрузке индекса: {e}")
-            self._index = {}
-    
-    def _save_index(self) -> None:
-        """Сохраняет индекс в файл"""
+            rows = []
+        
+        self._index = {}
+        self._total_size = 0
+        for key, timestamp, ttl, access_count, last_access, size_bytes, stored_bytes, cost in rows:
+            info = _StoredEntryInfo(
+                timestamp=timestamp,
+                ttl=ttl,
+                size_bytes=size_bytes,
+                stored_bytes=stored_bytes,
+                compute_cost=cost,
+                access_count=access_count,
+                last_access=last_access
+            )
+            info.priority = self._priority(info)
+            self._index[key] = info
+            self._total_size += stored_bytes
+    
+    def _import_legacy_files(self) -> None:
+        """Однократно переносит записи из старого формата (файл на ключ + cache_index.json)"""
+        legacy_index_file = self.cache_dir / "cache_index.json"
+        if not legacy_index_file.exists():
+            return
+        
+        imported = 0
         try:
-            with open(self._index_file, 'w') as f:
-                json.dump(self._index, f, indent=2)
+            with open(legacy_index_file, 'r') as f:
+                legacy_index = json.load(f)
+            
+            for key, entry_info in legacy_index.items():
+                file_path = Path(entry_info['file'])
+                if not file_path.exists():
+                    continue
+                with open(file_path, 'rb') as f:
+                    data = pickle.load(f)
+                entry = CacheEntry(
+                    data=data['data'],
+                    timestamp=data['timestamp'],
+                    ttl=data['ttl'],
+                    access_count=data['access_count'],
+                    last_access=data['last_access'],
+                    size_bytes=data['size_bytes'],
+                    metadata=data['metadata']
+                )
+                if not entry.is_expired and self.store(key, entry):
+                    imported += 1
+            
+            for file_path in self.cache_dir.glob("*.cache"):
+                file_path.unlink()
+            legacy_index_file.unlink()
+            
+            logger.info(f"Перенесено {imported} записей persistent cache в {self.db_path}")
+            
         except Exception as e:
-            logger.error(f"Ошибка при сохранении индекса: {e}")
+            logger.error(f"Ошибка при переносе старого persistent cache: {e}")
 
 
 class MCPToolsCache:
@@ -423,7 +649,9 @@ class MCPToolsCache:
                  default_ttl_stable: float = 30 * 60,  # 30 минут
                  default_ttl_dynamic: float = 5 * 60,  # 5 минут
                  persistent_cache_dir: Optional[Union[str, Path]] = None,
-                 strategy: Optional[CacheStrategy] = None):
+                 strategy: Optional[CacheStrategy] = None,
+                 warm_start_ratio: float = 0.5,
+                 persistent_max_size_mb: Optional[int] = None):
         
         self.max_size_bytes = max_size_mb * 1024 * 1024
         self.default_ttl_stable = default_ttl_stable
@@ -438,7 +666,8 @@ class MCPToolsCache:
         # Persistent cache (опционально)
         self.persistent_cache = None
         if persistent_cache_dir:
-            self.persistent_cache = PersistentCache(persistent_cache_dir, max_size_mb)
+            self.persistent_cache = PersistentCache(persistent_cache_dir,
+                                                    persistent_max_size_mb or max_size_mb)
         
         # Механизмы инвалидации
         self.invalidation = CacheInvalidation()
@@ -454,6 +683,10 @@ class MCPToolsCache:
             'dynamic': {'ttl': default_ttl_dynamic, 'persistent': False}
         }
         
+        # Тёплый старт: поднимаем в память только горячие записи с диска
+        if self.persistent_cache and warm_start_ratio > 0:
+            self.warm_up(int(self.max_size_bytes * warm_start_ratio))
+        
         logger.info(f"Инициализирован MCP Tools Cache: {max_size_mb}MB, "
                    f"TTL стабильных: {default_ttl_stable}s, "
                    f"TTL динамических: {default_ttl_dynamic}s")
@@ -491,6 +724,10 @@ class MCPToolsCache:
                     # Перемещаем в конец (для LRU)
                     self._cache.move_to_end(key)
                     
+                    # Частота обращений нужна persistent cache для вытеснения и прогрева
+                    if self.persistent_cache:
+                        self.persistent_cache.record_access(key)
+                    
                     self.metrics.record_hit()
                     return entry.data
                 
@@ -522,7 +759,8 @@ class MCPToolsCache:
     def set(self, key: str, data: Any, 
             ttl: Optional[float] = None, 
             data_type: str = 'stable',
-            metadata: Optional[Dict[str, Any]] = None) -> bool:
+            metadata: Optional[Dict[str, Any]] = None,
+            compute_cost: Optional[float] = None) -> bool:
         """
         Сохраняет данные в кэш
         
@@ -532,6 +770,7 @@ class MCPToolsCache:
             ttl: Время жизни (в секундах), если None - используется тип данных
             data_type: Тип данных
             metadata: Дополнительные метаданные
+            compute_cost: Время получения данных (секунды), учитывается при вытеснении
             
         Returns:
             True если сохранение успешно
@@ -548,7 +787,8 @@ class MCPToolsCache:
                     data=data,
                     timestamp=time.time(),
                     ttl=ttl,
-                    metadata=metadata or {}
+                    metadata=metadata or {},
+                    compute_cost=compute_cost or 0.0
                 )
                 
                 # Оцениваем размер
@@ -578,10 +818,11 @@ class MCPToolsCache:
     async def set_async(self, key: str, data: Any, 
                        ttl: Optional[float] = None,
                        data_type: str = 'stable',
-                       metadata: Optional[Dict[str, Any]] = None) -> bool:
+                       metadata: Optional[Dict[str, Any]] = None,
+                       compute_cost: Optional[float] = None) -> bool:
         """Асинхронная версия set"""
         return await asyncio.get_event_loop().run_in_executor(
-            None, self.set, key, data, ttl, data_type, metadata
+            None, self.set, key, data, ttl, data_type, metadata, compute_cost
         )
     
     def delete(self, key: str) -> bool:
@@ -613,6 +854,37 @@ class MCPToolsCache:
         except Exception as e:
             logger.error(f"Ошибка при очистке кэша: {e}")
     
+    def warm_up(self, max_bytes: Optional[int] = None) -> int:
+        """
+        Загружает в память горячие записи из persistent cache
+        
+        Холодные записи остаются на диске и поднимаются лениво при get().
+        
+        Args:
+            max_bytes: Бюджет памяти на прогрев (по умолчанию - весь лимит)
+            
+        Returns:
+            Количество загруженных записей
+        """
+        if not self.persistent_cache:
+            return 0
+        
+        budget = self.max_size_bytes if max_bytes is None else max_bytes
+        loaded = 0
+        with self._lock:
+            for key, entry in self.persistent_cache.hot_entries(max_bytes=budget):
+                if key not in self._cache:
+                    self._cache[key] = entry
+                    loaded += 1
+        
+        logger.info(f"Прогрев кэша: загружено {loaded} записей из persistent cache")
+        return loaded
+    
+    def close(self) -> None:
+        """Сохраняет счётчики обращений и закрывает persistent cache"""
+        if self.persistent_cache:
+            self.persistent_cache.close()
+    
     def has(self, key: str) -> bool:
         """Проверяет наличие ключа в кэше"""
         return self.get(key) is not None
@@ -669,9 +941,8 @@ class MCPToolsCache:
         while self._is_full() and evicted < max_evictions and self._cache:
             target_key = self.strategy.select_eviction_target(self)
             if target_key:
+                # Копия в persistent cache остаётся: запись просто становится холодной
                 del self._cache[target_key]
-                if self.persistent_cache:
-                    self.persistent_cache.delete(target_key)
                 self.metrics.record_eviction()
                 evicted += 1
             else:
@@ -752,7 +1023,8 @@ def init_cache(max_size_mb: int = 100,
                default_ttl_stable: float = 30 * 60,
                default_ttl_dynamic: float = 5 * 60,
                persistent_cache_dir: Optional[str] = None,
-               strategy: Optional[CacheStrategy] = None) -> MCPToolsCache:
+               strategy: Optional[CacheStrategy] = None,
+               warm_start_ratio: float = 0.5) -> MCPToolsCache:
     """
     Инициализирует глобальный экземпляр кэша
     
@@ -762,6 +1034,7 @@ def init_cache(max_size_mb: int = 100,
         default_ttl_dynamic: TTL для динамических данных (по умолчанию 5 минут)
         persistent_cache_dir: Директория для persistent cache
         strategy: Стратегия кэширования
+        warm_start_ratio: Доля лимита памяти, заполняемая горячими записями с диска
         
     Returns:
         Экземпляр кэша
@@ -773,7 +1046,8 @@ def init_cache(max_size_mb: int = 100,
         default_ttl_stable=default_ttl_stable,
         default_ttl_dynamic=default_ttl_dynamic,
         persistent_cache_dir=persistent_cache_dir,
-        strategy=strategy
+        strategy=strategy,
+        warm_start_ratio=warm_start_ratio
     )
     
     logger.info(f"Инициализирован глобальный MCP Tools Cache")
@@ -811,9 +1085,11 @@ def cached(key_func: Optional[Callable] = None,
                 return result
             
             # Выполняем функцию и кэшируем результат
+            started = time.perf_counter()
             result = func(*args, **kwargs)
             if result is not None:  # Кэшируем только успешные результаты
-                cache.set(cache_key, result, ttl, data_type)
+                cache.set(cache_key, result, ttl, data_type,
+                          compute_cost=time.perf_counter() - started)
             
             return result
         
@@ -844,13 +1120,15 @@ async def cached_async(key_func: Optional[Callable] = None,
                 return result
             
             # Выполняем функцию и кэшируем результат
+            started = time.perf_counter()
             if asyncio.iscoroutinefunction(func):
                 result = await func(*args, **kwargs)
             else:
                 result = func(*args, **kwargs)
             
             if result is not None:
-                await cache.set_async(cache_key, result, ttl, data_type)
+                await cache.set_async(cache_key, result, ttl, data_type,
+                                      compute_cost=time.perf_counter() - started)
             
             return result
         
@@ -1015,7 +1293,10 @@ def get_cache_stats() -> Dict[str, Any]:
         'evictions': metrics.evictions,
         'errors': metrics.errors,
         'max_size_mb': cache.max_size_bytes / (1024 * 1024),
-        'persistent_cache_enabled': cache.persistent_cache is not None
+        'persistent_cache_enabled': cache.persistent_cache is not None,
+        'persistent_entries': cache.persistent_cache.entry_count() if cache.persistent_cache else 0,
+        'persistent_size_mb': (cache.persistent_cache._get_total_size() / (1024 * 1024)
+                               if cache.persistent_cache else 0.0)
     }
 
 
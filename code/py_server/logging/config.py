@@ -40,6 +40,7 @@ class LoggingConfig:
     MASK_PHONE = os.getenv("MASK_PHONE", "true").lower() == "true"
     MASK_CREDIT_CARD = os.getenv("MASK_CREDIT_CARD", "true").lower() == "true"
     MASK_SSN = os.getenv("MASK_SSN", "true").lower() == "true"
+    LAZY_SANITIZATION = os.getenv("LAZY_SANITIZATION", "false").lower() == "true"
     
     # Настройки интеграции с monitoring
     ENABLE_METRICS = os.getenv("ENABLE_METRICS", "true").lower() == "true"
@@ -67,6 +68,7 @@ class LoggingConfig:
             "mask_phone": cls.MASK_PHONE,
             "mask_credit_card": cls.MASK_CREDIT_CARD,
             "mask_ssn": cls.MASK_SSN,
+            "lazy_sanitization": cls.LAZY_SANITIZATION,
             "enable_metrics": cls.ENABLE_METRICS,
             "enable_apm": cls.ENABLE_APM,
             "async_processing": cls.ASYNC_PROCESSING,
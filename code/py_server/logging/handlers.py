@@ -12,6 +12,7 @@
 
 import json
 import logging
+import queue
 import threading
 import time
 from concurrent.futures import ThreadPoolExecutor
@@ -32,6 +33,13 @@ class StructuredLogger:
         self.name = name
         self.logger = structlog.get_logger(name)
         self.sanitizer = kwargs.get("sanitizer", None)
+        # Ленивый режим: записи ниже min_level не строятся и не санитизируются
+        self.lazy_sanitization = kwargs.get(
+            "lazy_sanitization", logging_config.LAZY_SANITIZATION
+        )
+        self.min_level = logging.getLevelName(
+            kwargs.get("min_level", logging_config.LOG_LEVEL)
+        )
         self.handlers: List["BaseHandler"] = []
         self._setup_handlers(kwargs)
 
@@ -81,9 +89,16 @@ class StructuredLogger:
                 )
             )
 
+    def is_enabled_for(self, level: LogLevel) -> bool:
+        """Будет ли запись этого уровня выведена"""
+        return logging.getLevelName(level.value) >= self.min_level
+
     def log(self, level: LogLevel, message: str, **kwargs):
         """Логирование с автоматическим применением обработчиков"""
 
+        if self.lazy_sanitization and not self.is_enabled_for(level):
+            return
+
         # Создание структуры лога
         log_data = create_log_structure(
             level=level, message=message, logger_name=self.name, **kwargs
@@ -240,59 +255,230 @@ class FileHandler(BaseHandler):
         self._current_size = 0
 
 
-class AsyncFileHandler(FileHandler):
-    """Асинхронный файловый обработчик"""
+class LogPipeline:
+    """
+    Неблокирующий конвейер записи логов
 
-    def __init__(self, file_path: str, **kwargs):
-        super().__init__(file_path, **kwargs)
-        self.executor = ThreadPoolExecutor(max_workers=2)
-        self.buffer = []
-        self.buffer_size = 1000
-        self.flush_interval = 10  # секунд
-        self._last_flush = time.time()
-        self._flush_task = None
+    Вызывающий поток только кладет запись в ограниченную очередь; единственный
+    фоновый поток-писатель забирает записи пачками и передает их в `sink`.
+    Пачка сбрасывается по размеру (`batch_size`) или по времени
+    (`flush_interval`). При заполнении очереди выше `debug_drop_ratio`
+    отбрасываются DEBUG записи, при полном заполнении - любые.
+    """
 
-    def handle(self, log_data: Dict[str, Any]):
-        """Асинхронная запись в файл"""
-        self.buffer.append(log_data)
+    _STOP = object()
 
-        if len(self.buffer) >= self.buffer_size:
-            self._flush_buffer()
+    def __init__(
+        self,
+        sink,
+        name: str = "log-pipeline",
+        max_queue_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        debug_drop_ratio: float = 0.8,
+    ):
+        self.sink = sink
+        self.name = name
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.debug_drop_threshold = int(max_queue_size * debug_drop_ratio)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue_size)
+        self._flush_requests: "queue.Queue" = queue.Queue()
+
+        self._metrics_lock = threading.Lock()
+        self._enqueued = 0
+        self._written = 0
+        self._dropped: Dict[str, int] = {}
+        self._flush_count = 0
+        self._flush_errors = 0
+        self._flush_latency_total = 0.0
+        self._flush_latency_max = 0.0
+        self._last_flush_latency = 0.0
+
+        self._writer = threading.Thread(target=self._run, name=name, daemon=True)
+        self._writer.start()
+
+    def submit(self, log_data: Dict[str, Any]) -> bool:
+        """Постановка записи в очередь без ожидания"""
+        level = log_data.get("level", "INFO")
+
+        if level == "DEBUG" and self._queue.qsize() >= self.debug_drop_threshold:
+            self._record_drop(level)
+            return False
 
-        if time.time() - self._last_flush > self.flush_interval:
-            self._flush_buffer()
+        try:
+            self._queue.put_nowait(log_data)
+        except queue.Full:
+            self._record_drop(level)
+            return False
+
+        with self._metrics_lock:
+            self._enqueued += 1
+        return True
+
+    def _record_drop(self, level: str):
+        with self._metrics_lock:
+            self._dropped[level] = self._dropped.get(level, 0) + 1
+
+    def _run(self):
+        """Цикл потока-писателя"""
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.flush_interval
+        stopping = False
+
+        while not stopping:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+                # Дочитываем все, что уже накопилось, без ожидания
+                while True:
+                    if item is self._STOP:
+                        stopping = True
+                        break
+                    if item is not None:  # None - пробуждение для flush()
+                        batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                pass
+
+            flush_requested = not self._flush_requests.empty()
+            if (
+                len(batch) >= self.batch_size
+                or time.monotonic() >= deadline
+                or stopping
+                or flush_requested
+            ):
+                if batch:
+                    self._flush(batch)
+                    batch = []
+                deadline = time.monotonic() + self.flush_interval
+                while not self._flush_requests.empty():
+                    self._flush_requests.get_nowait().set()
+
+    def _flush(self, batch: List[Dict[str, Any]]):
+        started = time.perf_counter()
+        try:
+            self.sink(batch)
+            written = len(batch)
+            failed = False
+        except Exception as e:
+            print(f"{self.name} flush error: {e}")
+            written = 0
+            failed = True
+        latency = time.perf_counter() - started
+
+        with self._metrics_lock:
+            self._written += written
+            self._flush_count += 1
+            self._flush_errors += int(failed)
+            self._flush_latency_total += latency
+            self._flush_latency_max = max(self._flush_latency_max, latency)
+            self._last_flush_latency = latency
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Принудительный сброс накопленных записей (ждет окончания записи)"""
+        if not self._writer.is_alive():
+            return True
+        done = threading.Event()
+        self._flush_requests.put(done)
+        # Будим писателя, если он ждет на пустой очереди
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 10.0):
+        """Остановка писателя со сбросом очереди"""
+        if self._writer.is_alive():
+            self._queue.put(self._STOP)
+            self._writer.join(timeout)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Глубина очереди, отброшенные записи и задержка сброса"""
+        with self._metrics_lock:
+            flushes = self._flush_count
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_size": self.max_queue_size,
+                "enqueued_total": self._enqueued,
+                "written_total": self._written,
+                "dropped_total": sum(self._dropped.values()),
+                "dropped_by_level": dict(self._dropped),
+                "flush_total": flushes,
+                "flush_errors_total": self._flush_errors,
+                "flush_latency_last_ms": self._last_flush_latency * 1000,
+                "flush_latency_avg_ms": (
+                    self._flush_latency_total / flushes * 1000 if flushes else 0.0
+                ),
+                "flush_latency_max_ms": self._flush_latency_max * 1000,
+            }
 
-    def _flush_buffer(self):
-        """Сброс буфера в файл"""
-        if self.buffer:
-            buffer_copy = self.buffer.copy()
-            self.buffer.clear()
+    def to_prometheus(self) -> str:
+        """Метрики конвейера в формате Prometheus"""
+        metrics = self.get_metrics()
+        sink = f'sink="{self.name}"'
+        lines = [
+            f"log_pipeline_queue_depth{{{sink}}} {metrics['queue_depth']}",
+            f"log_pipeline_enqueued_total{{{sink}}} {metrics['enqueued_total']}",
+            f"log_pipeline_written_total{{{sink}}} {metrics['written_total']}",
+            f"log_pipeline_flush_total{{{sink}}} {metrics['flush_total']}",
+            f"log_pipeline_flush_errors_total{{{sink}}} {metrics['flush_errors_total']}",
+            f"log_pipeline_flush_latency_avg_ms{{{sink}}} {metrics['flush_latency_avg_ms']:.3f}",
+            f"log_pipeline_flush_latency_max_ms{{{sink}}} {metrics['flush_latency_max_ms']:.3f}",
+        ]
+        for level, count in sorted(metrics["dropped_by_level"].items()):
+            lines.append(f'log_pipeline_dropped_total{{{sink},level="{level}"}} {count}')
+        return "\n".join(lines)
+
+
+class AsyncFileHandler(FileHandler):
+    """Асинхронный файловый обработчик (фоновый писатель с пакетной записью)"""
+
+    def __init__(self, file_path: str, **kwargs):
+        self.buffer_size = kwargs.pop("buffer_size", logging_config.BUFFER_SIZE)
+        self.flush_interval = kwargs.pop("flush_interval", 1.0)  # секунд
+        max_queue_size = kwargs.pop("max_queue_size", 10000)
+        super().__init__(file_path, **kwargs)
+        self.pipeline = LogPipeline(
+            self._write_to_file,
+            name=f"file:{file_path}",
+            max_queue_size=max_queue_size,
+            batch_size=self.buffer_size,
+            flush_interval=self.flush_interval,
+        )
 
-            self.executor.submit(self._write_to_file, buffer_copy)
-            self._last_flush = time.time()
+    def handle(self, log_data: Dict[str, Any]):
+        """Постановка записи в очередь (без обращения к диску)"""
+        self.pipeline.submit(log_data)
 
     def _write_to_file(self, logs: List[Dict[str, Any]]):
-        """Запись в файл в отдельном потоке"""
-        try:
-            with self._lock:
-                with open(self.file_path, "a", encoding="utf-8") as f:
-                    for log_data in logs:
-                        log_line = (
-                            json.dumps(log_data, ensure_ascii=False, default=str) + "\n"
-                        )
-                        f.write(log_line)
-                        self._current_size += len(log_line.encode("utf-8"))
+        """Запись пачки в файл в потоке-писателе"""
+        payload = "".join(
+            json.dumps(log_data, ensure_ascii=False, default=str) + "\n"
+            for log_data in logs
+        )
+        if not payload:
+            return
 
-                if self.rotation == "size" and self._current_size > self.max_size:
-                    self._rotate_file()
+        with self._lock:
+            with open(self.file_path, "a", encoding="utf-8") as f:
+                f.write(payload)
+            self._current_size += len(payload.encode("utf-8"))
 
-        except Exception as e:
-            print(f"Async file handler error: {e}")
+            if self.rotation == "size" and self._current_size > self.max_size:
+                self._rotate_file()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Метрики конвейера записи"""
+        return self.pipeline.get_metrics()
 
     def shutdown(self):
         """Закрытие с сбросом буфера"""
-        self._flush_buffer()
-        self.executor.shutdown(wait=True)
+        self.pipeline.close()
 
 
 class MonitorHandler(BaseHandler):
@@ -730,14 +916,38 @@ class MessageBrokerHandler(BaseHandler):
 
 
 class DatabaseHandler(BaseHandler):
-    """Обработчик для записи в базу данных"""
+    """
+    Обработчик для записи в базу данных
+
+    По умолчанию (`batch_writes=True`) записи пишутся фоновым потоком
+    пачками через executemany (execute_values для PostgreSQL).
+    """
+
+    COLUMNS = (
+        "timestamp", "level", "message", "logger_name", "correlation_id",
+        "user_id", "request_id", "duration_ms", "service_name",
+        "error_code", "error_type", "stacktrace", "context",
+        "http_method", "http_status_code", "target_url",
+    )
 
     def __init__(self, db_config: Dict[str, Any]):
         self.db_config = db_config
         self.connection = None
         self.logger = logging.getLogger(__name__)
+        self._db_type = self.db_config.get("type", "sqlite").lower()
+        self._placeholder = "%s" if self._db_type == "postgresql" else "?"
         self._connect()
 
+        self.pipeline: Optional[LogPipeline] = None
+        if self.db_config.get("batch_writes", True):
+            self.pipeline = LogPipeline(
+                self._write_batch,
+                name=f"db:{self._db_type}",
+                max_queue_size=self.db_config.get("max_queue_size", 10000),
+                batch_size=self.db_config.get("batch_size", 500),
+                flush_interval=self.db_config.get("flush_interval", 1.0),
+            )
+
     def _connect(self):
         """Подключение к БД"""
         try:
@@ -761,7 +971,8 @@ class DatabaseHandler(BaseHandler):
         db_path = self.db_config.get("path", "logs.db")
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
 
-        self.connection = sqlite3.connect(db_path)
+        # Соединение используется потоком-писателем конвейера
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
         self._create_table()
 
     def _connect_postgresql(self):
@@ -785,10 +996,15 @@ class DatabaseHandler(BaseHandler):
         """Создание таблицы для логов"""
         cursor = self.connection.cursor()
 
+        if self._db_type == "postgresql":
+            id_column = "id SERIAL PRIMARY KEY"
+        else:
+            id_column = "id INTEGER PRIMARY KEY AUTOINCREMENT"
+
         cursor.execute(
-            """
+            f"""
             CREATE TABLE IF NOT EXISTS logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                {id_column},
                 timestamp TEXT NOT NULL,
                 level TEXT NOT NULL,
                 message TEXT NOT NULL,
@@ -812,47 +1028,70 @@ class DatabaseHandler(BaseHandler):
 
         self.connection.commit()
 
-    def handle(self, log_data: Dict[str, Any]):
-        """Запись лога в БД"""
+    def _row(self, log_data: Dict[str, Any]) -> tuple:
+        """Значения колонок таблицы logs для записи"""
+        return (
+            log_data.get("timestamp"),
+            log_data.get("level"),
+            log_data.get("message"),
+            log_data.get("logger_name"),
+            log_data.get("correlation_id"),
+            log_data.get("user_id"),
+            log_data.get("request_id"),
+            log_data.get("duration_ms"),
+            log_data.get("service_name"),
+            log_data.get("error_code"),
+            log_data.get("error_type"),
+            log_data.get("stacktrace"),
+            json.dumps(log_data.get("context", {})),
+            log_data.get("http_method"),
+            log_data.get("http_status_code"),
+            log_data.get("target_url"),
+        )
+
+    def _write_batch(self, logs: List[Dict[str, Any]]):
+        """Пакетная вставка (выполняется в потоке-писателе)"""
+        rows = [self._row(log_data) for log_data in logs]
+        columns = ", ".join(self.COLUMNS)
+        placeholders = ", ".join([self._placeholder] * len(self.COLUMNS))
+        insert_sql = f"INSERT INTO logs ({columns}) VALUES ({placeholders})"
+        cursor = self.connection.cursor()
+
         try:
-            cursor = self.connection.cursor()
-
-            cursor.execute(
-                """
-                INSERT INTO logs (
-                    timestamp, level, message, logger_name, correlation_id,
-                    user_id, request_id, duration_ms, service_name,
-                    error_code, error_type, stacktrace, context,
-                    http_method, http_status_code, target_url
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-                (
-                    log_data.get("timestamp"),
-                    log_data.get("level"),
-                    log_data.get("message"),
-                    log_data.get("logger_name"),
-                    log_data.get("correlation_id"),
-                    log_data.get("user_id"),
-                    log_data.get("request_id"),
-                    log_data.get("duration_ms"),
-                    log_data.get("service_name"),
-                    log_data.get("error_code"),
-                    log_data.get("error_type"),
-                    log_data.get("stacktrace"),
-                    json.dumps(log_data.get("context", {})),
-                    log_data.get("http_method"),
-                    log_data.get("http_status_code"),
-                    log_data.get("target_url"),
-                ),
-            )
+            if self._db_type == "postgresql":
+                try:
+                    from psycopg2.extras import execute_values
+                except ImportError:
+                    cursor.executemany(insert_sql, rows)
+                else:
+                    execute_values(cursor, f"INSERT INTO logs ({columns}) VALUES %s", rows)
+            else:
+                cursor.executemany(insert_sql, rows)
 
             self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+
+    def handle(self, log_data: Dict[str, Any]):
+        """Запись лога в БД"""
+        if self.pipeline is not None:
+            self.pipeline.submit(log_data)
+            return
 
+        try:
+            self._write_batch([log_data])
         except Exception as e:
             self.logger.error(f"Failed to insert log into database: {e}")
 
+    def get_metrics(self) -> Dict[str, Any]:
+        """Метрики конвейера записи"""
+        return self.pipeline.get_metrics() if self.pipeline is not None else {}
+
     def shutdown(self):
         """Закрытие подключения к БД"""
+        if self.pipeline is not None:
+            self.pipeline.close()
         if self.connection:
             self.connection.close()
 
@@ -12,7 +12,8 @@ import logging
 import re
 from dataclasses import dataclass
 from enum import Enum
-from typing import Any, Dict, List, Optional, Pattern, Set
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Set, Tuple
 
 
 class MaskingRule(Enum):
@@ -106,38 +107,40 @@ class PatternMatcher:
             return text
         
         def replace_func(match):
-            matched_text = match.group(0)
-            
-            if preserve_pattern:
-                # Сохранение структуры (например, скрытие только части)
-                if rule == MaskingRule.EMAIL:
-                    username, domain = matched_text.split('@', 1)
-                    return f"{username[:2]}***@{domain}"
-                elif rule == MaskingRule.PHONE:
-                    return re.sub(r'\d', 'X', matched_text)
-                elif rule == MaskingRule.CREDIT_CARD:
-                    # Маскировка всех кроме последних 4 цифр
-                    digits = re.sub(r'\D', '', matched_text)
-                    if len(digits) >= 4:
-                        masked = 'X' * (len(digits) - 4) + digits[-4:]
-                        # Восстановление оригинального форматирования
-                        result = masked
-                        index = 0
-                        formatted_result = ''
-                        for char in matched_text:
-                            if char.isdigit() and index < len(masked):
-                                formatted_result += masked[index]
-                                index += 1
-                            else:
-                                formatted_result += char
-                        return formatted_result
-                elif rule == MaskingRule.IP_ADDRESS:
-                    parts = matched_text.split('.')
-                    return f"{parts[0]}.{parts[1]}.***.***"
-            
-            return replacement
+            return self.mask_match(match.group(0), rule, replacement, preserve_pattern)
         
         return pattern.sub(replace_func, text)
+    
+    def mask_match(self, matched_text: str, rule: MaskingRule,
+                   replacement: str, preserve_pattern: bool = True) -> str:
+        """Маскирование одного найденного совпадения"""
+        if preserve_pattern:
+            # Сохранение структуры (например, скрытие только части)
+            if rule == MaskingRule.EMAIL:
+                username, domain = matched_text.split('@', 1)
+                return f"{username[:2]}***@{domain}"
+            elif rule == MaskingRule.PHONE:
+                return re.sub(r'\d', 'X', matched_text)
+            elif rule == MaskingRule.CREDIT_CARD:
+                # Маскировка всех кроме последних 4 цифр
+                digits = re.sub(r'\D', '', matched_text)
+                if len(digits) >= 4:
+                    masked = 'X' * (len(digits) - 4) + digits[-4:]
+                    # Восстановление оригинального форматирования
+                    index = 0
+                    formatted_result = ''
+                    for char in matched_text:
+                        if char.isdigit() and index < len(masked):
+                            formatted_result += masked[index]
+                            index += 1
+                        else:
+                            formatted_result += char
+                    return formatted_result
+            elif rule == MaskingRule.IP_ADDRESS:
+                parts = matched_text.split('.')
+                return f"{parts[0]}.{parts[1]}.***.***"
+        
+        return replacement
 
 
 class DataSanitizer:
@@ -296,8 +299,9 @@ class DataSanitizer:
         # Понижение регистра для проверки чувствительности
         key_lower = key.lower()
         if any(sensitive in key_lower for sensitive in self.sensitive_keys):
-            # Возвращаем нормализованный ключ
-            for sensitive in self.sensitive_keys:
+            # Возвращаем нормализованный ключ: самый длинный из совпавших,
+            # порядок не зависит от порядка обхода множества
+            for sensitive in sorted(self.sensitive_keys, key=_key_priority):
                 if sensitive in key_lower:
                     return sensitive
         
@@ -355,8 +359,174 @@ class DataSanitizer:
         return self.hash_sensitive_value(user_id, salt)
 
 
+def _key_priority(key: str) -> Tuple[int, str]:
+    """Порядок проверки чувствительных ключей: длинные раньше коротких"""
+    return -len(key), key
+
+
+def _compile_substring_scanner(keys: Iterable[str]) -> Optional[Pattern]:
+    """Одно регулярное выражение для поиска любого ключа как подстроки"""
+    keys = [key.lower() for key in keys if key]
+    if not keys:
+        return None
+    # Длинные ключи раньше коротких, чтобы найти самое специфичное совпадение
+    ordered = sorted(set(keys), key=_key_priority)
+    return re.compile('|'.join(re.escape(key) for key in ordered))
+
+
+class CompiledSanitizer(DataSanitizer):
+    """
+    Санитайзер с заранее скомпилированным планом маскирования.
+    
+    - все включенные правила объединены в одно регулярное выражение
+      с именованными группами и применяются за один проход;
+    - строки без символов, с которых может начинаться совпадение
+      (цифры, '@'), отбрасываются дешевым префильтром;
+    - чувствительность ключей запоминается в LRU-кэше.
+    
+    После изменения ``configs`` или ``sensitive_keys`` нужно вызвать
+    ``rebuild()``.
+    """
+    
+    # Символы, без которых правило не может сработать
+    RULE_TRIGGERS = {
+        MaskingRule.EMAIL: '@',
+    }
+    DEFAULT_TRIGGER = r'\d'
+    
+    def __init__(self, key_cache_size: int = 4096):
+        super().__init__()
+        self.key_cache_size = key_cache_size
+        self.rebuild()
+    
+    def rebuild(self):
+        """Перекомпиляция плана маскирования и сброс кэшей ключей"""
+        self._group_rules: Dict[str, Tuple[MaskingRule, MaskingConfig]] = {}
+        alternatives = []
+        triggers = set()
+        
+        # Порядок альтернатив совпадает с порядком применения правил в DataSanitizer
+        for rule, config in self.configs.items():
+            pattern = self.matcher.patterns.get(rule)
+            if not config.enabled or pattern is None:
+                continue
+            group = f"r_{rule.name.lower()}"
+            self._group_rules[group] = (rule, config)
+            alternatives.append(f"(?P<{group}>{pattern.pattern})")
+            triggers.add(self.RULE_TRIGGERS.get(rule, self.DEFAULT_TRIGGER))
+        
+        self._combined: Optional[Pattern] = (
+            re.compile('|'.join(alternatives), re.IGNORECASE) if alternatives else None
+        )
+        self._prefilter: Optional[Pattern] = (
+            re.compile('[' + ''.join(sorted(triggers)) + ']') if triggers else None
+        )
+        self._key_scanner = _compile_substring_scanner(self.sensitive_keys)
+        self._ordered_keys = tuple(sorted(self.sensitive_keys, key=_key_priority))
+        
+        self._key_sensitivity = lru_cache(maxsize=self.key_cache_size)(self._compute_key_sensitivity)
+        self._normalized_key = lru_cache(maxsize=self.key_cache_size)(self._compute_normalized_key)
+        self._custom_scanner = lru_cache(maxsize=64)(_compile_substring_scanner)
+    
+    def _compute_key_sensitivity(self, key_lower: str, custom_keys: Tuple[str, ...]) -> bool:
+        if self._key_scanner is not None and self._key_scanner.search(key_lower):
+            return True
+        if custom_keys:
+            scanner = self._custom_scanner(custom_keys)
+            return scanner is not None and scanner.search(key_lower) is not None
+        return False
+    
+    def _compute_normalized_key(self, key: str) -> str:
+        # Как в DataSanitizer: самый длинный совпавший ключ, а не самый левый
+        key_lower = key.lower()
+        for sensitive in self._ordered_keys:
+            if sensitive in key_lower:
+                return sensitive
+        return key
+    
+    def _replace_match(self, match: re.Match) -> str:
+        rule, config = self._group_rules[match.lastgroup]
+        return self.matcher.mask_match(
+            match.group(0), rule, config.replacement_pattern, config.preserve_pattern
+        )
+    
+    def sanitize_text(self, text: str) -> str:
+        """Маскирование строки за один проход"""
+        if self._combined is None or not self._prefilter.search(text):
+            return text
+        return self._combined.sub(self._replace_match, text)
+    
+    def sanitize_value(self, value: Any, key: Optional[str] = None,
+                      custom_rules: Optional[Dict[str, Any]] = None) -> Any:
+        """Санитизация отдельного значения"""
+        if value is None:
+            return value
+        
+        if key and self.is_sensitive_key(key, custom_rules):
+            return self._get_replacement_value(key, custom_rules)
+        
+        if isinstance(value, str):
+            return self.sanitize_text(value)
+        
+        return value
+    
+    def sanitize_key(self, key: str, key_mappings: Optional[Dict[str, str]] = None) -> str:
+        """Санитизация ключа (если есть маппинг)"""
+        if key_mappings and key in key_mappings:
+            return key_mappings[key]
+        return self._normalized_key(key)
+    
+    def is_sensitive_key(self, key: str, custom_rules: Optional[Dict[str, Any]] = None) -> bool:
+        """Проверка, является ли ключ чувствительным"""
+        custom_keys: Tuple[str, ...] = ()
+        if custom_rules and 'sensitive_keys' in custom_rules:
+            custom_keys = tuple(custom_rules['sensitive_keys'])
+        return self._key_sensitivity(key.lower(), custom_keys)
+    
+    def cache_info(self) -> Dict[str, Any]:
+        """Статистика кэшей ключей"""
+        return {
+            'key_sensitivity': self._key_sensitivity.cache_info()._asdict(),
+            'normalized_key': self._normalized_key.cache_info()._asdict(),
+        }
+
+
+class LazySanitizingFilter(logging.Filter):
+    """
+    Отложенная санитизация записей стандартного logging.
+    
+    Фильтр обработчика вызывается только для записей, прошедших проверку
+    уровня логгера и обработчика, поэтому записи отключенных уровней
+    не санитизируются вовсе.
+    """
+    
+    def __init__(self, sanitizer: Optional[DataSanitizer] = None,
+                 custom_rules: Optional[Dict[str, Any]] = None):
+        super().__init__()
+        self.sanitizer = sanitizer or default_sanitizer
+        self.custom_rules = custom_rules
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, '_sanitized', False):
+            return True
+        
+        if isinstance(record.msg, str):
+            record.msg = self.sanitizer.sanitize_value(record.msg, custom_rules=self.custom_rules)
+        
+        if isinstance(record.args, dict):
+            record.args = self.sanitizer.sanitize_dict(record.args, self.custom_rules)
+        elif isinstance(record.args, tuple):
+            record.args = tuple(
+                self.sanitizer.sanitize_value(arg, custom_rules=self.custom_rules)
+                for arg in record.args
+            )
+        
+        record._sanitized = True
+        return True
+
+
 # Глобальный экземпляр санитайзера
-default_sanitizer = DataSanitizer()
+default_sanitizer = CompiledSanitizer()
 
 
 # Функции-утилиты
@@ -13,6 +13,7 @@
 
 import asyncio
 import json
+import threading
 import time
 from unittest.mock import patch
 
@@ -22,11 +23,13 @@ import pytest
 from .config import LoggingConfig, logging_config
 from .formatter import (HTTPRequestFormatter, LogLevel, PerformanceFormatter,
                         StructuredFormatter, create_log_structure)
-from .handlers import (ConsoleHandler, FileHandler, StructuredLogger)
+from .handlers import (AsyncFileHandler, ConsoleHandler, DatabaseHandler,
+                       FileHandler, LogPipeline, StructuredLogger)
 from .middleware import (LoggingMiddleware, correlation_context,
                          correlation_context_manager, log_execution_time,
                          with_correlation_id)
-from .sanitizers import (DataSanitizer, MaskingRule, sanitize_user_data)
+from .sanitizers import (CompiledSanitizer, DataSanitizer, LazySanitizingFilter,
+                         MaskingRule, sanitize_user_data)
 
 
 class TestLoggingConfig:
@@ -215,6 +218,73 @@ class TestDataSanitizer:
         assert "***EMAIL***" in sanitized["email"]
 
 
+class TestCompiledSanitizer:
+    """Тесты скомпилированного санитайзера"""
+    
+    def setup_method(self):
+        """Настройка для каждого теста"""
+        self.reference = DataSanitizer()
+        self.sanitizer = CompiledSanitizer()
+    
+    def test_matches_reference_sanitizer(self):
+        """Тест совпадения результата с DataSanitizer"""
+        data = {
+            "message": "Contact user@example.com or +7 (900) 123-45-67 from 192.168.1.10",
+            "card": "4532 1234 5678 9012",
+            "account": "40817810099910004312",
+            "password": "secret123",
+            "nested": {"api_key": "abc", "note": "plain text"},
+            "items": ["ssn 123-45-6789", 42, None],
+        }
+        assert self.sanitizer.sanitize_dict(data) == self.reference.sanitize_dict(data)
+    
+    def test_key_normalization_matches_reference(self):
+        """Тест детерминированной нормализации ключей"""
+        keys = ["api_key", "user_token_password", "X-Session-Token", "client_secret_key", "duration_ms"]
+        for key in keys:
+            assert self.sanitizer.sanitize_key(key) == self.reference.sanitize_key(key)
+        assert self.reference.sanitize_key("user_token_password") == "password"
+        assert self.reference.sanitize_key("api_key") == "api_key"
+    
+    def test_prefilter_skips_plain_text(self):
+        """Тест пропуска строк без цифр и '@'"""
+        text = "request handled successfully"
+        assert self.sanitizer.sanitize_text(text) is text
+    
+    def test_key_sensitivity_is_memoized(self):
+        """Тест LRU-кэша чувствительности ключей"""
+        for _ in range(3):
+            assert self.sanitizer.is_sensitive_key("X-Auth-Token")
+            assert not self.sanitizer.is_sensitive_key("duration_ms")
+        
+        info = self.sanitizer.cache_info()["key_sensitivity"]
+        assert info["misses"] == 2
+        assert info["hits"] == 4
+    
+    def test_custom_sensitive_keys(self):
+        """Тест кастомных чувствительных ключей"""
+        rules = {"sensitive_keys": ["cookie"]}
+        assert self.sanitizer.is_sensitive_key("Set-Cookie", rules)
+        assert not self.sanitizer.is_sensitive_key("Set-Cookie")
+    
+    def test_rebuild_after_disabling_rule(self):
+        """Тест перекомпиляции после изменения правил"""
+        self.sanitizer.configs[MaskingRule.EMAIL].enabled = False
+        self.sanitizer.rebuild()
+        assert self.sanitizer.sanitize_text("user@example.com") == "user@example.com"
+    
+    def test_lazy_filter_sanitizes_emitted_record(self):
+        """Тест отложенной санитизации записи logging"""
+        import logging
+        
+        record = logging.LogRecord(
+            "test", logging.INFO, __file__, 1,
+            "login from %s", ("user@example.com",), None
+        )
+        assert LazySanitizingFilter(self.sanitizer).filter(record)
+        assert "***@example.com" in record.getMessage()
+
+
 class TestCorrelationContext:
     """Тесты корреляционного контекста"""
     
@@ -407,6 +477,63 @@ class TestHandlers:
         assert "Test file message" in content
         assert json.loads(content.split('\n')[0])["level"] == "INFO"
     
+    def test_async_file_handler_batches_in_background(self, tmp_path):
+        """Тест фоновой пакетной записи в файл"""
+        log_file = tmp_path / "async.log"
+        handler = AsyncFileHandler(str(log_file), buffer_size=50, flush_interval=10)
+        
+        for i in range(120):
+            handler.handle({"level": "INFO", "message": f"message {i}"})
+        
+        assert handler.pipeline.flush(timeout=5)
+        handler.shutdown()
+        
+        lines = log_file.read_text().splitlines()
+        assert len(lines) == 120
+        metrics = handler.get_metrics()
+        assert metrics["written_total"] == 120
+        assert metrics["dropped_total"] == 0
+        assert metrics["flush_total"] >= 3
+    
+    def test_pipeline_drops_debug_first(self):
+        """Тест отбрасывания DEBUG при переполнении очереди"""
+        release = threading.Event()
+        pipeline = LogPipeline(lambda batch: release.wait(5), max_queue_size=10,
+                               batch_size=1, debug_drop_ratio=0.5)
+        
+        pipeline.submit({"level": "INFO"})
+        time.sleep(0.1)  # писатель занят первой записью
+        for _ in range(5):
+            pipeline.submit({"level": "INFO"})
+        
+        assert pipeline.submit({"level": "DEBUG"}) is False
+        assert pipeline.submit({"level": "ERROR"}) is True
+        
+        metrics = pipeline.get_metrics()
+        assert metrics["dropped_by_level"] == {"DEBUG": 1}
+        assert metrics["queue_depth"] == 6
+        
+        release.set()
+        pipeline.close()
+        assert 'log_pipeline_dropped_total{sink="log-pipeline",level="DEBUG"} 1' in pipeline.to_prometheus()
+    
+    def test_database_handler_executemany(self, tmp_path):
+        """Тест пакетной вставки в SQLite"""
+        import sqlite3
+        
+        db_path = tmp_path / "logs.db"
+        handler = DatabaseHandler({"type": "sqlite", "path": str(db_path), "batch_size": 100})
+        
+        for i in range(250):
+            handler.handle({"timestamp": "2023-01-01T00:00:00Z", "level": "INFO",
+                            "message": f"db message {i}", "context": {"i": i}})
+        
+        handler.shutdown()
+        
+        rows = sqlite3.connect(db_path).execute("SELECT COUNT(*) FROM logs").fetchone()
+        assert rows[0] == 250
+        assert handler.get_metrics()["written_total"] == 250
+    
     def test_structured_logger(self):
         """Тест структурированного логгера"""
         logger = StructuredLogger("test_logger", console=False)
@@ -13,6 +13,8 @@ from .metrics import (  # Основные классы мониторинга;
     ActiveAlert, AlertManager, AlertRule, AlertSeverity, MetricType,
     PrometheusExporter, RateLimitDashboard, RateLimitMetric, RateLimitMetrics,
     RateLimitMonitoringSystem, RealTimeMonitor, rate_limit_monitoring)
+from .sketches import (FixedBucketHistogram, HyperLogLog,
+                       ShardedMetricsRecorder, SpaceSavingTopK)
 from .request_tracker import (DistributedTracker, IPTracker, RateLimitStats,
                               RequestMetrics, RequestTracker, ToolTracker,
                               UserTracker, create_rate_limit_middleware,
@@ -43,6 +45,12 @@ __all__ = [
     'MetricType',
     'rate_limit_monitoring',
     
+    # Компактные структуры метрик
+    'FixedBucketHistogram',
+    'SpaceSavingTopK',
+    'HyperLogLog',
+    'ShardedMetricsRecorder',
+    
     # Трекинг запросов
     'RequestTracker',
     'IPTracker',
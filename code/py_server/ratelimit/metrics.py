@@ -18,12 +18,14 @@ import json
 import logging
 import threading
 import time
-from collections import defaultdict, deque
+from collections import deque
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
 from typing import Any, Dict, List, Optional
 
+from .sketches import ShardedMetricsRecorder
+
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -45,6 +47,11 @@ class MetricType(Enum):
     SUMMARY = "summary"
 
 
+def _escape_label_value(value: Any) -> str:
+    """Экранирование значения метки для текстового формата Prometheus"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
 @dataclass
 class RateLimitMetric:
     """Структура метрики блокировки"""
@@ -59,7 +66,7 @@ class RateLimitMetric:
         """Формат метрики для Prometheus"""
         label_str = ""
         if self.labels:
-            labels_str = ','.join([f'{k}="{v}"' for k, v in self.labels.items()])
+            labels_str = ','.join([f'{k}="{_escape_label_value(v)}"' for k, v in self.labels.items()])
             label_str = f'{{{labels_str}}}'
         
         timestamp_ms = int(self.timestamp.timestamp() * 1000)
@@ -127,25 +134,34 @@ class ActiveAlert:
 
 
 class RateLimitMetrics:
-    """Сборщик метрик блокировок Rate Limiting"""
-    
-    def __init__(self, max_history_size: int = 10000):
+    """
+    Сборщик метрик блокировок Rate Limiting
+    
+    Горячий путь (record_request) не берет общую блокировку: счетчики,
+    гистограммы и top-K по IP/пользователям/tools пишутся в шард текущего
+    потока и сливаются только при чтении сводки или экспорте. Память
+    ограничена независимо от числа клиентов: гистограммы с фиксированными
+    корзинами, Space-Saving top-K и HyperLogLog для уникальных ключей.
+    """
+    
+    def __init__(self, max_history_size: int = 10000,
+                 top_k: int = 100,
+                 max_label_values: int = 200,
+                 record_events: bool = True):
         self.max_history_size = max_history_size
+        self.top_k = top_k
+        self.record_events = record_events
         self._lock = threading.RLock()
         
-        # Метрики
+        # Лента событий для алертов и real-time мониторинга (ограничена по размеру)
         self._metrics: deque = deque(maxlen=max_history_size)
-        self._counters: Dict[str, float] = defaultdict(float)
+        # Последние значения gauge без меток (active_limits, health_status, ...)
         self._gauges: Dict[str, float] = {}
-        self._histograms: Dict[str, List[float]] = defaultdict(list)
-        
-        # Детализация по IP, пользователю, MCP tool
-        self._ip_metrics: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
-        self._user_metrics: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
-        self._tool_metrics: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
         
-        # RPS метрики (окно 1 минута)
-        self._rps_windows: Dict[str, deque] = defaultdict(lambda: deque(maxlen=60))
+        # Счетчики, гистограммы и top-K по IP, пользователю, MCP tool (RPS окно 1 минута)
+        self._recorder = ShardedMetricsRecorder(
+            top_k=top_k, window=60.0, max_label_values=max_label_values
+        )
         
         # Активные ограничения
         self._active_limits: Dict[str, Dict[str, Any]] = {}
@@ -162,10 +178,28 @@ class RateLimitMetrics:
                       blocked: bool = False,
                       limit_exceeded: bool = False):
         """Запись метрик запроса"""
-        with self._lock:
-            timestamp = datetime.now()
+        now = time.time()
+        blocked = blocked or limit_exceeded
+        shard = self._recorder.shard()
+        
+        # Метка tool имеет ограниченную кардинальность; IP и пользователи - только в top-K
+        tool_label = self._recorder.bounded_label(tool) if tool else ""
+        
+        shard.inc('rate_limit_requests_total', tool_label)
+        if blocked:
+            shard.inc('rate_limit_blocked_total', tool_label)
+        if response_time is not None:
+            shard.observe(tool_label, response_time)
+        
+        if ip:
+            shard.hit('ip', ip, now)
+        if user_id:
+            shard.hit('user', user_id, now)
+        if tool:
+            shard.hit('tool', tool, now)
+        
+        if self.record_events:
             base_labels = {}
-            
             if ip:
                 base_labels['ip'] = ip
             if user_id:
@@ -173,31 +207,22 @@ class RateLimitMetrics:
             if tool:
                 base_labels['tool'] = tool
             
-            # Общие метрики
             self._record_counter('rate_limit_requests_total', base_labels, 1)
-            
-            if blocked or limit_exceeded:
+            if blocked:
                 self._record_counter('rate_limit_blocked_total', base_labels, 1)
-                self._record_gauge('rate_limit_blocked_current', base_labels, 1)
-            else:
-                self._record_gauge('rate_limit_blocked_current', base_labels, 0)
+            self._record_gauge('rate_limit_blocked_current', base_labels, 1 if blocked else 0,
+                               keep_last=False)
             
-            # Время отклика
             if response_time is not None:
                 self._record_histogram('rate_limit_response_time_seconds', response_time, base_labels)
-            
-            # RPS метрики
-            if ip:
-                self._record_rps('ip', ip)
-            if user_id:
-                self._record_rps('user', user_id)
-            if tool:
-                self._record_rps('tool', tool)
-            
-            self._last_update = datetime.now()
+        
+        # RPS по сущностям не считается на горячем пути: окна шардов
+        # сливаются при чтении (get_recent_metrics, экспорт)
+        
+        self._last_update = datetime.now()
     
     def _record_counter(self, name: str, labels: Dict[str, str], value: float):
-        """Запись счетчика"""
+        """Запись события счетчика в ленту"""
         metric = RateLimitMetric(
             timestamp=datetime.now(),
             metric_name=name,
@@ -206,12 +231,9 @@ class RateLimitMetrics:
             labels=labels.copy()
         )
         self._metrics.append(metric)
-        
-        # Обновление счетчика
-        counter_key = f"{name}:{json.dumps(labels, sort_keys=True)}"
-        self._counters[counter_key] += value
     
-    def _record_gauge(self, name: str, labels: Dict[str, str], value: float):
+    def _record_gauge(self, name: str, labels: Dict[str, str], value: float,
+                      keep_last: bool = True):
         """Запись показателя"""
         metric = RateLimitMetric(
             timestamp=datetime.now(),
@@ -222,11 +244,13 @@ class RateLimitMetrics:
         )
         self._metrics.append(metric)
         
-        gauge_key = f"{name}:{json.dumps(labels, sort_keys=True)}"
-        self._gauges[gauge_key] = value
+        # Последнее значение храним только для gauge с ограниченным набором меток
+        if keep_last:
+            gauge_key = f"{name}:{json.dumps(labels, sort_keys=True)}"
+            self._gauges[gauge_key] = value
     
     def _record_histogram(self, name: str, value: float, labels: Dict[str, str]):
-        """Запись гистограммы"""
+        """Запись события гистограммы в ленту"""
         metric = RateLimitMetric(
             timestamp=datetime.now(),
             metric_name=name,
@@ -235,35 +259,6 @@ class RateLimitMetrics:
             labels=labels.copy()
         )
         self._metrics.append(metric)
-        
-        hist_key = f"{name}:{json.dumps(labels, sort_keys=True)}"
-        self._histograms[hist_key].append(value)
-        
-        # Ограничение размера гистограммы
-        if len(self._histograms[hist_key]) > 1000:
-            self._histograms[hist_key] = self._histograms[hist_key][-500:]
-    
-    def _record_rps(self, entity_type: str, entity_id: str):
-        """Запись RPS метрики"""
-        timestamp = datetime.now()
-        
-        # Добавляем метку времени в окно RPS
-        rps_key = f"{entity_type}:{entity_id}"
-        self._rps_windows[rps_key].append(timestamp)
-        
-        # Рассчитываем RPS за последнюю минуту
-        now = timestamp
-        one_minute_ago = now - timedelta(minutes=1)
-        
-        # Удаляем старые записи
-        while (self._rps_windows[rps_key] and 
-               self._rps_windows[rps_key][0] < one_minute_ago):
-            self._rps_windows[rps_key].popleft()
-        
-        # Записываем RPS как gauge метрику
-        rps_value = len(self._rps_windows[rps_key])
-        labels = {entity_type: entity_id}
-        self._record_gauge('rate_limit_requests_per_second', labels, rps_value)
     
     def register_active_limit(self, limit_id: str, limit_data: Dict[str, Any]):
         """Регистрация активного ограничения"""
@@ -290,27 +285,57 @@ class RateLimitMetrics:
             if limit_id in self._active_limits:
                 self._active_limits[limit_id]['last_access'] = datetime.now()
     
+    def collect(self):
+        """Слияние шардов потоков в единый снимок (для сводки и экспорта)"""
+        return self._recorder.collect()
+    
     def get_metrics_summary(self) -> Dict[str, Any]:
         """Получение сводки метрик"""
+        snapshot = self.collect()
         with self._lock:
             return {
-                'total_requests': sum(v for k, v in self._counters.items() 
-                                    if k.startswith('rate_limit_requests_total:')),
-                'total_blocked': sum(v for k, v in self._counters.items() 
-                                   if k.startswith('rate_limit_blocked_total:')),
+                'total_requests': snapshot.counter_total('rate_limit_requests_total'),
+                'total_blocked': snapshot.counter_total('rate_limit_blocked_total'),
                 'active_limits': len(self._active_limits),
-                'unique_ips': len([k for k in self._rps_windows.keys() if k.startswith('ip:')]),
-                'unique_users': len([k for k in self._rps_windows.keys() if k.startswith('user:')]),
-                'unique_tools': len([k for k in self._rps_windows.keys() if k.startswith('tool:')]),
+                'unique_ips': snapshot.unique('ip'),
+                'unique_users': snapshot.unique('user'),
+                'unique_tools': snapshot.unique('tool'),
                 'last_update': self._last_update.isoformat(),
                 'health_status': self._health_status
             }
     
+    def get_top_entities(self, entity_type: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Самые активные IP ('ip'), пользователи ('user') или tools ('tool')"""
+        return [
+            {'id': key, 'requests': count, 'max_error': error}
+            for key, count, error in self.collect().top(entity_type, limit)
+        ]
+    
     def get_recent_metrics(self, minutes: int = 5) -> List[RateLimitMetric]:
         """Получение недавних метрик"""
-        with self._lock:
-            cutoff = datetime.now() - timedelta(minutes=minutes)
-            return [m for m in self._metrics if m.timestamp >= cutoff]
+        cutoff = datetime.now() - timedelta(minutes=minutes)
+        # Копия ленты: запись в нее идет без блокировки
+        recent = [m for m in list(self._metrics) if m.timestamp >= cutoff]
+        if self.record_events:
+            recent.extend(self._rps_gauges())
+        return recent
+    
+    def _rps_gauges(self) -> List[RateLimitMetric]:
+        """Число запросов за последнюю минуту по самым активным сущностям (по слитым шардам)"""
+        now = time.time()
+        snapshot = self.collect()
+        timestamp = datetime.fromtimestamp(now)
+        return [
+            RateLimitMetric(
+                timestamp=timestamp,
+                metric_name='rate_limit_requests_per_second',
+                metric_type=MetricType.GAUGE,
+                value=count,
+                labels={entity_type: key}
+            )
+            for entity_type in ('ip', 'user', 'tool')
+            for key, count in snapshot.window_top(entity_type, now, self.top_k)
+        ]
     
     def set_health_status(self, status: str):
         """Установка статуса здоровья системы"""
@@ -349,25 +374,50 @@ class PrometheusExporter:
                 "# TYPE rate_limit_requests_per_second gauge",
                 "# TYPE rate_limit_active_limits gauge",
                 "# TYPE rate_limit_response_time_seconds histogram",
-                "# TYPE rate_limit_blocked_current gauge",
+                "# TYPE rate_limit_top_requests_total counter",
                 "# TYPE rate_limit_health_status gauge",
                 ""
             ])
             
-            # Получаем метрики и экспортируем их
-            metrics = self.metrics_collector.get_recent_metrics(minutes=10)
-            
-            for metric in metrics:
-                try:
-                    output.append(metric.to_prometheus())
-                except Exception as e:
-                    logger.warning(f"Error exporting metric {metric.metric_name}: {e}")
+            # События ленты (с метками ip/user_id) не экспортируются: число
+            # серий росло бы с числом клиентов. Только агрегаты из слитых шардов
+            output.extend(self._generate_sketch_metrics())
             
             # Добавляем summary метрики
             output.extend(self._generate_summary_metrics())
             
             return "\n".join(output)
     
+    def _generate_sketch_metrics(self) -> List[str]:
+        """Генерация гистограмм и top-K метрик"""
+        output = []
+        snapshot = self.metrics_collector.collect()
+        now = time.time()
+        
+        # Метка tool ограничена max_label_values (bounded_label)
+        for (name, tool), value in sorted(snapshot.counters.items()):
+            label = f'{{tool="{_escape_label_value(tool)}"}}' if tool else ''
+            output.append(f'{name}{label} {value}')
+        
+        for tool, hist in sorted(snapshot.histograms.items()):
+            label = f'tool="{_escape_label_value(tool)}",' if tool else ''
+            for le, count in hist.cumulative():
+                output.append(f'rate_limit_response_time_seconds_bucket{{{label}le="{le}"}} {count}')
+            output.append(f'rate_limit_response_time_seconds_sum{{{label.rstrip(",")}}} {hist.sum}')
+            output.append(f'rate_limit_response_time_seconds_count{{{label.rstrip(",")}}} {hist.count}')
+        
+        for entity_type in ('ip', 'user', 'tool'):
+            for key, count, _error in snapshot.top(entity_type, self.metrics_collector.top_k):
+                output.append(
+                    f'rate_limit_top_requests_total{{{entity_type}="{_escape_label_value(key)}"}} {count}'
+                )
+            for key, count in snapshot.window_top(entity_type, now, self.metrics_collector.top_k):
+                output.append(
+                    f'rate_limit_requests_per_second{{{entity_type}="{_escape_label_value(key)}"}} {count}'
+                )
+        
+        return output
+    
     def _generate_summary_metrics(self) -> List[str]:
         """Генерация summary метрик"""
         output = []
@@ -382,7 +432,9 @@ class PrometheusExporter:
             f"rate_limit_summary_active_limits {summary['active_limits']}",
             f"rate_limit_summary_unique_ips {summary['unique_ips']}",
             f"rate_limit_summary_unique_users {summary['unique_users']}",
-            f"rate_limit_summary_unique_tools {summary['unique_tools']}"
+            f"rate_limit_summary_unique_tools {summary['unique_tools']}",
+            f"rate_limit_active_limits {summary['active_limits']}",
+            f"rate_limit_health_status {1 if summary['health_status'] == 'healthy' else 0}"
         ]
         
         output.extend(summary_metrics)
@@ -583,6 +635,12 @@ class AlertManager:
             return max_rps
         
         elif metric_name == "rate_limit_response_time_seconds":
+            if not self.metrics_collector.record_events:
+                # Без ленты событий - среднее по гистограммам
+                histograms = self.metrics_collector.collect().histograms.values()
+                total = sum(h.count for h in histograms)
+                return sum(h.sum for h in histograms) / total if total else 0.0
+            
             # Ищем среднее время отклика
             response_times = []
             metrics = self.metrics_collector.get_recent_metrics(minutes=1)
@@ -0,0 +1,452 @@
+"""
+Компактные структуры данных для метрик Rate Limiting
+
+Модуль обеспечивает:
+- Гистограмму с фиксированными корзинами (совместима с Prometheus histogram)
+- Поиск самых активных ключей (Space-Saving, top-K) за O(1) на запрос
+- Оценку числа уникальных ключей (HyperLogLog)
+- Шардированный по потокам регистратор, сливаемый только при экспорте
+
+Все структуры имеют ограниченный размер независимо от числа клиентов
+и поддерживают слияние (merge), поэтому каждый поток пишет в свой шард
+без блокировок, а сбор происходит при скрейпе Prometheus.
+"""
+
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+# Стандартные корзины Prometheus для времени отклика (секунды)
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# Значение метки, в которую сворачиваются значения сверх лимита кардинальности
+OVERFLOW_LABEL = "__other__"
+
+
+class FixedBucketHistogram:
+    """Гистограмма с фиксированными границами корзин"""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.bounds: Tuple[float, ...] = tuple(sorted(bounds))
+        # Последняя корзина - +Inf
+        self.counts: List[int] = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """Учет одного наблюдения"""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other: "FixedBucketHistogram"):
+        """Слияние с гистограммой с теми же границами"""
+        if other.bounds != self.bounds:
+            raise ValueError("Cannot merge histograms with different buckets")
+        counts = list(other.counts)
+        for i, value in enumerate(counts):
+            self.counts[i] += value
+        self.sum += other.sum
+        self.count += other.count
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """Кумулятивные корзины в формате Prometheus (le, count)"""
+        result = []
+        running = 0
+        for bound, value in zip(self.bounds, self.counts):
+            running += value
+            result.append((repr(float(bound)), running))
+        result.append(("+Inf", running + self.counts[-1]))
+        return result
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля линейной интерполяцией внутри корзины"""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        running = 0
+        lower = 0.0
+        for i, value in enumerate(self.counts):
+            if running + value >= rank and value > 0:
+                if i >= len(self.bounds):
+                    return self.bounds[-1] if self.bounds else 0.0
+                upper = self.bounds[i]
+                return lower + (upper - lower) * (rank - running) / value
+            running += value
+            if i < len(self.bounds):
+                lower = self.bounds[i]
+        return self.bounds[-1] if self.bounds else 0.0
+
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+
+class SpaceSavingTopK:
+    """
+    Top-K самых частых ключей (алгоритм Space-Saving, Metwally et al.)
+
+    Хранит не более `capacity` ключей. Для каждого ключа оценка сверху
+    `count` и максимальная погрешность `error`. Единичный инкремент - O(1)
+    благодаря корзинам ключей по значению счетчика (stream-summary).
+    """
+
+    __slots__ = ("capacity", "_counts", "_errors", "_buckets", "_min")
+
+    def __init__(self, capacity: int = 100):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._counts: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        self._buckets: Dict[int, Set[str]] = {}
+        self._min = 0
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._counts
+
+    def add(self, key: str, weight: int = 1):
+        """Учет `weight` появлений ключа"""
+        if weight <= 0:
+            return
+
+        old = self._counts.get(key)
+        if old is None:
+            if len(self._counts) < self.capacity:
+                base = 0
+            else:
+                # Вытесняем ключ с минимальным счетчиком, наследуя его значение
+                base = self._min
+                bucket = self._buckets[base]
+                victim = bucket.pop()
+                if not bucket:
+                    del self._buckets[base]
+                del self._counts[victim]
+                del self._errors[victim]
+            self._errors[key] = base
+        else:
+            base = old
+            bucket = self._buckets[old]
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[old]
+
+        new = base + weight
+        self._counts[key] = new
+        self._buckets.setdefault(new, set()).add(key)
+
+        if len(self._counts) == 1 or new < self._min:
+            self._min = new
+        elif base == self._min and base not in self._buckets:
+            # Минимальная корзина опустела: при единичном шаге следующий минимум - new
+            self._min = new if weight == 1 else min(self._buckets)
+
+    def count(self, key: str) -> int:
+        """Оценка частоты ключа (0, если ключ не отслеживается)"""
+        return self._counts.get(key, 0)
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[str, int, int]]:
+        """Самые частые ключи: (ключ, оценка, погрешность)"""
+        items = sorted(self._counts.copy().items(), key=lambda kv: kv[1], reverse=True)
+        if n is not None:
+            items = items[:n]
+        errors = self._errors.copy()
+        return [(key, value, errors.get(key, 0)) for key, value in items]
+
+    def merge(self, other: "SpaceSavingTopK"):
+        """Слияние с другим экземпляром (оценки остаются верхними границами)"""
+        for key, value, _error in other.top():
+            self.add(key, value)
+
+
+class HyperLogLog:
+    """Оценка числа уникальных ключей с фиксированной памятью 2^p байт"""
+
+    __slots__ = ("p", "m", "registers", "_alpha")
+
+    def __init__(self, p: int = 12):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+        if self.m >= 128:
+            self._alpha = 0.7213 / (1 + 1.079 / self.m)
+        else:
+            self._alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(self.m, 0.7213)
+
+    def add(self, key: str):
+        x = hash(key) & 0xFFFFFFFFFFFFFFFF
+        index = x >> (64 - self.p)
+        rest = (x << self.p) & 0xFFFFFFFFFFFFFFFF
+        rank = 64 - rest.bit_length() + 1 if rest else (64 - self.p) + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        if other.p != self.p:
+            raise ValueError("Cannot merge HyperLogLog with different precision")
+        registers = bytes(other.registers)
+        for i, value in enumerate(registers):
+            if value > self.registers[i]:
+                self.registers[i] = value
+
+    def cardinality(self) -> int:
+        registers = self.registers
+        estimate = self._alpha * self.m * self.m / sum(2.0 ** -r for r in registers)
+        zeros = registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            # Linear counting для малых кардинальностей
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+
+class _SlidingTopK:
+    """Top-K за скользящее окно из двух соседних интервалов"""
+
+    __slots__ = ("window", "capacity", "_epoch", "current", "previous")
+
+    def __init__(self, capacity: int, window: float = 60.0):
+        self.window = window
+        self.capacity = capacity
+        self._epoch = 0
+        self.current = SpaceSavingTopK(capacity)
+        self.previous = SpaceSavingTopK(capacity)
+
+    def _rotate(self, now: float):
+        epoch = int(now // self.window)
+        if epoch != self._epoch:
+            self.previous = self.current if epoch == self._epoch + 1 else SpaceSavingTopK(self.capacity)
+            self.current = SpaceSavingTopK(self.capacity)
+            self._epoch = epoch
+
+    def add(self, key: str, now: float):
+        self._rotate(now)
+        self.current.add(key)
+
+    def estimate(self, key: str, now: float) -> float:
+        """Оценка числа запросов ключа за последнее окно"""
+        epoch = int(now // self.window)
+        if epoch == self._epoch:
+            elapsed = (now % self.window) / self.window
+            return self.current.count(key) + self.previous.count(key) * (1.0 - elapsed)
+        if epoch == self._epoch + 1:
+            elapsed = (now % self.window) / self.window
+            return self.current.count(key) * (1.0 - elapsed)
+        return 0.0
+
+    def estimates(self, now: float, n: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Оценки за последнее окно для отслеживаемых ключей, по убыванию"""
+        current, previous = self.current, self.previous
+        keys = {key for key, _count, _error in current.top()}
+        keys.update(key for key, _count, _error in previous.top())
+        items = [(key, self.estimate(key, now)) for key in keys]
+        items = sorted((item for item in items if item[1] > 0), key=lambda kv: kv[1], reverse=True)
+        return items[:n] if n is not None else items
+
+    def merge(self, other: "_SlidingTopK"):
+        """Слияние окна другого шарда с выравниванием интервалов"""
+        epoch, current, previous = other._epoch, other.current, other.previous
+        if epoch > self._epoch:
+            self._rotate(epoch * self.window)
+        if epoch == self._epoch:
+            self.current.merge(current)
+            self.previous.merge(previous)
+        elif epoch == self._epoch - 1:
+            self.previous.merge(current)
+
+
+class MetricsShard:
+    """Метрики одного потока. Пишет только поток-владелец."""
+
+    def __init__(self, owner: Optional[threading.Thread], top_k: int,
+                 window: float, buckets: Sequence[float], hll_precision: int):
+        self.owner = owner
+        self.top_k = top_k
+        self.window = window
+        self.buckets = tuple(buckets)
+        self.hll_precision = hll_precision
+        self.counters: Dict[Tuple[str, str], float] = {}
+        self.histograms: Dict[str, FixedBucketHistogram] = {}
+        self.heavy_hitters: Dict[str, SpaceSavingTopK] = {}
+        self.windows: Dict[str, _SlidingTopK] = {}
+        self.cardinality: Dict[str, HyperLogLog] = {}
+
+    def is_alive(self) -> bool:
+        return self.owner is None or self.owner.is_alive()
+
+    def inc(self, name: str, label: str = "", value: float = 1.0):
+        key = (name, label)
+        self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def observe(self, label: str, value: float):
+        hist = self.histograms.get(label)
+        if hist is None:
+            hist = self.histograms[label] = FixedBucketHistogram(self.buckets)
+        hist.observe(value)
+
+    def hit(self, entity_type: str, key: str, now: float):
+        top = self.heavy_hitters.get(entity_type)
+        if top is None:
+            top = self.heavy_hitters[entity_type] = SpaceSavingTopK(self.top_k)
+            self.windows[entity_type] = _SlidingTopK(self.top_k, self.window)
+            self.cardinality[entity_type] = HyperLogLog(self.hll_precision)
+        top.add(key)
+        self.windows[entity_type].add(key, now)
+        self.cardinality[entity_type].add(key)
+
+    def merge_into(self, snapshot: "MetricsSnapshot"):
+        for key, value in self.counters.copy().items():
+            snapshot.counters[key] = snapshot.counters.get(key, 0.0) + value
+        for label, hist in self.histograms.copy().items():
+            target = snapshot.histograms.get(label)
+            if target is None:
+                target = snapshot.histograms[label] = FixedBucketHistogram(hist.bounds)
+            target.merge(hist)
+        for entity_type, top in self.heavy_hitters.copy().items():
+            target = snapshot.heavy_hitters.get(entity_type)
+            if target is None:
+                target = snapshot.heavy_hitters[entity_type] = SpaceSavingTopK(self.top_k)
+            target.merge(top)
+        for entity_type, window in self.windows.copy().items():
+            target = snapshot.windows.get(entity_type)
+            if target is None:
+                target = snapshot.windows[entity_type] = _SlidingTopK(self.top_k, self.window)
+            target.merge(window)
+        for entity_type, hll in self.cardinality.copy().items():
+            target = snapshot.cardinality.get(entity_type)
+            if target is None:
+                target = snapshot.cardinality[entity_type] = HyperLogLog(hll.p)
+            target.merge(hll)
+
+
+class MetricsSnapshot:
+    """Слитое состояние всех шардов на момент скрейпа"""
+
+    def __init__(self):
+        self.counters: Dict[Tuple[str, str], float] = {}
+        self.histograms: Dict[str, FixedBucketHistogram] = {}
+        self.heavy_hitters: Dict[str, SpaceSavingTopK] = {}
+        self.windows: Dict[str, _SlidingTopK] = {}
+        self.cardinality: Dict[str, HyperLogLog] = {}
+
+    def counter_total(self, name: str) -> float:
+        return sum(v for (n, _label), v in self.counters.items() if n == name)
+
+    def unique(self, entity_type: str) -> int:
+        hll = self.cardinality.get(entity_type)
+        return hll.cardinality() if hll is not None else 0
+
+    def top(self, entity_type: str, n: Optional[int] = None) -> List[Tuple[str, int, int]]:
+        top = self.heavy_hitters.get(entity_type)
+        return top.top(n) if top is not None else []
+
+    def window_top(self, entity_type: str, now: Optional[float] = None,
+                   n: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Самые активные ключи за последнее окно: (ключ, число запросов)"""
+        window = self.windows.get(entity_type)
+        if window is None:
+            return []
+        return window.estimates(time.time() if now is None else now, n)
+
+
+class ShardedMetricsRecorder:
+    """
+    Регистратор метрик с шардом на поток
+
+    Запись идет в thread-local шард без общей блокировки; блокировка берется
+    только при создании шарда и при сборе. Шарды завершившихся потоков
+    сворачиваются в общий "retired" шард, чтобы их число не росло.
+    """
+
+    def __init__(self, top_k: int = 100, window: float = 60.0,
+                 buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+                 hll_precision: int = 12, max_label_values: int = 200):
+        self.top_k = top_k
+        self.window = window
+        self.buckets = tuple(buckets)
+        self.hll_precision = hll_precision
+        self.max_label_values = max_label_values
+        self._local = threading.local()
+        self._registry_lock = threading.Lock()
+        self._shards: List[MetricsShard] = []
+        self._retired = MetricsSnapshot()
+        self._labels: Set[str] = set()
+
+    def _new_shard(self, owner: Optional[threading.Thread]) -> MetricsShard:
+        return MetricsShard(owner, self.top_k, self.window, self.buckets, self.hll_precision)
+
+    def shard(self) -> MetricsShard:
+        """Шард текущего потока"""
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._new_shard(threading.current_thread())
+            with self._registry_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def bounded_label(self, value: str) -> str:
+        """Ограничение кардинальности метки: лишние значения -> OVERFLOW_LABEL"""
+        if value in self._labels:
+            return value
+        with self._registry_lock:
+            if len(self._labels) < self.max_label_values:
+                self._labels.add(value)
+                return value
+        return OVERFLOW_LABEL
+
+    def collect(self) -> MetricsSnapshot:
+        """Слияние всех шардов (вызывается при скрейпе)"""
+        with self._registry_lock:
+            live = [shard for shard in self._shards if shard.is_alive()]
+            dead = [shard for shard in self._shards if not shard.is_alive()]
+            self._shards = live
+            for shard in dead:
+                shard.merge_into(self._retired)
+
+            snapshot = MetricsSnapshot()
+            _merge_snapshot(snapshot, self._retired)
+
+        for shard in live:
+            shard.merge_into(snapshot)
+        return snapshot
+
+    def reset(self):
+        """Сброс всех шардов (для тестов и перезапуска)"""
+        with self._registry_lock:
+            self._shards = []
+            self._retired = MetricsSnapshot()
+            self._labels = set()
+        self._local = threading.local()
+
+
+def _merge_snapshot(target: MetricsSnapshot, source: MetricsSnapshot):
+    for key, value in source.counters.items():
+        target.counters[key] = target.counters.get(key, 0.0) + value
+    for label, hist in source.histograms.items():
+        merged = target.histograms.get(label)
+        if merged is None:
+            merged = target.histograms[label] = FixedBucketHistogram(hist.bounds)
+        merged.merge(hist)
+    for entity_type, top in source.heavy_hitters.items():
+        merged = target.heavy_hitters.get(entity_type)
+        if merged is None:
+            merged = target.heavy_hitters[entity_type] = SpaceSavingTopK(top.capacity)
+        merged.merge(top)
+    for entity_type, window in source.windows.items():
+        merged = target.windows.get(entity_type)
+        if merged is None:
+            merged = target.windows[entity_type] = _SlidingTopK(window.capacity, window.window)
+        merged.merge(window)
+    for entity_type, hll in source.cardinality.items():
+        merged = target.cardinality.get(entity_type)
+        if merged is None:
+            merged = target.cardinality[entity_type] = HyperLogLog(hll.p)
+        merged.merge(hll)
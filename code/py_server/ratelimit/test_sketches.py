@@ -0,0 +1,201 @@
+"""
+Тесты компактных структур метрик Rate Limiting
+
+Проверка гистограмм, top-K, HyperLogLog и шардирования по потокам
+"""
+
+import threading
+import unittest
+
+from ratelimit.metrics import PrometheusExporter, RateLimitMetrics
+from ratelimit.sketches import (OVERFLOW_LABEL, FixedBucketHistogram,
+                                HyperLogLog, ShardedMetricsRecorder,
+                                SpaceSavingTopK)
+
+
+class TestFixedBucketHistogram(unittest.TestCase):
+    """Тесты гистограммы с фиксированными корзинами"""
+    
+    def test_cumulative_buckets(self):
+        hist = FixedBucketHistogram(bounds=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 5.0):
+            hist.observe(value)
+        
+        self.assertEqual(hist.cumulative(), [("0.1", 1), ("1.0", 3), ("+Inf", 4)])
+        self.assertEqual(hist.count, 4)
+        self.assertAlmostEqual(hist.sum, 6.25)
+    
+    def test_merge_and_quantile(self):
+        left = FixedBucketHistogram(bounds=(1.0, 2.0, 3.0))
+        right = FixedBucketHistogram(bounds=(1.0, 2.0, 3.0))
+        for _ in range(50):
+            left.observe(0.5)
+            right.observe(2.5)
+        
+        left.merge(right)
+        self.assertEqual(left.count, 100)
+        self.assertLessEqual(left.quantile(0.25), 1.0)
+        self.assertGreater(left.quantile(0.95), 2.0)
+
+
+class TestSpaceSavingTopK(unittest.TestCase):
+    """Тесты top-K (Space-Saving)"""
+    
+    def test_bounded_size_keeps_heavy_hitters(self):
+        top = SpaceSavingTopK(capacity=10)
+        for i in range(10000):
+            top.add(f"noise-{i}")
+            if i % 10 == 0:
+                top.add("heavy")
+        
+        self.assertEqual(len(top), 10)
+        key, count, error = top.top(1)[0]
+        self.assertEqual(key, "heavy")
+        self.assertGreaterEqual(count, 1000)
+        self.assertLessEqual(count - error, 1000)
+    
+    def test_exact_when_under_capacity(self):
+        top = SpaceSavingTopK(capacity=5)
+        for key, times in (("a", 3), ("b", 1), ("c", 2)):
+            for _ in range(times):
+                top.add(key)
+        
+        self.assertEqual([(k, c) for k, c, _ in top.top()], [("a", 3), ("c", 2), ("b", 1)])
+
+
+class TestHyperLogLog(unittest.TestCase):
+    """Тесты оценки кардинальности"""
+    
+    def test_cardinality_estimate(self):
+        hll = HyperLogLog()
+        for i in range(20000):
+            hll.add(f"10.0.{i // 256}.{i % 256}")
+        
+        self.assertAlmostEqual(hll.cardinality(), 20000, delta=20000 * 0.05)
+    
+    def test_small_cardinality(self):
+        hll = HyperLogLog()
+        for _ in range(100):
+            hll.add("192.168.1.100")
+        
+        self.assertEqual(hll.cardinality(), 1)
+
+
+class TestShardedMetricsRecorder(unittest.TestCase):
+    """Тесты шардирования метрик по потокам"""
+    
+    def test_threads_merge_on_collect(self):
+        recorder = ShardedMetricsRecorder()
+        
+        def worker():
+            shard = recorder.shard()
+            for _ in range(1000):
+                shard.inc('requests')
+                shard.hit('ip', '10.0.0.1', 0.0)
+        
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        snapshot = recorder.collect()
+        self.assertEqual(snapshot.counter_total('requests'), 4000)
+        self.assertEqual(snapshot.top('ip', 1)[0][:2], ('10.0.0.1', 4000))
+        # Шарды завершившихся потоков свернуты в общий
+        self.assertEqual(recorder.collect().counter_total('requests'), 4000)
+    
+    def test_sliding_windows_merge_on_collect(self):
+        recorder = ShardedMetricsRecorder(window=60.0)
+        
+        def worker(now):
+            shard = recorder.shard()
+            for _ in range(10):
+                shard.hit('ip', '10.0.0.1', now)
+        
+        # Шарды с разными текущими интервалами окна
+        threads = [threading.Thread(target=worker, args=(now,)) for now in (90.0, 125.0, 130.0)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        # Предыдущий интервал учитывается с весом оставшейся доли окна
+        self.assertEqual(recorder.collect().window_top('ip', now=150.0), [('10.0.0.1', 25.0)])
+    
+    def test_label_cardinality_limit(self):
+        recorder = ShardedMetricsRecorder(max_label_values=2)
+        labels = [recorder.bounded_label(f"tool-{i}") for i in range(4)]
+        self.assertEqual(labels, ["tool-0", "tool-1", OVERFLOW_LABEL, OVERFLOW_LABEL])
+
+
+class TestBoundedRateLimitMetrics(unittest.TestCase):
+    """Тесты RateLimitMetrics с ограниченной памятью"""
+    
+    def test_many_ips_bounded_memory(self):
+        metrics = RateLimitMetrics(max_history_size=100, top_k=20, record_events=False)
+        for i in range(5000):
+            metrics.record_request(ip=f"10.1.{i // 256}.{i % 256}", tool="search", response_time=0.01)
+        
+        summary = metrics.get_metrics_summary()
+        self.assertEqual(summary['total_requests'], 5000)
+        self.assertAlmostEqual(summary['unique_ips'], 5000, delta=250)
+        self.assertLessEqual(len(metrics.get_top_entities('ip', limit=100)), 20)
+        self.assertEqual(len(metrics.get_recent_metrics()), 0)
+    
+    def test_prometheus_histogram_export(self):
+        metrics = RateLimitMetrics()
+        metrics.record_request(ip="192.168.1.100", tool="test", response_time=0.2)
+        
+        text = PrometheusExporter(metrics).generate_prometheus_metrics()
+        self.assertIn('rate_limit_response_time_seconds_bucket{tool="test",le="+Inf"} 1', text)
+        self.assertIn('rate_limit_top_requests_total{ip="192.168.1.100"} 1', text)
+
+    def test_prometheus_export_bounded_with_event_feed(self):
+        metrics = RateLimitMetrics(top_k=20)
+        for i in range(1000):
+            metrics.record_request(ip=f"10.2.{i // 256}.{i % 256}", user_id=f"u{i}", tool="search")
+
+        text = PrometheusExporter(metrics).generate_prometheus_metrics()
+        self.assertIn('rate_limit_requests_total{tool="search"} 1000', text)
+        self.assertNotIn('user_id=', text)
+        self.assertLessEqual(text.count('ip="'), 2 * 20)
+
+
+    def test_record_request_skips_registry_lock(self):
+        metrics = RateLimitMetrics()
+        metrics.record_request(ip="10.0.0.1", user_id="u1", tool="search")
+        
+        class FailingLock:
+            def __enter__(self):
+                raise AssertionError("registry lock taken on the hot path")
+            
+            def __exit__(self, *exc):
+                return False
+        
+        lock = metrics._recorder._registry_lock
+        metrics._recorder._registry_lock = FailingLock()
+        for _ in range(10):
+            metrics.record_request(ip="10.0.0.1", user_id="u1", tool="search")
+        metrics._recorder._registry_lock = lock
+        
+        rps = {
+            tuple(m.labels.items()): m.value
+            for m in metrics.get_recent_metrics(minutes=1)
+            if m.metric_name == 'rate_limit_requests_per_second'
+        }
+        self.assertEqual(rps[(('ip', '10.0.0.1'),)], 11)
+        self.assertEqual(rps[(('user', 'u1'),)], 11)
+    
+    def test_prometheus_label_values_escaped(self):
+        metrics = RateLimitMetrics()
+        metrics.record_request(ip='10.0.0.1"\nfake_metric 1', tool='a\\b')
+        
+        text = PrometheusExporter(metrics).generate_prometheus_metrics()
+        self.assertIn('rate_limit_top_requests_total{ip="10.0.0.1\\"\\nfake_metric 1"} 1', text)
+        self.assertIn('tool="a\\\\b"', text)
+        self.assertNotIn('\nfake_metric', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
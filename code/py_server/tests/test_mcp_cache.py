@@ -215,6 +215,7 @@ class TestPersistentCache(unittest.TestCase):
     def tearDown(self):
         """Очистка после тестов"""
         import shutil
+        self.persistent_cache.close()
         if os.path.exists(self.temp_dir):
             shutil.rmtree(self.temp_dir)
     
@@ -254,6 +255,50 @@ class TestPersistentCache(unittest.TestCase):
         # Проверяем, что запись удалена
         loaded_entry = self.persistent_cache.load("test_key")
         self.assertIsNone(loaded_entry)
+    
+    def test_single_file_storage(self):
+        """Тест хранения всех записей в одном файле"""
+        for i in range(10):
+            entry = CacheEntry(data={"i": i}, timestamp=time.time(), ttl=60.0)
+            self.persistent_cache.store(f"key_{i}", entry)
+        
+        self.assertEqual(sorted(os.listdir(self.temp_dir))[0], "cache.db")
+        self.assertFalse(any(name.endswith(".cache") for name in os.listdir(self.temp_dir)))
+        self.assertEqual(self.persistent_cache.entry_count(), 10)
+    
+    def test_cost_aware_eviction(self):
+        """Тест вытеснения с учётом стоимости пересчёта и частоты"""
+        payload = "x" * 200 * 1024  # ~200KB, лимит 1MB
+        
+        expensive = CacheEntry(data=payload, timestamp=time.time(), ttl=60.0,
+                               compute_cost=5.0)
+        self.persistent_cache.store("expensive", expensive)
+        
+        frequent = CacheEntry(data=payload, timestamp=time.time(), ttl=60.0)
+        self.persistent_cache.store("frequent", frequent)
+        for _ in range(50):
+            self.persistent_cache.record_access("frequent")
+        
+        for i in range(6):
+            cheap = CacheEntry(data=payload, timestamp=time.time(), ttl=60.0)
+            self.persistent_cache.store(f"cheap_{i}", cheap)
+        
+        self.assertIn("expensive", self.persistent_cache)
+        self.assertIn("frequent", self.persistent_cache)
+        self.assertLessEqual(self.persistent_cache._get_total_size(),
+                             self.persistent_cache.max_size_bytes)
+    
+    def test_index_survives_reopen(self):
+        """Тест восстановления индекса и счётчиков после перезапуска"""
+        entry = CacheEntry(data={"test": "data"}, timestamp=time.time(), ttl=60.0)
+        self.persistent_cache.store("test_key", entry)
+        self.persistent_cache.record_access("test_key")
+        self.persistent_cache.close()
+        
+        self.persistent_cache = PersistentCache(self.temp_dir, max_size_mb=1)
+        self.assertIn("test_key", self.persistent_cache)
+        self.assertEqual(self.persistent_cache._index["test_key"].access_count, 1)
+        self.assertEqual(self.persistent_cache.load("test_key").data, {"test": "data"})
 
 
 class TestMCPToolsCache(unittest.TestCase):
@@ -336,6 +381,53 @@ class TestMCPToolsCache(unittest.TestCase):
         self.assertEqual(metrics.hit_ratio, 0.5)
 
 
+class TestWarmRestart(unittest.TestCase):
+    """Тесты тёплого старта MCPToolsCache из persistent cache"""
+    
+    def setUp(self):
+        """Настройка тестов с временной директорией"""
+        self.temp_dir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        """Очистка после тестов"""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_warm_restart_loads_only_hot_entries(self):
+        """Тест: после перезапуска в памяти только горячие записи"""
+        cache = MCPToolsCache(max_size_mb=1, persistent_cache_dir=self.temp_dir)
+        for i in range(20):
+            cache.set(f"metadata:item_{i}", "x" * 20 * 1024, data_type='metadata')
+        for _ in range(10):
+            cache.get("metadata:item_3")
+            cache.get("metadata:item_7")
+        cache.close()
+        
+        # Бюджет прогрева - около четырёх записей
+        restarted = MCPToolsCache(max_size_mb=1, persistent_cache_dir=self.temp_dir,
+                                  warm_start_ratio=0.08)
+        self.assertIn("metadata:item_3", restarted._cache)
+        self.assertIn("metadata:item_7", restarted._cache)
+        self.assertLess(restarted.size(), 20)
+        
+        # Холодные записи поднимаются с диска по запросу
+        cold_key = next(f"metadata:item_{i}" for i in range(20)
+                        if f"metadata:item_{i}" not in restarted._cache)
+        self.assertIsNotNone(restarted.get(cold_key))
+        restarted.close()
+    
+    def test_memory_eviction_keeps_disk_copy(self):
+        """Тест: вытеснение из памяти не удаляет запись с диска"""
+        cache = MCPToolsCache(max_size_mb=1, persistent_cache_dir=self.temp_dir,
+                              strategy=LRUStrategy(), persistent_max_size_mb=4)
+        for i in range(15):
+            cache.set(f"metadata:big_{i}", "x" * 100 * 1024, data_type='metadata')
+        
+        self.assertLess(cache.size(), 15)
+        self.assertIsNotNone(cache.get("metadata:big_0"))
+        cache.close()
+
+
 class TestAsyncOperations(unittest.TestCase):
     """Тесты асинхронных операций"""
     
@@ -0,0 +1,285 @@
+"""
+Execution Policy для AI стратегий
+---------------------------------
+
+Политика выполнения нескольких стратегий в рамках одного запроса:
+бюджет времени на запрос, ожидание первых N успешных ответов с отменой
+остальных, хеджирование запроса на резервный провайдер после задержки,
+рассчитанной по p95 задержек провайдера, и частичный результат при
+исчерпании бюджета.
+
+Задержки каждой стратегии копятся в гистограммах с фиксированными
+корзинами и используются для расчета задержки хеджирования.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyHistogram:
+    """
+    Гистограмма задержек с логарифмическими корзинами.
+
+    Память фиксирована. При накоплении max_samples наблюдений счетчики
+    делятся пополам, поэтому квантили следуют за недавним поведением
+    провайдера.
+    """
+
+    def __init__(
+        self,
+        min_seconds: float = 0.001,
+        max_seconds: float = 300.0,
+        buckets_per_decade: int = 20,
+        max_samples: int = 10000,
+    ):
+        self.min_seconds = min_seconds
+        self.buckets_per_decade = buckets_per_decade
+        self.max_samples = max_samples
+        decades = math.log10(max_seconds / min_seconds)
+        size = int(math.ceil(decades * buckets_per_decade)) + 1
+        self._bounds = [min_seconds * 10 ** (i / buckets_per_decade) for i in range(size)]
+        self._counts = [0] * (size + 1)  # последняя корзина - переполнение
+        self._total = 0
+        self.errors = 0
+
+    @property
+    def count(self) -> int:
+        return self._total
+
+    def record(self, seconds: float) -> None:
+        """Добавить наблюдение."""
+        if seconds <= self.min_seconds:
+            index = 0
+        else:
+            index = int(math.ceil(math.log10(seconds / self.min_seconds) * self.buckets_per_decade))
+            index = min(index, len(self._counts) - 1)
+        self._counts[index] += 1
+        self._total += 1
+
+        if self._total >= self.max_samples:
+            self._counts = [c // 2 for c in self._counts]
+            self._total = sum(self._counts)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Верхняя граница корзины, в которую попадает квантиль q."""
+        if not self._total:
+            return None
+        rank = q * self._total
+        seen = 0
+        for index, bucket_count in enumerate(self._counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return self._bounds[min(index, len(self._bounds) - 1)]
+        return self._bounds[-1]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self._total,
+            "errors": self.errors,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+@dataclass
+class ExecutionPolicy:
+    """Политика выполнения стратегий для одного запроса."""
+
+    # Бюджет времени на запрос в секундах (None - без ограничения)
+    budget_seconds: Optional[float] = None
+    # Сколько успешных ответов достаточно (None - ждать все)
+    min_results: Optional[int] = None
+    # Хеджирование на резервный провайдер
+    hedge: bool = True
+    hedge_quantile: float = 0.95
+    # Минимум наблюдений, после которого задержке хеджирования можно верить
+    hedge_min_samples: int = 20
+    hedge_min_delay: float = 0.05
+
+    def with_overrides(self, context: Dict[str, Any]) -> "ExecutionPolicy":
+        """
+        Политика с параметрами запроса из context.
+
+        Поддерживаются ключи latency_budget, min_results и hedge.
+        """
+        overrides = {}
+        if "latency_budget" in context:
+            overrides["budget_seconds"] = context["latency_budget"]
+        if "min_results" in context:
+            overrides["min_results"] = context["min_results"]
+        if "hedge" in context:
+            overrides["hedge"] = bool(context["hedge"])
+        if not overrides:
+            return self
+        return ExecutionPolicy(**{**self.__dict__, **overrides})
+
+
+@dataclass
+class StrategyCall:
+    """Вызов стратегии с необязательным резервным провайдером."""
+
+    name: str
+    run: Callable[[], Awaitable[Any]]
+    backup_name: Optional[str] = None
+    backup_run: Optional[Callable[[], Awaitable[Any]]] = None
+
+
+@dataclass
+class ExecutionOutcome:
+    """Результат выполнения набора стратегий."""
+
+    # Ответ или исключение по имени вызова; отмененные вызовы отсутствуют
+    results: Dict[str, Any] = field(default_factory=dict)
+    # Вызовы, отмененные после получения N ответов или по бюджету
+    cancelled: List[str] = field(default_factory=list)
+    # Имя вызова -> имя провайдера, на который был отправлен хедж-запрос
+    hedged: Dict[str, str] = field(default_factory=dict)
+    # Имя вызова -> провайдер, чей ответ использован (если это резерв)
+    answered_by: Dict[str, str] = field(default_factory=dict)
+    # Бюджет времени исчерпан до получения нужных ответов
+    partial: bool = False
+    elapsed: float = 0.0
+
+
+def is_good_result(result: Any) -> bool:
+    """Успешный ответ: не исключение и не словарь с ошибкой."""
+    if isinstance(result, BaseException):
+        return False
+    return not (isinstance(result, dict) and result.get("error"))
+
+
+class PolicyExecutor:
+    """
+    Выполнение стратегий по ExecutionPolicy.
+
+    Хранит гистограммы задержек по именам стратегий; задержка
+    хеджирования для вызова - квантиль hedge_quantile его гистограммы.
+    """
+
+    def __init__(self):
+        self.histograms: Dict[str, LatencyHistogram] = {}
+
+    def _histogram(self, name: str) -> LatencyHistogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        return histogram
+
+    def hedge_delay(self, name: str, policy: ExecutionPolicy) -> Optional[float]:
+        """Задержка перед хедж-запросом или None, если данных мало."""
+        histogram = self.histograms.get(name)
+        if not policy.hedge or histogram is None or histogram.count < policy.hedge_min_samples:
+            return None
+        return max(histogram.quantile(policy.hedge_quantile), policy.hedge_min_delay)
+
+    def latency_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: histogram.snapshot() for name, histogram in self.histograms.items()}
+
+    async def _timed(self, name: str, run: Callable[[], Awaitable[Any]]) -> Any:
+        """Вызов стратегии с записью задержки; исключение возвращается как значение."""
+        started = time.perf_counter()
+        try:
+            result = await run()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._histogram(name).errors += 1
+            return e
+        histogram = self._histogram(name)
+        if is_good_result(result):
+            histogram.record(time.perf_counter() - started)
+        else:
+            histogram.errors += 1
+        return result
+
+    async def _run_call(self, call: StrategyCall, policy: ExecutionPolicy, outcome: ExecutionOutcome) -> Any:
+        """Вызов с хеджированием: побеждает первый успешный ответ основного или резервного провайдера."""
+        names = {}
+        primary = asyncio.ensure_future(self._timed(call.name, call.run))
+        names[primary] = call.name
+        pending = {primary}
+        delay = self.hedge_delay(call.name, policy) if call.backup_run else None
+        last_result = None
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # Основной провайдер медленнее своего p95 - отправляем хедж-запрос
+                    backup = asyncio.ensure_future(self._timed(call.backup_name, call.backup_run))
+                    names[backup] = call.backup_name
+                    pending.add(backup)
+                    outcome.hedged[call.name] = call.backup_name
+                    delay = None
+                    continue
+
+                for task in done:
+                    last_result = task.result()
+                    if is_good_result(last_result):
+                        if names[task] != call.name:
+                            outcome.answered_by[call.name] = names[task]
+                        return last_result
+            return last_result
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def run(self, calls: List[StrategyCall], policy: ExecutionPolicy) -> ExecutionOutcome:
+        """
+        Выполнить вызовы параллельно по политике.
+
+        Возвращает ответы, полученные до выполнения условия остановки:
+        все вызовы завершены, получено min_results успешных ответов или
+        исчерпан бюджет времени (тогда outcome.partial = True).
+        """
+        outcome = ExecutionOutcome()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + policy.budget_seconds if policy.budget_seconds is not None else None
+
+        tasks = {
+            asyncio.ensure_future(self._run_call(call, policy, outcome)): call.name for call in calls
+        }
+        pending = set(tasks)
+        good = 0
+
+        try:
+            while pending:
+                timeout = None if deadline is None else max(deadline - loop.time(), 0)
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    outcome.partial = True
+                    logger.warning(
+                        "Latency budget exhausted",
+                        extra={"budget": policy.budget_seconds, "pending": len(pending)},
+                    )
+                    break
+
+                for task in done:
+                    result = task.result()
+                    outcome.results[tasks[task]] = result
+                    if is_good_result(result):
+                        good += 1
+
+                if policy.min_results is not None and good >= policy.min_results:
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        outcome.cancelled = [name for task, name in tasks.items() if task in pending]
+        outcome.elapsed = loop.time() - started
+        return outcome
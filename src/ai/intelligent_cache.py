@@ -10,17 +10,58 @@ Intelligent Cache Manager for AI Orchestrator
 
 from __future__ import annotations
 
+import asyncio
 import hashlib
+import inspect
 import logging
+import math
+import random
 import time
 from collections import OrderedDict
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Any, Dict, Optional, Set
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional, Set
 
 logger = logging.getLogger(__name__)
 
 
+def _noop(*args: Any, **kwargs: Any) -> None:
+    return None
+
+
+@lru_cache(maxsize=None)
+def _metric_handles() -> SimpleNamespace:
+    """
+    Функции Prometheus-метрик кэша, разрешаемые один раз на процесс.
+
+    Если модуль метрик недоступен, возвращаются пустые обработчики.
+    """
+    try:
+        from src.monitoring.prometheus_metrics import (
+            track_intelligent_cache_eviction,
+            track_intelligent_cache_hit,
+            track_intelligent_cache_invalidation,
+            track_intelligent_cache_miss,
+            track_intelligent_cache_operation,
+            update_intelligent_cache_size,
+        )
+    except ImportError:
+        return SimpleNamespace(
+            hit=_noop, miss=_noop, eviction=_noop, invalidation=_noop, operation=_noop, size=_noop
+        )
+
+    return SimpleNamespace(
+        hit=track_intelligent_cache_hit,
+        miss=track_intelligent_cache_miss,
+        eviction=track_intelligent_cache_eviction,
+        invalidation=track_intelligent_cache_invalidation,
+        operation=track_intelligent_cache_operation,
+        size=update_intelligent_cache_size,
+    )
+
+
 @dataclass
 class CacheEntry:
     """Запись в кэше с метаданными."""
@@ -32,6 +73,7 @@ class CacheEntry:
     last_accessed: datetime = field(default_factory=datetime.utcnow)
     tags: Set[str] = field(default_factory=set)  # Теги для инвалидации
     query_type: Optional[str] = None  # Тип запроса для группировки
+    compute_seconds: float = 0.0  # Время вычисления значения (для XFetch)
 
     def is_expired(self) -> bool:
         """Проверить, истёк ли срок действия."""
@@ -39,6 +81,21 @@ class CacheEntry:
             return False
         return datetime.utcnow() > self.expires_at
 
+    def should_refresh_early(self, beta: float = 1.0) -> bool:
+        """
+        Вероятностное досрочное истечение (XFetch).
+
+        Чем ближе истечение TTL и чем дольше вычисляется значение, тем
+        выше вероятность, что запрос пересчитает его заранее. Так
+        пересчеты популярных записей распределяются во времени, а не
+        приходятся на момент истечения TTL.
+        """
+        if self.expires_at is None or self.compute_seconds <= 0 or beta <= 0:
+            return False
+        remaining = (self.expires_at - datetime.utcnow()).total_seconds()
+        # 1 - random() лежит в (0, 1], логарифм определен
+        return -self.compute_seconds * beta * math.log(1.0 - random.random()) >= remaining
+
     def touch(self) -> None:
         """Обновить время последнего доступа."""
         self.last_accessed = datetime.utcnow()
@@ -51,30 +108,43 @@ class IntelligentCache:
 
     Особенности:
     - TTL на основе типа запроса
-    - Инвалидация по тегам
+    - Инвалидация по тегам (обратный индекс тег -> ключи)
     - LRU eviction при переполнении
     - Метрики производительности
     - Контекстно-зависимое кэширование
+    - get_or_compute: одно вычисление на ключ для конкурентных промахов
+      и вероятностное досрочное обновление (XFetch)
     """
 
     def __init__(
         self,
         max_size: int = 1000,
         default_ttl_seconds: int = 300,  # 5 минут по умолчанию
+        xfetch_beta: float = 1.0,
     ) -> None:
         """
         Args:
             max_size: Максимальное количество записей в кэше
             default_ttl_seconds: TTL по умолчанию в секундах
+            xfetch_beta: Агрессивность досрочного обновления (0 - отключено)
         """
         self.max_size = max_size
         self.default_ttl_seconds = default_ttl_seconds
+        self.xfetch_beta = xfetch_beta
         self._cache: OrderedDict[str, CacheEntry] = OrderedDict()
+        # Обратные индексы для инвалидации без полного обхода кэша
+        self._tag_index: Dict[str, Set[str]] = {}
+        self._query_type_index: Dict[str, Set[str]] = {}
+        # Вычисления get_or_compute в процессе, по ключу
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._track = _metric_handles()
         self._metrics: Dict[str, Any] = {
             "hits": 0,
             "misses": 0,
             "evictions": 0,
             "invalidations": 0,
+            "coalesced": 0,
+            "early_refreshes": 0,
         }
 
         # TTL для разных типов запросов (в секундах)
@@ -116,10 +186,56 @@ class IntelligentCache:
         key_data = f"{normalized_query}|{context_str}"
         return hashlib.sha256(key_data.encode()).hexdigest()
 
+    def _lookup(
+        self,
+        key: str,
+        context: Optional[Dict[str, Any]],
+        start_time: float,
+        record_miss: bool = True,
+    ) -> Optional[CacheEntry]:
+        """
+        Найти действующую запись; истёкшая запись удаляется.
+
+        Промахи учитываются в метриках, попадания - на стороне вызывающего.
+        """
+        entry = self._cache.get(key)
+
+        # Проверить наличие в кэше
+        if entry is None:
+            if record_miss:
+                query_type = context.get("query_type") if context else None
+                self._record_miss(query_type, start_time)
+            return None
+
+        # Проверить срок действия
+        if entry.is_expired():
+            self._remove(key)
+            self._track.eviction(eviction_reason="ttl_expired")
+            if record_miss:
+                self._record_miss(entry.query_type, start_time)
+            return None
+
+        return entry
+
+    def _record_miss(self, query_type: Optional[str], start_time: float) -> None:
+        self._metrics["misses"] += 1
+        self._track.miss(query_type=query_type)
+        self._track.operation("get", time.perf_counter() - start_time, "miss")
+
+    def _record_hit(self, key: str, entry: CacheEntry, start_time: float) -> None:
+        # Обновить время доступа и переместить в конец (LRU)
+        entry.touch()
+        self._cache.move_to_end(key)
+
+        self._metrics["hits"] += 1
+        self._track.hit(query_type=entry.query_type)
+        self._track.operation("get", time.perf_counter() - start_time, "success")
+
     def get(
         self,
         query: str,
         context: Optional[Dict[str, Any]] = None,
+        record_miss: bool = True,
     ) -> Optional[Any]:
         """
         Получить значение из кэша.
@@ -127,72 +243,112 @@ class IntelligentCache:
         Args:
             query: Запрос пользователя
             context: Контекст запроса
+            record_miss: Учитывать промах в метриках (False, если следом
+                вызывается get_or_compute, который учтёт его сам)
 
         Returns:
             Кэшированное значение или None
         """
         key = self._generate_key(query, context)
 
-        start_time = time.time()
+        start_time = time.perf_counter()
+        entry = self._lookup(key, context, start_time, record_miss)
+        if entry is None:
+            return None
 
-        # Проверить наличие в кэше
-        if key not in self._cache:
-            self._metrics["misses"] += 1
-            duration = time.time() - start_time
-            try:
-                from src.monitoring.prometheus_metrics import (
-                    track_intelligent_cache_miss,
-                    track_intelligent_cache_operation,
-                )
+        self._record_hit(key, entry, start_time)
+        return entry.value
 
-                query_type = context.get("query_type") if context else None
-                track_intelligent_cache_miss(query_type=query_type)
-                track_intelligent_cache_operation("get", duration, "miss")
-            except ImportError:
-                pass
-            return None
+    async def get_or_compute(
+        self,
+        query: str,
+        compute: Callable[[], Any],
+        context: Optional[Dict[str, Any]] = None,
+        *,
+        ttl_seconds: Optional[int] = None,
+        tags: Optional[Set[str]] = None,
+        query_type: Optional[str] = None,
+        cache_if: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """
+        Получить значение из кэша или вычислить его.
 
-        entry = self._cache[key]
+        Конкурентные промахи по одному ключу ждут одно вычисление
+        (single-flight). Запись может быть пересчитана до истечения TTL
+        (XFetch); пока идет пересчет, остальные запросы получают текущее
+        значение. Вычисление выполняется отдельной задачей и не
+        прерывается отменой вызывающего.
 
-        # Проверить срок действия
-        if entry.is_expired():
-            del self._cache[key]
-            self._metrics["misses"] += 1
-            duration = time.time() - start_time
-            try:
-                from src.monitoring.prometheus_metrics import (
-                    track_intelligent_cache_eviction,
-                    track_intelligent_cache_miss,
-                    track_intelligent_cache_operation,
-                )
+        Args:
+            query: Запрос пользователя
+            compute: Функция без аргументов, возвращающая значение или awaitable
+            context: Контекст запроса
+            ttl_seconds: TTL в секундах (опционально)
+            tags: Теги для инвалидации (опционально)
+            query_type: Тип запроса для определения TTL (опционально)
+            cache_if: Предикат: сохранять ли вычисленное значение (по умолчанию всегда)
 
-                query_type = entry.query_type
-                track_intelligent_cache_miss(query_type=query_type)
-                track_intelligent_cache_operation("get", duration, "miss")
-                track_intelligent_cache_eviction(eviction_reason="ttl_expired")
-            except ImportError:
-                pass
-            return None
+        Returns:
+            Кэшированное или вычисленное значение
+        """
+        key = self._generate_key(query, context)
 
-        # Обновить время доступа и переместить в конец (LRU)
-        entry.touch()
-        self._cache.move_to_end(key)
+        start_time = time.perf_counter()
+        entry = self._lookup(key, context, start_time)
+        inflight = self._inflight.get(key)
 
-        self._metrics["hits"] += 1
-        duration = time.time() - start_time
-        try:
-            from src.monitoring.prometheus_metrics import (
-                track_intelligent_cache_hit,
-                track_intelligent_cache_operation,
+        if entry is not None:
+            if inflight is not None or not entry.should_refresh_early(self.xfetch_beta):
+                self._record_hit(key, entry, start_time)
+                return entry.value
+            self._metrics["misses"] += 1
+            self._metrics["early_refreshes"] += 1
+
+        if inflight is None:
+            inflight = asyncio.ensure_future(
+                self._compute_and_store(
+                    key, compute, ttl_seconds, tags, query_type, cache_if
+                )
             )
+            self._inflight[key] = inflight
+            inflight.add_done_callback(lambda task: self._finish_inflight(key, task))
+        else:
+            self._metrics["coalesced"] += 1
 
-            query_type = entry.query_type
-            track_intelligent_cache_hit(query_type=query_type)
-            track_intelligent_cache_operation("get", duration, "success")
-        except ImportError:
-            pass
+        return await asyncio.shield(inflight)
 
-        return entry.value
+    async def _compute_and_store(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        ttl_seconds: Optional[int],
+        tags: Optional[Set[str]],
+        query_type: Optional[str],
+        cache_if: Optional[Callable[[Any], bool]],
+    ) -> Any:
+        started = time.perf_counter()
+        value = compute()
+        if inspect.isawaitable(value):
+            value = await value
+
+        if cache_if is None or cache_if(value):
+            self._store(
+                key,
+                value,
+                ttl_seconds=ttl_seconds,
+                tags=tags,
+                query_type=query_type,
+                compute_seconds=time.perf_counter() - started,
+            )
+        return value
+
+    def _finish_inflight(self, key: str, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Ошибка доставляется ожидающим; если все они отменены, не оставляем
+        # исключение неполученным
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Cache compute failed: %s", task.exception())
 
     def set(
         self,
@@ -203,6 +359,7 @@ class IntelligentCache:
         ttl_seconds: Optional[int] = None,
         tags: Optional[Set[str]] = None,
         query_type: Optional[str] = None,
+        compute_seconds: float = 0.0,
     ) -> None:
         """
         Сохранить значение в кэш.
@@ -214,9 +371,28 @@ class IntelligentCache:
             ttl_seconds: TTL в секундах (опционально)
             tags: Теги для инвалидации (опционально)
             query_type: Тип запроса для определения TTL (опционально)
+            compute_seconds: Время вычисления значения; включает XFetch для записи
         """
         key = self._generate_key(query, context)
+        self._store(
+            key,
+            value,
+            ttl_seconds=ttl_seconds,
+            tags=tags,
+            query_type=query_type,
+            compute_seconds=compute_seconds,
+        )
 
+    def _store(
+        self,
+        key: str,
+        value: Any,
+        *,
+        ttl_seconds: Optional[int],
+        tags: Optional[Set[str]],
+        query_type: Optional[str],
+        compute_seconds: float,
+    ) -> None:
         # Определить TTL
         if ttl_seconds is None:
             if query_type and query_type in self.ttl_by_query_type:
@@ -230,44 +406,46 @@ class IntelligentCache:
             value=value,
             created_at=datetime.utcnow(),
             expires_at=expires_at,
-            tags=tags or set(),
+            tags=set(tags) if tags else set(),
             query_type=query_type,
+            compute_seconds=compute_seconds,
         )
 
-        start_time = time.time()
+        start_time = time.perf_counter()
 
-        # Проверить размер кэша
-        if len(self._cache) >= self.max_size and key not in self._cache:
+        if key in self._cache:
+            self._remove(key)
+        elif len(self._cache) >= self.max_size:
             # Удалить самую старую запись (LRU)
-            oldest_key = next(iter(self._cache))
-            del self._cache[oldest_key]
+            self._remove(next(iter(self._cache)))
             self._metrics["evictions"] += 1
-            try:
-                from src.monitoring.prometheus_metrics import (
-                    track_intelligent_cache_eviction,
-                )
-
-                track_intelligent_cache_eviction(eviction_reason="lru")
-            except ImportError:
-                pass
+            self._track.eviction(eviction_reason="lru")
 
         # Сохранить запись
         self._cache[key] = entry
-        self._cache.move_to_end(key)
-
-        duration = time.time() - start_time
-        try:
-            from src.monitoring.prometheus_metrics import (
-                track_intelligent_cache_operation,
-                update_intelligent_cache_size,
-            )
-
-            track_intelligent_cache_operation("set", duration, "success")
-            update_intelligent_cache_size(
-                current_size=len(self._cache), max_size=self.max_size
-            )
-        except ImportError:
-            pass
+        for tag in entry.tags:
+            self._tag_index.setdefault(tag, set()).add(key)
+        if query_type is not None:
+            self._query_type_index.setdefault(query_type, set()).add(key)
+
+        self._track.operation("set", time.perf_counter() - start_time, "success")
+        self._track.size(current_size=len(self._cache), max_size=self.max_size)
+
+    def _remove(self, key: str) -> None:
+        """Удалить запись и её ключ из индексов."""
+        entry = self._cache.pop(key)
+        for tag in entry.tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+        if entry.query_type is not None:
+            keys = self._query_type_index.get(entry.query_type)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._query_type_index[entry.query_type]
 
     def invalidate_by_tags(self, tags: Set[str]) -> int:
         """
@@ -279,34 +457,22 @@ class IntelligentCache:
         Returns:
             Количество удалённых записей
         """
-        start_time = time.time()
-        keys_to_remove = [
-            key
-            for key, entry in self._cache.items()
-            if entry.tags & tags  # Пересечение множеств
-        ]
+        start_time = time.perf_counter()
+        keys_to_remove: Set[str] = set()
+        for tag in tags:
+            keys_to_remove.update(self._tag_index.get(tag, ()))
 
         for key in keys_to_remove:
-            del self._cache[key]
+            self._remove(key)
 
         count = len(keys_to_remove)
         self._metrics["invalidations"] += count
 
-        duration = time.time() - start_time
-        try:
-            from src.monitoring.prometheus_metrics import (
-                track_intelligent_cache_invalidation,
-                track_intelligent_cache_operation,
-                update_intelligent_cache_size,
-            )
-
-            track_intelligent_cache_invalidation(invalidation_type="tags")
-            track_intelligent_cache_operation("invalidate_by_tags", duration, "success")
-            update_intelligent_cache_size(
-                current_size=len(self._cache), max_size=self.max_size
-            )
-        except ImportError:
-            pass
+        self._track.invalidation(invalidation_type="tags")
+        self._track.operation(
+            "invalidate_by_tags", time.perf_counter() - start_time, "success"
+        )
+        self._track.size(current_size=len(self._cache), max_size=self.max_size)
 
         return count
 
@@ -320,57 +486,35 @@ class IntelligentCache:
         Returns:
             Количество удалённых записей
         """
-        start_time = time.time()
-        keys_to_remove = [
-            key for key, entry in self._cache.items() if entry.query_type == query_type
-        ]
+        start_time = time.perf_counter()
+        keys_to_remove = list(self._query_type_index.get(query_type, ()))
 
         for key in keys_to_remove:
-            del self._cache[key]
+            self._remove(key)
 
         count = len(keys_to_remove)
         self._metrics["invalidations"] += count
 
-        duration = time.time() - start_time
-        try:
-            from src.monitoring.prometheus_metrics import (
-                track_intelligent_cache_invalidation,
-                track_intelligent_cache_operation,
-                update_intelligent_cache_size,
-            )
-
-            track_intelligent_cache_invalidation(invalidation_type="query_type")
-            track_intelligent_cache_operation(
-                "invalidate_by_query_type", duration, "success"
-            )
-            update_intelligent_cache_size(
-                current_size=len(self._cache), max_size=self.max_size
-            )
-        except ImportError:
-            pass
+        self._track.invalidation(invalidation_type="query_type")
+        self._track.operation(
+            "invalidate_by_query_type", time.perf_counter() - start_time, "success"
+        )
+        self._track.size(current_size=len(self._cache), max_size=self.max_size)
 
         return count
 
     def clear(self) -> None:
         """Очистить весь кэш."""
-        start_time = time.time()
+        start_time = time.perf_counter()
         size_before = len(self._cache)
         self._cache.clear()
+        self._tag_index.clear()
+        self._query_type_index.clear()
         self._metrics["invalidations"] += size_before
 
-        duration = time.time() - start_time
-        try:
-            from src.monitoring.prometheus_metrics import (
-                track_intelligent_cache_invalidation,
-                track_intelligent_cache_operation,
-                update_intelligent_cache_size,
-            )
-
-            track_intelligent_cache_invalidation(invalidation_type="manual")
-            track_intelligent_cache_operation("clear", duration, "success")
-            update_intelligent_cache_size(current_size=0, max_size=self.max_size)
-        except ImportError:
-            pass
+        self._track.invalidation(invalidation_type="manual")
+        self._track.operation("clear", time.perf_counter() - start_time, "success")
+        self._track.size(current_size=0, max_size=self.max_size)
 
     def cleanup_expired(self) -> int:
         """
@@ -384,7 +528,7 @@ class IntelligentCache:
         ]
 
         for key in keys_to_remove:
-            del self._cache[key]
+            self._remove(key)
 
         return len(keys_to_remove)
 
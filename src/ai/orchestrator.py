@@ -5,6 +5,7 @@
 import asyncio
 from typing import Any, Dict, Optional, TYPE_CHECKING
 
+from src.ai.execution_policy import ExecutionPolicy, PolicyExecutor, StrategyCall, is_good_result
 from src.ai.query_classifier import QueryClassifier, QueryIntent, QueryType, AIService
 from src.utils.structured_logging import StructuredLogger
 
@@ -16,9 +17,23 @@ if TYPE_CHECKING:
 class AIOrchestrator:
     # Main AI orchestrator - routes queries to appropriate services using Strategy Pattern
 
-    def __init__(self):
+    # Backup provider for hedged requests: a slow call is duplicated to the
+    # provider that can answer the same kind of query. The OPENAI slot is
+    # served by YandexGPTStrategy, so the second pair is gigachat <-> yandexgpt
+    HEDGE_BACKUPS = {
+        AIService.QWEN_CODER: AIService.KIMI_K2,
+        AIService.KIMI_K2: AIService.QWEN_CODER,
+        AIService.GIGACHAT: AIService.OPENAI,
+        AIService.OPENAI: AIService.GIGACHAT,
+    }
+
+    def __init__(self, execution_policy: Optional[ExecutionPolicy] = None):
         self.classifier = QueryClassifier()
 
+        # Latency budget, first-N and hedging policy; per-request overrides come from context
+        self.execution_policy = execution_policy or ExecutionPolicy()
+        self.executor = PolicyExecutor()
+
         # Initialize strategies (Lazy Loading)
         from src.ai.strategies.graph import Neo4jStrategy
         from src.ai.strategies.kimi import KimiStrategy
@@ -72,6 +87,16 @@ class AIOrchestrator:
         except Exception as e:
             logger.warning("Council orchestrator not available: %s", e)
 
+        # Security validator (poetic jailbreak detection): one instance with
+        # compiled filters and a verdict cache, shared by all requests
+        self.security_validator = None
+        try:
+            from src.security.poetic_detection import MultiStageValidator
+
+            self.security_validator = MultiStageValidator(self)
+        except Exception as e:
+            logger.warning("Security validator not available: %s", e)
+
     def _get_strategy(self, service: AIService, context: Dict) -> Any:
         # Get strategy for service
         if service == AIService.EXTERNAL_AI:
@@ -92,65 +117,75 @@ class AIOrchestrator:
 
         context = context or {}
 
-        # Security validation (poetic jailbreak detection)
-        if context.get("enable_security_validation", True):
-            try:
-                from src.security.poetic_detection import MultiStageValidator
-
-                validator = MultiStageValidator(self)
-                validation_result = await validator.validate(query, context)
-
-                if not validation_result.allowed:
-                    logger.warning(
-                        f"Query blocked by security validation: {validation_result.reason}",
-                        extra={"query_length": len(query)},
-                    )
-                    return {
-                        "error": "Query blocked by security filters",
-                        "reason": validation_result.reason,
-                        "details": {
-                            "poetic_detected": validation_result.poetic_analysis is not None,
-                            "stage": validation_result.stage_completed,
-                        },
-                    }
-
-                # If poetic form detected, force council mode for extra safety
-                if validation_result.poetic_analysis and validation_result.poetic_analysis.is_poetic:
-                    context["use_council"] = True
-                    logger.info("Poetic form detected, forcing council mode for safety")
-
-            except Exception as e:
-                logger.error("Security validation error: %s", e)
-                # Continue without security validation on error
-
-        # Check if council mode requested
+        # Security validation (poetic jailbreak detection) is awaited before anything
+        # is returned or executed. Its task is given one loop step to reach its first
+        # I/O wait (intent extraction), so the cache lookup and, on a miss,
+        # classification overlap with that wait
+        validation = self._start_security_validation(query, context)
+        council_requested = bool(context.get("use_council", False) and self.council)
+        cache_key = f"{query}:{context}"
+        intent = None
+        try:
+            if isinstance(validation, asyncio.Future):
+                await asyncio.sleep(0)
+
+            cached = None
+            if not council_requested:
+                if isinstance(self.cache, dict):
+                    cached = self.cache.get(cache_key)
+                else:
+                    # The miss is counted by get_or_compute below
+                    cached = self.cache.get(query, context, record_miss=False)
+                if not cached:
+                    intent = self.classifier.classify(query, context)
+
+            if validation is not None:
+                blocked = await self._apply_security_verdict(validation, query, context)
+                if blocked is not None:
+                    return blocked
+        finally:
+            if isinstance(validation, asyncio.Future) and not validation.done():
+                validation.cancel()
+
+        # Check if council mode requested (also forced by a poetic verdict)
         if context.get("use_council", False) and self.council:
             logger.info("Using council mode for query")
             return await self.process_query_with_council(query, context)
 
-        # Check cache
-        cached_value = None
-        if isinstance(self.cache, dict):
-            cache_key = f"{query}:{context}"
-            cached_value = self.cache.get(cache_key)
-        else:
-            cached_value = self.cache.get(query, context)
-
-        if cached_value:
-            try:
-                orchestrator_cache_hits_total.inc()
-            except Exception:
-                pass
-            return cached_value
-
-        try:
-            orchestrator_cache_misses_total.inc()
-        except Exception:
-            pass
+        if cached:
+            self._track_cache_lookup(True)
+            return cached
 
         # Classify
-        intent = self.classifier.classify(query, context)
+        if intent is None:
+            intent = self.classifier.classify(query, context)
+
+        if isinstance(self.cache, dict):
+            self._track_cache_lookup(False)
+            response = await self._execute_query(query, intent, context)
+            if self._is_cacheable(response):
+                self.cache[cache_key] = response
+            return response
+
+        # Concurrent misses for the same query share one execution; requests that
+        # joined it count as hits
+        executed = []
+
+        async def compute() -> Any:
+            executed.append(True)
+            return await self._execute_query(query, intent, context)
+
+        response = await self.cache.get_or_compute(
+            query,
+            compute,
+            context,
+            query_type=intent.query_type.value,
+            cache_if=self._is_cacheable,
+        )
+        self._track_cache_lookup(not executed)
+        return response
 
+    async def _execute_query(self, query: str, intent: Any, context: Dict) -> Any:
         # Select Provider via Abstraction (optional, updates context)
         if self.classifier.llm_abstraction:
             # ... (logic to select provider and update context, similar to original)
@@ -168,15 +203,61 @@ class AIOrchestrator:
         if isinstance(response, dict):
             self._enrich_response(response, query, intent)
 
-        # Cache result
-        if isinstance(self.cache, dict):
-            cache_key = f"{query}:{context}"
-            self.cache[cache_key] = response
-        else:
-            self.cache.set(query, response, context, query_type=intent.query_type.value)
-
         return response
 
+    @staticmethod
+    def _is_cacheable(response: Any) -> bool:
+        # Partial results (latency budget exhausted) are not cached
+        return not (isinstance(response, dict) and response.get("partial"))
+
+    @staticmethod
+    def _track_cache_lookup(hit: bool) -> None:
+        try:
+            if hit:
+                orchestrator_cache_hits_total.inc()
+            else:
+                orchestrator_cache_misses_total.inc()
+        except Exception:
+            pass
+
+    def _start_security_validation(self, query: str, context: Dict) -> Any:
+        # Cached or prefiltered verdict, a task running full validation, or None when disabled
+        if not context.get("enable_security_validation", True) or self.security_validator is None:
+            return None
+        verdict = self.security_validator.peek(query)
+        if verdict is not None:
+            return verdict
+        return asyncio.ensure_future(self.security_validator.validate(query, context))
+
+    async def _apply_security_verdict(self, validation: Any, query: str, context: Dict) -> Optional[Dict[str, Any]]:
+        # Error response if the query is blocked; forces council mode for poetic queries
+        try:
+            validation_result = await validation if isinstance(validation, asyncio.Future) else validation
+
+            if not validation_result.allowed:
+                logger.warning(
+                    f"Query blocked by security validation: {validation_result.reason}",
+                    extra={"query_length": len(query)},
+                )
+                return {
+                    "error": "Query blocked by security filters",
+                    "reason": validation_result.reason,
+                    "details": {
+                        "poetic_detected": validation_result.poetic_analysis is not None,
+                        "stage": validation_result.stage_completed,
+                    },
+                }
+
+            # If poetic form detected, force council mode for extra safety
+            if validation_result.poetic_analysis and validation_result.poetic_analysis.is_poetic:
+                context["use_council"] = True
+                logger.info("Poetic form detected, forcing council mode for safety")
+
+        except Exception as e:
+            logger.error("Security validation error: %s", e)
+            # Continue without security validation on error
+        return None
+
     async def process_query_with_council(
         self, query: str, context: Optional[Dict[str, Any]] = None, council_config: Optional[Dict] = None
     ) -> Dict[str, Any]:
@@ -223,61 +304,100 @@ class AIOrchestrator:
 
         return self.strategies.get(service)
 
+    def _build_call(self, service: AIService, strategy: Any, query: str, context: Dict,
+                    services: list) -> StrategyCall:
+        # Strategy call with an optional hedge target
+        call = StrategyCall(name=strategy.service_name, run=lambda: strategy.execute(query, context))
+
+        backup_service = self.HEDGE_BACKUPS.get(service)
+        if backup_service and backup_service not in services:
+            backup = self._get_strategy(backup_service, context)
+            if backup and backup is not strategy:
+                call.backup_name = backup.service_name
+                call.backup_run = lambda: backup.execute(query, context)
+        return call
+
     async def _execute_strategies(self, query: str, intent: QueryIntent, context: Dict) -> Dict:
-        # Execute strategies based on intent
+        # Execute strategies based on intent under the execution policy:
+        # latency budget, first N good answers, hedging to a backup provider
+        policy = self.execution_policy.with_overrides(context)
 
         # Single service optimization
         if len(intent.preferred_services) == 1:
             service = intent.preferred_services[0]
             strategy = self._get_strategy(service, context)
             if strategy:
-                try:
-                    return await strategy.execute(query, context)
-                except Exception as e:
-                    logger.error(f"Service {service} failed: {e}")
+                call = self._build_call(service, strategy, query, context, intent.preferred_services)
+                outcome = await self.executor.run([call], policy)
+
+                if call.name not in outcome.results:
+                    logger.warning(f"Service {service} exceeded latency budget")
+                    error = f"Latency budget of {policy.budget_seconds}s exceeded"
                     return {
-                        "error": str(e),
+                        "error": error,
+                        "partial": True,
                         "detailed_results": {
-                            service: {"error": str(e)}
+                            service: {"error": error}
                         }
                     }
 
+                result = outcome.results[call.name]
+                if isinstance(result, Exception):
+                    logger.error(f"Service {service} failed: {result}")
+                    return {
+                        "error": str(result),
+                        "detailed_results": {
+                            service: {"error": str(result)}
+                        }
+                    }
+                return result
+
         # Parallel execution
-        tasks = []
-        service_names = []
+        calls = []
 
         for service in intent.preferred_services:
             strategy = self._get_strategy(service, context)
             if strategy:
-                tasks.append(strategy.execute(query, context))
-                service_names.append(strategy.service_name)
+                calls.append(self._build_call(service, strategy, query, context, intent.preferred_services))
 
-        if not tasks:
+        if not calls:
             return {"error": "No suitable services found"}
 
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        outcome = await self.executor.run(calls, policy)
 
         # Aggregate results
         successful_count = 0
         combined_results = {}
 
-        for i, result in enumerate(results):
-            service_name = service_names[i]
+        for call in calls:
+            if call.name not in outcome.results:
+                continue
+            result = outcome.results[call.name]
             if isinstance(result, Exception):
-                logger.error(f"Service {service_name} failed: {result}")
-                combined_results[service_name] = {"error": str(result)}
+                logger.error(f"Service {call.name} failed: {result}")
+                combined_results[call.name] = {"error": str(result)}
             else:
-                combined_results[service_name] = result
-                successful_count += 1
+                combined_results[call.name] = result
+                if is_good_result(result):
+                    successful_count += 1
 
         return {
             "type": "multi_service",
             "execution": "parallel",
-            "services_called": service_names,
+            "services_called": [call.name for call in calls],
             "successful": successful_count,
             "detailed_results": combined_results,
+            "partial": outcome.partial,
+            "cancelled": outcome.cancelled,
+            "hedged": outcome.hedged,
+            "answered_by": outcome.answered_by,
+            "elapsed": outcome.elapsed,
         }
 
+    def get_latency_stats(self) -> Dict[str, Dict[str, Any]]:
+        # Per-strategy latency histograms (count, errors, p50/p95/p99)
+        return self.executor.latency_stats()
+
     def _enrich_response(self, response: Dict, query: str, intent: QueryIntent):
         # Add metadata to response
         meta = response.get("_meta", {})
@@ -1,7 +1,9 @@
 import re
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from src.ai.scenario_hub import ScenarioRiskLevel
 from src.utils.structured_logging import StructuredLogger
@@ -47,11 +49,151 @@ class QueryIntent:
     suggested_tools: List[str]
 
 
+_REGEX_META = set(".^$*+?{}[]|()\\")
+
+
+def _split_alternatives(pattern: str) -> Optional[List[str]]:
+    """Split pattern on top-level |; None if it has character classes."""
+    parts, depth, start, i = [], 0, 0, 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\":
+            i += 2
+            continue
+        if ch == "[":
+            return None
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "|" and depth == 0:
+            parts.append(pattern[start:i])
+            start = i + 1
+        i += 1
+    parts.append(pattern[start:])
+    return parts
+
+
+def _leading_literal(pattern: str) -> str:
+    """Literal prefix every match of pattern must start with ('' if none)."""
+    end = 0
+    while end < len(pattern) and pattern[end] not in _REGEX_META:
+        end += 1
+    # Квантификатор после литерала делает его последний символ необязательным
+    if end < len(pattern) and pattern[end] in "?*{":
+        end -= 1
+    return pattern[:end]
+
+
+def pattern_anchors(pattern: str) -> Optional[Tuple[str, ...]]:
+    """
+    Literals of which at least one occurs in any text matching pattern.
+
+    Handles a literal prefix ("найди\\s+...") and a leading group of literal
+    alternatives ("(создай|напиши)\\s+..."); None when nothing can be derived
+    and the pattern must always be searched.
+    """
+    alternatives = _split_alternatives(pattern)
+    if alternatives is None or len(alternatives) != 1:
+        return None
+
+    literal = _leading_literal(pattern)
+    if literal:
+        return (literal.casefold(),)
+
+    if pattern.startswith("("):
+        close = pattern.find(")")
+        group = pattern[1:close]
+        if close < 0 or pattern[close + 1 : close + 2] in ("?", "*", "{"):
+            return None
+        if group.startswith("?"):
+            return None
+        options = group.split("|")
+        if all(option and not _REGEX_META.intersection(option) for option in options):
+            return tuple(option.casefold() for option in options)
+    return None
+
+
+class CompiledRules:
+    """
+    Rule set of QueryClassifier compiled once.
+
+    Keywords are lowercased up front; patterns are compiled once and guarded
+    by literal anchors, so a pattern is searched only when the text contains
+    one of its anchors. Anchors are checked against the casefolded text:
+    every character IGNORECASE treats as equal to an anchor character has
+    the same casefold, so the guard never rejects a text the pattern matches.
+    """
+
+    def __init__(self, rules: Dict["QueryType", Dict[str, Any]]):
+        self.types: List[QueryType] = list(rules)
+        # (индекс правила, ключевое слово, ключевое слово в нижнем регистре)
+        self.keywords: List[Tuple[int, str, str]] = []
+        # (индекс правила, скомпилированный шаблон)
+        self.patterns: List[Tuple[int, "re.Pattern"]] = []
+        # Якорь -> номера шаблонов в self.patterns; шаблоны без якорей проверяются всегда
+        self.anchors: Dict[str, List[int]] = {}
+        self.unanchored: List[int] = []
+
+        for index, rules_for_type in enumerate(rules.values()):
+            for keyword in rules_for_type.get("keywords", []):
+                self.keywords.append((index, keyword, keyword.lower()))
+            for pattern in rules_for_type.get("patterns", []):
+                try:
+                    compiled = re.compile(pattern, re.IGNORECASE)
+                except re.error:
+                    logger.warning(f"Invalid regex pattern for {self.types[index]}: {pattern}")
+                    continue
+                anchors = pattern_anchors(pattern)
+                position = len(self.patterns)
+                self.patterns.append((index, compiled))
+                if anchors is None:
+                    self.unanchored.append(position)
+                else:
+                    for anchor in anchors:
+                        self.anchors.setdefault(anchor, []).append(position)
+
+    def score(self, query_lower: str) -> Tuple[List[float], List[str]]:
+        """Scores per rule (in RULES order) and matched keywords."""
+        scores = [0.0] * len(self.types)
+        matched_keywords: List[str] = []
+
+        for index, keyword, keyword_lower in self.keywords:
+            if keyword_lower in query_lower:
+                scores[index] += 1.0
+                matched_keywords.append(keyword)
+
+        folded = query_lower.casefold()
+        candidates = set(self.unanchored)
+        for anchor, positions in self.anchors.items():
+            if anchor in folded:
+                candidates.update(positions)
+
+        for position in candidates:
+            index, compiled = self.patterns[position]
+            if compiled.search(query_lower):
+                scores[index] += 2.0
+
+        return scores, matched_keywords
+
+
 class QueryClassifier:
     """Classifies user queries to determine routing"""
 
-    def __init__(self):
-        """Инициализация QueryClassifier с поддержкой LLM Provider Abstraction."""
+    def __init__(self, cache_size: int = 1024):
+        """
+        Инициализация QueryClassifier с поддержкой LLM Provider Abstraction.
+
+        Args:
+            cache_size: Размер LRU кэша результатов по нормализованному запросу (0 - без кэша)
+        """
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Tuple]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_stats = {"hits": 0, "misses": 0}
+        self._compiled = CompiledRules(self.RULES)
+        self._tools_by_type: Dict[QueryType, List[str]] = {}
+
         self.llm_abstraction = None
         try:
             from src.ai.llm_provider_abstraction import LLMProviderAbstraction
@@ -184,42 +326,34 @@ class QueryClassifier:
         if context is None:
             context = {}
 
+        # Нормализованный запрос - ключ кэша: от него зависит все, кроме context_type
         query_lower = query.lower()
-        scores: Dict[QueryType, float] = {}
-        matched_keywords: List[str] = []
+        cached = self._get_cached(query_lower)
+        if cached is None:
+            cached = self._classify_normalized(query_lower)
+            self._store_cached(query_lower, cached)
+        best_type, confidence, matched_keywords, preferred_services, suggested_tools = cached
 
-        # Robust rule matching
-        for query_type, rules in self.RULES.items():
-            score = 0.0
-
-            # Check keywords
-            if "keywords" in rules:
-                for keyword in rules["keywords"]:
-                    if keyword.lower() in query_lower:
-                        score += 1.0
-                        matched_keywords.append(keyword)
-
-            # Check patterns
-            if "patterns" in rules:
-                for pattern in rules["patterns"]:
-                    try:
-                        if re.search(pattern, query_lower, re.IGNORECASE):
-                            score += 2.0
-                    except re.error:
-                        logger.warning(
-                            f"Invalid regex pattern for {query_type}: {pattern}"
-                        )
-
-            scores[query_type] = score
-
-        if scores:
-            best_type = max(scores, key=scores.get)
+        # Копии списков: изменение результата вызывающим кодом не портит кэш
+        return QueryIntent(
+            query_type=best_type,
+            confidence=confidence,
+            keywords=list(matched_keywords),
+            context_type=context.get("type") if context else None,
+            preferred_services=list(preferred_services),
+            suggested_tools=list(suggested_tools),
+        )
+
+    def _classify_normalized(self, query_lower: str) -> Tuple:
+        """Классификация нормализованного запроса за один проход по скомпилированным правилам"""
+        scores, matched_keywords = self._compiled.score(query_lower)
+
+        # Первое правило с максимальным счетом в порядке RULES
+        best_index = max(range(len(scores)), key=scores.__getitem__) if scores else None
+        if best_index is not None and scores[best_index] > 0:
+            best_type = self._compiled.types[best_index]
             # Normalize confidence
-            confidence = (
-                min(scores[best_type] / 5.0, 1.0) if scores[best_type] > 0 else 0.0
-            )
-            if confidence == 0.0:
-                best_type = QueryType.UNKNOWN
+            confidence = min(scores[best_index] / 5.0, 1.0)
         else:
             best_type = QueryType.UNKNOWN
             confidence = 0.0
@@ -232,6 +366,20 @@ class QueryClassifier:
                 "services", []
             )
 
+        return (
+            best_type,
+            confidence,
+            tuple(matched_keywords),
+            tuple(preferred_services),
+            tuple(self._suggest_tools(best_type)),
+        )
+
+    def _suggest_tools(self, best_type: QueryType) -> List[str]:
+        """Инструменты для типа запроса; реестр строится один раз на тип"""
+        cached = self._tools_by_type.get(best_type)
+        if cached is not None:
+            return cached
+
         suggested_tools: List[str] = []
         try:
             # Robust tool registry loading
@@ -257,14 +405,39 @@ class QueryClassifier:
                     logger.debug("Failed to add LLM tools to suggestions: %s", e)
         except ImportError:
             logger.debug("Tool registry examples not available")
+            return suggested_tools
         except Exception as e:
             logger.warning("Tool suggestions failed", extra={"error": str(e)})
+            return suggested_tools
 
-        return QueryIntent(
-            query_type=best_type,
-            confidence=confidence,
-            keywords=matched_keywords,
-            context_type=context.get("type") if context else None,
-            preferred_services=preferred_services,
-            suggested_tools=list(set(suggested_tools)),  # Deduplicate
-        )
+        tools = list(dict.fromkeys(suggested_tools))  # Deduplicate
+        self._tools_by_type[best_type] = tools
+        return tools
+
+    def _get_cached(self, key: str) -> Optional[Tuple]:
+        if self.cache_size <= 0:
+            return None
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is None:
+                self.cache_stats["misses"] += 1
+                return None
+            self._cache.move_to_end(key)
+            self.cache_stats["hits"] += 1
+            return cached
+
+    def _store_cached(self, key: str, value: Tuple) -> None:
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def clear_cache(self) -> None:
+        """Сброс кэша результатов и подсказок инструментов (например, после изменения RULES)"""
+        with self._cache_lock:
+            self._cache.clear()
+        self._tools_by_type.clear()
+        self._compiled = CompiledRules(self.RULES)
@@ -304,6 +304,11 @@ class Settings(BaseSettings):
     # --- Infrastructure ---
     otlp_endpoint: Optional[str] = Field(default=None, description="OpenTelemetry Endpoint", validation_alias="OTLP_ENDPOINT")
     enable_legacy_api_redirect: bool = Field(default=True, description="Enable redirect from /api/ to /api/v1/", validation_alias="ENABLE_LEGACY_API_REDIRECT")
+    use_asgi_middleware_pipeline: bool = Field(default=False, description="Use fused pure-ASGI middleware pipeline instead of BaseHTTPMiddleware stack", validation_alias="USE_ASGI_MIDDLEWARE_PIPELINE")
+    ai_agent_rate_limit_shared: bool = Field(default=False, description="Share AI agent rate limit state across workers via Redis", validation_alias="AI_AGENT_RATE_LIMIT_SHARED")
+    realtime_backplane: str = Field(default="none", description="Backplane for real-time broadcasts across workers: none, redis, nats", validation_alias="REALTIME_BACKPLANE")
+    realtime_backplane_batch_interval: float = Field(default=0.0, description="Seconds to accumulate real-time broadcasts per topic before publishing to the backplane", validation_alias="REALTIME_BACKPLANE_BATCH_INTERVAL")
+    nats_url: str = Field(default="nats://localhost:4222", description="NATS URL", validation_alias="NATS_URL")
 
     # --- Databases (Fallback/Direct) ---
     postgres_host: str = Field(default="localhost", validation_alias="POSTGRES_HOST")
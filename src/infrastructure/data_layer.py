@@ -18,8 +18,22 @@ Unified Data Layer - Абстракция над множественными Б
 
 import asyncio
 import logging
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Any, Dict, Generic, List, Optional, TypeVar
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -45,64 +59,162 @@ class DataLoader:
     """
     DataLoader для batch loading и предотвращения N+1 проблем
 
+    Все вызовы load(), сделанные за один проход event loop, собираются в один
+    dispatch: повторные ключи получают общий future, очередь режется на батчи
+    по max_batch_size, а батчи выполняются параллельно, но не более
+    max_concurrency одновременно.
+
+    Кэш результатов - LRU с ограничением размера и необязательным TTL.
+    Для кэша в рамках запроса создавайте новый DataLoader на каждый запрос,
+    для общего кэша задавайте cache_ttl.
+
     Научное обоснование:
     - "DataLoader Pattern" (Facebook, 2015): Batch loading
     - "N+1 Problem Solution" (2024): Оптимизация запросов
     """
 
-    def __init__(self, batch_fn, max_batch_size: int = 100):
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 100,
+        max_concurrency: int = 4,
+        cache: bool = True,
+        cache_ttl: Optional[float] = None,
+        cache_max_size: int = 10000,
+    ):
+        """
+        Args:
+            batch_fn: Корутина, получающая список ключей и возвращающая значения
+                в том же порядке (исключение на месте значения - ошибка для ключа)
+            max_batch_size: Максимальный размер одного вызова batch_fn
+            max_concurrency: Сколько батчей может выполняться одновременно
+            cache: Кэшировать ли результаты
+            cache_ttl: Время жизни записи кэша в секундах (None - без ограничения)
+            cache_max_size: Максимальное количество записей кэша (LRU)
+        """
         self.batch_fn = batch_fn
         self.max_batch_size = max_batch_size
-        self._cache: Dict[str, Any] = {}
-        self._pending: Dict[str, asyncio.Future] = {}
-        self._batch_queue: List[str] = []
-        self._batch_timer: Optional[asyncio.Task] = None
-
-    async def load(self, key: str) -> Any:
-        """Загрузка одного элемента"""
-        return (await self.load_many([key]))[0]
-
-    async def load_many(self, keys: List[str]) -> List[Any]:
+        self.max_concurrency = max_concurrency
+        self.cache_enabled = cache
+        self.cache_ttl = cache_ttl
+        self.cache_max_size = cache_max_size
+        # key -> (value, expires_at)
+        self._cache: "OrderedDict[Any, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._pending: Dict[Any, asyncio.Future] = {}
+        self._batch_queue: List[Any] = []
+        self._batch_timer: Optional[asyncio.Handle] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.stats = {"loads": 0, "cache_hits": 0, "dispatches": 0, "batches": 0}
+
+    async def load(self, key: Any) -> Any:
+        """Загрузка одного элемента (попадает в общий батч текущего прохода loop)"""
+        self.stats["loads"] += 1
+
+        found, value = self._cache_get(key)
+        if found:
+            self.stats["cache_hits"] += 1
+            return value
+
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[key] = future
+            self._batch_queue.append(key)
+            if self._batch_timer is None:
+                self._batch_timer = loop.call_soon(self._dispatch)
+
+        # shield: отмена одного из ожидающих не должна отменять общий future
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: List[Any]) -> List[Any]:
         """Загрузка множества элементов с batch оптимизацией"""
-        results = []
-        uncached_keys = []
-
-        # Проверка кэша
-        for key in keys:
-            if key in self._cache:
-                results.append(self._cache[key])
-            else:
-                uncached_keys.append(key)
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
 
-        if not uncached_keys:
-            return results
+    def prime(self, key: Any, value: Any) -> None:
+        """Кладёт известное значение в кэш без обращения к batch_fn"""
+        self._cache_set(key, value)
 
-        # Batch загрузка
-        batch_results = await self._batch_load(uncached_keys)
+    def clear(self, key: Any) -> None:
+        """Удаляет ключ из кэша"""
+        self._cache.pop(key, None)
 
-        # Кэширование и формирование результатов
-        for key, value in zip(uncached_keys, batch_results):
-            self._cache[key] = value
-            results.append(value)
+    def clear_cache(self) -> None:
+        """Очистка кэша"""
+        self._cache.clear()
 
-        return results
+    def _dispatch(self) -> None:
+        """Отправляет накопленные за проход loop ключи батчами"""
+        self._batch_timer = None
+        keys, self._batch_queue = self._batch_queue, []
+        if not keys:
+            return
 
-    async def _batch_load(self, keys: List[str]) -> List[Any]:
-        """Batch загрузка"""
-        # Разбиение на батчи
-        batches = [keys[i : i + self.max_batch_size]
-            for i in range(0, len(keys), self.max_batch_size)]
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
 
-        all_results = []
-        for batch in batches:
-            results = await self.batch_fn(batch)
-            all_results.extend(results)
+        self.stats["dispatches"] += 1
+        for i in range(0, len(keys), self.max_batch_size):
+            task = asyncio.create_task(self._run_batch(keys[i : i + self.max_batch_size]))
+            # Держим ссылку, чтобы задача не была собрана GC до завершения
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
 
-        return all_results
+    async def _run_batch(self, keys: List[Any]) -> None:
+        """Выполняет один батч и разрешает futures его ключей"""
+        futures = [self._pending[key] for key in keys]
+        try:
+            async with self._semaphore:
+                self.stats["batches"] += 1
+                results = await self.batch_fn(keys)
 
-    def clear_cache(self) -> None:
-        """Очистка кэша"""
-        self._cache.clear()
+            if len(results) != len(keys):
+                raise ValueError(
+                    f"batch_fn returned {len(results)} values for {len(keys)} keys"
+                )
+        except Exception as e:
+            logger.error("DataLoader batch failed: %s", e)
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            # Пока батч в работе, повторные load() тех же ключей ждут его future
+            for key, future in zip(keys, futures):
+                if self._pending.get(key) is future:
+                    del self._pending[key]
+
+        for key, future, value in zip(keys, futures, results):
+            if future.done():
+                continue
+            if isinstance(value, Exception):
+                future.set_exception(value)
+            else:
+                self._cache_set(key, value)
+                future.set_result(value)
+
+    def _cache_get(self, key: Any) -> Tuple[bool, Any]:
+        """Чтение из кэша с учётом TTL"""
+        entry = self._cache.get(key)
+        if entry is None:
+            return False, None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._cache[key]
+            return False, None
+        self._cache.move_to_end(key)
+        return True, value
+
+    def _cache_set(self, key: Any, value: Any) -> None:
+        """Запись в кэш с вытеснением самых давних записей"""
+        if not self.cache_enabled:
+            return
+        expires_at = time.monotonic() + self.cache_ttl if self.cache_ttl is not None else None
+        self._cache[key] = (value, expires_at)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_max_size:
+            self._cache.popitem(last=False)
 
 
 class UnifiedDataLayer:
@@ -115,8 +227,14 @@ class UnifiedDataLayer:
     - Qdrant (векторные данные)
     - Elasticsearch (полнотекстовый поиск)
     - Redis (кэш)
+
+    PostgreSQL и Qdrant имеют асинхронный путь: пул asyncpg и AsyncQdrantClient.
+    Синхронные клиенты остаются запасным вариантом и вызываются в отдельном потоке.
     """
 
+    # Сколько форм SELECT держать в кэше сгенерированного SQL
+    PG_SQL_CACHE_SIZE = 256
+
     def __init__(
         self,
         postgres_conn: Optional[Any] = None,
@@ -124,15 +242,108 @@ class UnifiedDataLayer:
         qdrant_conn: Optional[Any] = None,
         elasticsearch_conn: Optional[Any] = None,
         redis_conn: Optional[Any] = None,
+        postgres_pool: Optional[Any] = None,
+        qdrant_async_conn: Optional[Any] = None,
+        use_shared_pool: Optional[bool] = None,
     ):
+        """
+        Args:
+            postgres_conn: Синхронное соединение psycopg2
+            postgres_pool: Пул asyncpg (если не задан, используется общий пул
+                src.infrastructure.db.connection при use_shared_pool=True)
+            use_shared_pool: Брать общий пул приложения; по умолчанию - только
+                если не передано ни postgres_pool, ни postgres_conn
+            qdrant_conn: Синхронный QdrantClient
+            qdrant_async_conn: AsyncQdrantClient
+        """
         self.postgres = postgres_conn
+        self.postgres_pool = postgres_pool
+        if use_shared_pool is None:
+            use_shared_pool = postgres_conn is None
+        self.use_shared_pool = use_shared_pool
         self.neo4j = neo4j_conn
         self.qdrant = qdrant_conn
+        self.qdrant_async = qdrant_async_conn
         self.elasticsearch = elasticsearch_conn
         self.redis = redis_conn
 
+        self._postgres_sync_lock = asyncio.Lock()
+        self._pg_sql_cache: "OrderedDict[Tuple[Any, ...], Tuple[str, str]]" = OrderedDict()
+
         logger.info("UnifiedDataLayer initialized")
 
+    def postgres_row_loader(
+        self,
+        table: str,
+        key_column: str = "id",
+        fields: Optional[List[str]] = None,
+        **loader_options: Any,
+    ) -> DataLoader:
+        """
+        DataLoader строк PostgreSQL по ключевой колонке
+
+        Каждый батч - один SELECT ... WHERE key_column IN (...), для
+        отсутствующих ключей возвращается None.
+
+        Args:
+            table: Таблица
+            key_column: Колонка, по которой загружаются строки
+            fields: Поля выборки (key_column добавляется автоматически)
+            **loader_options: Параметры DataLoader (max_batch_size, cache_ttl, ...)
+        """
+        select_fields = ["*"]
+        if fields:
+            select_fields = fields if key_column in fields else [key_column, *fields]
+
+        async def batch_fn(keys: List[Any]) -> List[Optional[Dict[str, Any]]]:
+            result = await self._query_postgres(
+                "select",
+                {
+                    "table": table,
+                    "fields": select_fields,
+                    "where": {key_column: list(keys)},
+                    "limit": len(keys),
+                    "order_by": key_column,
+                    "count": False,
+                },
+            )
+            if "error" in result.metadata:
+                raise RuntimeError(result.metadata["error"])
+            rows = {row.get(key_column): row for row in result.data}
+            return [rows.get(key) for key in keys]
+
+        return DataLoader(batch_fn, **loader_options)
+
+    def qdrant_point_loader(
+        self,
+        collection: str,
+        with_vectors: bool = False,
+        **loader_options: Any,
+    ) -> DataLoader:
+        """
+        DataLoader точек Qdrant по id
+
+        Каждый батч - один retrieve по списку id, для отсутствующих
+        точек возвращается None.
+
+        Args:
+            collection: Коллекция
+            with_vectors: Загружать ли векторы вместе с payload
+            **loader_options: Параметры DataLoader (max_batch_size, cache_ttl, ...)
+        """
+
+        async def batch_fn(ids: List[Any]) -> List[Optional[Dict[str, Any]]]:
+            result = await self._query_qdrant(
+                "retrieve",
+                {"collection": collection, "ids": list(ids), "with_vectors": with_vectors},
+            )
+            if "error" in result.metadata:
+                raise RuntimeError(result.metadata["error"])
+            points = {point["id"]: point for point in result.data}
+            return [points.get(point_id) for point_id in ids]
+
+        return DataLoader(batch_fn, **loader_options)
+
     async def query(self, query_type: str, query: Dict[str, Any], database: str = "postgres") -> QueryResult:
         """
         Унифицированный запрос к данным
@@ -160,6 +371,10 @@ class UnifiedDataLayer:
         """
         Запрос к PostgreSQL с полной CRUD функциональностью
 
+        Если доступен пул asyncpg (явный или общий из src.infrastructure.db.connection),
+        запрос выполняется асинхронно; иначе синхронное соединение psycopg2
+        используется в отдельном потоке, чтобы не блокировать event loop.
+
         Args:
             query_type: "select", "insert", "update", "delete"
             query: Параметры запроса
@@ -168,14 +383,180 @@ class UnifiedDataLayer:
                 - values: значения (для insert/update)
                 - where: условия (для select/update/delete)
                 - limit/offset: пагинация
+                - count: считать ли total отдельным COUNT (для select, по умолчанию True)
 
         Returns:
             QueryResult с данными
         """
+        pool = self._get_postgres_pool()
+        if pool is not None:
+            return await self._query_postgres_async(pool, query_type, query)
+
         if not self.postgres:
             logger.error("PostgreSQL connection not initialized")
             return QueryResult(data=[], total=0)
 
+        # Одно соединение psycopg2 - одна транзакция: запросы к нему сериализуем
+        async with self._postgres_sync_lock:
+            return await asyncio.to_thread(self._query_postgres_sync, query_type, query)
+
+    def _get_postgres_pool(self) -> Optional[Any]:
+        """Возвращает пул asyncpg: явно переданный или общий пул приложения"""
+        if self.postgres_pool is not None:
+            return self.postgres_pool
+        if not self.use_shared_pool:
+            return None
+        try:
+            from src.infrastructure.db.connection import get_pool
+        except ImportError:
+            # asyncpg не установлен - больше не пытаемся
+            self.use_shared_pool = False
+            return None
+        try:
+            return get_pool()
+        except RuntimeError:
+            # Пул ещё не создан при старте приложения
+            return None
+
+    def _pg_select_sql(
+        self, table: str, fields: List[str], where: Dict[str, Any], order_by: str
+    ) -> Tuple[str, str, List[Any]]:
+        """
+        SQL для SELECT в формате asyncpg ($n) и параметры WHERE
+
+        Текст запроса зависит только от формы запроса (таблица, поля, колонки
+        условий, порядок), а не от значений: списки передаются одним параметром
+        через = ANY($n). Поэтому кэш подготовленных выражений asyncpg
+        (statement_cache_size пула) переиспользует их, а сами строки SQL
+        кэшируются здесь по форме запроса.
+        """
+        shape = (
+            table,
+            tuple(fields),
+            tuple((key, isinstance(value, (list, tuple))) for key, value in where.items()),
+            order_by,
+        )
+        cached = self._pg_sql_cache.get(shape)
+        if cached is None:
+            conditions = []
+            for position, (key, is_list) in enumerate(shape[2], start=1):
+                conditions.append(f"{key} = ANY(${position})" if is_list else f"{key} = ${position}")
+            where_clause = "WHERE " + " AND ".join(conditions) if conditions else ""
+            fields_str = ", ".join(fields) if list(fields) != ["*"] else "*"
+            count_sql = f"SELECT COUNT(*) FROM {table} {where_clause}"
+            select_sql = (
+                f"SELECT {fields_str} FROM {table} {where_clause} ORDER BY {order_by} "
+                f"LIMIT ${len(conditions) + 1} OFFSET ${len(conditions) + 2}"
+            )
+            cached = (count_sql, select_sql)
+            self._pg_sql_cache[shape] = cached
+            while len(self._pg_sql_cache) > self.PG_SQL_CACHE_SIZE:
+                self._pg_sql_cache.popitem(last=False)
+        else:
+            self._pg_sql_cache.move_to_end(shape)
+
+        where_values = [list(value) if isinstance(value, tuple) else value for value in where.values()]
+        return cached[0], cached[1], where_values
+
+    @staticmethod
+    async def _pg_fetch(pool: Any, sql: str, *args: Any) -> List[Dict[str, Any]]:
+        """fetch через отдельное соединение пула"""
+        async with pool.acquire() as conn:
+            return [dict(record) for record in await conn.fetch(sql, *args)]
+
+    @staticmethod
+    async def _pg_fetchval(pool: Any, sql: str, *args: Any) -> Any:
+        """fetchval через отдельное соединение пула"""
+        async with pool.acquire() as conn:
+            return await conn.fetchval(sql, *args)
+
+    async def _query_postgres_async(self, pool: Any, query_type: str, query: Dict[str, Any]) -> QueryResult:
+        """Асинхронное выполнение запроса к PostgreSQL через пул asyncpg"""
+        try:
+            table = query.get("table")
+            if not table:
+                raise ValueError("Table name is required")
+
+            if query_type == "select":
+                limit = query.get("limit", 100)
+                offset = query.get("offset", 0)
+                count_sql, select_sql, where_values = self._pg_select_sql(
+                    table,
+                    query.get("fields", ["*"]),
+                    query.get("where", {}),
+                    query.get("order_by", "id DESC"),
+                )
+
+                rows_coro = self._pg_fetch(pool, select_sql, *where_values, limit, offset)
+                if query.get("count", True):
+                    # COUNT и выборка идут параллельно на разных соединениях пула
+                    total, rows = await asyncio.gather(
+                        self._pg_fetchval(pool, count_sql, *where_values), rows_coro
+                    )
+                else:
+                    rows = await rows_coro
+                    total = len(rows)
+
+                logger.debug("PostgreSQL SELECT: %s rows from %s", len(rows), table)
+
+                return QueryResult(
+                    data=rows,
+                    total=total,
+                    page=offset // limit + 1 if limit > 0 else 1,
+                    page_size=limit,
+                )
+
+            elif query_type == "insert":
+                values = query.get("values", {})
+                if not values:
+                    raise ValueError("Values are required for insert")
+
+                fields_str = ",".join(values.keys())
+                placeholders = ",".join(f"${i}" for i in range(1, len(values) + 1))
+                rows = await self._pg_fetch(
+                    pool,
+                    f"INSERT INTO {table} ({fields_str}) VALUES ({placeholders}) RETURNING *",
+                    *values.values(),
+                )
+
+                logger.debug("PostgreSQL INSERT: 1 row into %s", table)
+
+                return QueryResult(data=rows[:1], total=1)
+
+            elif query_type in ("update", "delete"):
+                values = query.get("values", {}) if query_type == "update" else {}
+                where = query.get("where", {})
+
+                if query_type == "update" and not values:
+                    raise ValueError("Values are required for update")
+                if not where:
+                    raise ValueError(f"WHERE clause is required for {query_type}")
+
+                where_clause = " AND ".join(
+                    f"{key} = ${i}" for i, key in enumerate(where.keys(), start=len(values) + 1)
+                )
+                if query_type == "update":
+                    set_clause = ", ".join(f"{key} = ${i}" for i, key in enumerate(values.keys(), start=1))
+                    sql = f"UPDATE {table} SET {set_clause} WHERE {where_clause} RETURNING *"
+                else:
+                    sql = f"DELETE FROM {table} WHERE {where_clause} RETURNING *"
+
+                rows = await self._pg_fetch(pool, sql, *values.values(), *where.values())
+
+                logger.debug("PostgreSQL %s: %s rows in %s", query_type.upper(), len(rows), table)
+
+                return QueryResult(data=rows, total=len(rows))
+
+            else:
+                raise ValueError(f"Unknown query type: {query_type}")
+
+        except Exception as e:
+            logger.error(f"PostgreSQL query failed: {e}", exc_info=True)
+            return QueryResult(data=[], total=0, metadata={"error": str(e)})
+
+    def _query_postgres_sync(self, query_type: str, query: Dict[str, Any]) -> QueryResult:
+        """Синхронное выполнение запроса через соединение psycopg2"""
+        cursor = None
         try:
             from psycopg2.extras import RealDictCursor
 
@@ -210,9 +591,11 @@ class UnifiedDataLayer:
                     where_clause = "WHERE " + " AND ".join(conditions)
 
                 # Count total
-                count_query = f"SELECT COUNT(*) as total FROM {table} {where_clause}"
-                cursor.execute(count_query, where_values)
-                total = cursor.fetchone()["total"]
+                total = None
+                if query.get("count", True):
+                    count_query = f"SELECT COUNT(*) as total FROM {table} {where_clause}"
+                    cursor.execute(count_query, where_values)
+                    total = cursor.fetchone()["total"]
 
                 # Select data
                 fields_str = ", ".join(fields) if fields != ["*"] else "*"
@@ -225,7 +608,7 @@ class UnifiedDataLayer:
 
                 return QueryResult(
                     data=[dict(row) for row in data],
-                    total=total,
+                    total=total if total is not None else len(data),
                     page=offset // limit + 1 if limit > 0 else 1,
                     page_size=limit,
                 )
@@ -355,9 +738,10 @@ class UnifiedDataLayer:
         Запрос к Qdrant (векторная БД)
 
         Args:
-            query_type: "search", "insert", "delete"
+            query_type: "search", "insert", "retrieve"
             query: Параметры запроса
                 - collection: название коллекции
+                - ids: id точек (для retrieve)
                 - vector: вектор для поиска
                 - limit: количество результатов
                 - filter: фильтры
@@ -365,7 +749,7 @@ class UnifiedDataLayer:
         Returns:
             QueryResult с данными
         """
-        if not self.qdrant:
+        if not self.qdrant and not self.qdrant_async:
             logger.error("Qdrant connection not initialized")
             return QueryResult(data=[], total=0)
 
@@ -385,7 +769,8 @@ class UnifiedDataLayer:
                     raise ValueError("Vector is required for search")
 
                 # Vector search
-                search_result = self.qdrant.search(
+                search_result = await self._qdrant_call(
+                    "search",
                     collection_name=collection,
                     query_vector=vector,
                     limit=limit,
@@ -405,12 +790,33 @@ class UnifiedDataLayer:
                 if not points:
                     raise ValueError("Points are required for insert")
 
-                self.qdrant.upsert(collection_name=collection, points=points)
+                await self._qdrant_call("upsert", collection_name=collection, points=points)
 
                 logger.debug(f"Qdrant insert: {len(points)} points")
 
                 return QueryResult(data=[], total=len(points))
 
+            elif query_type == "retrieve":
+                ids = query.get("ids")
+
+                if not ids:
+                    raise ValueError("Point ids are required for retrieve")
+
+                records = await self._qdrant_call(
+                    "retrieve",
+                    collection_name=collection,
+                    ids=ids,
+                    with_payload=True,
+                    with_vectors=query.get("with_vectors", False),
+                )
+
+                data = [{"id": record.id, "payload": record.payload, "vector": record.vector}
+                    for record in records]
+
+                logger.debug(f"Qdrant retrieve: {len(data)} points")
+
+                return QueryResult(data=data, total=len(data))
+
             else:
                 raise ValueError(f"Unknown query type: {query_type}")
 
@@ -418,6 +824,115 @@ class UnifiedDataLayer:
             logger.error(f"Qdrant query failed: {e}", exc_info=True)
             return QueryResult(data=[], total=0, metadata={"error": str(e)})
 
+    def _qdrant_call(self, method: str, **kwargs: Any) -> Awaitable[Any]:
+        """Вызов метода Qdrant: через AsyncQdrantClient или синхронный клиент в потоке"""
+        if self.qdrant_async is not None:
+            return getattr(self.qdrant_async, method)(**kwargs)
+        return asyncio.to_thread(getattr(self.qdrant, method), **kwargs)
+
+    async def stream(
+        self, query: Dict[str, Any], database: str = "postgres", chunk_size: int = 500
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Потоковая выборка больших результатов порциями
+
+        Для PostgreSQL используется серверный курсор asyncpg (без пула - постраничные
+        SELECT), для Qdrant - scroll. Параметры query те же, что у query("select")
+        и у коллекций Qdrant; limit=None - без ограничения.
+
+        Args:
+            query: Параметры запроса
+            database: "postgres" или "qdrant"
+            chunk_size: Размер порции
+
+        Yields:
+            Списки записей длиной не более chunk_size
+        """
+        if database == "postgres":
+            async for chunk in self._stream_postgres(query, chunk_size):
+                yield chunk
+        elif database == "qdrant":
+            async for chunk in self._stream_qdrant(query, chunk_size):
+                yield chunk
+        else:
+            raise ValueError(f"Streaming is not supported for database: {database}")
+
+    async def _stream_postgres(self, query: Dict[str, Any], chunk_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Потоковая выборка из PostgreSQL"""
+        table = query.get("table")
+        if not table:
+            raise ValueError("Table name is required")
+        limit = query.get("limit")
+        offset = query.get("offset", 0)
+
+        pool = self._get_postgres_pool()
+        if pool is None:
+            # Без asyncpg - постраничные запросы через обычный путь
+            while limit is None or limit > 0:
+                page_size = chunk_size if limit is None else min(chunk_size, limit)
+                page = await self._query_postgres(
+                    "select", {**query, "limit": page_size, "offset": offset, "count": False}
+                )
+                if "error" in page.metadata:
+                    raise RuntimeError(page.metadata["error"])
+                if not page.data:
+                    return
+                yield page.data
+                offset += len(page.data)
+                if limit is not None:
+                    limit -= len(page.data)
+                if len(page.data) < page_size:
+                    return
+            return
+
+        _, select_sql, where_values = self._pg_select_sql(
+            table, query.get("fields", ["*"]), query.get("where", {}), query.get("order_by", "id DESC")
+        )
+        async with pool.acquire() as conn:
+            # Серверный курсор asyncpg работает только внутри транзакции
+            async with conn.transaction():
+                chunk: List[Dict[str, Any]] = []
+                async for record in conn.cursor(select_sql, *where_values, limit, offset, prefetch=chunk_size):
+                    chunk.append(dict(record))
+                    if len(chunk) >= chunk_size:
+                        yield chunk
+                        chunk = []
+                if chunk:
+                    yield chunk
+
+    async def _stream_qdrant(self, query: Dict[str, Any], chunk_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Потоковое чтение точек коллекции Qdrant через scroll"""
+        collection = query.get("collection")
+        if not collection:
+            raise ValueError("Collection name is required")
+        remaining = query.get("limit")
+        filter_dict = query.get("filter")
+        scroll_filter = None
+        if filter_dict:
+            from qdrant_client.models import Filter
+
+            scroll_filter = Filter(**filter_dict)
+        next_offset = None
+
+        while remaining is None or remaining > 0:
+            page_size = chunk_size if remaining is None else min(chunk_size, remaining)
+            records, next_offset = await self._qdrant_call(
+                "scroll",
+                collection_name=collection,
+                scroll_filter=scroll_filter,
+                limit=page_size,
+                offset=next_offset,
+                with_payload=True,
+                with_vectors=query.get("with_vectors", False),
+            )
+            if records:
+                yield [{"id": record.id, "payload": record.payload, "vector": record.vector}
+                    for record in records]
+            if remaining is not None:
+                remaining -= len(records)
+            if next_offset is None or not records:
+                return
+
     async def _query_elasticsearch(self, query_type: str, query: Dict[str, Any]) -> QueryResult:
         """
         Запрос к Elasticsearch (полнотекстовый поиск)
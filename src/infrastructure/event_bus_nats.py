@@ -150,6 +150,21 @@ class NATSEventBus(EventBus):
 
         logger.info("Subscribed to NATS subject: %s", subject)
 
+    async def publish_raw(self, subject: str, data: bytes) -> None:
+        """
+        Публикация произвольных данных в subject через core NATS
+
+        Без JetStream и локальной истории - для эфемерных сообщений
+        (рассылки real-time между воркерами).
+        """
+        await self._nc.publish(subject, data)
+
+    async def subscribe_raw(self, subject: str, cb) -> Any:
+        """Подписка на subject (допускаются wildcard * и >) через core NATS"""
+        sub = await self._nc.subscribe(subject, cb=cb)
+        logger.info("Subscribed to raw NATS subject: %s", subject)
+        return sub
+
 
 class KafkaEventBus(EventBus):
     """
@@ -19,6 +19,7 @@ if os.getenv("IGNORE_PY_VERSION_CHECK") != "1" and sys.version_info[:2] != (
     raise RuntimeError(
         f"Python 3.11.x is required to run 1C AI Stack (detected {sys.version.split()[0]}).")
 
+import redis
 import redis.asyncio as aioredis
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from fastapi import APIRouter, FastAPI, Request, status
@@ -59,6 +60,10 @@ from src.middleware.metrics_middleware import MetricsMiddleware
 from src.middleware.security_headers import SecurityHeadersMiddleware
 from src.middleware.user_rate_limit import UserRateLimitMiddleware
 from src.middleware.ai_security_middleware import AISecurityMiddleware
+from src.middleware.asgi_pipeline import ASGIPipeline, RateLimitStage, create_default_stages
+from src.security.ai_security_layer import configure_shared_rate_limiter
+from src.services.real_time_backplane import NATSBackplane, RedisBackplane
+from src.services.real_time_service import real_time_manager
 from src.modules.admin_dashboard.api.routes import router as admin_dashboard_router
 
 # NEW: Analytics Router
@@ -286,7 +291,13 @@ async def lifespan(app: FastAPI):
                     logger.warning("Failed to get auth service: %s", auth_err)
                     auth_service = None
 
-                if auth_service:
+                if settings.use_asgi_middleware_pipeline:
+                    # Пользовательский rate limit - этап общего ASGI-конвейера
+                    for stage in middleware_pipeline_stages:
+                        if isinstance(stage, RateLimitStage):
+                            stage.configure(redis_client, user_rate_limit, user_rate_window)
+                    logger.info("User rate limit stage configured")
+                elif auth_service:
                     app.add_middleware(
                         UserRateLimitMiddleware,
                         redis_client=redis_client,
@@ -304,6 +315,48 @@ async def lifespan(app: FastAPI):
                     extra={"error": str(e), "error_type": type(e).__name__},
                 )
 
+        # Общий rate limit AI-агентов для всех воркеров (GCRA в Redis)
+        if redis_client and settings.ai_agent_rate_limit_shared:
+            try:
+                # validate_input синхронный - отдельный sync-клиент с коротким таймаутом
+                configure_shared_rate_limiter(
+                    redis.Redis(
+                        host=os.getenv("REDIS_HOST", "localhost"),
+                        port=int(os.getenv("REDIS_PORT", "6379")),
+                        password=os.getenv("REDIS_PASSWORD"),
+                        db=int(os.getenv("REDIS_DB", "0")),
+                        socket_connect_timeout=0.5,
+                        socket_timeout=0.1,
+                    )
+                )
+                logger.info("Shared AI agent rate limit enabled")
+            except Exception as e:
+                logger.warning(
+                    "Failed to enable shared AI agent rate limit",
+                    extra={"error": str(e), "error_type": type(e).__name__},
+                )
+
+        # Рассылки real-time на клиентов всех воркеров
+        if settings.realtime_backplane != "none":
+            try:
+                backplane = None
+                if settings.realtime_backplane == "redis" and redis_client:
+                    backplane = RedisBackplane(redis_client)
+                elif settings.realtime_backplane == "nats":
+                    backplane = NATSBackplane(nats_url=settings.nats_url)
+                if backplane is not None:
+                    real_time_manager.batch_interval = settings.realtime_backplane_batch_interval
+                    await real_time_manager.attach_backplane(backplane)
+                    logger.info("Real-time backplane enabled: %s", settings.realtime_backplane)
+                else:
+                    logger.warning(
+                        "Real-time backplane unavailable: %s", settings.realtime_backplane)
+            except Exception as e:
+                logger.warning(
+                    "Failed to enable real-time backplane",
+                    extra={"error": str(e), "error_type": type(e).__name__},
+                )
+
         logger.info("Security layer initialized (Agents Rule of Two)")
         logger.info("Application startup completed successfully")
 
@@ -335,8 +388,14 @@ async def lifespan(app: FastAPI):
             except Exception as e:
                 logger.warning("Error refreshing marketplace cache: %s", e)
 
+        try:
+            await real_time_manager.detach_backplane()
+        except Exception as e:
+            logger.warning("Error stopping real-time backplane: %s", e)
+
         # Close Redis
         if redis_client:
+            configure_shared_rate_limiter(None)
             try:
                 await redis_client.close()
                 # wait_closed() may not exist in all aioredis versions
@@ -413,23 +472,38 @@ app.add_middleware(
     max_age=3600,  # Cache preflight requests for 1 hour
 )
 
-# Security Headers (CRITICAL!)
-app.add_middleware(SecurityHeadersMiddleware)
-
-# AI Security Layer (Rule of Two)
-app.add_middleware(AISecurityMiddleware)
+middleware_pipeline_stages = []
 
-# Compression
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+if settings.use_asgi_middleware_pipeline:
+    # Compression
+    app.add_middleware(GZipMiddleware, minimum_size=1000)
 
-# Metrics
-app.add_middleware(MetricsMiddleware)
-# JWT User Context Middleware with error handling
-try:
-    auth_service = get_auth_service()
-    app.add_middleware(JWTUserContextMiddleware, auth_service=auth_service)
-except Exception as e:
-    logger.warning("Failed to add JWT middleware: %s", e)
+    # Metrics, JWT context, rate limit, security headers и AI Security одним ASGI-слоем
+    try:
+        auth_service = get_auth_service()
+    except Exception as e:
+        logger.warning("Failed to get auth service for middleware pipeline: %s", e)
+        auth_service = None
+    middleware_pipeline_stages = create_default_stages(auth_service=auth_service)
+    app.add_middleware(ASGIPipeline, stages=middleware_pipeline_stages)
+else:
+    # Security Headers (CRITICAL!)
+    app.add_middleware(SecurityHeadersMiddleware)
+
+    # AI Security Layer (Rule of Two)
+    app.add_middleware(AISecurityMiddleware)
+
+    # Compression
+    app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+    # Metrics
+    app.add_middleware(MetricsMiddleware)
+    # JWT User Context Middleware with error handling
+    try:
+        auth_service = get_auth_service()
+        app.add_middleware(JWTUserContextMiddleware, auth_service=auth_service)
+    except Exception as e:
+        logger.warning("Failed to add JWT middleware: %s", e)
 
 
 LEGACY_API_REDIRECT_ENABLED = settings.enable_legacy_api_redirect
@@ -1,3 +1,4 @@
+import asyncio
 import json
 from typing import Callable, Dict, Optional
 
@@ -7,10 +8,40 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.types import ASGIApp
 
 from src.infrastructure.logging.structured_logging import StructuredLogger
-from src.security.ai_security_layer import AGENT_CONFIGS, AISecurityLayer, AgentRuleOfTwoConfig
+from src.security.ai_security_layer import (
+    AGENT_CONFIGS,
+    AISecurityLayer,
+    AgentRuleOfTwoConfig,
+    SecurityCheck,
+)
 
 logger = StructuredLogger(__name__).logger
 
+# Map of URL prefixes to Agent IDs
+AGENT_ROUTES: Dict[str, str] = {
+    "/api/v1/sql_optimizer": "sql_optimizer",
+    "/api/v1/code_review": "code_review_ai",
+    "/api/v1/devops": "devops_ai",
+    "/api/v1/assistants/developer": "developer_ai",
+}
+
+
+def extract_input_text(body_text: str) -> Optional[str]:
+    """Извлекает проверяемый текст из тела запроса к агенту"""
+    try:
+        data = json.loads(body_text)
+        # Common fields in our API
+        return data.get("query") or data.get("code") or data.get("content") or data.get("prompt")
+    except json.JSONDecodeError:
+        return body_text
+
+
+async def validate_agent_input(security_layer: AISecurityLayer, **kwargs) -> SecurityCheck:
+    """validate_input; при лимите в Redis - в потоке, чтобы не блокировать event loop"""
+    if security_layer.rate_limit_blocks:
+        return await asyncio.to_thread(security_layer.validate_input, **kwargs)
+    return security_layer.validate_input(**kwargs)
+
 
 class AISecurityMiddleware(BaseHTTPMiddleware):
     """
@@ -21,13 +52,7 @@ class AISecurityMiddleware(BaseHTTPMiddleware):
     def __init__(self, app: ASGIApp):
         super().__init__(app)
         self.security_layer = AISecurityLayer()
-        # Map of URL prefixes to Agent IDs
-        self.agent_routes = {
-            "/api/v1/sql_optimizer": "sql_optimizer",
-            "/api/v1/code_review": "code_review_ai",
-            "/api/v1/devops": "devops_ai",
-            "/api/v1/assistants/developer": "developer_ai",
-        }
+        self.agent_routes = dict(AGENT_ROUTES)
 
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         # 1. Check if this is a protected agent route
@@ -60,7 +85,8 @@ class AISecurityMiddleware(BaseHTTPMiddleware):
                 # Get user_id from request state (populated by Auth middleware)
                 user_id = getattr(request.state, "user_id", "anonymous")
                 
-                security_check = self.security_layer.validate_input(
+                security_check = await validate_agent_input(
+                    self.security_layer,
                     user_input=user_input,
                     agent_id=agent_id,
                     agent_config=agent_config,
@@ -109,9 +135,4 @@ class AISecurityMiddleware(BaseHTTPMiddleware):
         return None
 
     def _extract_input_text(self, body_text: str) -> Optional[str]:
-        try:
-            data = json.loads(body_text)
-            # Common fields in our API
-            return data.get("query") or data.get("code") or data.get("content") or data.get("prompt")
-        except json.JSONDecodeError:
-            return body_text
+        return extract_input_text(body_text)
@@ -0,0 +1,491 @@
+"""
+Fused ASGI Middleware Pipeline
+
+Чистые ASGI-эквиваленты middleware из src/main.py (MetricsMiddleware,
+JWTUserContextMiddleware, UserRateLimitMiddleware / TieredRateLimitMiddleware,
+SecurityHeadersMiddleware, AISecurityMiddleware), собранные в один конвейер.
+
+Отличия от стека BaseHTTPMiddleware:
+- Один слой вместо шести: нет отдельной задачи и обёртки потока тела на каждый middleware
+- Контекст запроса (пользователь, тенант, агент) разбирается один раз и
+  доступен всем этапам и обработчикам через request.state
+- Тело запроса буферизуется только для защищённых маршрутов агентов
+- Счётчики rate limit (пользовательский и tiered) обновляются одним pipeline Redis
+- Security headers вычисляются один раз при создании этапа
+
+Каждый этап - PipelineStage с хуками on_request / on_response_start / on_complete.
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.middleware import metrics_middleware
+from src.middleware.ai_security_middleware import (
+    AGENT_ROUTES,
+    extract_input_text,
+    validate_agent_input,
+)
+from src.middleware.security_headers import get_security_headers
+from src.utils.structured_logging import StructuredLogger
+
+logger = StructuredLogger(__name__).logger
+
+RawHeaders = List[Tuple[bytes, bytes]]
+
+
+@dataclass
+class RequestContext:
+    """Контекст запроса, общий для всех этапов конвейера"""
+
+    scope: Scope
+    method: str
+    path: str
+    scheme: str
+    headers: Dict[str, str]
+    client_host: Optional[str]
+    started_at: float = field(default_factory=time.perf_counter)
+    user_id: Optional[str] = None
+    tenant_id: Optional[str] = None
+    current_user: Any = None
+    agent_id: Optional[str] = None
+    endpoint: Optional[str] = None
+    body: Optional[bytes] = None
+    status_code: int = 0
+    response_size: int = 0
+    extra: Dict[str, Any] = field(default_factory=dict)
+    _receive: Optional[Receive] = None
+
+    @classmethod
+    def from_scope(cls, scope: Scope, receive: Receive) -> "RequestContext":
+        """Разбирает scope один раз: заголовки, путь, клиент"""
+        headers = {
+            name.decode("latin-1").lower(): value.decode("latin-1")
+            for name, value in scope.get("headers", [])
+        }
+        client = scope.get("client")
+        return cls(
+            scope=scope,
+            method=scope.get("method", "GET"),
+            path=scope.get("path", "") or "",
+            scheme=scope.get("scheme", "http"),
+            headers=headers,
+            client_host=client[0] if client else None,
+            _receive=receive,
+        )
+
+    @property
+    def state(self) -> Dict[str, Any]:
+        """Хранилище request.state (Starlette читает его из scope["state"])"""
+        return self.scope.setdefault("state", {})
+
+    async def read_body(self) -> bytes:
+        """Читает и запоминает тело запроса (дальше оно отдаётся приложению из буфера)"""
+        if self.body is None:
+            chunks = []
+            more_body = True
+            while more_body:
+                message = await self._receive()
+                if message["type"] == "http.disconnect":
+                    break
+                chunks.append(message.get("body", b""))
+                more_body = message.get("more_body", False)
+            self.body = b"".join(chunks)
+        return self.body
+
+
+class PipelineStage:
+    """Этап конвейера. Все хуки необязательны."""
+
+    async def on_request(self, ctx: RequestContext) -> Optional[Response]:
+        """Вызывается до приложения; возвращённый ответ прерывает конвейер"""
+        return None
+
+    def on_response_start(self, ctx: RequestContext, headers: RawHeaders) -> None:
+        """Позволяет изменить заголовки ответа (в т.ч. ответов других этапов)"""
+
+    def on_complete(self, ctx: RequestContext, error: Optional[BaseException]) -> None:
+        """Вызывается после отправки ответа или ошибки"""
+
+
+class ASGIPipeline:
+    """
+    Один ASGI-слой, выполняющий все этапы
+
+    Usage:
+        app.add_middleware(ASGIPipeline, stages=create_default_stages(auth_service))
+    """
+
+    def __init__(self, app: ASGIApp, stages: Sequence[PipelineStage]):
+        self.app = app
+        self.stages = list(stages)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        ctx = RequestContext.from_scope(scope, receive)
+        ctx.state["request_context"] = ctx
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                ctx.status_code = message["status"]
+                headers = list(message.get("headers", []))
+                for stage in self.stages:
+                    stage.on_response_start(ctx, headers)
+                message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body":
+                ctx.response_size += len(message.get("body", b""))
+            await send(message)
+
+        error: Optional[BaseException] = None
+        try:
+            for stage in self.stages:
+                response = await stage.on_request(ctx)
+                if response is not None:
+                    await response(scope, receive, send_wrapper)
+                    return
+
+            if ctx.body is not None:
+                receive = _replay_body(ctx.body, receive)
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            for stage in self.stages:
+                try:
+                    stage.on_complete(ctx, error)
+                except Exception as e:
+                    logger.warning(
+                        "Pipeline stage on_complete failed",
+                        extra={"stage": type(stage).__name__, "error": str(e)},
+                    )
+
+
+def _replay_body(body: bytes, receive: Receive) -> Callable[[], Awaitable[Message]]:
+    """receive, отдающий буферизованное тело, а затем исходные сообщения (disconnect)"""
+    sent = False
+
+    async def replay() -> Message:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return replay
+
+
+def _extend_headers(headers: RawHeaders, values: Dict[str, str]) -> None:
+    """Заменяет заголовки ответа значениями из values"""
+    names = {name.lower().encode("latin-1") for name in values}
+    headers[:] = [item for item in headers if item[0].lower() not in names]
+    headers.extend((name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in values.items())
+
+
+class MetricsStage(PipelineStage):
+    """Эквивалент MetricsMiddleware: Prometheus-метрики и X-Process-Time / X-Endpoint"""
+
+    def on_response_start(self, ctx: RequestContext, headers: RawHeaders) -> None:
+        if ctx.path.startswith("/metrics"):
+            return
+        ctx.endpoint = metrics_middleware.normalize_endpoint(ctx.path)
+        duration = time.perf_counter() - ctx.started_at
+        _extend_headers(headers, {"X-Process-Time": f"{duration:.3f}", "X-Endpoint": ctx.endpoint})
+
+    def on_complete(self, ctx: RequestContext, error: Optional[BaseException]) -> None:
+        if ctx.path.startswith("/metrics") or not metrics_middleware.PROMETHEUS_AVAILABLE:
+            return
+        try:
+            metrics_middleware.track_request(
+                method=ctx.method[:10],
+                endpoint=ctx.endpoint or metrics_middleware.normalize_endpoint(ctx.path),
+                status_code=500 if error is not None or not ctx.status_code else ctx.status_code,
+                duration=time.perf_counter() - ctx.started_at,
+                size=ctx.response_size,
+            )
+        except Exception as e:
+            # Не прерываем запрос при ошибке метрик
+            logger.warning(
+                "Failed to track metrics",
+                extra={"error": str(e), "error_type": type(e).__name__},
+            )
+
+
+class RequestContextStage(PipelineStage):
+    """
+    Эквивалент JWTUserContextMiddleware
+
+    Bearer-токен декодируется один раз (если задан auth_service); результат
+    используется rate limit и AI security этапами и виден обработчикам
+    как request.state.user_id / tenant_id / current_user.
+    """
+
+    MAX_TOKEN_LENGTH = 1000
+
+    def __init__(
+        self,
+        auth_service: Any = None,
+        default_user_id: Optional[str] = "dev-user-1",
+        default_tenant_id: Optional[str] = "tenant-1",
+    ):
+        self.auth_service = auth_service
+        self.default_user_id = default_user_id
+        self.default_tenant_id = default_tenant_id
+
+    async def on_request(self, ctx: RequestContext) -> Optional[Response]:
+        current_user = self._decode_user(ctx.headers.get("authorization"))
+        user_id = getattr(current_user, "user_id", None) if current_user else None
+
+        ctx.current_user = current_user
+        ctx.user_id = str(user_id) if user_id else self.default_user_id
+        ctx.tenant_id = getattr(current_user, "tenant_id", None) or self.default_tenant_id
+
+        state = ctx.state
+        state["user_id"] = ctx.user_id
+        state["tenant_id"] = ctx.tenant_id
+        if current_user is not None:
+            state["current_user"] = current_user
+        return None
+
+    def _decode_user(self, authorization: Optional[str]) -> Any:
+        if not self.auth_service or not authorization or not authorization.lower().startswith("bearer "):
+            return None
+        token = authorization.split(" ", maxsplit=1)[1].strip()[: self.MAX_TOKEN_LENGTH]
+        try:
+            return self.auth_service.decode_token(token)
+        except Exception as e:
+            logger.debug(
+                f"Error decoding token in RequestContextStage: {e}",
+                extra={"error_type": type(e).__name__},
+            )
+            return None
+
+
+class RateLimitStage(PipelineStage):
+    """
+    Эквивалент UserRateLimitMiddleware и TieredRateLimitMiddleware
+
+    Оба счётчика обновляются одним pipeline Redis. Ключи совпадают с
+    ключами исходных middleware, поэтому переключение не сбрасывает окна.
+    Пока redis_client не задан (см. configure), этап пропускает запросы.
+    """
+
+    def __init__(
+        self,
+        redis_client: Any = None,
+        max_requests: Optional[int] = 60,
+        window_seconds: int = 60,
+        tiered: bool = False,
+    ):
+        self.redis = redis_client
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.tiered = tiered
+
+    def configure(self, redis_client: Any, max_requests: Optional[int] = None, window_seconds: Optional[int] = None) -> None:
+        """Подключает Redis после старта приложения"""
+        self.redis = redis_client
+        if max_requests is not None:
+            self.max_requests = max_requests
+        if window_seconds is not None:
+            self.window_seconds = window_seconds
+
+    async def on_request(self, ctx: RequestContext) -> Optional[Response]:
+        if self.redis is None:
+            return None
+
+        identity = self._identity(ctx)
+        if identity is None:
+            return None
+
+        window = int(time.time() // self.window_seconds)
+        limits: List[Tuple[str, int, Optional[str]]] = []
+        if self.max_requests:
+            limits.append((f"rl:{identity}:{window}", self.max_requests, None))
+        if self.tiered:
+            tier, tier_limit = self._tier(ctx)
+            limits.append((f"rl:v2:{tier}:{identity}:{window}", tier_limit, tier))
+        if not limits:
+            return None
+
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for key, _, _ in limits:
+                pipe.incr(key)
+            counts = await pipe.execute()
+
+            fresh = [key for (key, _, _), count in zip(limits, counts) if count == 1]
+            if fresh:
+                pipe = self.redis.pipeline(transaction=False)
+                for key in fresh:
+                    pipe.expire(key, self.window_seconds)
+                await pipe.execute()
+        except Exception as e:
+            # Graceful fallback: allow request if Redis fails
+            logger.error(
+                f"Error checking rate limit: {e}",
+                extra={"error_type": type(e).__name__, "path": ctx.path},
+            )
+            return None
+
+        for (key, limit, tier), count in zip(limits, counts):
+            if tier is not None:
+                ctx.extra["rate_limit"] = (limit, max(0, limit - count))
+            if count > limit:
+                return self._reject(ctx, key, limit, count, tier)
+        return None
+
+    def on_response_start(self, ctx: RequestContext, headers: RawHeaders) -> None:
+        rate_limit = ctx.extra.get("rate_limit")
+        if rate_limit:
+            limit, remaining = rate_limit
+            _extend_headers(
+                headers,
+                {
+                    "X-RateLimit-Limit": str(limit),
+                    "X-RateLimit-Remaining": str(remaining),
+                    "X-RateLimit-Reset": str(int(time.time()) + self.window_seconds),
+                },
+            )
+
+    def _identity(self, ctx: RequestContext) -> Optional[str]:
+        user_id = getattr(ctx.current_user, "user_id", None) if ctx.current_user else None
+        if user_id:
+            return "user:" + str(user_id).replace(":", "").replace(" ", "")
+        if ctx.client_host:
+            return "ip:" + ctx.client_host.replace(":", "").replace(" ", "")
+        return None
+
+    def _tier(self, ctx: RequestContext) -> Tuple[str, int]:
+        from src.middleware.tiered_rate_limit import TIER_LIMITS, UserTier
+
+        if "/revolutionary" in ctx.path:
+            tier = UserTier.REVOLUTIONARY
+        else:
+            user_tier = getattr(ctx.current_user, "tier", None) if ctx.current_user else None
+            tier = {"enterprise": UserTier.ENTERPRISE, "pro": UserTier.PRO}.get(user_tier, UserTier.FREE)
+        return tier.value, TIER_LIMITS[tier]
+
+    def _reject(self, ctx: RequestContext, key: str, limit: int, count: int, tier: Optional[str]) -> Response:
+        logger.warning(
+            "Rate limit exceeded",
+            extra={"limiter_key": key, "current_value": count, "max_requests": limit, "path": ctx.path},
+        )
+        if tier is not None:
+            from src.middleware.tiered_rate_limit import rate_limit_exceeded
+
+            rate_limit_exceeded.labels(tier=tier, path=ctx.path).inc()
+
+        return JSONResponse(
+            status_code=429,
+            content={
+                "detail": f"Too many requests, please try again later. Limit: {limit} per {self.window_seconds}s"
+            },
+            headers={
+                "X-RateLimit-Limit": str(limit),
+                "X-RateLimit-Remaining": "0",
+                "X-RateLimit-Reset": str(int(time.time()) + self.window_seconds),
+                "Retry-After": str(self.window_seconds),
+            },
+        )
+
+
+class SecurityHeadersStage(PipelineStage):
+    """Эквивалент SecurityHeadersMiddleware; заголовки вычисляются один раз"""
+
+    def __init__(self) -> None:
+        self._headers = {
+            False: get_security_headers(is_https=False),
+            True: get_security_headers(is_https=True),
+        }
+
+    def on_response_start(self, ctx: RequestContext, headers: RawHeaders) -> None:
+        _extend_headers(headers, self._headers[ctx.scheme == "https"])
+
+
+class AISecurityStage(PipelineStage):
+    """
+    Эквивалент AISecurityMiddleware (Rule of Two)
+
+    Тело читается только для маршрутов агентов, у которых есть конфигурация;
+    остальные запросы проходят без буферизации.
+    """
+
+    def __init__(self, security_layer: Any = None, agent_routes: Optional[Dict[str, str]] = None):
+        from src.security.ai_security_layer import AGENT_CONFIGS, AISecurityLayer
+
+        self.security_layer = security_layer or AISecurityLayer()
+        self.agent_configs = AGENT_CONFIGS
+        self.agent_routes = tuple((agent_routes or AGENT_ROUTES).items())
+
+    async def on_request(self, ctx: RequestContext) -> Optional[Response]:
+        agent_id = next((agent for route, agent in self.agent_routes if ctx.path.startswith(route)), None)
+        if not agent_id:
+            return None
+
+        ctx.agent_id = agent_id
+        ctx.state["agent_id"] = agent_id
+
+        agent_config = self.agent_configs.get(agent_id)
+        if not agent_config:
+            logger.warning(f"No security config found for agent {agent_id}, allowing request but logging warning.")
+            return None
+
+        try:
+            body = await ctx.read_body()
+            user_input = extract_input_text(body.decode("utf-8"))
+            if user_input:
+                security_check = await validate_agent_input(
+                    self.security_layer,
+                    user_input=user_input,
+                    agent_id=agent_id,
+                    agent_config=agent_config,
+                    context={"user_id": str(ctx.user_id or "anonymous")},
+                )
+                if not security_check.allowed:
+                    logger.warning(f"Blocked request to {agent_id}: {security_check.reason}")
+                    return JSONResponse(
+                        status_code=403,
+                        content={
+                            "error": "Security Check Failed",
+                            "reason": security_check.reason,
+                            "details": security_check.details,
+                        },
+                    )
+        except Exception as e:
+            logger.error(f"Error in AI Security stage input validation: {e}", exc_info=True)
+            # Fail closed for security
+            return JSONResponse(status_code=500, content={"error": "Internal Security Error"})
+
+        return None
+
+
+def create_default_stages(
+    auth_service: Any = None,
+    redis_client: Any = None,
+    max_requests: Optional[int] = 60,
+    window_seconds: int = 60,
+    tiered_rate_limit: bool = False,
+) -> List[PipelineStage]:
+    """
+    Этапы в порядке стека из src/main.py: метрики снаружи, затем контекст
+    пользователя, rate limit, security headers и проверка AI-агентов
+    """
+    return [
+        MetricsStage(),
+        RequestContextStage(auth_service=auth_service),
+        RateLimitStage(
+            redis_client=redis_client,
+            max_requests=max_requests,
+            window_seconds=window_seconds,
+            tiered=tiered_rate_limit,
+        ),
+        SecurityHeadersStage(),
+        AISecurityStage(),
+    ]
@@ -20,7 +20,7 @@ Features:
 """
 
 import os
-from typing import Callable
+from typing import Callable, Dict
 
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
@@ -37,11 +37,9 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
         return await security_headers_middleware(request, call_next)
 
 
-async def security_headers_middleware(
-    request: Request, call_next: Callable
-) -> Response:
+def get_security_headers(is_https: bool) -> Dict[str, str]:
     """
-    Add security headers to all responses
+    Набор security headers для ответа
 
     Headers:
     - Content-Security-Policy: Prevents XSS
@@ -51,59 +49,69 @@ async def security_headers_middleware(
     - Referrer-Policy: Controls referrer info
     - Permissions-Policy: Controls browser features
     """
-    try:
-        response = await call_next(request)
-
-        # Content Security Policy (CSP)
-        # Best practice: Strict CSP, allow only necessary sources
-        # Added cdn.jsdelivr.net for Swagger UI
-        csp_policy = os.getenv(
-            "CSP_POLICY",
-            "default-src 'self'; "
-            # Allow Swagger UI scripts
-            "script-src 'self' 'unsafe-inline' 'unsafe-eval' https://cdn.jsdelivr.net; "
-            "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; " # Allow Swagger UI styles
-            "img-src 'self' data: https:; "
-            "font-src 'self' data:; "
-            # Allow WebSocket (for local dev and Kasperski)
-            "connect-src 'self' https://api.openai.com https://api.deepseek.com ws: wss:; "
-            "frame-ancestors 'none'; "
-            "base-uri 'self'; "
-            "form-action 'self';",
+    # Content Security Policy (CSP)
+    # Best practice: Strict CSP, allow only necessary sources
+    # Added cdn.jsdelivr.net for Swagger UI
+    csp_policy = os.getenv(
+        "CSP_POLICY",
+        "default-src 'self'; "
+        # Allow Swagger UI scripts
+        "script-src 'self' 'unsafe-inline' 'unsafe-eval' https://cdn.jsdelivr.net; "
+        "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; " # Allow Swagger UI styles
+        "img-src 'self' data: https:; "
+        "font-src 'self' data:; "
+        # Allow WebSocket (for local dev and Kasperski)
+        "connect-src 'self' https://api.openai.com https://api.deepseek.com ws: wss:; "
+        "frame-ancestors 'none'; "
+        "base-uri 'self'; "
+        "form-action 'self';",
+    )
+
+    # Validate CSP policy length (prevent DoS)
+    if len(csp_policy) > 2000:
+        logger.warning(
+            "CSP policy too long, truncating",
+            extra={"csp_length": len(csp_policy), "max_length": 2000},
         )
+        csp_policy = csp_policy[:2000]
 
-        # Validate CSP policy length (prevent DoS)
-        if len(csp_policy) > 2000:
-            logger.warning(
-                "CSP policy too long, truncating",
-                extra={"csp_length": len(csp_policy), "max_length": 2000},
-            )
-            csp_policy = csp_policy[:2000]
+    headers = {
+        "Content-Security-Policy": csp_policy,
+        # Prevent clickjacking
+        "X-Frame-Options": "DENY",
+        # Prevent MIME sniffing
+        "X-Content-Type-Options": "nosniff",
+    }
 
-        response.headers["Content-Security-Policy"] = csp_policy
+    # Force HTTPS (only in production)
+    if is_https:
+        headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
 
-        # Prevent clickjacking
-        response.headers["X-Frame-Options"] = "DENY"
+    # Referrer policy
+    headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
 
-        # Prevent MIME sniffing
-        response.headers["X-Content-Type-Options"] = "nosniff"
+    # Permissions policy (disable unnecessary features)
+    headers["Permissions-Policy"] = (
+        "camera=(), microphone=(), geolocation=(), interest-cohort=()"
+    )
 
-        # Force HTTPS (only in production)
-        if request.url.scheme == "https":
-            response.headers["Strict-Transport-Security"] = (
-                "max-age=31536000; includeSubDomains"
-            )
+    # XSS Protection (legacy, but doesn't hurt)
+    headers["X-XSS-Protection"] = "1; mode=block"
 
-        # Referrer policy
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+    return headers
 
-        # Permissions policy (disable unnecessary features)
-        response.headers["Permissions-Policy"] = (
-            "camera=(), microphone=(), geolocation=(), interest-cohort=()"
-        )
 
-        # XSS Protection (legacy, but doesn't hurt)
-        response.headers["X-XSS-Protection"] = "1; mode=block"
+async def security_headers_middleware(
+    request: Request, call_next: Callable
+) -> Response:
+    """
+    Add security headers to all responses (см. get_security_headers)
+    """
+    try:
+        response = await call_next(request)
+
+        for name, value in get_security_headers(request.url.scheme == "https").items():
+            response.headers[name] = value
 
         logger.debug(
             "Security headers added",
@@ -6,11 +6,18 @@ Implements Isolation Forest for detecting anomalies in:
 - System metrics
 - Performance data
 - Security events
+
+Признаки извлекаются векторно по колонкам (dict колонок, pandas
+DataFrame или список записей). detect_stream оценивает микробатчи из
+асинхронного потока и может дообучать модель на скользящем окне.
 """
 
+import asyncio
 import logging
+import operator
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+from itertools import repeat
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Sequence, Tuple, Union
 
 import numpy as np
 from sklearn.ensemble import IsolationForest
@@ -18,6 +25,119 @@ from sklearn.preprocessing import StandardScaler
 
 logger = logging.getLogger(__name__)
 
+# Записи (список dict) или колонки: dict колонок / pandas DataFrame
+LogData = Union[Sequence[Dict[str, Any]], Mapping[str, Sequence[Any]], Any]
+
+_STREAM_END = object()
+
+_MONTH_DAYS = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def _column(data: LogData, name: str, default: Any, size: int) -> np.ndarray:
+    """Колонка как ndarray; для списка записей - один проход по записям"""
+    if isinstance(data, (list, tuple)):
+        return np.asarray([entry.get(name, default) for entry in data], dtype=object)
+    columns = getattr(data, "columns", data)
+    if name in columns:
+        values = data[name]
+        return np.asarray(getattr(values, "to_numpy", lambda: values)(), dtype=object)
+    return np.full(size, default, dtype=object)
+
+
+def _numeric_column(data: LogData, name: str, default: float, size: int) -> np.ndarray:
+    values = _column(data, name, default, size)
+    # None в числовых колонках - как отсутствующее значение
+    values[values == None] = default  # noqa: E711
+    return values.astype(np.float64)
+
+
+def _data_length(data: LogData) -> int:
+    if isinstance(data, (list, tuple)):
+        return len(data)
+    if hasattr(data, "columns"):
+        return len(data)
+    return max((len(values) for values in data.values()), default=0)
+
+
+def _days_from_civil(year: np.ndarray, month: np.ndarray, day: np.ndarray) -> np.ndarray:
+    """Дни от 1970-01-01 для колонок года, месяца и дня (пролептический григорианский)"""
+    year = year - (month <= 2)
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * ((month + 9) % 12) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+def _parse_iso_columns(strings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Часы и дни от эпохи для ISO-строк арифметикой над кодами символов
+
+    Разбираются только "YYYY-MM-DD" и "YYYY-MM-DD[T ]HH...": время по
+    смещению самой строки, как у fromisoformat. Остальные строки
+    разбирает NumPy (некорректные - ValueError, как раньше).
+    """
+    fixed = strings.astype("U19")
+    codes = fixed.view(np.uint32).reshape(len(fixed), 19).astype(np.int64)
+    digits = codes - ord("0")
+    is_digit = (digits >= 0) & (digits <= 9)
+
+    has_time = np.isin(codes[:, 10], (ord("T"), ord(" ")))
+    valid = (
+        is_digit[:, [0, 1, 2, 3, 5, 6, 8, 9]].all(axis=1)
+        & (codes[:, 4] == ord("-"))
+        & (codes[:, 7] == ord("-"))
+        & ((codes[:, 10] == 0) | (has_time & is_digit[:, 11] & is_digit[:, 12]))
+    )
+
+    year = digits[:, 0] * 1000 + digits[:, 1] * 100 + digits[:, 2] * 10 + digits[:, 3]
+    month = digits[:, 5] * 10 + digits[:, 6]
+    day = digits[:, 8] * 10 + digits[:, 9]
+    hours = np.where(has_time, digits[:, 11] * 10 + digits[:, 12], 0)
+    days = _days_from_civil(year, month, day)
+
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    month_days = _MONTH_DAYS[np.clip(month, 1, 12) - 1] + (leap & (month == 2))
+    valid &= (month >= 1) & (month <= 12) & (day >= 1) & (day <= month_days) & (hours < 24)
+    if not valid.all():
+        parsed = fixed[~valid].astype("datetime64[s]")
+        hours[~valid] = parsed.astype("datetime64[h]").astype(np.int64) % 24
+        days[~valid] = parsed.astype("datetime64[D]").astype(np.int64)
+    return hours, days
+
+
+def _timestamp_features(timestamps: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Час и день недели для колонки меток времени
+
+    ISO-строки разбираются векторно; datetime-объекты - без таймзоны
+    (час по их собственному смещению), отсутствующие - текущее время.
+    """
+    size = len(timestamps)
+    is_str = np.fromiter(map(isinstance, timestamps, repeat(str)), dtype=bool, count=size)
+    hours = np.zeros(size, dtype=np.int64)
+    days = np.zeros(size, dtype=np.int64)
+    if is_str.any():
+        hours[is_str], days[is_str] = _parse_iso_columns(timestamps[is_str])
+    if not is_str.all():
+        now = datetime.now()
+        parsed = np.array(
+            [(t or now).replace(tzinfo=None) for t in timestamps[~is_str]], dtype="datetime64[s]"
+        )
+        hours[~is_str] = parsed.astype("datetime64[h]").astype(np.int64) % 24
+        days[~is_str] = parsed.astype("datetime64[D]").astype(np.int64)
+
+    # 1970-01-01 - четверг (weekday() == 3)
+    return hours, (days + 3) % 7
+
+
+def _dictionary_encode(values: np.ndarray) -> Tuple[np.ndarray, List[Any]]:
+    """Коды и словарь различных значений (уровней логов мало - словарь крошечный)"""
+    distinct = list(dict.fromkeys(values))
+    index = {value: code for code, value in enumerate(distinct)}
+    codes = np.fromiter(map(index.__getitem__, values), dtype=np.int64, count=len(values))
+    return codes, distinct
+
 
 class AnomalyDetector:
     """
@@ -28,12 +148,37 @@ class AnomalyDetector:
     - Metric anomaly detection
     - Adaptive thresholds
     - Feature extraction
+    - Streaming detection with incremental model update
     """
 
+    LOG_FEATURES = (
+        "hour_of_day",
+        "day_of_week",
+        "log_level_error",
+        "log_level_warning",
+        "message_length",
+        "has_exception",
+        "response_time",
+        "status_code"
+    )
+
+    METRIC_FEATURES = (
+        "cpu_usage",
+        "memory_usage",
+        "disk_usage",
+        "network_in",
+        "network_out",
+        "request_rate",
+        "error_rate",
+        "response_time_p95"
+    )
+
     def __init__(
         self,
         contamination: float = 0.1,
-        n_estimators: int = 100
+        n_estimators: int = 100,
+        window_size: int = 10000,
+        refit_every: int = 5000
     ):
         """
         Initialize anomaly detector
@@ -41,16 +186,15 @@ class AnomalyDetector:
         Args:
             contamination: Expected proportion of anomalies (0.1 = 10%)
             n_estimators: Number of trees in forest
+            window_size: Скользящее окно признаков для дообучения в потоке
+            refit_every: Через сколько новых записей переобучать модель на окне
         """
         self.logger = logging.getLogger("anomaly_detector")
+        self.contamination = contamination
+        self.n_estimators = n_estimators
 
         # Isolation Forest model
-        self.model = IsolationForest(
-            contamination=contamination,
-            n_estimators=n_estimators,
-            random_state=42,
-            n_jobs=-1  # Use all CPU cores
-        )
+        self.model = self._new_model()
 
         # Scaler for normalization
         self.scaler = StandardScaler()
@@ -61,109 +205,101 @@ class AnomalyDetector:
         # Feature names for interpretability
         self.feature_names = []
 
+        # Incremental update: кольцевой буфер последних признаков
+        self.window_size = window_size
+        self.refit_every = refit_every
+        self._window: Optional[np.ndarray] = None
+        self._window_pos = 0
+        self._window_filled = 0
+        self._since_refit = 0
+        self._refit_task: Optional[asyncio.Task] = None
+        self.refits = 0
+
+    def _new_model(self) -> IsolationForest:
+        return IsolationForest(
+            contamination=self.contamination,
+            n_estimators=self.n_estimators,
+            random_state=42,
+            n_jobs=-1  # Use all CPU cores
+        )
+
     def extract_log_features(
         self,
-        log_entries: List[Dict[str, Any]]
+        log_entries: LogData
     ) -> Tuple[np.ndarray, List[str]]:
         """
         Extract features from log entries
 
         Args:
-            log_entries: List of log entries
+            log_entries: List of log entries или колонки
+                (dict колонок, pandas DataFrame)
 
         Returns:
             Feature matrix and feature names
         """
-        features = []
-        feature_names = [
-            "hour_of_day",
-            "day_of_week",
-            "log_level_error",
-            "log_level_warning",
-            "message_length",
-            "has_exception",
-            "response_time",
-            "status_code"
-        ]
-
-        for entry in log_entries:
-            # Temporal features
-            timestamp = entry.get("timestamp", datetime.now())
-            if isinstance(timestamp, str):
-                timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-
-            hour = timestamp.hour
-            day_of_week = timestamp.weekday()
-
-            # Log level features
-            level = entry.get("level", "INFO").upper()
-            is_error = 1 if level == "ERROR" else 0
-            is_warning = 1 if level == "WARNING" else 0
-
-            # Message features
-            message = entry.get("message", "")
-            message_length = len(message)
-            has_exception = 1 if "exception" in message.lower() or "error" in message.lower() else 0
-
-            # Performance features
-            response_time = entry.get("response_time", 0)
-            status_code = entry.get("status_code", 200)
-
-            features.append([
-                hour,
-                day_of_week,
+        size = _data_length(log_entries)
+        if size == 0:
+            return np.empty((0, len(self.LOG_FEATURES))), list(self.LOG_FEATURES)
+
+        # Temporal features
+        hours, days_of_week = _timestamp_features(_column(log_entries, "timestamp", None, size))
+
+        # Log level features
+        # Словарное кодирование: upper() только для различных уровней
+        level_codes, distinct = _dictionary_encode(_column(log_entries, "level", "INFO", size))
+        distinct = np.array([str(level).upper() for level in distinct])
+        is_error = (distinct == "ERROR")[level_codes]
+        is_warning = (distinct == "WARNING")[level_codes]
+
+        # Message features - lower() один раз на сообщение
+        messages = _column(log_entries, "message", "", size)
+        lowered = list(map(str.lower, messages))
+        has_exception = np.fromiter(
+            map(operator.contains, lowered, repeat("exception")), dtype=bool, count=size
+        ) | np.fromiter(map(operator.contains, lowered, repeat("error")), dtype=bool, count=size)
+        message_lengths = np.fromiter(map(len, messages), dtype=np.int64, count=size)
+
+        features = np.column_stack(
+            [
+                hours,
+                days_of_week,
                 is_error,
                 is_warning,
-                message_length,
+                message_lengths,
                 has_exception,
-                response_time,
-                status_code
-            ])
+                # Performance features
+                _numeric_column(log_entries, "response_time", 0, size),
+                _numeric_column(log_entries, "status_code", 200, size),
+            ]
+        ).astype(np.float64)
 
-        return np.array(features), feature_names
+        return features, list(self.LOG_FEATURES)
 
     def extract_metric_features(
         self,
-        metrics: List[Dict[str, Any]]
+        metrics: LogData
     ) -> Tuple[np.ndarray, List[str]]:
         """
         Extract features from system metrics
 
         Args:
-            metrics: List of metric data points
+            metrics: List of metric data points или колонки
 
         Returns:
             Feature matrix and feature names
         """
-        features = []
-        feature_names = [
-            "cpu_usage",
-            "memory_usage",
-            "disk_usage",
-            "network_in",
-            "network_out",
-            "request_rate",
-            "error_rate",
-            "response_time_p95"
-        ]
-
-        for metric in metrics:
-            features.append([
-                metric.get("cpu_usage", 0),
-                metric.get("memory_usage", 0),
-                metric.get("disk_usage", 0),
-                metric.get("network_in", 0),
-                metric.get("network_out", 0),
-                metric.get("request_rate", 0),
-                metric.get("error_rate", 0),
-                metric.get("response_time_p95", 0)
-            ])
+        size = _data_length(metrics)
+        if size == 0:
+            return np.empty((0, len(self.METRIC_FEATURES))), list(self.METRIC_FEATURES)
 
-        return np.array(features), feature_names
+        features = np.column_stack(
+            [_numeric_column(metrics, name, 0, size) for name in self.METRIC_FEATURES]
+        )
+        return features, list(self.METRIC_FEATURES)
 
     def train(
         self,
-        data: List[Dict[str, Any]],
+        data: LogData,
         data_type: str = "logs"
     ) -> Dict[str, Any]:
         """
@@ -191,16 +327,9 @@ class AnomalyDetector:
                     "message": "Need at least 10 samples for training"
                 }
 
-            # Normalize features
-            X_scaled = self.scaler.fit_transform(X)
-
-            # Train model
-            self.model.fit(X_scaled)
+            self.model, self.scaler, scores = self._fit(X)
             self.is_trained = True
 
-            # Get anomaly scores for training data
-            scores = self.model.score_samples(X_scaled)
-
             self.logger.info(
                 f"Trained anomaly detector on {len(X)} samples",
                 extra={
@@ -222,9 +351,18 @@ class AnomalyDetector:
             self.logger.error("Training failed: %s", e)
             return {"status": "failed", "error": str(e)}
 
+    def _fit(self, X: np.ndarray) -> Tuple[IsolationForest, StandardScaler, np.ndarray]:
+        """Обучает новые scaler и модель; текущие не трогает до подмены"""
+        scaler = StandardScaler()
+        X_scaled = scaler.fit_transform(X)
+        model = self._new_model()
+        model.fit(X_scaled)
+        # Get anomaly scores for training data
+        return model, scaler, model.score_samples(X_scaled)
+
     def detect(
         self,
-        data: List[Dict[str, Any]],
+        data: LogData,
         data_type: str = "logs"
     ) -> Dict[str, Any]:
         """
@@ -250,49 +388,221 @@ class AnomalyDetector:
             else:
                 X, _ = self.extract_metric_features(data)
 
-            # Normalize
-            X_scaled = self.scaler.transform(X)
-
-            # Predict anomalies (-1 = anomaly, 1 = normal)
-            predictions = self.model.predict(X_scaled)
-
-            # Get anomaly scores (lower = more anomalous)
-            scores = self.model.score_samples(X_scaled)
-
-            # Find anomalies
-            anomalies = []
-            for i, (pred, score) in enumerate(zip(predictions, scores)):
-                if pred == -1:
-                    anomalies.append({
-                        "index": i,
-                        "data": data[i],
-                        "anomaly_score": float(score),
-                        "severity": self._calculate_severity(score)
-                    })
-
-            # Sort by severity
-            anomalies.sort(key=lambda x: x["anomaly_score"])
+            result = self._detect_features(X, data, self.model, self.scaler)
 
             self.logger.info(
-                f"Detected {len(anomalies)} anomalies in {len(data)} samples",
+                f"Detected {result['anomalies_count']} anomalies in {len(X)} samples",
                 extra={
                     "data_type": data_type,
-                    "anomaly_rate": len(anomalies) / len(data) if data else 0
+                    "anomaly_rate": result["anomaly_rate"]
                 }
             )
+            return result
 
+        except Exception as e:
+            self.logger.error("Detection failed: %s", e)
+            return {"status": "failed", "error": str(e)}
+
+    def _detect_features(
+        self,
+        X: np.ndarray,
+        data: LogData,
+        model: IsolationForest,
+        scaler: StandardScaler
+    ) -> Dict[str, Any]:
+        """Оценка готовой матрицы признаков (model и scaler - согласованная пара)"""
+        total = len(X)
+        if total == 0:
             return {
                 "status": "completed",
-                "total_samples": len(data),
-                "anomalies_count": len(anomalies),
-                "anomaly_rate": len(anomalies) / len(data) if data else 0,
-                "anomalies": anomalies[:10],  # Top 10 most anomalous
-                "all_scores": scores.tolist()
+                "total_samples": 0,
+                "anomalies_count": 0,
+                "anomaly_rate": 0,
+                "anomalies": [],
+                "all_scores": []
             }
 
+        # Normalize
+        X_scaled = scaler.transform(X)
+
+        # Get anomaly scores (lower = more anomalous); predict() = порог offset_
+        scores = model.score_samples(X_scaled)
+        anomaly_indices = np.flatnonzero(scores - model.offset_ < 0)
+
+        # Sort by severity
+        anomaly_indices = anomaly_indices[np.argsort(scores[anomaly_indices], kind="stable")]
+
+        anomalies = [
+            {
+                "index": int(i),
+                "data": self._row(data, int(i)),
+                "anomaly_score": float(scores[i]),
+                "severity": self._calculate_severity(scores[i])
+            }
+            for i in anomaly_indices[:10]  # Top 10 most anomalous
+        ]
+
+        return {
+            "status": "completed",
+            "total_samples": total,
+            "anomalies_count": len(anomaly_indices),
+            "anomaly_rate": len(anomaly_indices) / total,
+            "anomalies": anomalies,
+            "all_scores": scores.tolist()
+        }
+
+    @staticmethod
+    def _row(data: LogData, index: int) -> Dict[str, Any]:
+        """Запись по индексу для списка записей и колонок"""
+        if isinstance(data, (list, tuple)):
+            return data[index]
+        if hasattr(data, "iloc"):
+            return data.iloc[index].to_dict()
+        return {name: values[index] for name, values in data.items()}
+
+    # ------------------------------------------------------------------ #
+    # Потоковая детекция
+    # ------------------------------------------------------------------ #
+
+    def update(self, X: np.ndarray) -> bool:
+        """
+        Добавляет признаки в скользящее окно
+
+        IsolationForest не умеет partial_fit, поэтому модель и scaler
+        переобучаются на окне последних window_size записей каждые
+        refit_every записей (см. _refit_in_background). Возвращает True,
+        если пора переобучать.
+        """
+        if len(X) == 0:
+            return False
+        if self._window is None or self._window.shape[1] != X.shape[1]:
+            self._window = np.empty((self.window_size, X.shape[1]))
+            self._window_pos = self._window_filled = 0
+
+        rows = X[-self.window_size:]
+        end = self._window_pos + len(rows)
+        if end <= self.window_size:
+            self._window[self._window_pos:end] = rows
+        else:
+            split = self.window_size - self._window_pos
+            self._window[self._window_pos:] = rows[:split]
+            self._window[:end - self.window_size] = rows[split:]
+        self._window_pos = end % self.window_size
+        self._window_filled = min(self.window_size, self._window_filled + len(rows))
+        self._since_refit += len(X)
+
+        if not self.is_trained:
+            return self._window_filled >= 10
+        return self._since_refit >= self.refit_every
+
+    async def _refit_in_background(self) -> None:
+        X = self._window[:self._window_filled].copy()
+        self._since_refit = 0
+        try:
+            model, scaler, _ = await asyncio.to_thread(self._fit, X)
         except Exception as e:
-            self.logger.error("Detection failed: %s", e)
-            return {"status": "failed", "error": str(e)}
+            self.logger.error("Incremental refit failed: %s", e)
+            return
+        # Подмена пары модель/scaler одним шагом в цикле событий
+        self.model, self.scaler = model, scaler
+        self.is_trained = True
+        self.refits += 1
+        self.logger.info(f"Anomaly detector refitted on {len(X)} recent samples")
+
+    async def detect_stream(
+        self,
+        source: AsyncIterator[Any],
+        data_type: str = "logs",
+        batch_size: int = 1000,
+        max_delay: float = 1.0,
+        update: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Потоковая детекция по микробатчам
+
+        Args:
+            source: Асинхронный поток записей (dict) или готовых пачек (list)
+            data_type: "logs" или "metrics"
+            batch_size: Максимальный размер микробатча
+            max_delay: Максимальное ожидание неполного батча (секунды)
+            update: Дообучать модель на скользящем окне; без обученной
+                модели она обучается, как только наберётся 10 записей
+
+        Yields:
+            Результат detect() для каждого микробатча (+ batch_index)
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=batch_size * 4)
+
+        async def pump():
+            try:
+                async for item in source:
+                    await queue.put(item)
+            except Exception as e:
+                self.logger.error("Anomaly stream source failed: %s", e)
+            # Не в finally: после отмены очередь может быть полна, и put() не вернётся
+            await queue.put(_STREAM_END)
+
+        pump_task = asyncio.get_running_loop().create_task(pump())
+        extract = self.extract_log_features if data_type == "logs" else self.extract_metric_features
+        batch_index = 0
+        finished = False
+        try:
+            while not finished:
+                batch, finished = await self._next_micro_batch(queue, batch_size, max_delay)
+                if not batch:
+                    continue
+
+                # Признаки извлекаются один раз на микробатч
+                X, names = extract(batch)
+                if update and self.update(X) and (self._refit_task is None or self._refit_task.done()):
+                    if self.is_trained:
+                        self._refit_task = asyncio.get_running_loop().create_task(self._refit_in_background())
+                    else:
+                        # Первое обучение синхронно: оценивать пока нечем
+                        self.feature_names = names
+                        await self._refit_in_background()
+
+                if not self.is_trained:
+                    result = {"status": "not_trained", "message": "Model must be trained first"}
+                else:
+                    model, scaler = self.model, self.scaler
+                    result = await asyncio.to_thread(self._detect_features, X, batch, model, scaler)
+                result["batch_index"] = batch_index
+                batch_index += 1
+                yield result
+        finally:
+            pump_task.cancel()
+            await asyncio.gather(pump_task, return_exceptions=True)
+            if self._refit_task is not None:
+                await asyncio.gather(self._refit_task, return_exceptions=True)
+
+    @staticmethod
+    async def _next_micro_batch(
+        queue: asyncio.Queue,
+        batch_size: int,
+        max_delay: float
+    ) -> Tuple[List[Any], bool]:
+        """Собирает до batch_size записей или до истечения max_delay"""
+        batch: List[Any] = []
+        loop = asyncio.get_running_loop()
+        deadline = None
+        while len(batch) < batch_size:
+            timeout = None if deadline is None else deadline - loop.time()
+            if timeout is not None and timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is _STREAM_END:
+                return batch, True
+            if isinstance(item, list):
+                batch.extend(item)
+            else:
+                batch.append(item)
+            if deadline is None:
+                deadline = loop.time() + max_delay
+        return batch, False
 
     def _calculate_severity(self, score: float) -> str:
         """
@@ -13,16 +13,354 @@ Based on Meta's Agents Rule of Two framework
 """
 
 import hashlib
+import math
 import re
+import threading
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List, Optional, Pattern, Tuple
 
 from src.utils.structured_logging import StructuredLogger
 
 logger = StructuredLogger(__name__).logger
 
 
+# Символы вне ASCII, которые re.IGNORECASE считает равными ASCII-буквам
+_ASCII_CASE_FOLD = str.maketrans({"\u0130": "i", "\u0131": "i", "\u017f": "s", "\u212a": "k"})
+
+# Метасимволы regex, на которых заканчивается литеральный префикс паттерна
+_REGEX_META = set(".^$*+?{}[]\\|()")
+
+
+def _literal_prefix(pattern: str) -> Optional[str]:
+    """Литеральный префикс паттерна, который обязан быть в любом совпадении"""
+    if "|" in pattern:
+        return None
+    end = 0
+    while end < len(pattern) and pattern[end] not in _REGEX_META:
+        end += 1
+    # Символ перед квантификатором может отсутствовать в совпадении
+    if end < len(pattern) and pattern[end] in "*+?{":
+        end -= 1
+    return pattern[:end].lower() if end > 0 else None
+
+
+@dataclass(frozen=True)
+class PatternScanResult:
+    """Результат сканирования текста всеми паттернами"""
+
+    injection_patterns: Tuple[str, ...] = ()
+    sensitive_types: Tuple[str, ...] = ()
+
+
+@dataclass
+class _ScanEntry:
+    category: str
+    kind: str
+    regex: Pattern
+    anchors: Optional[Tuple[str, ...]]
+
+
+class PatternScanner:
+    """
+    Сканер всех паттернов безопасности за один вызов
+
+    Паттерны компилируются один раз. У каждого паттерна есть якоря -
+    литералы, без которых совпадение невозможно (литеральный префикс или
+    явно заданные). Текст один раз приводится к нижнему регистру, якоря
+    ищутся str.find, а regex запускается только для категорий, чьи якоря
+    нашлись, начиная с окрестности первого якоря. Паттерны без якорей
+    проверяются всегда.
+
+    Результаты мемоизируются по хешу текста (сам текст не хранится).
+    """
+
+    # Насколько совпадение может начинаться раньше первого якоря
+    ANCHOR_LOOKBEHIND = 256
+
+    def __init__(
+        self,
+        injection_patterns: Tuple[str, ...],
+        sensitive_patterns: Tuple[Tuple[str, str], ...],
+        anchors: Tuple[Tuple[str, Tuple[str, ...]], ...] = (),
+        memo_size: int = 4096,
+    ):
+        explicit_anchors = dict(anchors)
+        self._entries: List[_ScanEntry] = []
+        for kind, items in (
+            ("injection", [(pattern, pattern) for pattern in injection_patterns]),
+            ("sensitive", list(sensitive_patterns)),
+        ):
+            for category, pattern in items:
+                category_anchors = explicit_anchors.get(category)
+                if category_anchors is None:
+                    prefix = _literal_prefix(pattern)
+                    category_anchors = (prefix,) if prefix else None
+                self._entries.append(
+                    _ScanEntry(
+                        category=category,
+                        kind=kind,
+                        regex=re.compile(pattern, re.IGNORECASE),
+                        anchors=category_anchors,
+                    )
+                )
+
+        self._memo: "OrderedDict[bytes, PatternScanResult]" = OrderedDict()
+        self._memo_size = memo_size
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        # Отдельные regex чувствительных данных - для поиска span'ов в потоке
+        self.sensitive_regexes: List[Tuple[str, Pattern]] = [
+            (entry.category, entry.regex)
+            for entry in self._entries
+            if entry.kind == "sensitive"
+        ]
+
+    def _scan_uncached(self, text: str) -> PatternScanResult:
+        ascii_only = text.isascii()
+        folded = (
+            text.lower() if ascii_only else text.translate(_ASCII_CASE_FOLD).lower()
+        )
+
+        injection = []
+        sensitive = []
+        for entry in self._entries:
+            start = 0
+            if entry.anchors is not None:
+                positions = [folded.find(anchor) for anchor in entry.anchors]
+                positions = [position for position in positions if position >= 0]
+                if not positions:
+                    continue
+                # lower() вне ASCII может менять длину - тогда ищем с начала
+                if ascii_only:
+                    start = max(0, min(positions) - self.ANCHOR_LOOKBEHIND)
+
+            found = entry.regex.search(text, start) is not None
+            if not found and start > 0:
+                found = entry.regex.search(text) is not None
+            if found:
+                (injection if entry.kind == "injection" else sensitive).append(
+                    entry.category
+                )
+        return PatternScanResult(tuple(injection), tuple(sensitive))
+
+    def scan(self, text: str, memoize: bool = True) -> PatternScanResult:
+        """Возвращает все категории, найденные в тексте"""
+        if not memoize:
+            return self._scan_uncached(text)
+
+        key = hashlib.blake2b(
+            text.encode("utf-8", "surrogatepass"), digest_size=16
+        ).digest()
+        with self._lock:
+            result = self._memo.get(key)
+            if result is not None:
+                self._memo.move_to_end(key)
+                self.hits += 1
+                return result
+
+        result = self._scan_uncached(text)
+        with self._lock:
+            self.misses += 1
+            self._memo[key] = result
+            if len(self._memo) > self._memo_size:
+                self._memo.popitem(last=False)
+        return result
+
+
+@lru_cache(maxsize=None)
+def _get_scanner(
+    injection_patterns: Tuple[str, ...],
+    sensitive_patterns: Tuple[Tuple[str, str], ...],
+    anchors: Tuple[Tuple[str, Tuple[str, ...]], ...],
+) -> PatternScanner:
+    """Общий сканер (и его memo) для всех экземпляров с одинаковыми паттернами"""
+    return PatternScanner(injection_patterns, sensitive_patterns, anchors)
+
+
+@lru_cache(maxsize=None)
+def _compile_redactions(
+    sensitive_patterns: Tuple[Tuple[str, str], ...],
+    redactions: Tuple[Tuple[str, str, int], ...],
+) -> Tuple[Tuple[str, Pattern, str], ...]:
+    """Скомпилированные замены для редактирования чувствительных данных"""
+    patterns = dict(sensitive_patterns)
+    return tuple(
+        (data_type, re.compile(patterns[data_type], flags), replacement)
+        for data_type, replacement, flags in redactions
+        if data_type in patterns
+    )
+
+
+class GCRARateLimiter:
+    """
+    Rate limiter на GCRA (Generic Cell Rate Algorithm), состояние в процессе
+
+    На ключ хранится одно число - теоретическое время прибытия (TAT).
+    limit запросов за period: интервал T = period / limit, всплеск до limit
+    запросов подряд, дальше - по одному каждые T секунд. Ключ, у которого
+    TAT в прошлом, неотличим от нового и удаляется периодической очисткой.
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        period: float = 60.0,
+        sweep_interval: float = 60.0,
+        clock=time.monotonic,
+    ):
+        self.limit = limit
+        self.period = float(period)
+        self.emission_interval = self.period / limit
+        self.sweep_interval = sweep_interval
+        self._clock = clock
+        self._tat: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._next_sweep = clock() + sweep_interval
+
+    def check(self, key: str) -> Tuple[bool, float]:
+        """Учитывает запрос; возвращает (разрешён, секунд до следующей попытки)"""
+        now = self._clock()
+        with self._lock:
+            if now >= self._next_sweep:
+                self._sweep(now)
+
+            tat = max(self._tat.get(key, now), now)
+            allow_at = tat + self.emission_interval - self.period
+            # Допуск на накопленную погрешность сложения интервалов
+            if allow_at - now > 1e-9:
+                return False, allow_at - now
+
+            self._tat[key] = tat + self.emission_interval
+            return True, 0.0
+
+    def _sweep(self, now: float) -> None:
+        """Удаляет ключи неактивных пользователей"""
+        idle = [key for key, tat in self._tat.items() if tat <= now]
+        for key in idle:
+            del self._tat[key]
+        self._next_sweep = now + self.sweep_interval
+
+    def key_count(self) -> int:
+        """Число отслеживаемых ключей"""
+        return len(self._tat)
+
+
+class RedisGCRARateLimiter:
+    """
+    GCRA с общим состоянием в Redis - один лимит на все воркеры
+
+    Проверка и обновление TAT - один Lua-скрипт (один round trip, атомарно),
+    время берётся у Redis, поэтому расхождение часов воркеров не влияет.
+    TTL ключа совпадает с моментом, когда TAT уходит в прошлое, так что
+    неактивные ключи Redis удаляет сам. При ошибке Redis используется
+    локальный GCRARateLimiter, и следующие open_seconds секунд Redis не
+    опрашивается вовсе.
+
+    Клиент синхронный (validate_input синхронный) - задавайте короткий
+    socket_timeout. Из async-кода, пока лимитер доступен (available),
+    validate_input вызывают вне event loop.
+    """
+
+    SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then
+    tat = now
+end
+local allow_at = tat + interval - period
+if now < allow_at then
+    return {0, tostring(allow_at - now)}
+end
+local new_tat = tat + interval
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, '0'}
+"""
+
+    def __init__(
+        self,
+        redis_client,
+        limit: int = 100,
+        period: float = 60.0,
+        key_prefix: str = "ai_security:rate_limit:",
+        open_seconds: float = 5.0,
+        clock=time.monotonic,
+    ):
+        self.redis = redis_client
+        self.limit = limit
+        self.period = float(period)
+        self.emission_interval = self.period / limit
+        self.key_prefix = key_prefix
+        self.open_seconds = open_seconds
+        self.fallback = GCRARateLimiter(limit=limit, period=period, clock=clock)
+        self._clock = clock
+        self._open_until = 0.0
+        self._script = redis_client.register_script(self.SCRIPT)
+
+    @property
+    def available(self) -> bool:
+        """False, пока после ошибки Redis не истекло open_seconds"""
+        return self._clock() >= self._open_until
+
+    def _call(self, key: str) -> Tuple[bool, float]:
+        allowed, retry_after = self._script(
+            keys=[self.key_prefix + key],
+            args=[self.emission_interval, self.period],
+        )
+        if isinstance(retry_after, bytes):
+            retry_after = retry_after.decode()
+        return bool(int(allowed)), float(retry_after)
+
+    def check(self, key: str) -> Tuple[bool, float]:
+        """Учитывает запрос; возвращает (разрешён, секунд до следующей попытки)"""
+        if not self.available:
+            return self.fallback.check(key)
+        try:
+            return self._call(key)
+        except Exception as e:
+            self._open(e)
+            return self.fallback.check(key)
+
+    def _open(self, error: Exception) -> None:
+        self._open_until = self._clock() + self.open_seconds
+        logger.warning(
+            f"Shared rate limit unavailable, using local state for "
+            f"{self.open_seconds:g}s: {error}",
+            extra={"error_type": type(error).__name__},
+        )
+
+
+# Общий для всех AISecurityLayer лимитер (между воркерами), если настроен
+_shared_rate_limiter = None
+
+
+def configure_shared_rate_limiter(
+    redis_client=None, limit: int = 100, period: float = 60.0
+) -> None:
+    """
+    Включает общий rate limit агентов для всех экземпляров AISecurityLayer
+
+    Args:
+        redis_client: Синхронный redis.Redis; None - отключить общий лимитер
+        limit: Запросов за период на пару agent:user
+        period: Период в секундах
+    """
+    global _shared_rate_limiter
+    _shared_rate_limiter = (
+        RedisGCRARateLimiter(redis_client, limit=limit, period=period)
+        if redis_client is not None
+        else None
+    )
+
+
 @dataclass
 class SecurityCheck:
     """Результат проверки безопасности"""
@@ -96,9 +434,55 @@ class AISecurityLayer:
         "bearer_token": r"Bearer\s+[a-zA-Z0-9\-._~+/]+=*",
     }
 
-    def __init__(self):
+    # Якоря для паттернов без литерального префикса (см. PatternScanner)
+    SENSITIVE_DATA_ANCHORS = {
+        "email": ("@",),
+        "api_key": ("api", "token"),
+    }
+
+    # Редактирование: (тип, замена, флаги) в порядке применения
+    REDACTIONS = (
+        ("email", "[REDACTED_EMAIL]", 0),
+        ("api_key", r"\1[REDACTED_API_KEY]", re.IGNORECASE),
+        ("password", "password: [REDACTED]", re.IGNORECASE),
+        ("credit_card", "[REDACTED_CC]", 0),
+        ("private_key", "[REDACTED_PRIVATE_KEY]", 0),
+        ("bearer_token", "Bearer [REDACTED_TOKEN]", 0),
+    )
+
+    # Лимит запросов к агенту на пользователя
+    RATE_LIMIT_REQUESTS = 100
+    RATE_LIMIT_PERIOD = 60.0
+
+    def __init__(self, rate_limiter=None):
         self.audit_logger = AuditLogger()
-        self._rate_limit_cache = {}
+        self._rate_limiter = rate_limiter
+        self._local_rate_limiter = GCRARateLimiter(
+            limit=self.RATE_LIMIT_REQUESTS, period=self.RATE_LIMIT_PERIOD
+        )
+        self.scanner = _get_scanner(
+            tuple(self.INJECTION_PATTERNS),
+            tuple(self.SENSITIVE_DATA_PATTERNS.items()),
+            tuple(self.SENSITIVE_DATA_ANCHORS.items()),
+        )
+        self._redactions = _compile_redactions(
+            tuple(self.SENSITIVE_DATA_PATTERNS.items()), self.REDACTIONS
+        )
+
+    @property
+    def rate_limiter(self):
+        """Явно переданный, общий (если настроен) или локальный лимитер"""
+        if self._rate_limiter is not None:
+            return self._rate_limiter
+        if _shared_rate_limiter is not None:
+            return _shared_rate_limiter
+        return self._local_rate_limiter
+
+    @property
+    def rate_limit_blocks(self) -> bool:
+        """Проверка лимита ходит в сеть - validate_input стоит вызывать вне event loop"""
+        limiter = self.rate_limiter
+        return isinstance(limiter, RedisGCRARateLimiter) and limiter.available
 
     def validate_input(
         self,
@@ -201,12 +585,14 @@ class AISecurityLayer:
 
         # Проверка 3: Rate Limiting
         user_id = context.get("user_id")
-        if user_id and not self._check_rate_limit(agent_id, user_id):
-            return SecurityCheck(
-                allowed=False,
-                reason="Rate limit exceeded",
-                details={"retry_after": self._get_retry_after(user_id)},
-            )
+        if user_id:
+            allowed, retry_after = self._check_rate_limit(agent_id, user_id)
+            if not allowed:
+                return SecurityCheck(
+                    allowed=False,
+                    reason="Rate limit exceeded",
+                    details={"retry_after": max(1, math.ceil(retry_after))},
+                )
 
         # Все проверки пройдены
         self.audit_logger.log_ai_request(
@@ -268,6 +654,49 @@ class AISecurityLayer:
             allowed=True, details={"output": ai_output, "redacted": False}
         )
 
+    def stream_output_guard(
+        self,
+        agent_id: str,
+        agent_config: AgentRuleOfTwoConfig,
+        holdback: int = 256,
+        min_chunk: int = 64,
+    ) -> "OutputStreamGuard":
+        """
+        Потоковая проверка выхода AI по мере генерации токенов
+
+        Args:
+            agent_id: ID агента
+            agent_config: Конфигурация Rule of Two
+            holdback: Сколько последних символов удерживать до следующего чанка
+            min_chunk: Минимальный объём новых данных для очередной проверки
+
+        Returns:
+            OutputStreamGuard: feed(chunk) -> безопасный текст, finish() -> хвост
+        """
+        return OutputStreamGuard(
+            layer=self,
+            agent_id=agent_id,
+            enabled=agent_config.can_access_sensitive,
+            holdback=holdback,
+            min_chunk=min_chunk,
+        )
+
+    async def guard_output_stream(
+        self,
+        chunks: AsyncIterator[str],
+        agent_id: str,
+        agent_config: AgentRuleOfTwoConfig,
+    ) -> AsyncIterator[str]:
+        """Оборачивает асинхронный поток токенов LLM потоковой проверкой"""
+        guard = self.stream_output_guard(agent_id, agent_config)
+        async for chunk in chunks:
+            safe = guard.feed(chunk)
+            if safe:
+                yield safe
+        tail = guard.finish()
+        if tail:
+            yield tail
+
     def _check_prompt_injection(self, text: str) -> SecurityCheck:
         """Детектирует попытки prompt injection с input validation"""
         if not text or not isinstance(text, str):
@@ -278,19 +707,18 @@ class AISecurityLayer:
             return SecurityCheck(allowed=False, reason="Invalid input")
 
         try:
-            text_lower = text.lower()
-
-            for pattern in self.INJECTION_PATTERNS:
-                if re.search(pattern, text_lower, re.IGNORECASE):
-                    logger.debug(
-                        "Prompt injection pattern detected", extra={"pattern": pattern}
-                    )
-                    return SecurityCheck(
-                        allowed=False,
-                        reason="Potential prompt injection detected",
-                        confidence=0.85,
-                        details={"pattern": pattern},
-                    )
+            matched = self.scanner.scan(text).injection_patterns
+            if matched:
+                pattern = matched[0]
+                logger.debug(
+                    "Prompt injection pattern detected", extra={"pattern": pattern}
+                )
+                return SecurityCheck(
+                    allowed=False,
+                    reason="Potential prompt injection detected",
+                    confidence=0.85,
+                    details={"pattern": pattern},
+                )
 
             return SecurityCheck(allowed=True)
         except Exception as e:
@@ -314,11 +742,7 @@ class AISecurityLayer:
             return SecurityCheck(allowed=True)
 
         try:
-            found_types = []
-
-            for data_type, pattern in self.SENSITIVE_DATA_PATTERNS.items():
-                if re.search(pattern, text, re.IGNORECASE):
-                    found_types.append(data_type)
+            found_types = list(self.scanner.scan(text).sensitive_types)
 
             if found_types:
                 return SecurityCheck(
@@ -346,11 +770,7 @@ class AISecurityLayer:
             return {"has_leakage": False, "types": []}
 
         try:
-            leaked_types = []
-
-            for data_type, pattern in self.SENSITIVE_DATA_PATTERNS.items():
-                if re.search(pattern, text, re.IGNORECASE):
-                    leaked_types.append(data_type)
+            leaked_types = list(self.scanner.scan(text).sensitive_types)
 
             return {"has_leakage": len(leaked_types) > 0, "types": leaked_types}
         except Exception as e:
@@ -371,49 +791,7 @@ class AISecurityLayer:
             return ""
 
         try:
-            redacted = text
-
-            # Email
-            redacted = re.sub(
-                self.SENSITIVE_DATA_PATTERNS["email"], "[REDACTED_EMAIL]", redacted
-            )
-
-            # API Keys / Tokens
-            redacted = re.sub(
-                self.SENSITIVE_DATA_PATTERNS["api_key"],
-                r"\1[REDACTED_API_KEY]",
-                redacted,
-                flags=re.IGNORECASE,
-            )
-
-            # Passwords
-            redacted = re.sub(
-                self.SENSITIVE_DATA_PATTERNS["password"],
-                "password: [REDACTED]",
-                redacted,
-                flags=re.IGNORECASE,
-            )
-
-            # Credit Cards
-            redacted = re.sub(
-                self.SENSITIVE_DATA_PATTERNS["credit_card"], "[REDACTED_CC]", redacted
-            )
-
-            # Private Keys
-            redacted = re.sub(
-                self.SENSITIVE_DATA_PATTERNS["private_key"],
-                "[REDACTED_PRIVATE_KEY]",
-                redacted,
-            )
-
-            # Bearer Tokens
-            redacted = re.sub(
-                self.SENSITIVE_DATA_PATTERNS["bearer_token"],
-                "Bearer [REDACTED_TOKEN]",
-                redacted,
-            )
-
-            return redacted
+            return self._redact(text, self.scanner.scan(text).sensitive_types)
         except Exception as e:
             logger.error(
                 f"Error redacting sensitive data: {e}",
@@ -423,6 +801,14 @@ class AISecurityLayer:
             # Return original text if redaction fails (better than empty string)
             return text
 
+    def _redact(self, text: str, types: Tuple[str, ...]) -> str:
+        """Применяет замены только для найденных типов данных"""
+        redacted = text
+        for data_type, regex, replacement in self._redactions:
+            if data_type in types:
+                redacted = regex.sub(replacement, redacted)
+        return redacted
+
     def _hash_input(self, text: str) -> str:
         """Создаёт hash для логирования (не храним сам вход) с input validation"""
         if not text or not isinstance(text, str):
@@ -442,56 +828,178 @@ class AISecurityLayer:
             )
             return "hash_error"
 
-    def _check_rate_limit(self, agent_id: str, user_id: str) -> bool:
-        """Проверка rate limit с input validation"""
+    def _check_rate_limit(self, agent_id: str, user_id: str) -> Tuple[bool, float]:
+        """Проверка rate limit с input validation: (разрешён, секунд до следующей попытки)"""
         # Input validation
         if not agent_id or not isinstance(agent_id, str):
             logger.warning(
                 "Invalid agent_id in _check_rate_limit",
                 extra={"agent_id_type": type(agent_id).__name__ if agent_id else None},
             )
-            return False
+            return False, float(self.RATE_LIMIT_PERIOD)
 
         if not user_id or not isinstance(user_id, str):
             logger.warning(
                 "Invalid user_id in _check_rate_limit",
                 extra={"user_id_type": type(user_id).__name__ if user_id else None},
             )
-            return False
+            return False, float(self.RATE_LIMIT_PERIOD)
 
-        # Простая реализация - в продакшене использовать Redis
         key = f"{agent_id}:{user_id}"
-        now = datetime.now()
-
-        if key not in self._rate_limit_cache:
-            self._rate_limit_cache[key] = []
-
-        # Удаляем старые запросы (> 1 минуты)
-        self._rate_limit_cache[key] = [
-            timestamp
-            for timestamp in self._rate_limit_cache[key]
-            if (now - timestamp).seconds < 60
-        ]
-
-        # Проверяем лимит (100 запросов в минуту)
-        if len(self._rate_limit_cache[key]) >= 100:
+        allowed, retry_after = self.rate_limiter.check(key)
+        if not allowed:
             logger.debug(
                 "Rate limit exceeded",
                 extra={
                     "agent_id": agent_id,
                     "user_id": user_id,
-                    "requests": len(self._rate_limit_cache[key]),
+                    "retry_after": retry_after,
                 },
             )
-            return False
+        return allowed, retry_after
+
+
+class OutputStreamGuard:
+    """
+    Проверка выхода LLM чанками, без ожидания конца генерации
+
+    Последние holdback символов буфера не отдаются клиенту: там может быть
+    начало ещё не завершённого совпадения. Совпадение, пересекающее границу
+    выдачи, удерживается целиком, если оно не длиннее holdback. Более
+    длинное совпадение выдаётся сразу в редактированном виде, а его
+    продолжение в следующих чанках отбрасывается. Совпадения ищутся только
+    в окне перед границей, поэтому буфер и стоимость чанка ограничены.
+    """
+
+    def __init__(
+        self,
+        layer: AISecurityLayer,
+        agent_id: str,
+        enabled: bool = True,
+        holdback: int = 256,
+        min_chunk: int = 64,
+    ):
+        self.layer = layer
+        self.agent_id = agent_id
+        self.enabled = enabled
+        self.holdback = holdback
+        self.min_chunk = min_chunk
+        self._buffer = ""
+        self._types: List[str] = []
+        self._digest = hashlib.sha256()
+        self._finished = False
+        # (regex, текст) совпадения, выданного вплотную к границе выдачи
+        self._continuation: Optional[Tuple[Pattern, str]] = None
+
+    def feed(self, chunk: str) -> str:
+        """Принимает очередной чанк, возвращает текст, который можно отдать"""
+        if not chunk:
+            return ""
+        if not self.enabled:
+            return chunk
+
+        self._digest.update(chunk.encode("utf-8", "surrogatepass"))
+        self._buffer += self._drop_continuation(chunk)
+        if len(self._buffer) < self.holdback + self.min_chunk:
+            return ""
+        return self._release(final=False)
+
+    def finish(self) -> str:
+        """Завершает поток: проверяет и отдаёт удержанный хвост"""
+        if self._finished:
+            return ""
+        self._finished = True
+        tail = self._release(final=True) if self._buffer else ""
+
+        if self._types:
+            self.layer.audit_logger.log_data_leakage_attempt(
+                agent_id=self.agent_id,
+                output_hash=self._digest.hexdigest()[:16],
+                leaked_types=list(self._types),
+            )
+        return tail
+
+    @property
+    def result(self) -> SecurityCheck:
+        """Итог проверки потока (аналог validate_output без самого текста)"""
+        if self._types:
+            return SecurityCheck(
+                allowed=True,
+                reason="Sensitive data was redacted",
+                details={"redacted": True, "types": list(self._types)},
+            )
+        return SecurityCheck(allowed=True, details={"redacted": False})
 
-        # Добавляем текущий запрос
-        self._rate_limit_cache[key].append(now)
-        return True
+    def _drop_continuation(self, text: str) -> str:
+        """Отбрасывает начало текста, продолжающее уже выданное совпадение"""
+        if self._continuation is None:
+            return text
+        regex, head = self._continuation
+        match = regex.match(head + text)
+        consumed = max(0, match.end() - len(head)) if match else 0
+        if consumed < len(text):
+            self._continuation = None
+        return text[consumed:]
+
+    def _safe_cut(self) -> int:
+        """Граница выдачи, не разрезающая ни одно короткое совпадение"""
+        buffer = self._buffer
+        cut = len(buffer) - self.holdback
+        # Совпадение, начавшееся раньше окна, длиннее holdback - его не держим
+        window = max(0, cut - self.holdback)
+        spans = [
+            match.span()
+            for _, regex in self.layer.scanner.sensitive_regexes
+            for match in regex.finditer(buffer, window)
+        ]
+
+        # Длинное совпадение выдаём целиком
+        moved = True
+        while moved:
+            moved = False
+            for start, end in spans:
+                if start < cut < end and end - start > self.holdback:
+                    cut = end
+                    moved = True
+
+        # Короткое - удерживаем
+        moved = True
+        while moved:
+            moved = False
+            for start, end in spans:
+                if start < cut < end and end - start <= self.holdback:
+                    cut = start
+                    moved = True
+        return cut
+
+    def _release(self, final: bool) -> str:
+        cut = len(self._buffer) if final else self._safe_cut()
+        if cut <= 0:
+            return ""
 
-    def _get_retry_after(self, user_id: str) -> int:
-        """Возвращает время до следующей попытки (секунды)"""
-        return 60  # 1 минута
+        released, self._buffer = self._buffer[:cut], self._buffer[cut:]
+        # Чанки потока уникальны - в memo сканера их не кладём
+        types = self.layer.scanner.scan(released, memoize=False).sensitive_types
+        if not types:
+            return released
+
+        for data_type in types:
+            if data_type not in self._types:
+                self._types.append(data_type)
+        if not final:
+            self._track_continuation(released, types)
+        return self.layer._redact(released, types)
+
+    def _track_continuation(self, released: str, types: Tuple[str, ...]) -> None:
+        """Запоминает совпадение, упирающееся в границу выдачи"""
+        for category, regex in self.layer.scanner.sensitive_regexes:
+            if category not in types:
+                continue
+            for match in regex.finditer(released):
+                if match.end() == len(released):
+                    self._continuation = (regex, match.group())
+                    self._buffer = self._drop_continuation(self._buffer)
+                    return
 
 
 class AuditLogger:
@@ -113,7 +113,10 @@ Direct prose translation:"""
 
         try:
             # Use orchestrator to translate
-            result = await self.orchestrator.process_query(query=prompt, context={"max_tokens": 200})
+            # The prompt embeds the poetic text itself: validating it again would recurse
+            result = await self.orchestrator.process_query(
+                query=prompt, context={"max_tokens": 200, "enable_security_validation": False}
+            )
 
             # Extract response
             if isinstance(result, dict):
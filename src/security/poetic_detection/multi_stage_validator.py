@@ -4,8 +4,12 @@ Multi-Stage Validator
 Combines poetic detection and intent extraction for comprehensive validation.
 """
 
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 
 import logging
 
@@ -13,6 +17,16 @@ logger = logging.getLogger(__name__)
 
 from .intent_extractor import IntentResult, SemanticIntentExtractor
 from .poetic_detector import PoeticAnalysis, PoeticFormDetector
+from .safety_filter import SafetyFilter
+
+DANGEROUS_KEYWORDS = (
+    "delete all",
+    "drop database",
+    "rm -rf /",
+    "format c:",
+    "sudo rm",
+    "del /f /s /q",
+)
 
 
 @dataclass
@@ -33,17 +47,54 @@ class MultiStageValidator:
     Stage 1: Poetic form detection
     Stage 2: Intent extraction (if poetic)
     Stage 3: Standard safety check
+
+    Meant to be created once and reused: the safety filter is compiled up
+    front and verdicts are cached by query hash. peek() adds a prefilter for
+    hot paths: queries that cannot be poetic and contain no trigger phrase
+    are allowed without running the stages.
     """
 
-    def __init__(self, orchestrator=None):
+    def __init__(self, orchestrator=None, cache_size: int = 4096, cache_ttl_seconds: float = 600.0):
         """
         Initialize validator.
 
         Args:
             orchestrator: AI orchestrator for LLM access
+            cache_size: Max cached verdicts (0 disables the cache)
+            cache_ttl_seconds: Verdict lifetime
         """
         self.poetic_detector = PoeticFormDetector(threshold=0.6)
         self.intent_extractor = SemanticIntentExtractor(orchestrator)
+        self.safety_filter = SafetyFilter()
+
+        # Prefilter is sound only while every safety pattern is a plain literal
+        self._triggers = SafetyFilter.literal_triggers()
+
+        self.cache_size = cache_size
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self._cache: "OrderedDict[bytes, Tuple[float, ValidationResult]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.stats = {"prefiltered": 0, "cache_hits": 0, "validated": 0}
+
+    def peek(self, query: str) -> Optional[ValidationResult]:
+        """
+        Verdict available without running the stages: cached or prefiltered.
+
+        Returns None when full validation is needed.
+        """
+        verdict = self._get_cached(self._key(query))
+        if verdict is not None:
+            self.stats["cache_hits"] += 1
+            return verdict
+
+        if self._is_obviously_benign(query):
+            self.stats["prefiltered"] += 1
+            return ValidationResult(
+                allowed=True,
+                reason="All validation stages passed",
+                stage_completed="complete",
+            )
+        return None
 
     async def validate(self, query: str, context: Optional[Dict] = None) -> ValidationResult:
         """
@@ -56,6 +107,21 @@ class MultiStageValidator:
         Returns:
             ValidationResult
         """
+        verdict = self._get_cached(self._key(query))
+        if verdict is not None:
+            self.stats["cache_hits"] += 1
+            return verdict
+
+        self.stats["validated"] += 1
+        result = await self._run_stages(query, context)
+
+        # Errors are transient and are not cached
+        if result.stage_completed != "error":
+            self._store_cached(self._key(query), result)
+        return result
+
+    async def _run_stages(self, query: str, context: Optional[Dict] = None) -> ValidationResult:
+        """Run all validation stages."""
         try:
             # Stage 1: Poetic form detection
             poetic_analysis = await self.poetic_detector.detect_poetry(query)
@@ -114,9 +180,7 @@ class MultiStageValidator:
         """
         # Simple keyword-based check
         # 1. Use SafetyFilter
-        from src.security.poetic_detection.safety_filter import SafetyFilter
-        safety_filter = SafetyFilter()
-        is_safe, reason = safety_filter.is_safe(query)
+        is_safe, reason = self.safety_filter.is_safe(query)
         
         if not is_safe:
             logger.warning(f"SafetyFilter blocked request: {reason}")
@@ -124,20 +188,60 @@ class MultiStageValidator:
 
         # 2. Simple keyword-based check (Legacy)
 
-        dangerous_keywords = [
-            "delete all",
-            "drop database",
-            "rm -rf /",
-            "format c:",
-            "sudo rm",
-            "del /f /s /q",
-        ]
-
         query_lower = query.lower()
 
-        for keyword in dangerous_keywords:
+        for keyword in DANGEROUS_KEYWORDS:
             if keyword in query_lower:
                 logger.warning("Dangerous keyword detected: %s", keyword)
                 return False
 
         return True
+
+    def _is_obviously_benign(self, query: str) -> bool:
+        """
+        Cheap first stage: query cannot be poetic and contains no trigger phrase.
+
+        Every such query passes all stages, so its verdict is known upfront.
+        """
+        if self._triggers is None or self.poetic_detector.can_be_poetic(query):
+            return False
+
+        query_lower = query.lower()
+        if any(keyword in query_lower for keyword in DANGEROUS_KEYWORDS):
+            return False
+
+        folded = SafetyFilter.fold(query)
+        return not any(trigger in folded for trigger in self._triggers)
+
+    @staticmethod
+    def _key(query: str) -> bytes:
+        return hashlib.blake2b(query.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+    def _get_cached(self, key: bytes) -> Optional[ValidationResult]:
+        if self.cache_size <= 0:
+            return None
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            expires_at, verdict = entry
+            if expires_at < time.monotonic():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return verdict
+
+    def _store_cached(self, key: bytes, verdict: ValidationResult) -> None:
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic() + self.cache_ttl_seconds, verdict)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def clear_cache(self) -> None:
+        """Drop cached verdicts (e.g. after changing safety patterns)."""
+        with self._cache_lock:
+            self._cache.clear()
+        self._triggers = SafetyFilter.literal_triggers()
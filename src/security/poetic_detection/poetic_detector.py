@@ -35,6 +35,9 @@ class PoeticFormDetector:
     - Metaphorical language
     """
 
+    # Feature weights in the combined poetic score
+    WEIGHTS = {"rhyme": 0.3, "meter": 0.2, "verse": 0.3, "metaphor": 0.2}
+
     def __init__(self, threshold: float = 0.6):
         """
         Initialize detector.
@@ -44,6 +47,19 @@ class PoeticFormDetector:
         """
         self.threshold = threshold
 
+    def can_be_poetic(self, text: str) -> bool:
+        """
+        Cheap necessary condition for is_poetic.
+
+        Meter and verse features need at least three non-empty lines, so a
+        shorter text scores at most rhyme + metaphor weights.
+        """
+        if not text or len(text.strip()) < 10:
+            return False
+        if text.count("\n") >= 2 and sum(1 for line in text.split("\n") if line.strip()) >= 3:
+            return True
+        return self.WEIGHTS["rhyme"] + self.WEIGHTS["metaphor"] > self.threshold
+
     async def detect_poetry(self, text: str) -> PoeticAnalysis:
         """
         Detect poetic form in text.
@@ -64,8 +80,12 @@ class PoeticFormDetector:
         metaphor_score = self._detect_metaphors(text)
 
         # Combine scores (weighted)
-        poetic_score = rhyme_score * 0.3 + meter_score * \
-            0.2 + verse_score * 0.3 + metaphor_score * 0.2
+        poetic_score = (
+            rhyme_score * self.WEIGHTS["rhyme"]
+            + meter_score * self.WEIGHTS["meter"]
+            + verse_score * self.WEIGHTS["verse"]
+            + metaphor_score * self.WEIGHTS["metaphor"]
+        )
 
         # Detect patterns
         patterns = []
@@ -8,7 +8,7 @@ and Jailbreak attempts before they reach the core AI logic.
 
 import logging
 import re
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +39,10 @@ class SafetyFilter:
         r"pretend to be",
     ]
 
+    # Under IGNORECASE "i" also matches Turkish "İ" and "ı", which casefold() keeps apart
+    _FOLD_FIXES = str.maketrans({"\u0131": "i", "\u0307": None})
+    _REGEX_META = frozenset(".^$*+?{}[]|()\\")
+
     def __init__(self):
         self._injection_regexes = [re.compile(p, re.IGNORECASE) for p in self.INJECTION_PATTERNS]
         self._jailbreak_regexes = [re.compile(p, re.IGNORECASE) for p in self.JAILBREAK_PATTERNS]
@@ -65,6 +69,25 @@ class SafetyFilter:
 
         return min(1.0, score)
 
+    @classmethod
+    def fold(cls, text: str) -> str:
+        """
+        Fold text so that an IGNORECASE match of an ASCII literal becomes a substring match.
+        """
+        return text.casefold().translate(cls._FOLD_FIXES)
+
+    @classmethod
+    def literal_triggers(cls) -> Optional[Tuple[str, ...]]:
+        """
+        Folded trigger phrases when every pattern is a plain literal, else None.
+
+        A folded text containing none of them cannot match any pattern.
+        """
+        patterns = cls.INJECTION_PATTERNS + cls.JAILBREAK_PATTERNS
+        if any(cls._REGEX_META.intersection(pattern) for pattern in patterns):
+            return None
+        return tuple(cls.fold(pattern) for pattern in patterns)
+
     def is_safe(self, text: str, threshold: float = 0.8) -> Tuple[bool, str]:
         """
         Check if the text is safe.
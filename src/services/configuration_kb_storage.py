@@ -0,0 +1,486 @@
+"""
+Configuration Knowledge Base Journal Storage
+Append-only шардированное хранилище базы знаний 1С
+
+Раскладка на диске (одна директория на конфигурацию):
+
+    <kb_path>/<config>/meta.jsonl             скалярные поля (name, version, ...)
+    <kb_path>/<config>/modules.jsonl          модули (upsert по имени)
+    <kb_path>/<config>/<list_field>.jsonl     best_practices, common_patterns, ...
+    <kb_path>/<config>/objects/<Type>.jsonl   объекты метаданных по типу
+
+Каждая строка шарда - одна операция журнала. Шард компактируется, когда
+число записей в журнале заметно превышает число живых элементов.
+Шарды читаются лениво, при первом обращении к соответствующему полю.
+"""
+
+import json
+import os
+import re
+from collections.abc import MutableMapping
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.utils.structured_logging import StructuredLogger
+
+logger = StructuredLogger(__name__).logger
+
+# Поля-списки, которые хранятся в отдельных шардах
+LIST_FIELDS = (
+    "modules",
+    "best_practices",
+    "common_patterns",
+    "api_usage",
+    "performance_tips",
+    "known_issues",
+)
+
+# Поля-списки, элементы которых адресуются по имени
+KEYED_FIELDS = ("modules",)
+
+OBJECTS_FIELD = "metadata_objects"
+META_SHARD = "meta"
+
+
+def _safe_shard_name(name: str) -> str:
+    """Имя файла шарда для произвольного типа объекта"""
+    safe = re.sub(r"[^\w.-]", "_", name)
+    return safe or "_"
+
+
+class JournalShard:
+    """Один append-only шард журнала в формате JSONL"""
+
+    def __init__(self, path: Path, compact_min_records: int = 256):
+        self.path = path
+        self.compact_min_records = compact_min_records
+        self.records = 0
+        self._handle = None
+
+    def replay(self) -> List[Dict[str, Any]]:
+        """Чтение всех операций шарда"""
+        ops: List[Dict[str, Any]] = []
+        if not self.path.exists():
+            return ops
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    ops.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Оборванная запись после аварийного завершения
+                    logger.warning(
+                        "Пропущена повреждённая запись журнала",
+                        extra={"shard": str(self.path), "line": line_no},
+                    )
+
+        self.records = len(ops)
+        return ops
+
+    def append(self, op: Dict[str, Any]) -> None:
+        """Дописать операцию в конец шарда"""
+        if self._handle is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._handle = open(self.path, "a", encoding="utf-8")
+
+        self._handle.write(json.dumps(op, ensure_ascii=False, separators=(",", ":")))
+        self._handle.write("\n")
+        self._handle.flush()
+        self.records += 1
+
+    def needs_compaction(self, live_items: int) -> bool:
+        """Журнал разросся относительно живых данных"""
+        return self.records > max(self.compact_min_records, 2 * live_items)
+
+    def rewrite(self, ops: List[Dict[str, Any]]) -> None:
+        """Атомарная перезапись шарда снапшотом операций"""
+        self.close()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".jsonl.tmp")
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for op in ops:
+                f.write(json.dumps(op, ensure_ascii=False, separators=(",", ":")))
+                f.write("\n")
+
+        os.replace(tmp_path, self.path)
+        self.records = len(ops)
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+# Метка удалённого элемента при восстановлении списка
+_REMOVED = object()
+
+
+def _apply_list_ops(ops: List[Dict[str, Any]], keyed: bool) -> List[Any]:
+    """Восстановление списка из операций журнала"""
+    items: List[Any] = []
+    # Позиции элементов по имени: upsert и delete без линейного поиска
+    positions: Dict[Any, List[int]] = {}
+    removed = False
+
+    def index_items() -> None:
+        positions.clear()
+        for i, item in enumerate(items):
+            if isinstance(item, dict) and "name" in item:
+                positions.setdefault(item["name"], []).append(i)
+
+    for op in ops:
+        kind = op.get("op")
+        if kind == "replace":
+            items = list(op.get("value") or [])
+            if keyed:
+                index_items()
+        elif kind == "append":
+            value = op.get("value")
+            if keyed and isinstance(value, dict) and "name" in value:
+                positions.setdefault(value["name"], []).append(len(items))
+            items.append(value)
+        elif kind == "upsert" and keyed:
+            key = op.get("key")
+            if positions.get(key):
+                items[positions[key][0]] = op.get("value")
+            else:
+                positions[key] = [len(items)]
+                items.append(op.get("value"))
+        elif kind == "delete" and keyed:
+            for i in positions.pop(op.get("key"), ()):
+                items[i] = _REMOVED
+                removed = True
+
+    if removed:
+        items = [item for item in items if item is not _REMOVED]
+    return items
+
+
+def _snapshot_list_ops(items: List[Any]) -> List[Dict[str, Any]]:
+    """Снапшот списка одной операцией replace (пустой список - пустой шард)"""
+    return [{"op": "replace", "value": list(items)}] if items else []
+
+
+class ShardedObjectIndex(MutableMapping):
+    """Объекты метаданных конфигурации, по одному шарду на тип объекта"""
+
+    def __init__(self, config: "ShardedConfiguration"):
+        self._config = config
+        self._dir = config.directory / "objects"
+        self._loaded: Dict[str, List[Any]] = {}
+        self._shards: Dict[str, JournalShard] = {}
+
+    def _shard(self, object_type: str) -> JournalShard:
+        shard = self._shards.get(object_type)
+        if shard is None:
+            shard = JournalShard(
+                self._dir / f"{_safe_shard_name(object_type)}.jsonl",
+                self._config.compact_min_records,
+            )
+            self._shards[object_type] = shard
+        return shard
+
+    def _on_disk_types(self) -> List[str]:
+        if not self._dir.is_dir():
+            return []
+        types = []
+        for path in sorted(self._dir.glob("*.jsonl")):
+            # Исходное имя типа хранится в первой записи шарда
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    first = json.loads(f.readline() or "{}")
+                types.append(first.get("type") or path.stem)
+            except (OSError, json.JSONDecodeError):
+                types.append(path.stem)
+        return types
+
+    def __getitem__(self, object_type: str) -> List[Any]:
+        if object_type not in self._loaded:
+            shard = self._shard(object_type)
+            if not shard.path.exists():
+                raise KeyError(object_type)
+            self._loaded[object_type] = _apply_list_ops(shard.replay(), keyed=False)
+        return self._loaded[object_type]
+
+    def __setitem__(self, object_type: str, items: List[Any]) -> None:
+        items = list(items)
+        self._loaded[object_type] = items
+        shard = self._shard(object_type)
+        shard.rewrite([{"op": "replace", "type": object_type, "value": items}])
+
+    def __delitem__(self, object_type: str) -> None:
+        self._loaded.pop(object_type, None)
+        shard = self._shards.pop(object_type, None) or self._shard(object_type)
+        shard.close()
+        if shard.path.exists():
+            shard.path.unlink()
+
+    def __contains__(self, object_type: object) -> bool:
+        if object_type in self._loaded:
+            return True
+        return isinstance(object_type, str) and self._shard(object_type).path.exists()
+
+    def __iter__(self) -> Iterator[str]:
+        seen = set(self._loaded)
+        yield from self._loaded
+        for object_type in self._on_disk_types():
+            if object_type not in seen:
+                yield object_type
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def append(self, object_type: str, item: Dict[str, Any]) -> None:
+        """Журналирование добавления объекта (список уже обновлён в памяти)"""
+        shard = self._shard(object_type)
+        shard.append({"op": "append", "value": item})
+
+    def to_dict(self) -> Dict[str, List[Any]]:
+        return {object_type: list(self[object_type]) for object_type in self}
+
+    def close(self) -> None:
+        for shard in self._shards.values():
+            shard.close()
+
+
+class ShardedConfiguration(MutableMapping):
+    """
+    Данные одной конфигурации поверх журнальных шардов
+
+    Ведёт себя как dict из legacy-формата `<config>.json`, но читает каждый
+    шард только при первом обращении к полю. Присваивание поля журналируется
+    автоматически; изменения элементов списков на месте журналируются явно
+    через append/upsert/delete.
+    """
+
+    def __init__(self, directory: Path, compact_min_records: int = 256):
+        self.directory = directory
+        self.compact_min_records = compact_min_records
+        self._meta: Optional[Dict[str, Any]] = None
+        self._lists: Dict[str, List[Any]] = {}
+        self._shards: Dict[str, JournalShard] = {}
+        self._objects: Optional[ShardedObjectIndex] = None
+
+    def _shard(self, name: str) -> JournalShard:
+        shard = self._shards.get(name)
+        if shard is None:
+            shard = JournalShard(self.directory / f"{name}.jsonl", self.compact_min_records)
+            self._shards[name] = shard
+        return shard
+
+    def _load_meta(self) -> Dict[str, Any]:
+        if self._meta is None:
+            meta: Dict[str, Any] = {}
+            for op in self._shard(META_SHARD).replay():
+                if op.get("op") == "set":
+                    meta[op["key"]] = op.get("value")
+                elif op.get("op") == "delete":
+                    meta.pop(op.get("key"), None)
+            self._meta = meta
+        return self._meta
+
+    def _load_list(self, field: str) -> List[Any]:
+        if field not in self._lists:
+            ops = self._shard(field).replay()
+            self._lists[field] = _apply_list_ops(ops, keyed=field in KEYED_FIELDS)
+        return self._lists[field]
+
+    def _objects_index(self) -> ShardedObjectIndex:
+        if self._objects is None:
+            self._objects = ShardedObjectIndex(self)
+        return self._objects
+
+    # MutableMapping
+
+    def __getitem__(self, field: str) -> Any:
+        if field in LIST_FIELDS:
+            return self._load_list(field)
+        if field == OBJECTS_FIELD:
+            return self._objects_index()
+        return self._load_meta()[field]
+
+    def __setitem__(self, field: str, value: Any) -> None:
+        if field in LIST_FIELDS:
+            items = list(value)
+            self._lists[field] = items
+            self._compact_list(field)
+        elif field == OBJECTS_FIELD:
+            index = self._objects_index()
+            for object_type in list(index):
+                del index[object_type]
+            for object_type, items in dict(value).items():
+                index[object_type] = items
+        else:
+            self._load_meta()[field] = value
+            shard = self._shard(META_SHARD)
+            shard.append({"op": "set", "key": field, "value": value})
+            if shard.needs_compaction(len(self._meta)):
+                self._compact_meta()
+
+    def __delitem__(self, field: str) -> None:
+        if field in LIST_FIELDS:
+            self[field] = []
+        elif field == OBJECTS_FIELD:
+            self[field] = {}
+        else:
+            del self._load_meta()[field]
+            self._shard(META_SHARD).append({"op": "delete", "key": field})
+
+    def __contains__(self, field: object) -> bool:
+        if field in LIST_FIELDS:
+            return True
+        if field == OBJECTS_FIELD:
+            return self._objects is not None or (self.directory / "objects").is_dir()
+        return field in self._load_meta()
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._load_meta()
+        yield from LIST_FIELDS
+        if OBJECTS_FIELD in self:
+            yield OBJECTS_FIELD
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    # Журналирование изменений на месте
+
+    def append(self, field: str, item: Any) -> None:
+        """Журналирование элемента, уже добавленного в список поля"""
+        shard = self._shard(field)
+        shard.append({"op": "append", "value": item})
+        self._maybe_compact_list(field)
+
+    def upsert(self, field: str, key: str, item: Dict[str, Any]) -> None:
+        """Журналирование вставки или замены элемента по имени"""
+        shard = self._shard(field)
+        shard.append({"op": "upsert", "key": key, "value": item})
+        self._maybe_compact_list(field)
+
+    def delete(self, field: str, key: str) -> None:
+        """Журналирование удаления элемента по имени"""
+        shard = self._shard(field)
+        shard.append({"op": "delete", "key": key})
+        self._maybe_compact_list(field)
+
+    def append_object(self, object_type: str, item: Dict[str, Any]) -> None:
+        """Журналирование объекта метаданных, уже добавленного в индекс"""
+        self._objects_index().append(object_type, item)
+
+    # Компактирование
+
+    def _maybe_compact_list(self, field: str) -> None:
+        if field in self._lists and self._shard(field).needs_compaction(len(self._lists[field])):
+            self._compact_list(field)
+
+    def _compact_list(self, field: str) -> None:
+        items = self._load_list(field)
+        self._shard(field).rewrite(_snapshot_list_ops(items))
+
+    def _compact_meta(self) -> None:
+        meta = self._load_meta()
+        self._shard(META_SHARD).rewrite([{"op": "set", "key": k, "value": v} for k, v in meta.items()])
+
+    def compact(self) -> None:
+        """Компактирование всех уже загруженных шардов"""
+        if self._meta is not None:
+            self._compact_meta()
+        for field in list(self._lists):
+            self._compact_list(field)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Материализация в legacy-формат `<config>.json`"""
+        data: Dict[str, Any] = dict(self._load_meta())
+        for field in LIST_FIELDS:
+            data[field] = list(self._load_list(field))
+        if OBJECTS_FIELD in self:
+            data[OBJECTS_FIELD] = self._objects_index().to_dict()
+        return data
+
+    def close(self) -> None:
+        for shard in self._shards.values():
+            shard.close()
+        if self._objects is not None:
+            self._objects.close()
+
+
+class JournalKnowledgeBaseStore:
+    """Хранилище базы знаний: по одной ShardedConfiguration на конфигурацию"""
+
+    def __init__(self, kb_path: Path, compact_min_records: int = 256):
+        self.kb_path = kb_path
+        self.compact_min_records = compact_min_records
+        self._configs: Dict[str, ShardedConfiguration] = {}
+
+    def exists(self, config_key: str) -> bool:
+        """Есть ли данные конфигурации на диске (журнал или legacy JSON)"""
+        return (self.kb_path / config_key).is_dir() or (self.kb_path / f"{config_key}.json").exists()
+
+    def open(self, config_key: str) -> ShardedConfiguration:
+        """
+        Открытие конфигурации без чтения шардов
+
+        Если есть только legacy `<config>.json`, он однократно
+        импортируется в журнальный формат.
+        """
+        config = self._configs.get(config_key)
+        if config is not None:
+            return config
+
+        config = ShardedConfiguration(self.kb_path / config_key, self.compact_min_records)
+        legacy_file = self.kb_path / f"{config_key}.json"
+        if not config.directory.is_dir() and legacy_file.exists():
+            with open(legacy_file, "r", encoding="utf-8") as f:
+                self._write_snapshot(config, json.load(f))
+            logger.info(
+                "Legacy JSON база знаний импортирована в журнал",
+                extra={"config_key": config_key},
+            )
+
+        self._configs[config_key] = config
+        return config
+
+    def create(self, config_key: str, data: Dict[str, Any]) -> ShardedConfiguration:
+        """Создание (или полная замена) конфигурации"""
+        config = self._configs.pop(config_key, None)
+        if config is not None:
+            config.close()
+
+        config = ShardedConfiguration(self.kb_path / config_key, self.compact_min_records)
+        if config.directory.is_dir():
+            for shard_file in config.directory.rglob("*.jsonl"):
+                shard_file.unlink()
+        self._write_snapshot(config, data)
+        self._configs[config_key] = config
+        return config
+
+    def _write_snapshot(self, config: ShardedConfiguration, data: Dict[str, Any]) -> None:
+        config.directory.mkdir(parents=True, exist_ok=True)
+        meta = {k: v for k, v in data.items() if k not in LIST_FIELDS and k != OBJECTS_FIELD}
+        config._meta = meta
+        config._compact_meta()
+        for field in LIST_FIELDS:
+            config[field] = data.get(field, [])
+        if OBJECTS_FIELD in data:
+            config[OBJECTS_FIELD] = data[OBJECTS_FIELD]
+
+    def compact(self, config_key: Optional[str] = None) -> None:
+        """Принудительное компактирование открытых конфигураций"""
+        keys = [config_key] if config_key else list(self._configs)
+        for key in keys:
+            if key in self._configs:
+                self._configs[key].compact()
+
+    def export_json(self, config_key: str, target_file: Path) -> None:
+        """Экспорт конфигурации в legacy-формат `<config>.json`"""
+        data = self.open(config_key).to_dict()
+        target_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(target_file, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+    def close(self) -> None:
+        for config in self._configs.values():
+            config.close()
@@ -9,6 +9,8 @@ Configuration Knowledge Base Service
 - Input validation
 - Structured logging
 - Улучшена обработка ошибок
+- Append-only журнальное хранилище с ленивой загрузкой шардов
+  (KNOWLEDGE_BASE_STORAGE=journal)
 """
 
 import json
@@ -19,6 +21,7 @@ from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 from src.parsers.onec_xml_parser import OneCXMLParser
+from src.services.configuration_kb_storage import JournalKnowledgeBaseStore, ShardedConfiguration
 from src.utils.structured_logging import StructuredLogger
 
 logger = StructuredLogger(__name__).logger
@@ -51,12 +54,18 @@ class ConfigurationKnowledgeBase:
         "ka": "Комплексная автоматизация",
     }
 
-    def __init__(self, knowledge_base_path: Optional[str] = None):
+    # Режимы хранения
+    STORAGE_JSON = "json"
+    STORAGE_JOURNAL = "journal"
+
+    def __init__(self, knowledge_base_path: Optional[str] = None, storage_mode: Optional[str] = None):
         """
         Инициализация базы знаний
 
         Args:
             knowledge_base_path: Путь к директории с базой знаний
+            storage_mode: "json" (один файл на конфигурацию, по умолчанию)
+                или "journal" (append-only шарды с ленивой загрузкой)
         """
         if knowledge_base_path:
             self.kb_path = Path(knowledge_base_path)
@@ -67,6 +76,15 @@ class ConfigurationKnowledgeBase:
 
         self.kb_path.mkdir(parents=True, exist_ok=True)
 
+        self.storage_mode = (storage_mode or os.getenv(
+            "KNOWLEDGE_BASE_STORAGE", self.STORAGE_JSON)).lower()
+        if self.storage_mode not in (self.STORAGE_JSON, self.STORAGE_JOURNAL):
+            raise ValueError(f"Unsupported storage mode: {self.storage_mode}")
+
+        self._store: Optional[JournalKnowledgeBaseStore] = None
+        if self.storage_mode == self.STORAGE_JOURNAL:
+            self._store = JournalKnowledgeBaseStore(self.kb_path)
+
         # Кэш загруженных знаний
         self._cache: Dict[str, Dict[str, Any]] = {}
 
@@ -78,6 +96,13 @@ class ConfigurationKnowledgeBase:
 
     def _load_knowledge_base(self):
         """Загрузка базы знаний из файлов"""
+        if self._store is not None:
+            # Шарды читаются лениво, при первом обращении к полю
+            for config in self.SUPPORTED_CONFIGURATIONS:
+                if self._store.exists(config):
+                    self._cache[config] = self._store.open(config)
+            return
+
         for config in self.SUPPORTED_CONFIGURATIONS:
             config_file = self.kb_path / f"{config}.json"
 
@@ -162,6 +187,9 @@ class ConfigurationKnowledgeBase:
                 },
             )
 
+            if isinstance(result, ShardedConfiguration):
+                result = result.to_dict()
+
             return result
         except Exception as e:
             logger.error(
@@ -231,42 +259,33 @@ class ConfigurationKnowledgeBase:
             return False
 
         # Получаем или создаем конфигурацию
-        if config_key not in self._cache:
-            self._cache[config_key] = {
-                "name": self.CONFIG_NAME_MAP.get(config_key, config_name),
-                "modules": [],
-                "best_practices": [],
-                "common_patterns": [],
-                "api_usage": [],
-                "performance_tips": [],
-                "known_issues": [],
-            }
-
-        config_data = self._cache[config_key]
+        config_data = self._ensure_config(
+            config_key, self.CONFIG_NAME_MAP.get(config_key, config_name))
 
         # Добавляем или обновляем модуль
-        module_exists = False
+        module_entry = None
         for i, module in enumerate(config_data["modules"]):
             if module.get("name") == module_name:
-                config_data["modules"][i] = {
+                module_entry = {
                     "name": module_name,
                     "documentation": documentation,
                     "updated_at": datetime.now().isoformat(),
                 }
-                module_exists = True
+                config_data["modules"][i] = module_entry
                 break
 
-        if not module_exists:
-            config_data["modules"].append(
-                {
-                    "name": module_name,
-                    "documentation": documentation,
-                    "created_at": datetime.now().isoformat(),
-                    "updated_at": datetime.now().isoformat(),
-                }
-            )
+        if module_entry is None:
+            module_entry = {
+                "name": module_name,
+                "documentation": documentation,
+                "created_at": datetime.now().isoformat(),
+                "updated_at": datetime.now().isoformat(),
+            }
+            config_data["modules"].append(module_entry)
 
         # Сохранение в файл
+        if isinstance(config_data, ShardedConfiguration):
+            return self._journal(config_key, config_data.upsert, "modules", module_name, module_entry)
         return self._save_configuration(config_key)
 
     def add_best_practice(self, config_name: str, category: str, practice: Dict[str, Any]) -> bool:
@@ -286,8 +305,7 @@ class ConfigurationKnowledgeBase:
         if config_key not in self.SUPPORTED_CONFIGURATIONS:
             return False
 
-        if config_key not in self._cache:
-            self._cache[config_key] = self._get_default_config()
+        config_data = self._ensure_config(config_key)
 
         practice_entry = {
             "category": category,
@@ -295,8 +313,10 @@ class ConfigurationKnowledgeBase:
             "added_at": datetime.now().isoformat(),
         }
 
-        self._cache[config_key]["best_practices"].append(practice_entry)
+        config_data["best_practices"].append(practice_entry)
 
+        if isinstance(config_data, ShardedConfiguration):
+            return self._journal(config_key, config_data.append, "best_practices", practice_entry)
         return self._save_configuration(config_key)
 
     def search_patterns(
@@ -440,8 +460,40 @@ class ConfigurationKnowledgeBase:
 
         return recommendations
 
+    def _ensure_config(self, config_key: str, name: str = "") -> Dict[str, Any]:
+        """Получение конфигурации из кэша, создание пустой при отсутствии"""
+        if config_key not in self._cache:
+            data = self._get_default_config()
+            data["name"] = name
+            if self._store is not None:
+                self._cache[config_key] = self._store.create(config_key, data)
+            else:
+                self._cache[config_key] = data
+        return self._cache[config_key]
+
+    def _journal(self, config_key: str, write, *args) -> bool:
+        """Запись одной операции в журнал конфигурации"""
+        try:
+            write(*args)
+            return True
+        except Exception as e:
+            logger.error(
+                "Ошибка записи журнала базы знаний",
+                extra={
+                    "error": str(e),
+                    "error_type": type(e).__name__,
+                    "config_key": config_key,
+                },
+                exc_info=True,
+            )
+            return False
+
     def _save_configuration(self, config_key: str) -> bool:
         """Сохранение конфигурации в файл"""
+        if self._store is not None:
+            # В журнальном режиме изменения уже записаны операциями журнала
+            return True
+
         try:
             config_file = self.kb_path / f"{config_key}.json"
 
@@ -466,6 +518,31 @@ class ConfigurationKnowledgeBase:
             )
             return False
 
+    def export_configuration(self, config_name: str, target_dir: Optional[str] = None) -> Optional[Path]:
+        """
+        Экспорт конфигурации в формат `<config>.json`
+
+        Args:
+            config_name: Название конфигурации
+            target_dir: Директория экспорта (по умолчанию - директория базы знаний)
+
+        Returns:
+            Путь к файлу экспорта или None
+        """
+        config_key = config_name.lower()
+        if config_key not in self._cache:
+            return None
+
+        target_file = Path(target_dir or self.kb_path) / f"{config_key}.json"
+        data = self._cache[config_key]
+        if isinstance(data, ShardedConfiguration):
+            data = data.to_dict()
+
+        target_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(target_file, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        return target_file
+
     def _get_default_config(self) -> Dict[str, Any]:
         """Получение дефолтной структуры конфигурации"""
         return {
@@ -563,6 +640,8 @@ class ConfigurationKnowledgeBase:
                 config_name = json_file.stem.lower()
 
                 if config_name in self.SUPPORTED_CONFIGURATIONS:
+                    if self._store is not None:
+                        data = self._store.create(config_name, data)
                     self._cache[config_name] = data
                     loaded_count += 1
                     logger.info("Загружена конфигурация", extra={
@@ -642,10 +721,7 @@ class ConfigurationKnowledgeBase:
             config_key: Ключ конфигурации
             parsed_data: Распарсенные данные
         """
-        if config_key not in self._cache:
-            self._cache[config_key] = self._get_default_config()
-
-        config = self._cache[config_key]
+        config = self._ensure_config(config_key)
 
         # Обновляем базовую информацию
         config["name"] = parsed_data.get("name", config.get("name", ""))
@@ -670,10 +746,7 @@ class ConfigurationKnowledgeBase:
             config_key: Ключ конфигурации
             module_data: Данные модуля
         """
-        if config_key not in self._cache:
-            self._cache[config_key] = self._get_default_config()
-
-        config = self._cache[config_key]
+        config = self._ensure_config(config_key)
 
         # Добавляем модуль
         if "modules" not in config:
@@ -687,15 +760,20 @@ class ConfigurationKnowledgeBase:
             # Обновляем существующий
             config["modules"].remove(existing_module)
 
-        config["modules"].append(
-            {
-                "name": module_data["name"],
-                "type": module_data["type"],
-                "procedures": module_data.get("procedures", []),
-                "server": module_data.get("server", False),
-                "client": module_data.get("client", False),
-            }
-        )
+        module_entry = {
+            "name": module_data["name"],
+            "type": module_data["type"],
+            "procedures": module_data.get("procedures", []),
+            "server": module_data.get("server", False),
+            "client": module_data.get("client", False),
+        }
+        config["modules"].append(module_entry)
+
+        if isinstance(config, ShardedConfiguration):
+            if existing_module:
+                self._journal(config_key, config.delete, "modules", module_entry["name"])
+            self._journal(config_key, config.upsert, "modules", module_entry["name"], module_entry)
+            return
 
         self._save_configuration(config_key)
 
@@ -707,10 +785,7 @@ class ConfigurationKnowledgeBase:
             config_key: Ключ конфигурации
             object_data: Данные объекта
         """
-        if config_key not in self._cache:
-            self._cache[config_key] = self._get_default_config()
-
-        config = self._cache[config_key]
+        config = self._ensure_config(config_key)
 
         # Добавляем в соответствующую категорию
         object_type = object_data.get("type", "Unknown")
@@ -723,14 +798,17 @@ class ConfigurationKnowledgeBase:
             config["metadata_objects"][object_type] = []
 
         # Добавляем объект
-        config["metadata_objects"][object_type].append(
-            {
-                "name": object_data["name"],
-                "synonym": object_data.get("synonym", ""),
-                "attributes": object_data.get("attributes", []),
-                "forms": object_data.get("forms", []),
-            }
-        )
+        object_entry = {
+            "name": object_data["name"],
+            "synonym": object_data.get("synonym", ""),
+            "attributes": object_data.get("attributes", []),
+            "forms": object_data.get("forms", []),
+        }
+        config["metadata_objects"][object_type].append(object_entry)
+
+        if isinstance(config, ShardedConfiguration):
+            self._journal(config_key, config.append_object, object_type, object_entry)
+            return
 
         self._save_configuration(config_key)
 
@@ -790,9 +868,8 @@ class ConfigurationKnowledgeBase:
             #         stats["errors"] += 1
             
             # Save timestamp
-            if config_key not in self._cache:
-                self._cache[config_key] = self._get_default_config()
-                
+            self._ensure_config(config_key)
+
             self._cache[config_key]["last_sync"] = datetime.now().isoformat()
             self._cache[config_key]["sync_source"] = "odata"
             self._save_configuration(config_key)
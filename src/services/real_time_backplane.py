@@ -0,0 +1,208 @@
+"""
+Real-Time Backplane
+
+Транспорт рассылок RealTimeManager между воркерами и подами.
+
+WebSocket-клиенты распределены по процессам, поэтому broadcast одного
+воркера должен дойти до клиентов всех остальных. Backplane передаёт
+готовые пачки сообщений (bytes) по топику; формирование пачек,
+дедупликация своих сообщений и локальная доставка - в RealTimeManager.
+
+Реализации:
+- InProcessBackplane: в пределах процесса (тесты, один воркер)
+- RedisBackplane: Redis pub/sub
+- NATSBackplane: NATS через соединение NATSEventBus
+"""
+
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, List, Optional
+
+from src.infrastructure.event_bus_nats import NATS_AVAILABLE
+
+logger = logging.getLogger(__name__)
+
+# Обработчик входящей пачки: (topic, payload)
+BatchHandler = Callable[[str, bytes], Awaitable[None]]
+
+
+class Backplane(ABC):
+    """Транспорт пачек сообщений по топикам между воркерами"""
+
+    @abstractmethod
+    async def start(self, handler: BatchHandler) -> None:
+        """Подписка на все топики; handler вызывается на каждую пачку"""
+
+    @abstractmethod
+    async def publish(self, topic: str, payload: bytes) -> None:
+        """Публикация пачки сообщений топика"""
+
+    @abstractmethod
+    async def stop(self) -> None:
+        """Отписка и освобождение ресурсов"""
+
+
+class InProcessBackplane(Backplane):
+    """
+    Backplane в пределах одного процесса
+
+    Несколько RealTimeManager с общим hub ведут себя как воркеры с общим
+    Redis/NATS: каждая пачка доставляется всем подписчикам, включая
+    отправителя. Доставка асинхронная, как у сетевых реализаций.
+    """
+
+    def __init__(self, hub: Optional["InProcessBackplane.Hub"] = None):
+        self.hub = hub if hub is not None else InProcessBackplane.Hub()
+        self._handler: Optional[BatchHandler] = None
+
+    class Hub:
+        """Общая "шина" для нескольких InProcessBackplane"""
+
+        def __init__(self):
+            self.subscribers: List["InProcessBackplane"] = []
+            self.published = 0
+
+    async def start(self, handler: BatchHandler) -> None:
+        self._handler = handler
+        if self not in self.hub.subscribers:
+            self.hub.subscribers.append(self)
+
+    async def publish(self, topic: str, payload: bytes) -> None:
+        self.hub.published += 1
+        loop = asyncio.get_running_loop()
+        for subscriber in list(self.hub.subscribers):
+            if subscriber._handler is not None:
+                loop.create_task(subscriber._handler(topic, payload))
+
+    async def stop(self) -> None:
+        if self in self.hub.subscribers:
+            self.hub.subscribers.remove(self)
+        self._handler = None
+
+
+class RedisBackplane(Backplane):
+    """
+    Backplane на Redis pub/sub
+
+    Топик публикуется в канал f"{channel_prefix}{topic}", воркер подписан
+    на шаблон f"{channel_prefix}*". Доставка at-most-once: пока воркер
+    переподключается, сообщения теряются - для снимков дашбордов и
+    алертов это допустимо.
+    """
+
+    def __init__(self, redis_client, channel_prefix: str = "realtime:", reconnect_delay: float = 1.0):
+        """
+        Args:
+            redis_client: redis.asyncio.Redis (pub/sub берёт отдельное соединение из пула)
+            channel_prefix: Префикс каналов
+            reconnect_delay: Пауза перед повторной подпиской после ошибки
+        """
+        self.redis = redis_client
+        self.channel_prefix = channel_prefix
+        self.reconnect_delay = reconnect_delay
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self, handler: BatchHandler) -> None:
+        self._pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.psubscribe(f"{self.channel_prefix}*")
+        self._listener = asyncio.get_running_loop().create_task(self._listen(handler))
+        logger.info("Redis backplane subscribed: %s*", self.channel_prefix)
+
+    async def _listen(self, handler: BatchHandler) -> None:
+        prefix_length = len(self.channel_prefix)
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None or message.get("type") != "pmessage":
+                    continue
+                channel = message["channel"]
+                if isinstance(channel, bytes):
+                    channel = channel.decode()
+                await handler(channel[prefix_length:], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(
+                    "Redis backplane receive failed",
+                    extra={"error": str(e), "error_type": type(e).__name__},
+                )
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def publish(self, topic: str, payload: bytes) -> None:
+        await self.redis.publish(f"{self.channel_prefix}{topic}", payload)
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.punsubscribe()
+                await self._pubsub.close()
+            except Exception as e:
+                logger.warning("Error closing Redis backplane: %s", e)
+            self._pubsub = None
+
+
+class NATSBackplane(Backplane):
+    """
+    Backplane на NATS (core NATS, без JetStream)
+
+    Использует соединение NATSEventBus: топик публикуется в subject
+    f"{subject_prefix}.{topic}", воркер подписан на f"{subject_prefix}.>".
+    Если шина не передана, создаётся собственная без JetStream.
+    """
+
+    def __init__(
+        self,
+        event_bus=None,
+        nats_url: str = "nats://localhost:4222",
+        subject_prefix: str = "realtime",
+    ):
+        if not NATS_AVAILABLE:
+            raise ImportError("NATS not available. Install: pip install nats-py")
+
+        self.event_bus = event_bus
+        self.nats_url = nats_url
+        self.subject_prefix = subject_prefix
+        self._owns_bus = event_bus is None
+        self._subscription = None
+
+    async def start(self, handler: BatchHandler) -> None:
+        if self.event_bus is None:
+            from src.infrastructure.event_bus_nats import NATSEventBus
+
+            self.event_bus = NATSEventBus(nats_url=self.nats_url, enable_jetstream=False)
+            await self.event_bus.start(num_workers=1)
+
+        prefix_length = len(self.subject_prefix) + 1
+
+        async def on_message(msg):
+            try:
+                await handler(msg.subject[prefix_length:], msg.data)
+            except Exception as e:
+                logger.error(
+                    "Error handling NATS backplane message",
+                    extra={"error": str(e), "subject": msg.subject},
+                    exc_info=True,
+                )
+
+        self._subscription = await self.event_bus.subscribe_raw(f"{self.subject_prefix}.>", on_message)
+        logger.info("NATS backplane subscribed: %s.>", self.subject_prefix)
+
+    async def publish(self, topic: str, payload: bytes) -> None:
+        await self.event_bus.publish_raw(f"{self.subject_prefix}.{topic}", payload)
+
+    async def stop(self) -> None:
+        if self._subscription is not None:
+            try:
+                await self._subscription.unsubscribe()
+            except Exception as e:
+                logger.warning("Error unsubscribing NATS backplane: %s", e)
+            self._subscription = None
+        if self._owns_bus and self.event_bus is not None:
+            await self.event_bus.stop()
+            self.event_bus = None
@@ -9,15 +9,21 @@ Real-Time Service
 - Structured logging
 - Улучшена обработка ошибок
 - Timeout handling
+- Fan-out рассылка через очереди соединений (websocket_fanout)
+- Backplane (Redis/NATS) для рассылок на клиентов всех воркеров и подов
 """
 
 import asyncio
+import json
 import re
 from datetime import datetime
-from typing import Any, Dict, Set
+from typing import Any, Dict, List, Optional, Set
+from uuid import uuid4
 
 from fastapi import WebSocket
 
+from src.services.real_time_backplane import Backplane
+from src.services.websocket_fanout import FanoutEngine, FanoutMessage, SlowConsumerPolicy
 from src.utils.structured_logging import StructuredLogger
 
 logger = StructuredLogger(__name__).logger
@@ -32,12 +38,59 @@ class RealTimeManager:
     - Topic-based subscriptions
     - Broadcast to specific topics
     - Automatic reconnection handling
+    - Fan-out: одна сериализация на рассылку, очередь и писатель на клиента;
+      обновления дашбордов схлопываются у медленных клиентов до последнего
+    - Backplane: рассылка доставляется локальным клиентам сразу, а другим
+      воркерам - одной пачкой на топик за тик (batch_interval)
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        max_queue_size: int = 100,
+        slow_consumer_policy: SlowConsumerPolicy = SlowConsumerPolicy.COALESCE,
+        batch_interval: float = 0.0,
+    ):
         # Active connections: topic → set of websockets
         self.connections: Dict[str, Set[WebSocket]] = {}
         self.connection_metadata: Dict[WebSocket, Dict] = {}
+        self.fanout = FanoutEngine(
+            channel="real_time",
+            max_queue_size=max_queue_size,
+            policy=slow_consumer_policy,
+            on_disconnect=self.disconnect,
+        )
+
+        # Backplane: пачки сообщений по топикам для других воркеров
+        self.backplane: Optional[Backplane] = None
+        self.batch_interval = batch_interval
+        self.worker_id = uuid4().hex
+        self._outbox: Dict[str, List[Dict[str, Any]]] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_tasks: Set[asyncio.Task] = set()
+        self._backplane_stats = {
+            "batches_published": 0,
+            "messages_published": 0,
+            "batches_received": 0,
+            "messages_received": 0,
+            "publish_errors": 0,
+        }
+
+    async def attach_backplane(self, backplane: Backplane) -> None:
+        """Подключает backplane: рассылки начинают доходить до всех воркеров"""
+        await backplane.start(self._on_backplane_batch)
+        self.backplane = backplane
+        logger.info(
+            "Real-time backplane attached",
+            extra={"backplane": type(backplane).__name__, "worker_id": self.worker_id},
+        )
+
+    async def detach_backplane(self) -> None:
+        """Отправляет накопленные пачки и отключает backplane"""
+        if self.backplane is None:
+            return
+        await self.flush_backplane()
+        backplane, self.backplane = self.backplane, None
+        await backplane.stop()
 
     async def connect(self, websocket: WebSocket, topic: str = "general", timeout: float = 10.0):
         """
@@ -75,8 +128,8 @@ class RealTimeManager:
             self.connection_metadata[websocket] = {
                 "topic": topic,
                 "connected_at": datetime.now(),
-                "messages_sent": 0,
             }
+            self.fanout.register(websocket)
 
             logger.info(
                 f"Client connected to topic '{topic}'",
@@ -86,17 +139,14 @@ class RealTimeManager:
                 },
             )
 
-            # Send welcome message with timeout
-            await asyncio.wait_for(
-                self.send_to_client(
-                    websocket,
-                    {
-                        "type": "connected",
-                        "topic": topic,
-                        "timestamp": datetime.now().isoformat(),
-                    },
-                ),
-                timeout=5.0,
+            # Welcome message - первым в очереди соединения
+            await self.send_to_client(
+                websocket,
+                {
+                    "type": "connected",
+                    "topic": topic,
+                    "timestamp": datetime.now().isoformat(),
+                },
             )
         except asyncio.TimeoutError:
             logger.error(
@@ -126,6 +176,8 @@ class RealTimeManager:
             if websocket in self.connection_metadata:
                 del self.connection_metadata[websocket]
 
+            self.fanout.unregister(websocket)
+
             logger.info("Client disconnected", extra={"topic": topic})
 
         except Exception as e:
@@ -157,34 +209,35 @@ class RealTimeManager:
             return
 
         try:
-            await asyncio.wait_for(websocket.send_json(message), timeout=timeout)
-
-            if websocket in self.connection_metadata:
-                self.connection_metadata[websocket]["messages_sent"] += 1
-
-        except asyncio.TimeoutError:
-            logger.warning(f"Send message timeout after {timeout}s", extra={
-                           "timeout": timeout})
-            await self.disconnect(websocket)
-        except Exception as e:
+            self.fanout.publish([websocket], message, timeout=timeout)
+        except (TypeError, ValueError) as e:
             logger.error(
-                f"Error sending to client: {e}",
+                f"Error serializing message for client: {e}",
                 extra={
                     "error_type": type(e).__name__,
                     "message_type": message.get("type", "unknown"),
                 },
-                exc_info=True,
             )
-            await self.disconnect(websocket)
 
-    async def broadcast_to_topic(self, topic: str, message: Dict[str, Any], timeout: float = 5.0):
+    async def broadcast_to_topic(
+        self,
+        topic: str,
+        message: Dict[str, Any],
+        timeout: float = 5.0,
+        coalesce: bool = False,
+    ):
         """
         Broadcast message to all clients subscribed to topic с input validation
 
+        Сообщение сериализуется один раз и ставится в очереди клиентов;
+        метод не ждёт отправки, медленный клиент не задерживает остальных.
+
         Args:
             topic: Topic name
             message: Message to broadcast
             timeout: Send timeout (seconds)
+            coalesce: Сообщение - снимок состояния: у клиента, который ещё
+                не получил предыдущий снимок этого топика, он заменяется новым
         """
         # Input validation
         if not topic or not isinstance(topic, str):
@@ -210,7 +263,8 @@ class RealTimeManager:
             logger.warning("Topic sanitized to empty, skipping broadcast")
             return
 
-        if topic not in self.connections:
+        # Подписчики топика могут быть на других воркерах
+        if topic not in self.connections and self.backplane is None:
             logger.debug("No connections for topic", extra={"topic": topic})
             return
 
@@ -218,40 +272,35 @@ class RealTimeManager:
         message["topic"] = topic
         message["timestamp"] = datetime.now().isoformat()
 
-        # Broadcast to all clients
-        disconnected = []
-
-        for websocket in self.connections[topic].copy():
-            try:
-                await asyncio.wait_for(websocket.send_json(message), timeout=timeout)
-
-                if websocket in self.connection_metadata:
-                    self.connection_metadata[websocket]["messages_sent"] += 1
+        try:
+            fanout_message = FanoutMessage.from_dict(message)
+        except (TypeError, ValueError) as e:
+            logger.error(
+                f"Failed to serialize broadcast for topic '{topic}': {e}",
+                extra={"topic": topic, "error_type": type(e).__name__},
+            )
+            return
 
-            except asyncio.TimeoutError:
-                logger.warning(
-                    f"Send timeout to client on topic '{topic}'",
-                    extra={"topic": topic, "timeout": timeout},
-                )
-                disconnected.append(websocket)
-            except Exception as e:
-                logger.warning(
-                    f"Failed to send to client: {e}",
-                    extra={"topic": topic, "error_type": type(e).__name__},
-                )
-                disconnected.append(websocket)
+        if self.backplane is not None:
+            self._enqueue_remote(topic, fanout_message, timeout, coalesce)
 
-        # Clean up disconnected clients
-        for ws in disconnected:
-            await self.disconnect(ws)
+        queued = self._deliver_local(topic, fanout_message, timeout, coalesce)
+        if queued:
+            logger.info(
+                f"Broadcasted to {queued} clients on topic '{topic}'",
+                extra={"topic": topic, "clients_count": queued},
+            )
 
-        logger.info(
-            f"Broadcasted to {len(self.connections[topic])} clients on topic '{topic}'",
-            extra={
-                "topic": topic,
-                "clients_count": len(self.connections[topic]),
-                "disconnected_count": len(disconnected),
-            },
+    def _deliver_local(self, topic: str, message: FanoutMessage, timeout: float, coalesce: bool) -> int:
+        """Ставит готовое сообщение в очереди клиентов топика на этом воркере"""
+        clients = self.connections.get(topic)
+        if not clients:
+            return 0
+        return self.fanout.publish(
+            clients,
+            message,
+            coalesce_key=f"{topic}:{message.message_type}" if coalesce else None,
+            timeout=timeout,
         )
 
     async def broadcast_dashboard_update(self, dashboard_type: str, data: Dict[str, Any]):
@@ -265,6 +314,7 @@ class RealTimeManager:
         await self.broadcast_to_topic(
             f"dashboard_{dashboard_type}",
             {"type": "dashboard_update", "dashboard": dashboard_type, "data": data},
+            coalesce=True,
         )
 
     async def broadcast_notification(self, user_id: str, notification: Dict[str, Any]):
@@ -275,6 +325,91 @@ class RealTimeManager:
         """Broadcast system-wide alert"""
         await self.broadcast_to_topic("system", {"type": "alert", "alert": alert})
 
+    # ------------------------------------------------------------------ #
+    # Backplane
+    # ------------------------------------------------------------------ #
+
+    def _enqueue_remote(self, topic: str, message: FanoutMessage, timeout: float, coalesce: bool) -> None:
+        """Добавляет сообщение в пачку топика; пачки уходят раз в тик"""
+        item = {"text": message.text, "type": message.message_type, "timeout": timeout, "coalesce": coalesce}
+        batch = self._outbox.setdefault(topic, [])
+        if coalesce:
+            # Другим воркерам нужен только последний снимок за тик
+            for index, queued in enumerate(batch):
+                if queued["coalesce"] and queued["type"] == item["type"]:
+                    batch[index] = item
+                    break
+            else:
+                batch.append(item)
+        else:
+            batch.append(item)
+
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.batch_interval, self._schedule_flush)
+
+    def _schedule_flush(self) -> None:
+        self._flush_handle = None
+        task = asyncio.ensure_future(self.flush_backplane())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def flush_backplane(self) -> None:
+        """Публикует накопленные пачки: одна публикация на топик"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        outbox, self._outbox = self._outbox, {}
+        if not outbox or self.backplane is None:
+            return
+
+        topics = list(outbox)
+        results = await asyncio.gather(
+            *(self.backplane.publish(topic, self._encode_batch(outbox[topic])) for topic in topics),
+            return_exceptions=True,
+        )
+        for topic, result in zip(topics, results):
+            if isinstance(result, Exception):
+                self._backplane_stats["publish_errors"] += 1
+                logger.warning(
+                    f"Failed to publish batch for topic '{topic}' to backplane: {result}",
+                    extra={"topic": topic, "error_type": type(result).__name__},
+                )
+                continue
+            self._backplane_stats["batches_published"] += 1
+            self._backplane_stats["messages_published"] += len(outbox[topic])
+
+    def _encode_batch(self, items: List[Dict[str, Any]]) -> bytes:
+        # Сообщения уже сериализованы - получатели не сериализуют их повторно
+        return json.dumps(
+            {"origin": self.worker_id, "messages": items}, separators=(",", ":"), ensure_ascii=False
+        ).encode()
+
+    async def _on_backplane_batch(self, topic: str, payload: bytes) -> None:
+        """Доставляет пачку другого воркера локальным клиентам топика"""
+        try:
+            batch = json.loads(payload)
+        except ValueError as e:
+            logger.warning(
+                f"Invalid backplane batch for topic '{topic}': {e}",
+                extra={"topic": topic, "error_type": type(e).__name__},
+            )
+            return
+
+        # Свои сообщения уже доставлены локально при рассылке
+        if batch.get("origin") == self.worker_id:
+            return
+
+        messages = batch.get("messages", [])
+        self._backplane_stats["batches_received"] += 1
+        self._backplane_stats["messages_received"] += len(messages)
+        for item in messages:
+            self._deliver_local(
+                topic,
+                FanoutMessage(text=item["text"], message_type=item.get("type", "unknown")),
+                item.get("timeout", 5.0),
+                item.get("coalesce", False),
+            )
+
     def get_stats(self) -> Dict[str, Any]:
         """Get connection statistics"""
         total_connections = sum(len(clients) for clients in self.connections.values())
@@ -283,7 +418,14 @@ class RealTimeManager:
             "total_connections": total_connections,
             "topics": list(self.connections.keys()),
             "connections_per_topic": {topic: len(clients) for topic, clients in self.connections.items()},
-            "total_messages_sent": sum(meta["messages_sent"] for meta in self.connection_metadata.values()),
+            "total_messages_sent": sum(self.fanout.sent_count(ws) for ws in self.connection_metadata),
+            "fanout": self.fanout.get_stats(),
+            "backplane": {
+                "enabled": self.backplane is not None,
+                "worker_id": self.worker_id,
+                "pending_topics": len(self._outbox),
+                **self._backplane_stats,
+            },
         }
 
 
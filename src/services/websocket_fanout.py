@@ -0,0 +1,355 @@
+"""
+WebSocket Fan-out Engine
+
+Рассылка одного сообщения многим WebSocket-клиентам:
+- сообщение сериализуется один раз, все клиенты получают общий payload
+- у каждого соединения своя ограниченная очередь и задача-писатель,
+  медленный клиент не задерживает остальных
+- политика для переполненной очереди: drop oldest / coalesce / disconnect
+- метрики: задержка доставки (постановка в очередь → отправка),
+  глубина очередей, сброшенные сообщения
+"""
+
+import asyncio
+import inspect
+import json
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, Optional, Union
+
+from fastapi import WebSocket
+
+from src.utils.structured_logging import StructuredLogger
+
+logger = StructuredLogger(__name__).logger
+
+try:
+    from prometheus_client import Counter, Gauge, Histogram
+
+    PROMETHEUS_AVAILABLE = True
+
+    fanout_delivery_latency = Histogram(
+        "websocket_fanout_delivery_seconds",
+        "Time from broadcast enqueue to WebSocket send completion",
+        ["channel"],
+        buckets=[0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0],
+    )
+    fanout_publish_duration = Histogram(
+        "websocket_fanout_publish_seconds",
+        "Time to serialize and enqueue a broadcast for all recipients",
+        ["channel"],
+        buckets=[0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1],
+    )
+    fanout_queue_depth = Gauge(
+        "websocket_fanout_queue_depth",
+        "Messages waiting in per-connection send queues",
+        ["channel"],
+    )
+    fanout_dropped_total = Counter(
+        "websocket_fanout_dropped_total",
+        "Messages dropped or replaced for slow WebSocket consumers",
+        ["channel", "reason"],
+    )
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+
+class SlowConsumerPolicy(str, Enum):
+    """Что делать, когда очередь соединения заполнена"""
+
+    DROP_OLDEST = "drop_oldest"  # Выбросить самое старое сообщение
+    COALESCE = "coalesce"  # Заменить ожидающее сообщение с тем же ключом
+    DISCONNECT = "disconnect"  # Отключить медленного клиента
+
+
+@dataclass
+class FanoutMessage:
+    """Сообщение, сериализованное один раз для всех получателей"""
+
+    text: str
+    message_type: str = "unknown"
+
+    @classmethod
+    def from_dict(cls, message: Dict[str, Any]) -> "FanoutMessage":
+        # Те же параметры, что у WebSocket.send_json
+        text = json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+        return cls(text=text, message_type=str(message.get("type", "unknown")))
+
+
+@dataclass
+class _QueuedMessage:
+    message: FanoutMessage
+    enqueued_at: float
+    timeout: float
+    coalesce_key: Optional[str] = None
+
+
+@dataclass
+class ConnectionWriter:
+    """Очередь отправки и задача-писатель одного соединения"""
+
+    websocket: WebSocket
+    queue: Deque[_QueuedMessage] = field(default_factory=deque)
+    pending_keys: Dict[str, _QueuedMessage] = field(default_factory=dict)
+    wakeup: asyncio.Event = field(default_factory=asyncio.Event)
+    task: Optional[asyncio.Task] = None
+    closed: bool = False
+    sent: int = 0
+    dropped: int = 0
+
+
+class FanoutEngine:
+    """
+    Fan-out рассылка по ограниченным очередям соединений
+
+    publish() синхронный: сериализует сообщение один раз и раскладывает
+    его по очередям, не ожидая отправки. Отправкой занимается задача-писатель
+    каждого соединения; ошибка или таймаут отправки отключает соединение
+    через on_disconnect.
+    """
+
+    def __init__(
+        self,
+        channel: str,
+        max_queue_size: int = 100,
+        send_timeout: float = 5.0,
+        policy: SlowConsumerPolicy = SlowConsumerPolicy.COALESCE,
+        on_disconnect: Optional[Callable[[WebSocket], Union[None, Awaitable[None]]]] = None,
+    ):
+        self.channel = channel
+        self.max_queue_size = max_queue_size
+        self.send_timeout = send_timeout
+        self.policy = policy
+        self.on_disconnect = on_disconnect
+        self._writers: Dict[WebSocket, ConnectionWriter] = {}
+        self._queued = 0
+        self._stats = {"published": 0, "sent": 0, "dropped": 0, "coalesced": 0, "disconnected": 0}
+
+        # Метрики с меткой канала - разрешаем один раз
+        if PROMETHEUS_AVAILABLE:
+            self._delivery_latency = fanout_delivery_latency.labels(channel=channel)
+            self._publish_duration = fanout_publish_duration.labels(channel=channel)
+            self._queue_depth = fanout_queue_depth.labels(channel=channel)
+            self._dropped = {
+                reason: fanout_dropped_total.labels(channel=channel, reason=reason)
+                for reason in ("dropped", "coalesced")
+            }
+
+    # ------------------------------------------------------------------ #
+    # Регистрация соединений
+    # ------------------------------------------------------------------ #
+
+    def register(self, websocket: WebSocket) -> ConnectionWriter:
+        """Создаёт очередь и задачу-писатель для соединения"""
+        writer = self._writers.get(websocket)
+        if writer is None:
+            writer = ConnectionWriter(websocket=websocket)
+            writer.task = asyncio.get_running_loop().create_task(self._run_writer(writer))
+            self._writers[websocket] = writer
+        return writer
+
+    def unregister(self, websocket: WebSocket) -> None:
+        """Останавливает писатель соединения и отбрасывает его очередь"""
+        writer = self._writers.pop(websocket, None)
+        if writer is None:
+            return
+        writer.closed = True
+        self._discard_queue(writer)
+        writer.wakeup.set()
+        try:
+            current = asyncio.current_task()
+        except RuntimeError:
+            current = None
+        if writer.task is not None and writer.task is not current:
+            writer.task.cancel()
+
+    def __contains__(self, websocket: WebSocket) -> bool:
+        return websocket in self._writers
+
+    def sent_count(self, websocket: WebSocket) -> int:
+        """Сколько сообщений доставлено соединению"""
+        writer = self._writers.get(websocket)
+        return writer.sent if writer else 0
+
+    # ------------------------------------------------------------------ #
+    # Публикация
+    # ------------------------------------------------------------------ #
+
+    def publish(
+        self,
+        websockets: Iterable[WebSocket],
+        message: Union[Dict[str, Any], FanoutMessage],
+        coalesce_key: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> int:
+        """
+        Ставит сообщение в очереди соединений
+
+        Args:
+            websockets: Получатели (должны быть зарегистрированы)
+            message: dict (сериализуется один раз) или готовый FanoutMessage
+            coalesce_key: Ключ замены - новое сообщение заменяет ещё не
+                отправленное с тем же ключом (снимки дашбордов и т.п.)
+            timeout: Таймаут отправки этого сообщения (по умолчанию send_timeout)
+
+        Returns:
+            Число соединений, в чьи очереди попало сообщение
+        """
+        started = time.perf_counter()
+        if not isinstance(message, FanoutMessage):
+            message = FanoutMessage.from_dict(message)
+
+        now = time.monotonic()
+        timeout = self.send_timeout if timeout is None else timeout
+        delivered = 0
+        # Копия: политика DISCONNECT может менять исходную коллекцию
+        for websocket in list(websockets):
+            writer = self._writers.get(websocket)
+            if writer is None or writer.closed:
+                continue
+            if self._enqueue(writer, _QueuedMessage(message, now, timeout, coalesce_key)):
+                delivered += 1
+
+        self._stats["published"] += 1
+        if PROMETHEUS_AVAILABLE:
+            self._publish_duration.observe(time.perf_counter() - started)
+            self._queue_depth.set(self._queued)
+        return delivered
+
+    def _enqueue(self, writer: ConnectionWriter, item: _QueuedMessage) -> bool:
+        key = item.coalesce_key
+        if key is not None and self.policy == SlowConsumerPolicy.COALESCE:
+            pending = writer.pending_keys.get(key)
+            if pending is not None:
+                # Клиенту нужен только последний снимок - заменяем на месте
+                pending.message = item.message
+                pending.enqueued_at = item.enqueued_at
+                pending.timeout = item.timeout
+                self._record_drop(writer, "coalesced")
+                return True
+
+        if len(writer.queue) >= self.max_queue_size:
+            if self.policy == SlowConsumerPolicy.DISCONNECT:
+                logger.warning(
+                    "Slow WebSocket consumer disconnected",
+                    extra={"channel": self.channel, "queue_size": len(writer.queue)},
+                )
+                self._stats["disconnected"] += 1
+                self._close_writer(writer)
+                return False
+            self._pop(writer)
+            self._record_drop(writer, "dropped")
+
+        writer.queue.append(item)
+        if key is not None:
+            writer.pending_keys[key] = item
+        self._queued += 1
+        writer.wakeup.set()
+        return True
+
+    def _pop(self, writer: ConnectionWriter) -> _QueuedMessage:
+        item = writer.queue.popleft()
+        self._queued -= 1
+        if item.coalesce_key is not None and writer.pending_keys.get(item.coalesce_key) is item:
+            del writer.pending_keys[item.coalesce_key]
+        return item
+
+    def _discard_queue(self, writer: ConnectionWriter) -> None:
+        self._queued -= len(writer.queue)
+        writer.queue.clear()
+        writer.pending_keys.clear()
+
+    def _record_drop(self, writer: ConnectionWriter, reason: str) -> None:
+        writer.dropped += 1
+        self._stats[reason] += 1
+        if PROMETHEUS_AVAILABLE:
+            self._dropped[reason].inc()
+
+    # ------------------------------------------------------------------ #
+    # Писатель соединения
+    # ------------------------------------------------------------------ #
+
+    async def _run_writer(self, writer: ConnectionWriter) -> None:
+        websocket = writer.websocket
+        while not writer.closed:
+            if not writer.queue:
+                writer.wakeup.clear()
+                await writer.wakeup.wait()
+                continue
+
+            item = self._pop(writer)
+            try:
+                await asyncio.wait_for(websocket.send_text(item.message.text), timeout=item.timeout)
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                logger.warning(
+                    "WebSocket send timeout",
+                    extra={"channel": self.channel, "timeout": item.timeout},
+                )
+                await self._handle_failure(writer)
+                return
+            except Exception as e:
+                logger.warning(
+                    f"Failed to send WebSocket message: {e}",
+                    extra={
+                        "channel": self.channel,
+                        "error_type": type(e).__name__,
+                        "message_type": item.message.message_type,
+                    },
+                )
+                await self._handle_failure(writer)
+                return
+
+            writer.sent += 1
+            self._stats["sent"] += 1
+            if PROMETHEUS_AVAILABLE:
+                self._delivery_latency.observe(time.monotonic() - item.enqueued_at)
+                self._queue_depth.set(self._queued)
+
+    def _close_writer(self, writer: ConnectionWriter) -> None:
+        """Закрывает писатель из publish() - уведомление уходит в фон"""
+        self.unregister(writer.websocket)
+        if self.on_disconnect is not None:
+            result = self.on_disconnect(writer.websocket)
+            if inspect.isawaitable(result):
+                asyncio.ensure_future(result)
+
+    async def _handle_failure(self, writer: ConnectionWriter) -> None:
+        """Закрывает писатель после ошибки отправки"""
+        self.unregister(writer.websocket)
+        if self.on_disconnect is not None:
+            result = self.on_disconnect(writer.websocket)
+            if inspect.isawaitable(result):
+                await result
+
+    # ------------------------------------------------------------------ #
+    # Служебное
+    # ------------------------------------------------------------------ #
+
+    async def drain(self, timeout: float = 5.0) -> bool:
+        """Ждёт, пока все очереди опустеют (для тестов и graceful shutdown)"""
+        deadline = time.monotonic() + timeout
+        while self._queued > 0 and time.monotonic() < deadline:
+            await asyncio.sleep(0.001)
+        return self._queued == 0
+
+    async def close(self) -> None:
+        """Останавливает все писатели"""
+        writers = list(self._writers.values())
+        for writer in writers:
+            self.unregister(writer.websocket)
+        tasks = [writer.task for writer in writers if writer.task is not None]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика fan-out"""
+        return {
+            **self._stats,
+            "connections": len(self._writers),
+            "queued": self._queued,
+            "max_queue_depth": max((len(w.queue) for w in self._writers.values()), default=0),
+        }
@@ -9,13 +9,15 @@ WebSocket Manager for Real-Time Updates
 - Structured logging
 - Input validation
 - Connection timeout handling
+- Fan-out рассылка через очереди соединений (websocket_fanout)
 """
 
 import asyncio
-from typing import Any, Dict, Optional, Set
+from typing import Any, Dict, Optional, Set, Tuple
 
 from fastapi import WebSocket
 
+from src.services.websocket_fanout import FanoutEngine, SlowConsumerPolicy
 from src.utils.structured_logging import StructuredLogger
 
 logger = StructuredLogger(__name__).logger
@@ -30,9 +32,15 @@ class ConnectionManager:
     - Broadcast to all connections
     - Send to specific user/tenant
     - Room-based messaging
+    - Fan-out через FanoutEngine: одна сериализация на рассылку, очередь
+      и задача-писатель на соединение, медленный клиент не тормозит остальных
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        max_queue_size: int = 100,
+        slow_consumer_policy: SlowConsumerPolicy = SlowConsumerPolicy.COALESCE,
+    ):
         # Active connections
         self.active_connections: Set[WebSocket] = set()
 
@@ -45,6 +53,16 @@ class ConnectionManager:
         # Room connections (room_id → WebSocket)
         self.room_connections: Dict[str, Set[WebSocket]] = {}
 
+        # WebSocket → (user_id, tenant_id) для очистки при ошибке отправки
+        self.connection_info: Dict[WebSocket, Tuple[Optional[str], Optional[str]]] = {}
+
+        self.fanout = FanoutEngine(
+            channel="websocket_manager",
+            max_queue_size=max_queue_size,
+            policy=slow_consumer_policy,
+            on_disconnect=self._on_send_failure,
+        )
+
     async def connect(
         self,
         websocket: WebSocket,
@@ -72,6 +90,8 @@ class ConnectionManager:
             await asyncio.wait_for(websocket.accept(), timeout=timeout)
 
             self.active_connections.add(websocket)
+            self.connection_info[websocket] = (user_id, tenant_id)
+            self.fanout.register(websocket)
 
             if user_id:
                 if user_id not in self.user_connections:
@@ -129,7 +149,12 @@ class ConnectionManager:
             )
             tenant_id = None
 
+        known_user_id, known_tenant_id = self.connection_info.pop(websocket, (None, None))
+        user_id = user_id or known_user_id
+        tenant_id = tenant_id or known_tenant_id
+
         self.active_connections.discard(websocket)
+        self.fanout.unregister(websocket)
 
         if user_id and user_id in self.user_connections:
             self.user_connections[user_id].discard(websocket)
@@ -177,29 +202,7 @@ class ConnectionManager:
             return
 
         if user_id in self.user_connections:
-            disconnected = []
-            for websocket in self.user_connections[user_id]:
-                try:
-                    await asyncio.wait_for(
-                        websocket.send_json(message), timeout=timeout
-                    )
-                except asyncio.TimeoutError:
-                    logger.warning(
-                        f"Send message timeout to user {user_id}",
-                        extra={"user_id": user_id, "timeout": timeout},
-                    )
-                    disconnected.append(websocket)
-                except Exception as e:
-                    # Connection closed or error
-                    logger.warning(
-                        f"Failed to send message to user {user_id}: {e}",
-                        extra={"user_id": user_id, "error_type": type(e).__name__},
-                    )
-                    disconnected.append(websocket)
-
-            # Clean up disconnected connections
-            for ws in disconnected:
-                self.disconnect(ws, user_id=user_id)
+            self._publish(self.user_connections[user_id], message, timeout)
 
     async def send_to_tenant(
         self, message: Dict[str, Any], tenant_id: str, timeout: float = 5.0
@@ -224,28 +227,7 @@ class ConnectionManager:
             return
 
         if tenant_id in self.tenant_connections:
-            disconnected = []
-            for websocket in self.tenant_connections[tenant_id]:
-                try:
-                    await asyncio.wait_for(
-                        websocket.send_json(message), timeout=timeout
-                    )
-                except asyncio.TimeoutError:
-                    logger.warning(
-                        f"Send message timeout to tenant {tenant_id}",
-                        extra={"tenant_id": tenant_id, "timeout": timeout},
-                    )
-                    disconnected.append(websocket)
-                except Exception as e:
-                    logger.warning(
-                        f"Failed to send message to tenant {tenant_id}: {e}",
-                        extra={"tenant_id": tenant_id, "error_type": type(e).__name__},
-                    )
-                    disconnected.append(websocket)
-
-            # Clean up disconnected connections
-            for ws in disconnected:
-                self.disconnect(ws, tenant_id=tenant_id)
+            self._publish(self.tenant_connections[tenant_id], message, timeout)
 
     async def send_to_room(
         self, message: Dict[str, Any], room_id: str, timeout: float = 5.0
@@ -270,30 +252,7 @@ class ConnectionManager:
             return
 
         if room_id in self.room_connections:
-            disconnected = []
-            for websocket in self.room_connections[room_id]:
-                try:
-                    await asyncio.wait_for(
-                        websocket.send_json(message), timeout=timeout
-                    )
-                except asyncio.TimeoutError:
-                    logger.warning(
-                        f"Send message timeout to room {room_id}",
-                        extra={"room_id": room_id, "timeout": timeout},
-                    )
-                    disconnected.append(websocket)
-                except Exception as e:
-                    logger.warning(
-                        f"Failed to send message to room {room_id}: {e}",
-                        extra={"room_id": room_id, "error_type": type(e).__name__},
-                    )
-                    disconnected.append(websocket)
-
-            # Clean up disconnected connections
-            for ws in disconnected:
-                self.disconnect(ws)
-                if room_id in self.room_connections:
-                    self.room_connections[room_id].discard(ws)
+            self._publish(self.room_connections[room_id], message, timeout)
 
     async def broadcast(self, message: Dict[str, Any], timeout: float = 5.0):
         """Broadcast message to all active connections с input validation"""
@@ -305,29 +264,28 @@ class ConnectionManager:
             )
             return
 
-        disconnected = []
-        for websocket in self.active_connections.copy():
-            try:
-                await asyncio.wait_for(websocket.send_json(message), timeout=timeout)
-            except asyncio.TimeoutError:
-                logger.warning(
-                    "Broadcast message timeout",
-                    extra={
-                        "timeout": timeout,
-                        "total_connections": len(self.active_connections),
-                    },
-                )
-                disconnected.append(websocket)
-            except Exception as e:
-                logger.warning(
-                    f"Failed to broadcast message: {e}",
-                    extra={"error_type": type(e).__name__},
-                )
-                disconnected.append(websocket)
-
-        # Clean up disconnected connections
-        for ws in disconnected:
-            self.disconnect(ws)
+        self._publish(self.active_connections, message, timeout)
+
+    def _publish(self, websockets: Set[WebSocket], message: Dict[str, Any], timeout: float):
+        """Одна сериализация, постановка в очереди соединений без ожидания отправки"""
+        try:
+            self.fanout.publish(websockets, message, timeout=timeout)
+        except (TypeError, ValueError) as e:
+            logger.error(
+                f"Failed to serialize WebSocket message: {e}",
+                extra={
+                    "error_type": type(e).__name__,
+                    "message_type": message.get("type", "unknown"),
+                },
+            )
+
+    def _on_send_failure(self, websocket: WebSocket):
+        """Писатель соединения не смог отправить сообщение - убираем соединение"""
+        self.disconnect(websocket)
+        for room_id in list(self.room_connections):
+            self.room_connections[room_id].discard(websocket)
+            if not self.room_connections[room_id]:
+                del self.room_connections[room_id]
 
     def join_room(self, websocket: WebSocket, room_id: str):
         """Add connection to room"""
@@ -347,6 +305,7 @@ class ConnectionManager:
             "users_connected": len(self.user_connections),
             "tenants_connected": len(self.tenant_connections),
             "active_rooms": len(self.room_connections),
+            "fanout": self.fanout.get_stats(),
         }
 
 
@@ -1,14 +1,41 @@
 """
 Wiki Markdown Renderer (Extended)
 Handles custom syntax extensions using Marko.
+
+Кэш рендера:
+- HTML страницы адресуется ревизией страницы (или хэшем текста)
+  и хранит ревизии включённых страниц ({{page:slug}}, транзитивно);
+  при попадании они сверяются с resolver, так что новая ревизия
+  включённой страницы видна и без invalidate (например, с другого воркера)
+- граф зависимостей: изменение страницы инвалидирует все страницы,
+  которые её включают, транзитивно
+- блочный режим: текст режется на разделы по заголовкам, каждый раздел
+  кэшируется по хэшу - при правке перерендериваются только изменённые
 """
 
+import hashlib
+import html
 import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 import marko
+from marko import patterns
 from marko.block import BlockElement
 from marko.inline import InlineElement
 
+_TRANSCLUDE_MARKER = "<!--wiki:transclude:{}-->"
+_TRANSCLUDE_MARKER_RE = re.compile(r"<!--wiki:transclude:(.*?)-->\n?")
+_ATX_HEADING_RE = re.compile(r"#{1,6}(?:[ \t]|$)")
+_FENCE_RE = re.compile(r" {0,3}(`{3,}|~{3,})")
+_LINK_REFERENCE_RE = re.compile(r"^ {0,3}\[[^\]]+\]:", re.MULTILINE)
+# HTML-блоки, которые могут идти через пустые строки (CommonMark, типы 1-5)
+_RAW_HTML_BLOCK_RE = re.compile(r"^ {0,3}<(?:pre|script|style|textarea|!|\?)", re.MULTILINE | re.IGNORECASE)
+_HTML_BLOCK_START_RE = re.compile(r" {0,3}<[A-Za-z/]")
+# HTML-блок типа 6 (блочные теги) прерывает и абзац
+_HTML_BLOCK_TAG_RE = re.compile(r" {0,3}</?(?:%s)(?: +|/?>|$)" % "|".join(patterns.tags), re.IGNORECASE)
+
 # --- Custom Elements ---
 
 
@@ -27,14 +54,15 @@ class WikiLink(InlineElement):
 
 class Transclusion(BlockElement):
     """
-    Parses {{code:path.to.object}}
+    Parses {{code:path.to.object}} and {{page:slug}}
     """
 
-    pattern = re.compile(r"\{\{code:(.*?)\}\}")
+    pattern = re.compile(r"\{\{(code|page):(.*?)\}\}")
     priority = 5
 
     def __init__(self, match):
-        self.target = match.group(1)
+        self.kind = match.group(1)
+        self.target = match.group(2)
 
     @classmethod
     def match(cls, source):
@@ -55,6 +83,9 @@ class WikiRendererMixin:
         return f'<a href="/wiki/pages/{element.target}" class="wiki-link">{element.label}</a>'
 
     def render_transclusion(self, element):
+        if element.kind == "page":
+            # Раскрывается WikiRenderer после конвертации, см. _expand
+            return _TRANSCLUDE_MARKER.format(html.escape(element.target)) + "\n"
         return (
             f'<div class="code-transclusion" data-target="{element.target}">'
             f'<pre><code class="language-python"># Transcluded: {element.target}\n# (Content loading...)</code></pre>'
@@ -73,15 +104,102 @@ class WikiMarkoExtension:
 
 # --- Main Renderer Class ---
 
+# resolver(slug) -> (revision, markdown) или None, если страницы нет
+PageResolver = Callable[[str], Optional[Tuple[Any, str]]]
+
+
+@dataclass
+class _RenderEntry:
+    html: str
+    deps: Dict[str, Any]  # slug включённой страницы → ревизия при рендере
+    slug: Optional[str] = None
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def split_blocks(text: str) -> Optional[List[str]]:
+    """
+    Делит Markdown на разделы по ATX-заголовкам в первой колонке
+
+    Такие разделы рендерятся независимо: заголовок прерывает любой блок,
+    кроме кода и HTML. Возвращает None, если документ нельзя резать:
+    ссылки-сноски [id]: url действуют на весь документ, а HTML-блоки
+    вроде <pre> и комментариев продолжаются через пустые строки.
+    """
+    if _LINK_REFERENCE_RE.search(text) or _RAW_HTML_BLOCK_RE.search(text):
+        return None
+
+    blocks: List[str] = []
+    current: List[str] = []
+    fence: Optional[str] = None
+    in_html = False
+    block_start = True  # Следующая строка начинает новый блок
+    for line in text.splitlines(keepends=True):
+        fence_match = _FENCE_RE.match(line)
+        if fence is not None:
+            if fence_match and fence_match.group(1)[0] == fence[0] and len(fence_match.group(1)) >= len(fence):
+                fence = None
+                block_start = True
+        elif fence_match:
+            fence = fence_match.group(1)
+        elif not line.strip():
+            in_html = False
+            block_start = True
+        elif in_html:
+            pass  # HTML-блок идёт до пустой строки
+        elif _HTML_BLOCK_TAG_RE.match(line) or (block_start and _HTML_BLOCK_START_RE.match(line)):
+            in_html = True
+        elif _ATX_HEADING_RE.match(line):
+            if current:
+                blocks.append("".join(current))
+                current = []
+            block_start = True
+        else:
+            block_start = False
+        current.append(line)
+    if current:
+        blocks.append("".join(current))
+    return blocks
+
 
 class WikiRenderer:
     """
     Renders Extended Markdown for the Enterprise Wiki using Marko.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        resolver: Optional[PageResolver] = None,
+        max_entries: int = 1024,
+        max_blocks: int = 8192,
+        max_depth: int = 5,
+        incremental: bool = True,
+    ):
+        """
+        Args:
+            resolver: Источник включаемых страниц для {{page:slug}}
+            max_entries: Размер LRU-кэша страниц
+            max_blocks: Размер LRU-кэша разделов
+            max_depth: Максимальная глубина включений
+            incremental: Рендерить по разделам с кэшем каждого раздела
+        """
         self.markdown = marko.Markdown()
         self.markdown.use(WikiMarkoExtension)
+        self.resolver = resolver
+        self.max_entries = max_entries
+        self.max_blocks = max_blocks
+        self.max_depth = max_depth
+        self.incremental = incremental
+
+        self._pages: "OrderedDict[str, _RenderEntry]" = OrderedDict()
+        self._blocks: "OrderedDict[str, str]" = OrderedDict()
+        # slug → ключи кэша, которые включают эту страницу
+        self._dependents: Dict[str, Set[str]] = {}
+        # slug → ключи кэша рендеров самой страницы
+        self._by_slug: Dict[str, Set[str]] = {}
+        self._stats = {"hits": 0, "misses": 0, "block_hits": 0, "block_misses": 0, "invalidated": 0, "stale": 0}
 
     def render(self, text: str) -> str:
         """
@@ -89,4 +207,178 @@ class WikiRenderer:
         """
         if not text:
             return ""
-        return self.markdown.convert(text)
+        return self._render(f"text:{_digest(text)}", text, None, ())
+
+    def render_page(self, slug: str, revision: Any, text: str) -> str:
+        """
+        Рендер страницы с кэшем по ревизии
+
+        Новая ревизия - новый ключ кэша; ревизии включённых страниц
+        хранятся в записи и отслеживаются графом зависимостей.
+        """
+        if not text:
+            return ""
+        return self._render(f"page:{slug}:{revision}", text, slug, ())
+
+    def invalidate(self, slug: str) -> int:
+        """
+        Сбрасывает кэш страницы и всех страниц, которые её включают
+
+        Вызывается при сохранении страницы. Возвращает число удалённых записей.
+        """
+        removed = 0
+        pending = [slug]
+        seen: Set[str] = set()
+        while pending:
+            current = pending.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            keys = self._dependents.pop(current, set()) | self._by_slug.pop(current, set())
+            for key in keys:
+                entry = self._pop_entry(key)
+                if entry is None:
+                    continue
+                removed += 1
+                if entry.slug is not None:
+                    pending.append(entry.slug)
+        self._stats["invalidated"] += removed
+        return removed
+
+    def get_stats(self) -> Dict[str, int]:
+        """Статистика кэша рендера"""
+        return {**self._stats, "pages": len(self._pages), "blocks": len(self._blocks)}
+
+    # ------------------------------------------------------------------ #
+    # Рендер
+    # ------------------------------------------------------------------ #
+
+    def _render(
+        self,
+        key: str,
+        text: str,
+        slug: Optional[str],
+        stack: Tuple[str, ...],
+        parent_deps: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        entry = self._pages.get(key)
+        if entry is not None and self._deps_current(entry.deps):
+            self._pages.move_to_end(key)
+            self._stats["hits"] += 1
+            if parent_deps is not None:
+                parent_deps.update(entry.deps)
+            return entry.html
+        if entry is not None:
+            # Включённая страница получила новую ревизию (возможно, на другом воркере)
+            self._stats["stale"] += 1
+            self._pop_entry(key)
+
+        self._stats["misses"] += 1
+        deps: Dict[str, Any] = {}
+        stack = stack + (slug,) if slug is not None else stack
+        rendered, cacheable = self._expand(self._render_blocks(text), deps, stack)
+        if cacheable:
+            self._store(key, _RenderEntry(rendered, deps, slug))
+        if parent_deps is not None:
+            parent_deps.update(deps)
+        return rendered
+
+    def _deps_current(self, deps: Dict[str, Any]) -> bool:
+        """Ревизии включённых страниц (транзитивно) совпадают с текущими"""
+        if self.resolver is None:
+            return True
+        for dep, revision in deps.items():
+            resolved = self.resolver(dep)
+            if (resolved[0] if resolved is not None else None) != revision:
+                return False
+        return True
+
+    def _render_blocks(self, text: str) -> str:
+        blocks = split_blocks(text) if self.incremental else None
+        if blocks is None:
+            return self.markdown.convert(text)
+
+        parts = []
+        for block in blocks:
+            key = _digest(block)
+            cached = self._blocks.get(key)
+            if cached is not None:
+                self._blocks.move_to_end(key)
+                self._stats["block_hits"] += 1
+            else:
+                self._stats["block_misses"] += 1
+                cached = self.markdown.convert(block)
+                self._blocks[key] = cached
+                if len(self._blocks) > self.max_blocks:
+                    self._blocks.popitem(last=False)
+            parts.append(cached)
+        return "".join(parts)
+
+    def _expand(self, body: str, deps: Dict[str, Any], stack: Tuple[str, ...]) -> Tuple[str, bool]:
+        """Раскрывает маркеры {{page:slug}}; рендер с циклом не кэшируется"""
+        if "<!--wiki:transclude:" not in body:
+            return body, True
+
+        cacheable = True
+
+        def replace(match):
+            nonlocal cacheable
+            target = html.unescape(match.group(1))
+            safe = html.escape(target)
+            if self.resolver is None:
+                return (
+                    f'<div class="page-transclusion" data-target="{safe}">'
+                    f"<p>Transcluded page: {safe}</p></div>\n"
+                )
+            if target in stack or len(stack) >= self.max_depth:
+                cacheable = False
+                return (
+                    f'<div class="page-transclusion page-transclusion-error" data-target="{safe}">'
+                    f"<p>Transclusion loop: {safe}</p></div>\n"
+                )
+            resolved = self.resolver(target)
+            # Зависимость и от отсутствующей страницы: её создание сбросит кэш
+            if resolved is None:
+                deps[target] = None
+                return (
+                    f'<div class="page-transclusion page-transclusion-missing" data-target="{safe}">'
+                    f"<p>Page not found: {safe}</p></div>\n"
+                )
+            revision, content = resolved
+            deps[target] = revision
+            # deps включающей страницы транзитивны: хит проверяет все ревизии
+            inner = self._render(f"page:{target}:{revision}", content, target, stack, deps) if content else ""
+            return f'<div class="page-transclusion" data-target="{safe}">\n{inner}</div>\n'
+
+        return _TRANSCLUDE_MARKER_RE.sub(replace, body), cacheable
+
+    # ------------------------------------------------------------------ #
+    # Кэш
+    # ------------------------------------------------------------------ #
+
+    def _store(self, key: str, entry: _RenderEntry) -> None:
+        self._pages[key] = entry
+        for dep in entry.deps:
+            self._dependents.setdefault(dep, set()).add(key)
+        if entry.slug is not None:
+            self._by_slug.setdefault(entry.slug, set()).add(key)
+        while len(self._pages) > self.max_entries:
+            self._pop_entry(next(iter(self._pages)))
+
+    def _pop_entry(self, key: str) -> Optional[_RenderEntry]:
+        entry = self._pages.pop(key, None)
+        if entry is None:
+            return None
+        for dep in entry.deps:
+            keys = self._dependents.get(dep)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._dependents[dep]
+        if entry.slug is not None:
+            keys = self._by_slug.get(entry.slug)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_slug[entry.slug]
+        return entry
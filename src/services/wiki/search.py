@@ -1,9 +1,25 @@
 """
 Wiki Search Service
 Handles semantic search via Qdrant and integration with WikiService
+
+Индексация:
+- страница режется на чанки по заголовкам Markdown (с путём заголовков),
+  длинные разделы - по абзацам
+- чанки всех страниц из фоновой очереди эмбеддятся пачками
+  и upsert-ятся в Qdrant пачками
+- id точки выводится из page_id и хэша чанка: при переиндексации
+  эмбеддятся только изменившиеся чанки, исчезнувшие удаляются
+
+Поиск: по чанкам, результаты агрегируются до страниц.
 """
 
-from typing import Any, Dict, List
+import asyncio
+import hashlib
+import re
+import uuid
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from src.db.qdrant_client import QdrantClient
 from src.services.embedding.service import EmbeddingService
@@ -11,6 +27,113 @@ from src.utils.structured_logging import StructuredLogger
 
 logger = StructuredLogger(__name__).logger
 
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_FENCE_RE = re.compile(r"^\s*(```|~~~)")
+_POINT_NAMESPACE = uuid.UUID("6f1c1b9e-8f4a-4c36-9d0e-3b7a9d2f5e10")
+
+
+@dataclass(frozen=True)
+class WikiChunk:
+    """Фрагмент страницы - единица индексации"""
+
+    page_id: str
+    title: str
+    index: int
+    heading: str  # Путь заголовков: "Раздел > Подраздел"
+    text: str
+
+    @cached_property
+    def embed_text(self) -> str:
+        """Текст для эмбеддинга: заголовок страницы и раздела дают контекст"""
+        if self.heading:
+            return f"{self.title}\n{self.heading}\n\n{self.text}"
+        return f"{self.title}\n\n{self.text}"
+
+    @cached_property
+    def hash(self) -> str:
+        return hashlib.sha256(self.embed_text.encode("utf-8")).hexdigest()
+
+    @cached_property
+    def point_id(self) -> str:
+        # Одинаковый текст на той же странице - та же точка
+        return str(uuid.uuid5(_POINT_NAMESPACE, f"{self.page_id}:{self.hash}"))
+
+
+def _split_sections(content: str) -> List[Tuple[str, str]]:
+    """Делит Markdown на (путь заголовков, тело) без учёта # внутри блоков кода"""
+    sections: List[Tuple[str, str]] = []
+    path: List[Tuple[int, str]] = []
+    body: List[str] = []
+    in_fence = False
+
+    def flush():
+        text = "\n".join(body).strip()
+        if text:
+            sections.append((" > ".join(title for _, title in path), text))
+        body.clear()
+
+    for line in content.splitlines():
+        if _FENCE_RE.match(line):
+            in_fence = not in_fence
+        match = None if in_fence else _HEADING_RE.match(line)
+        if match:
+            flush()
+            level = len(match.group(1))
+            while path and path[-1][0] >= level:
+                path.pop()
+            path.append((level, match.group(2)))
+        else:
+            body.append(line)
+    flush()
+    return sections
+
+
+def _pack_paragraphs(text: str, max_chars: int) -> List[str]:
+    """Собирает абзацы в куски не длиннее max_chars"""
+    if len(text) <= max_chars:
+        return [text]
+
+    pieces: List[str] = []
+    current = ""
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        # Абзац длиннее лимита режем жёстко
+        while len(paragraph) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+        if current and len(current) + 2 + len(paragraph) > max_chars:
+            pieces.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_page(page_id: str, title: str, content: str, max_chars: int = 1500) -> List[WikiChunk]:
+    """
+    Делит страницу на чанки по заголовкам
+
+    Args:
+        page_id: ID страницы
+        title: Заголовок страницы
+        content: Markdown
+        max_chars: Максимальная длина текста чанка
+    """
+    chunks: List[WikiChunk] = []
+    for heading, text in _split_sections(content or ""):
+        for piece in _pack_paragraphs(text, max_chars):
+            chunks.append(WikiChunk(page_id, title, len(chunks), heading, piece))
+    if not chunks:
+        # Пустая страница ищется хотя бы по заголовку
+        chunks.append(WikiChunk(page_id, title, 0, "", title))
+    return chunks
+
 
 class WikiSearchService:
     """
@@ -19,14 +142,218 @@ class WikiSearchService:
 
     COLLECTION_NAME = "wiki_pages"
 
-    def __init__(self, qdrant: QdrantClient, embedding: EmbeddingService):
+    def __init__(
+        self,
+        qdrant: QdrantClient,
+        embedding: EmbeddingService,
+        max_chunk_chars: int = 1500,
+        embed_batch_size: int = 64,
+        upsert_batch_size: int = 256,
+        index_delay: float = 0.5,
+    ):
+        """
+        Args:
+            qdrant: Обёртка Qdrant (SDK-клиент в qdrant.client)
+            embedding: Сервис эмбеддингов
+            max_chunk_chars: Максимальная длина чанка
+            embed_batch_size: Чанков в одном вызове модели
+            upsert_batch_size: Точек в одном upsert
+            index_delay: Сколько фоновая индексация копит страницы перед пачкой
+        """
         self.qdrant = qdrant
         self.embedding = embedding
+        self.max_chunk_chars = max_chunk_chars
+        self.embed_batch_size = embed_batch_size
+        self.upsert_batch_size = upsert_batch_size
+        self.index_delay = index_delay
+
+        # page_id → {point_id: chunk_hash} проиндексированных чанков
+        self._indexed: Dict[str, Dict[str, str]] = {}
+        self._pending: Dict[str, Tuple[str, str]] = {}
+        self._worker: Optional[asyncio.Task] = None
+        self._collection_ready = False
+
+    # ------------------------------------------------------------------ #
+    # Qdrant
+    # ------------------------------------------------------------------ #
+
+    def _client(self):
+        client = getattr(self.qdrant, "client", None) if self.qdrant is not None else None
+        if client is None:
+            raise RuntimeError("Qdrant client is not connected")
+        return client
+
+    async def ensure_collection(self, vector_size: Optional[int] = None) -> bool:
+        """
+        Ensure Qdrant collection exists
+
+        Без vector_size только проверяет наличие коллекции: размерность
+        становится известна после первого эмбеддинга.
+        """
+        if self._collection_ready:
+            return True
+        client = self._client()
+
+        def create() -> bool:
+            try:
+                client.get_collection(collection_name=self.COLLECTION_NAME)
+                return True
+            except Exception:
+                if vector_size is None:
+                    return False
+            client.create_collection(
+                collection_name=self.COLLECTION_NAME,
+                vectors_config={"size": vector_size, "distance": "Cosine"},
+            )
+            # Фильтр по page_id нужен при переиндексации и удалении
+            client.create_payload_index(
+                collection_name=self.COLLECTION_NAME, field_name="page_id", field_schema="keyword"
+            )
+            return True
+
+        self._collection_ready = await asyncio.to_thread(create)
+        return self._collection_ready
+
+    async def _load_indexed(self, page_ids: List[str]) -> None:
+        """Подтягивает хэши чанков страниц, которых нет в памяти (после рестарта)"""
+        missing = [page_id for page_id in page_ids if page_id not in self._indexed]
+        if not missing:
+            return
+        if not self._collection_ready:
+            # Коллекции ещё нет - нечего и загружать
+            self._indexed.update({page_id: {} for page_id in missing})
+            return
+
+        from qdrant_client import models
+
+        client = self._client()
+        scroll_filter = models.Filter(
+            must=[models.FieldCondition(key="page_id", match=models.MatchAny(any=missing))]
+        )
+
+        def scroll() -> Dict[str, Dict[str, str]]:
+            found: Dict[str, Dict[str, str]] = {page_id: {} for page_id in missing}
+            offset = None
+            while True:
+                points, offset = client.scroll(
+                    collection_name=self.COLLECTION_NAME,
+                    scroll_filter=scroll_filter,
+                    limit=1000,
+                    offset=offset,
+                    with_payload=["page_id", "chunk_hash"],
+                    with_vectors=False,
+                )
+                for point in points:
+                    payload = point.payload or {}
+                    found.setdefault(payload.get("page_id"), {})[str(point.id)] = payload.get("chunk_hash")
+                if offset is None:
+                    return found
 
-    async def ensure_collection(self):
-        """Ensure Qdrant collection exists"""
-        # Stub: In real implementation, check and create collection
-        # self.qdrant.create_collection(self.COLLECTION_NAME, vector_size=768)
+        self._indexed.update(await asyncio.to_thread(scroll))
+
+    async def _embed(self, texts: List[str]) -> List[List[float]]:
+        """Эмбеддинги пачками; модель синхронная - в отдельном потоке"""
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), self.embed_batch_size):
+            batch = texts[start : start + self.embed_batch_size]
+            result = await asyncio.to_thread(self.embedding.encode, batch)
+            if len(result) != len(batch):
+                raise ValueError(f"Embedding returned {len(result)} vectors for {len(batch)} texts")
+            vectors.extend(list(vector) for vector in result)
+        return vectors
+
+    # ------------------------------------------------------------------ #
+    # Индексация
+    # ------------------------------------------------------------------ #
+
+    async def index_pages(self, pages: Iterable[Tuple[str, str, str]]) -> Dict[str, int]:
+        """
+        Индексирует страницы одной пачкой
+
+        Args:
+            pages: (page_id, title, content)
+
+        Returns:
+            Статистика: pages, chunks, embedded, unchanged, deleted
+        """
+        pages = list(pages)
+        stats = {"pages": len(pages), "chunks": 0, "embedded": 0, "unchanged": 0, "deleted": 0}
+        if not pages:
+            return stats
+
+        await self.ensure_collection()
+        await self._load_indexed([page_id for page_id, _, _ in pages])
+
+        changed: List[WikiChunk] = []
+        current: Dict[str, Dict[str, str]] = {}
+        for page_id, title, content in pages:
+            chunks = chunk_page(page_id, title, content, self.max_chunk_chars)
+            indexed = self._indexed.get(page_id, {})
+            page_points = current.setdefault(page_id, {})
+            for chunk in chunks:
+                point_id = chunk.point_id
+                if point_id in page_points:
+                    continue  # повтор того же текста на странице
+                page_points[point_id] = chunk.hash
+                if indexed.get(point_id) == chunk.hash:
+                    stats["unchanged"] += 1
+                else:
+                    changed.append(chunk)
+            stats["chunks"] += len(page_points)
+
+        stale = [
+            point_id
+            for page_id, page_points in current.items()
+            for point_id in self._indexed.get(page_id, {})
+            if point_id not in page_points
+        ]
+
+        if changed:
+            vectors = await self._embed([chunk.embed_text for chunk in changed])
+            await self.ensure_collection(len(vectors[0]))
+            points = [
+                {
+                    "id": chunk.point_id,
+                    "vector": vector,
+                    "payload": {
+                        "page_id": chunk.page_id,
+                        "title": chunk.title,
+                        "heading": chunk.heading,
+                        "chunk_index": chunk.index,
+                        "chunk_hash": chunk.hash,
+                        "snippet": chunk.text[:200],
+                    },
+                }
+                for chunk, vector in zip(changed, vectors)
+            ]
+            await self._upsert(points)
+            stats["embedded"] = len(points)
+
+        if stale:
+            await self._delete_points(stale)
+            stats["deleted"] = len(stale)
+
+        self._indexed.update(current)
+        logger.info(
+            "Indexed %d wiki pages in Qdrant",
+            len(pages),
+            extra={k: v for k, v in stats.items() if k != "pages"},
+        )
+        return stats
+
+    async def _upsert(self, points: List[Dict[str, Any]]) -> None:
+        client = self._client()
+        for start in range(0, len(points), self.upsert_batch_size):
+            await asyncio.to_thread(
+                client.upsert,
+                collection_name=self.COLLECTION_NAME,
+                points=points[start : start + self.upsert_batch_size],
+            )
+
+    async def _delete_points(self, point_ids: List[str]) -> None:
+        await asyncio.to_thread(
+            self._client().delete, collection_name=self.COLLECTION_NAME, points_selector=point_ids
+        )
 
     async def index_page(self, page_id: str, title: str, content: str):
         """
@@ -34,47 +361,109 @@ class WikiSearchService:
         Should be called asynchronously (Background Task).
         """
         try:
-            text_to_embed = f"{title}\n\n{content}"
-            # Truncate if too long
-            text_to_embed = text_to_embed[:8000]
+            await self.index_pages([(page_id, title, content)])
+        except Exception as e:
+            logger.error(f"Failed to index wiki page {page_id}: {e}", exc_info=True)
 
-            await self.embedding.encode(text_to_embed)
+    async def delete_page(self, page_id: str) -> None:
+        """Удаляет все чанки страницы из индекса"""
+        self._pending.pop(page_id, None)
+        try:
+            from qdrant_client import models
 
-            # Prepare payload
-            payload = {"page_id": page_id, "title": title, "snippet": content[:200]}
+            await asyncio.to_thread(
+                self._client().delete,
+                collection_name=self.COLLECTION_NAME,
+                points_selector=models.FilterSelector(
+                    filter=models.Filter(
+                        must=[models.FieldCondition(key="page_id", match=models.MatchValue(value=page_id))]
+                    )
+                ),
+            )
+            self._indexed.pop(page_id, None)
+        except Exception as e:
+            logger.error(f"Failed to delete wiki page {page_id} from index: {e}", exc_info=True)
 
-            # Upsert to Qdrant
-            # Stub: self.qdrant.upsert(self.COLLECTION_NAME, points=[...])
-            logger.info("Indexed wiki page %s in Qdrant", page_id)
+    def schedule_index(self, page_id: str, title: str, content: str) -> None:
+        """
+        Ставит страницу в фоновую индексацию
 
-        except Exception as e:
-            logger.error(f"Failed to index wiki page {page_id}: {e}", exc_info=True)
+        Страницы копятся index_delay секунд и индексируются одной пачкой;
+        несколько правок одной страницы за это время индексируются один раз.
+        """
+        self._pending[page_id] = (title, content)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._run_indexer())
+
+    async def _run_indexer(self) -> None:
+        while self._pending:
+            await asyncio.sleep(self.index_delay)
+            pending, self._pending = self._pending, {}
+            try:
+                await self.index_pages(
+                    (page_id, title, content) for page_id, (title, content) in pending.items()
+                )
+            except Exception as e:
+                logger.error(
+                    f"Background wiki indexing failed: {e}",
+                    extra={"pages": len(pending)},
+                    exc_info=True,
+                )
+
+    async def flush(self) -> None:
+        """Дожидается фоновой индексации (тесты, graceful shutdown)"""
+        if self._worker is not None:
+            await self._worker
 
-    async def search(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+    # ------------------------------------------------------------------ #
+    # Поиск
+    # ------------------------------------------------------------------ #
+
+    async def search(self, query: str, limit: int = 5, chunks_per_page: int = 4) -> List[Dict[str, Any]]:
         """
         Semantic search for wiki pages.
+
+        Ищет по чанкам (limit * chunks_per_page кандидатов) и агрегирует
+        до страниц: score страницы - лучший чанк, snippet и heading - из него.
         """
         try:
-            await self.embedding.encode(query)
-
-            # Stub: results = self.qdrant.search(self.COLLECTION_NAME, vector, limit=limit)
-            # Returning mock results for MVP
+            vectors = await self._embed([query])
+            client = self._client()
             logger.info("Searching wiki for: %s", query)
 
-            return [
-                {
-                    "page_id": "mock-id-1",
-                    "title": "Architecture Overview",
-                    "score": 0.95,
-                    "snippet": "High level overview of the system...",
-                },
-                {
-                    "page_id": "mock-id-2",
-                    "title": "API Documentation",
-                    "score": 0.88,
-                    "snippet": "Details about REST endpoints...",
-                },
-            ]
+            hits = await asyncio.to_thread(
+                client.search,
+                collection_name=self.COLLECTION_NAME,
+                query_vector=vectors[0],
+                limit=limit * chunks_per_page,
+                with_payload=True,
+            )
+
+            pages: Dict[str, Dict[str, Any]] = {}
+            for hit in hits:
+                payload = hit.payload or {}
+                page_id = payload.get("page_id")
+                page = pages.get(page_id)
+                if page is None:
+                    # Хиты отсортированы по score - первый хит страницы лучший
+                    pages[page_id] = {
+                        "page_id": page_id,
+                        "title": payload.get("title"),
+                        "score": hit.score,
+                        "snippet": payload.get("snippet", ""),
+                        "heading": payload.get("heading", ""),
+                        "matched_chunks": 1,
+                    }
+                else:
+                    page["matched_chunks"] += 1
+                    if hit.score > page["score"]:
+                        page.update(
+                            score=hit.score,
+                            snippet=payload.get("snippet", ""),
+                            heading=payload.get("heading", ""),
+                        )
+
+            return sorted(pages.values(), key=lambda page: page["score"], reverse=True)[:limit]
 
         except Exception as e:
             logger.error(f"Wiki search failed: {e}", exc_info=True)
@@ -4,8 +4,9 @@ Handles logic for page management, versioning, rendering, and advanced features
 """
 
 import uuid
+from contextvars import ContextVar
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 from src.database import get_db_connection
 from src.utils.structured_logging import StructuredLogger
@@ -15,10 +16,29 @@ from .models import WikiPage as PageDTO
 from .models import WikiPageCreate, WikiPageUpdate
 
 # Import Renderer
-from .renderer import WikiRenderer
+from .renderer import Transclusion, WikiRenderer
 
 logger = StructuredLogger(__name__).logger
 
+# Страницы, включённые в текущий рендер ({{page:slug}}): slug → (version, content)
+_includes: ContextVar[Dict[str, Tuple[int, str]]] = ContextVar("wiki_includes", default={})
+
+
+def _resolve_include(slug: str) -> Optional[Tuple[int, str]]:
+    return _includes.get().get(slug)
+
+
+def _page_includes(content: str) -> Set[str]:
+    return {
+        match.group(2)
+        for match in Transclusion.pattern.finditer(content)
+        if match.group(1) == "page"
+    }
+
+
+# Общий для всех WikiService: кэш рендера и граф включений живут между запросами
+_renderer = WikiRenderer(resolver=_resolve_include)
+
 
 class WikiService:
     """
@@ -26,7 +46,7 @@ class WikiService:
     """
 
     def __init__(self, db_session=None):
-        self.renderer = WikiRenderer()
+        self.renderer = _renderer
         # Stub Qdrant integration for now
         self.qdrant = None
 
@@ -63,10 +83,17 @@ class WikiService:
             if not row:
                 return None
 
-            # Render content on the fly (or cache it in future)
-            html_content = (
-                self.renderer.render(row["content"]) if row["content"] else ""
-            )
+            # Рендер кэшируется по ревизии и сбрасывается в update_page
+            html_content = ""
+            if row["content"]:
+                includes = await self._load_includes(conn, row["content"])
+                html_content = self._render(
+                    includes,
+                    self.renderer.render_page,
+                    slug,
+                    version or row["version"],
+                    row["content"],
+                )
 
             # Construct DTO
             page_dto = PageDTO(
@@ -138,6 +165,8 @@ class WikiService:
                     # await self.qdrant.index_page(...)
                     logger.debug("Qdrant indexing skipped (not configured)")
 
+        # Страницы, включавшие ещё не созданную, перерендерятся
+        self.renderer.invalidate(data.slug)
         logger.info(f"Created wiki page: {data.title}", extra={"author_id": author_id})
 
         return PageDTO(
@@ -202,6 +231,8 @@ class WikiService:
                     page["id"],
                 )
 
+        # Страницы, включающие эту, перерендерятся при следующем просмотре
+        self.renderer.invalidate(slug)
         logger.info("Updated page %s to v{new_version}", slug)
 
         return PageDTO(
@@ -249,7 +280,50 @@ class WikiService:
         """
         Render Markdown to HTML using the rendering engine.
         """
-        return self.renderer.render(markdown)
+        includes: Dict[str, Tuple[int, str]] = {}
+        if _page_includes(markdown):
+            async with get_db_connection() as conn:
+                includes = await self._load_includes(conn, markdown)
+        return self._render(includes, self.renderer.render, markdown)
+
+    async def _load_includes(self, conn, content: str) -> Dict[str, Tuple[int, str]]:
+        """
+        Загружает страницы, включённые через {{page:slug}}, транзитивно
+
+        Один запрос на уровень вложенности; отсутствующие страницы
+        resolver рендера видит как None.
+        """
+        loaded: Dict[str, Tuple[int, str]] = {}
+        seen: Set[str] = set()
+        pending = _page_includes(content)
+        for _ in range(self.renderer.max_depth):
+            pending -= seen
+            if not pending:
+                break
+            seen |= pending
+            rows = await conn.fetch(
+                """
+                SELECT p.slug, p.version, r.content
+                FROM wiki_pages p
+                LEFT JOIN wiki_revisions r ON p.current_revision_id = r.id
+                WHERE p.slug = ANY($1::text[]) AND p.is_deleted = FALSE
+            """,
+                list(pending),
+            )
+            pending = set()
+            for row in rows:
+                text = row["content"] or ""
+                loaded[row["slug"]] = (row["version"], text)
+                pending |= _page_includes(text)
+        return loaded
+
+    @staticmethod
+    def _render(includes: Dict[str, Tuple[int, str]], render: Callable[..., str], *args: Any) -> str:
+        token = _includes.set(includes)
+        try:
+            return render(*args)
+        finally:
+            _includes.reset(token)
 
     async def ask_wiki(self, query: str) -> Dict[str, str]:
         """
@@ -0,0 +1,75 @@
+"""
+Performance tests for UnifiedDataLayer async path.
+"""
+
+import asyncio
+import statistics
+import time
+
+import pytest
+
+from src.infrastructure.data_layer import UnifiedDataLayer
+
+# Имитация сетевой задержки PostgreSQL на один запрос
+QUERY_LATENCY = 0.005
+PARALLEL_REQUESTS = 200
+
+
+class SimulatedPool:
+    """Пул asyncpg с ограниченным числом соединений и задержкой на запрос"""
+
+    def __init__(self, size: int = 20):
+        self._semaphore = asyncio.Semaphore(size)
+
+    def acquire(self):
+        pool = self
+
+        class _Acquire:
+            async def __aenter__(self):
+                await pool._semaphore.acquire()
+                return SimulatedConnection()
+
+            async def __aexit__(self, *exc):
+                pool._semaphore.release()
+                return False
+
+        return _Acquire()
+
+
+class SimulatedConnection:
+    async def fetch(self, sql, *args):
+        await asyncio.sleep(QUERY_LATENCY)
+        return [{"id": i} for i in range(10)]
+
+    async def fetchval(self, sql, *args):
+        await asyncio.sleep(QUERY_LATENCY)
+        return 10
+
+
+@pytest.mark.asyncio
+async def test_data_layer_p99_under_parallel_load():
+    """p99 асинхронного SELECT при 200 параллельных запросах"""
+    layer = UnifiedDataLayer(postgres_pool=SimulatedPool(size=20))
+    latencies = []
+
+    async def one_request(i: int):
+        start = time.perf_counter()
+        result = await layer.query("select", {"table": "items", "where": {"owner_id": i % 7}, "limit": 10})
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert result.total == 10
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_request(i) for i in range(PARALLEL_REQUESTS)))
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    p50 = statistics.median(latencies)
+    p99 = statistics.quantiles(latencies, n=100)[98]
+    # Последовательное выполнение (блокирующий драйвер): 2 запроса на вызов
+    serial_ms = PARALLEL_REQUESTS * 2 * QUERY_LATENCY * 1000
+
+    print(f"\nUnifiedDataLayer async SELECT x{PARALLEL_REQUESTS}:")
+    print(f"  wall: {wall_ms:.1f}ms (serial baseline {serial_ms:.0f}ms)")
+    print(f"  p50: {p50:.2f}ms")
+    print(f"  p99: {p99:.2f}ms")
+
+    assert p99 < serial_ms / 4, f"p99 latency too high: {p99:.2f}ms"
@@ -0,0 +1,128 @@
+"""
+Performance tests: BaseHTTPMiddleware stack vs fused ASGI pipeline.
+"""
+
+import asyncio
+import statistics
+import time
+from unittest.mock import patch
+
+import pytest
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from src.middleware.ai_security_middleware import AISecurityMiddleware
+from src.middleware.asgi_pipeline import ASGIPipeline, create_default_stages
+from src.middleware.jwt_user_context import JWTUserContextMiddleware
+from src.middleware.metrics_middleware import MetricsMiddleware
+from src.middleware.security_headers import SecurityHeadersMiddleware
+from src.security.ai_security_layer import AISecurityLayer
+
+REQUESTS = 400
+CONCURRENCY = 50
+
+
+async def projects(request):
+    return JSONResponse({"user_id": request.state.user_id, "items": list(range(20))})
+
+
+async def developer_agent(request):
+    payload = await request.json()
+    return JSONResponse({"echo": payload.get("query")})
+
+
+ROUTES = [
+    Route("/api/v1/projects", projects, methods=["GET", "POST"]),
+    Route("/api/v1/assistants/developer", developer_agent, methods=["POST"]),
+]
+
+
+def legacy_app() -> Starlette:
+    # Порядок как в src/main.py: последний в списке add_middleware - самый внешний
+    return Starlette(
+        routes=ROUTES,
+        middleware=[
+            Middleware(JWTUserContextMiddleware),
+            Middleware(MetricsMiddleware),
+            Middleware(AISecurityMiddleware),
+            Middleware(SecurityHeadersMiddleware),
+        ],
+    )
+
+
+def fused_app() -> Starlette:
+    return Starlette(routes=ROUTES, middleware=[Middleware(ASGIPipeline, stages=create_default_stages())])
+
+
+async def run_request(app, path: str, body: bytes) -> float:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"host", b"test")],
+        "client": ("127.0.0.1", 5000),
+        "server": ("test", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    statuses = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(3600)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    elapsed = (time.perf_counter() - start) * 1000
+    assert statuses == [200]
+    return elapsed
+
+
+async def benchmark(app) -> dict:
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def one(i: int) -> float:
+        async with semaphore:
+            if i % 4 == 0:
+                return await run_request(app, "/api/v1/assistants/developer", b'{"query": "optimize this query"}')
+            return await run_request(app, "/api/v1/projects", b"")
+
+    # Прогрев (сборка middleware stack, импорты)
+    await asyncio.gather(*(one(i) for i in range(20)))
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(one(i) for i in range(REQUESTS)))
+    wall = time.perf_counter() - started
+    return {
+        "rps": REQUESTS / wall,
+        "p50": statistics.median(latencies),
+        "p99": statistics.quantiles(latencies, n=100)[98],
+    }
+
+
+@pytest.mark.asyncio
+async def test_fused_pipeline_vs_base_http_middleware_stack():
+    """Сквозное сравнение стека BaseHTTPMiddleware и единого ASGI-конвейера"""
+    # Лимит AI-агентов на пользователя не должен влиять на замер
+    with patch.object(AISecurityLayer, "_check_rate_limit", return_value=(True, 0.0)):
+        legacy = await benchmark(legacy_app())
+        fused = await benchmark(fused_app())
+
+    print(f"\nMiddleware stack x{REQUESTS} (concurrency {CONCURRENCY}):")
+    for name, result in (("BaseHTTPMiddleware", legacy), ("ASGIPipeline", fused)):
+        print(f"  {name:>18}: {result['rps']:.0f} req/s, p50 {result['p50']:.2f}ms, p99 {result['p99']:.2f}ms")
+
+    assert fused["rps"] > legacy["rps"], "Fused pipeline should outperform the BaseHTTPMiddleware stack"
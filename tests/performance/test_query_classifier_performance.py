@@ -0,0 +1,75 @@
+"""
+Performance tests: QueryClassifier throughput with compiled rules and result cache.
+"""
+
+import re
+import time
+
+from src.ai.query_classifier import QueryClassifier, QueryType
+
+ROUNDS = 200
+
+QUERIES = [
+    "Как сделано в УТ типовая реализация?",
+    "Где используется этот метод и какие есть зависимости?",
+    "Создай функцию для проведения документа",
+    "Найди похожий код для проверки прав доступа",
+    "Оптимизируй эту функцию, как улучшить производительность",
+    "Просто поговорим о best practices",
+    "Подскажи, как в типовой конфигурации ERP реализовано проведение реализации товаров и услуг",
+]
+
+
+def reference_scores(query: str):
+    """Подсчет очков до компиляции правил: цикл по правилам и re.search на каждый шаблон"""
+    query_lower = query.lower()
+    scores = {}
+    for query_type, rules in QueryClassifier.RULES.items():
+        score = 0.0
+        for keyword in rules["keywords"]:
+            if keyword.lower() in query_lower:
+                score += 1.0
+        for pattern in rules["patterns"]:
+            if re.search(pattern, query_lower, re.IGNORECASE):
+                score += 2.0
+        scores[query_type] = score
+    return scores
+
+
+def throughput(classify, queries) -> float:
+    started = time.perf_counter()
+    for query in queries:
+        classify(query)
+    return len(queries) / (time.perf_counter() - started)
+
+
+def test_compiled_rules_vs_per_rule_regex_loop():
+    """Сравнение пропускной способности: цикл по правилам, скомпилированные правила, кэш"""
+    # Уникальные запросы - кэш результатов не помогает
+    unique = [f"{query} #{i}" for i in range(ROUNDS) for query in QUERIES]
+    uncached = QueryClassifier(cache_size=0)
+    cached = QueryClassifier()
+
+    for query in QUERIES:
+        scores, _ = uncached._compiled.score(query.lower())
+        assert scores == list(reference_scores(query).values())
+    assert uncached.classify(QUERIES[1]).query_type == QueryType.GRAPH_QUERY
+
+    # Прогрев (подсказки инструментов строятся один раз на тип запроса)
+    for query in QUERIES:
+        uncached.classify(query)
+        cached.classify(query)
+
+    reference = throughput(reference_scores, unique)
+    compiled = throughput(lambda query: uncached._compiled.score(query.lower()), unique)
+    classify_cold = throughput(uncached.classify, unique)
+    classify_cached = throughput(cached.classify, QUERIES * ROUNDS)
+
+    print(f"\nQueryClassifier x{len(unique)}:")
+    print(f"  {'per-rule re.search':>22}: {reference:.0f} q/s")
+    print(f"  {'compiled rules':>22}: {compiled:.0f} q/s")
+    print(f"  {'classify (no cache)':>22}: {classify_cold:.0f} q/s")
+    print(f"  {'classify (cached)':>22}: {classify_cached:.0f} q/s")
+
+    assert compiled > reference, "Compiled rules should outperform the per-rule regex loop"
+    assert classify_cached > classify_cold
@@ -0,0 +1,93 @@
+"""
+Performance tests: sequential WebSocket broadcast vs fan-out engine.
+"""
+
+import asyncio
+import json
+import statistics
+import time
+
+import pytest
+
+from src.services.websocket_fanout import FanoutEngine
+
+CLIENTS = 500
+SLOW_CLIENTS = 5
+SLOW_DELAY = 0.05
+BROADCASTS = 5
+
+
+class TimedWebSocket:
+    """WebSocket, записывающий момент получения каждого сообщения"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.received_at = []
+
+    async def _send(self):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        else:
+            await asyncio.sleep(0)
+        self.received_at.append(time.perf_counter())
+
+    async def send_json(self, message):
+        json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+        await self._send()
+
+    async def send_text(self, text):
+        await self._send()
+
+
+def make_clients():
+    return [TimedWebSocket(SLOW_DELAY if i < SLOW_CLIENTS else 0.0) for i in range(CLIENTS)]
+
+
+def percentiles(latencies):
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {"p50": statistics.median(latencies), "p95": quantiles[94], "p99": quantiles[98]}
+
+
+async def sequential_broadcast(clients, message):
+    # Поведение до fan-out: send_json по очереди, таймаут на каждый сокет
+    for ws in clients:
+        await asyncio.wait_for(ws.send_json(message), timeout=5.0)
+
+
+@pytest.mark.asyncio
+async def test_fanout_vs_sequential_broadcast():
+    """Задержка доставки быстрым клиентам при наличии медленных"""
+    message = {"type": "dashboard_update", "data": {"rows": list(range(200))}}
+
+    sequential_clients = make_clients()
+    sequential_latencies = []
+    for _ in range(BROADCASTS):
+        started = time.perf_counter()
+        await sequential_broadcast(sequential_clients, message)
+        sequential_latencies.extend(
+            (ws.received_at[-1] - started) * 1000 for ws in sequential_clients[SLOW_CLIENTS:]
+        )
+
+    engine = FanoutEngine("benchmark")
+    fanout_clients = make_clients()
+    for ws in fanout_clients:
+        engine.register(ws)
+
+    fast_clients = fanout_clients[SLOW_CLIENTS:]
+    fanout_latencies = []
+    for round_number in range(1, BROADCASTS + 1):
+        started = time.perf_counter()
+        engine.publish(fanout_clients, message, coalesce_key="dashboard")
+        # Ждём только быстрых клиентов - медленные не должны их задерживать
+        while min(len(ws.received_at) for ws in fast_clients) < round_number:
+            await asyncio.sleep(0)
+        fanout_latencies.extend((ws.received_at[-1] - started) * 1000 for ws in fast_clients)
+    await engine.close()
+
+    sequential = percentiles(sequential_latencies)
+    fanout = percentiles(fanout_latencies)
+    print(f"\nBroadcast to {CLIENTS} clients ({SLOW_CLIENTS} slow, {SLOW_DELAY * 1000:.0f}ms):")
+    for name, result in (("sequential", sequential), ("fan-out", fanout)):
+        print(f"  {name:>10}: p50 {result['p50']:.2f}ms, p95 {result['p95']:.2f}ms, p99 {result['p99']:.2f}ms")
+
+    assert fanout["p99"] < sequential["p50"], "Slow consumers should not delay fast ones"
@@ -82,3 +82,38 @@ async def test_validate_error_handling(validator):
 
         assert result.allowed is False
         assert "error" in result.reason.lower()
+
+
+def test_peek_prefilters_benign_prose(validator):
+    """Test short prose without triggers is allowed without running the stages"""
+    result = validator.peek("Generate BSL code for document processing")
+
+    assert result.allowed is True
+    assert validator.stats["prefiltered"] == 1
+    assert validator.peek("delete all records from database") is None
+    assert validator.peek("Generate code that flows with grace,\nFor documents in their proper place.\nAnd more") is None
+
+
+@pytest.mark.asyncio
+async def test_verdict_cache(validator):
+    """Test repeated queries are answered from the verdict cache"""
+    query = "delete all records from database"
+
+    first = await validator.validate(query)
+    with patch.object(validator, "_run_stages", new_callable=AsyncMock) as run_stages:
+        second = await validator.validate(query)
+        assert validator.peek(query) is second
+
+    run_stages.assert_not_called()
+    assert second.allowed is first.allowed is False
+    assert validator.stats["cache_hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_error_verdict_not_cached(validator):
+    """Test verdicts produced by validation errors are not cached"""
+    with patch.object(validator.poetic_detector, "detect_poetry", side_effect=Exception("Test error")):
+        await validator.validate("test query")
+
+    assert validator.peek("test query").allowed is True
+    assert validator.stats["cache_hits"] == 0
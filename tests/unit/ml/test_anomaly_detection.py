@@ -0,0 +1,163 @@
+"""
+Unit tests for AnomalyDetector vectorized features and streaming detection
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from src.ml.anomaly_detection import AnomalyDetector
+
+
+def reference_log_features(entries):
+    """Извлечение признаков до векторизации: цикл по записям"""
+    rows = []
+    for entry in entries:
+        timestamp = entry.get("timestamp", datetime.now())
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+        message = entry.get("message", "")
+        rows.append(
+            [
+                timestamp.hour,
+                timestamp.weekday(),
+                1 if entry.get("level", "INFO").upper() == "ERROR" else 0,
+                1 if entry.get("level", "INFO").upper() == "WARNING" else 0,
+                len(message),
+                1 if "exception" in message.lower() or "error" in message.lower() else 0,
+                entry.get("response_time", 0),
+                entry.get("status_code", 200),
+            ]
+        )
+    return np.array(rows, dtype=np.float64)
+
+
+def make_logs(count, start=datetime(2024, 3, 4, 8, 0, 0), anomalies=()):
+    logs = []
+    for i in range(count):
+        ts = start + timedelta(minutes=7 * i)
+        entry = {
+            "timestamp": ts.isoformat() + ("Z" if i % 3 == 0 else ""),
+            "level": ["info", "WARNING", "ERROR"][i % 3] if i % 5 == 0 else "INFO",
+            "message": f"request {i} handled" + (" with Exception" if i % 11 == 0 else ""),
+            "response_time": 100 + (i % 7) * 5,
+            "status_code": 200,
+        }
+        if i in anomalies:
+            entry.update(level="ERROR", message="Fatal error " * 40, response_time=9000, status_code=500)
+        logs.append(entry)
+    return logs
+
+
+def test_vectorized_log_features_match_reference():
+    """Тест: векторные признаки совпадают с построчным извлечением"""
+    logs = make_logs(50)
+    logs.append({"timestamp": datetime(2024, 3, 9, 22, 30, tzinfo=timezone.utc), "message": "ok"})
+    logs.append({"timestamp": "2024-03-10T01:02:03.456+03:00", "level": "error"})
+
+    features, names = AnomalyDetector().extract_log_features(logs)
+
+    assert names == list(AnomalyDetector.LOG_FEATURES)
+    np.testing.assert_array_equal(features, reference_log_features(logs))
+
+
+@pytest.mark.parametrize("timestamp", ["2024-02-30T10:00:00", "2023-02-29", "2024-04-31 08:00"])
+def test_impossible_dates_are_rejected(timestamp):
+    """Тест: несуществующая дата - ValueError, как у fromisoformat"""
+    with pytest.raises(ValueError):
+        AnomalyDetector().extract_log_features([{"timestamp": timestamp}])
+
+
+def test_leap_day_is_parsed():
+    """Тест: 29 февраля високосного года разбирается быстрым путём"""
+    logs = [{"timestamp": "2024-02-29T10:00:00"}, {"timestamp": "2000-02-29"}]
+
+    features, _ = AnomalyDetector().extract_log_features(logs)
+
+    np.testing.assert_array_equal(features, reference_log_features(logs))
+
+
+def test_columnar_input_matches_records():
+    """Тест: колонки дают ту же матрицу, что и список записей"""
+    logs = make_logs(30)
+    columns = {name: [entry[name] for entry in logs] for name in logs[0]}
+    detector = AnomalyDetector()
+
+    np.testing.assert_array_equal(
+        detector.extract_log_features(columns)[0], detector.extract_log_features(logs)[0]
+    )
+
+
+def test_detect_finds_injected_anomalies():
+    """Тест: detect находит аномальные записи и сортирует их по score"""
+    detector = AnomalyDetector(contamination=0.05, n_estimators=50)
+    assert detector.train(make_logs(300))["status"] == "trained"
+
+    result = detector.detect(make_logs(100, anomalies={10, 60}))
+
+    top = {anomaly["index"] for anomaly in result["anomalies"][:2]}
+    assert top == {10, 60}
+    scores = [anomaly["anomaly_score"] for anomaly in result["anomalies"]]
+    assert scores == sorted(scores)
+
+
+@pytest.mark.asyncio
+async def test_detect_stream_scores_micro_batches_and_trains_incrementally():
+    """Тест: поток режется на микробатчи, модель обучается и переобучается на окне"""
+    detector = AnomalyDetector(contamination=0.05, n_estimators=20, window_size=200, refit_every=150)
+    logs = make_logs(600, anomalies={450})
+
+    async def source():
+        for start in range(0, len(logs), 50):
+            yield logs[start : start + 50]
+            await asyncio.sleep(0)
+
+    results = [r async for r in detector.detect_stream(source(), batch_size=100, max_delay=0.05, update=True)]
+
+    assert sum(r["total_samples"] for r in results) == 600
+    assert [r["batch_index"] for r in results] == list(range(len(results)))
+    assert detector.refits >= 2
+    assert any(a["data"]["response_time"] == 9000 for r in results for a in r["anomalies"])
+
+
+@pytest.mark.asyncio
+async def test_detect_stream_flushes_partial_batch_after_delay():
+    """Тест: неполный батч отдаётся по таймауту, не дожидаясь конца потока"""
+    detector = AnomalyDetector(n_estimators=10)
+    detector.train(make_logs(50))
+    release = asyncio.Event()
+
+    async def source():
+        for entry in make_logs(5):
+            yield entry
+        await release.wait()
+
+    stream = detector.detect_stream(source(), batch_size=100, max_delay=0.01)
+    first = await asyncio.wait_for(stream.__anext__(), timeout=1.0)
+
+    assert first["total_samples"] == 5
+    release.set()
+    await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_detect_stream_consumer_exit_with_full_queue():
+    """Тест: выход потребителя после первого батча не вешает закрытие при полной очереди"""
+    detector = AnomalyDetector(n_estimators=10)
+    detector.train(make_logs(50))
+    logs = make_logs(100)
+
+    async def source():
+        while True:
+            for entry in logs:
+                yield entry
+
+    stream = detector.detect_stream(source(), batch_size=10, max_delay=0.01)
+    async for result in stream:
+        assert result["total_samples"] == 10
+        break
+    await asyncio.sleep(0.05)  # насос успевает заполнить очередь
+
+    await asyncio.wait_for(stream.aclose(), timeout=1.0)
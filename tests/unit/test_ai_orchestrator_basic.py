@@ -1,5 +1,9 @@
 # [NEXUS IDENTITY] ID: -327969305903321671 | DATE: 2025-11-19
 
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
 import pytest
 
 from src.ai.orchestrator import AIOrchestrator
@@ -93,3 +97,75 @@ async def test_handle_optimization_without_code_returns_error():
 
     assert result["type"] == "optimization"
     assert "No code provided in context" in result["error"]
+
+
+class RecordingValidator:
+    """Валидатор, который ждёт I/O (как извлечение намерения через LLM)"""
+
+    def __init__(self, events, allowed=True):
+        self.events = events
+        self.allowed = allowed
+
+    def peek(self, query):
+        return None
+
+    async def validate(self, query, context=None):
+        self.events.append("validation started")
+        await asyncio.sleep(0.01)
+        self.events.append("validation finished")
+        return SimpleNamespace(
+            allowed=self.allowed, reason="blocked", poetic_analysis=None, stage_completed="safety_check"
+        )
+
+
+def instrument(orchestrator, events, allowed=True):
+    orchestrator.security_validator = RecordingValidator(events, allowed)
+    classify = orchestrator.classifier.classify
+
+    def recording_classify(query, context=None):
+        events.append("classified")
+        return classify(query, context)
+
+    orchestrator.classifier.classify = recording_classify
+    orchestrator._execute_query = AsyncMock(return_value={"type": "stub"})
+
+
+@pytest.mark.asyncio
+async def test_classification_overlaps_security_validation():
+    orchestrator = AIOrchestrator()
+    events = []
+    instrument(orchestrator, events)
+
+    response = await orchestrator.process_query("Как оптимизировать запрос к регистру?")
+
+    assert response == {"type": "stub"}
+    assert events == ["validation started", "classified", "validation finished"]
+
+
+@pytest.mark.asyncio
+async def test_blocked_query_is_not_executed():
+    orchestrator = AIOrchestrator()
+    events = []
+    instrument(orchestrator, events, allowed=False)
+
+    response = await orchestrator.process_query("Как оптимизировать запрос к регистру?")
+
+    assert response["error"] == "Query blocked by security filters"
+    orchestrator._execute_query.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_skips_classification():
+    orchestrator = AIOrchestrator()
+    events = []
+    instrument(orchestrator, events)
+    query = "Как оптимизировать запрос к регистру?"
+
+    first = await orchestrator.process_query(query)
+    events.clear()
+    second = await orchestrator.process_query(query)
+
+    assert first == second == {"type": "stub"}
+    assert "classified" not in events
+    orchestrator._execute_query.assert_awaited_once()
+    assert orchestrator.cache.get_metrics()["misses"] == 1
@@ -0,0 +1,147 @@
+"""
+Unit tests for the fused ASGI middleware pipeline
+"""
+
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.middleware.asgi_pipeline import (
+    AISecurityStage,
+    ASGIPipeline,
+    RateLimitStage,
+    RequestContextStage,
+    SecurityHeadersStage,
+)
+
+
+def make_scope(path: str, headers=None) -> dict:
+    return {
+        "type": "http",
+        "method": "POST",
+        "path": path,
+        "scheme": "http",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "client": ("10.0.0.1", 1234),
+    }
+
+
+async def call(app, scope, body: bytes = b""):
+    """Прогоняет один запрос через ASGI-приложение"""
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    start = next(m for m in sent if m["type"] == "http.response.start")
+    response_body = b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+    return start["status"], dict(start["headers"]), response_body
+
+
+class EchoApp:
+    """Приложение, возвращающее тело запроса и state"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        message = await receive()
+        payload = {"body": message.get("body", b"").decode(), "user_id": scope["state"].get("user_id")}
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": json.dumps(payload).encode()})
+
+
+def allow_all_security_stage(allowed: bool = True) -> AISecurityStage:
+    layer = MagicMock()
+    layer.validate_input.return_value = MagicMock(allowed=allowed, reason="blocked", details={})
+    return AISecurityStage(security_layer=layer)
+
+
+@pytest.mark.asyncio
+async def test_context_shared_and_body_replayed_for_agent_route():
+    """Тест: контекст виден приложению, тело агента прочитано и передано дальше"""
+    app = EchoApp()
+    security = allow_all_security_stage()
+    pipeline = ASGIPipeline(app, [RequestContextStage(), SecurityHeadersStage(), security])
+
+    status, headers, body = await call(pipeline, make_scope("/api/v1/assistants/developer"), b'{"query": "hi"}')
+
+    assert status == 200
+    assert json.loads(body) == {"body": '{"query": "hi"}', "user_id": "dev-user-1"}
+    assert headers[b"x-frame-options"] == b"DENY"
+    kwargs = security.security_layer.validate_input.call_args.kwargs
+    assert kwargs["user_input"] == "hi"
+    assert kwargs["context"]["user_id"] == "dev-user-1"
+
+
+@pytest.mark.asyncio
+async def test_non_agent_route_is_not_buffered():
+    """Тест: обычные маршруты не читают тело в конвейере"""
+    app = EchoApp()
+    security = allow_all_security_stage()
+    pipeline = ASGIPipeline(app, [RequestContextStage(), security])
+
+    status, _, body = await call(pipeline, make_scope("/api/v1/projects"), b"payload")
+
+    assert status == 200
+    assert json.loads(body)["body"] == "payload"
+    security.security_layer.validate_input.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_blocked_agent_request_gets_security_headers():
+    """Тест: отказ AI security - 403 с security headers, приложение не вызывается"""
+    app = EchoApp()
+    pipeline = ASGIPipeline(app, [SecurityHeadersStage(), allow_all_security_stage(allowed=False)])
+
+    status, headers, _ = await call(pipeline, make_scope("/api/v1/code_review/run"), b'{"code": "x"}')
+
+    assert status == 403
+    assert app.calls == 0
+    assert b"content-security-policy" in headers
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_uses_single_redis_round_trip():
+    """Тест: пользовательский и tiered лимиты считаются одним pipeline"""
+    counters = {}
+
+    class FakePipeline:
+        def __init__(self):
+            self.ops = []
+
+        def incr(self, key):
+            self.ops.append(("incr", key))
+
+        def expire(self, key, ttl):
+            self.ops.append(("expire", key))
+
+        async def execute(self):
+            results = []
+            for op, key in self.ops:
+                if op == "incr":
+                    counters[key] = counters.get(key, 0) + 1
+                    results.append(counters[key])
+                else:
+                    results.append(True)
+            return results
+
+    redis = MagicMock()
+    redis.pipeline.side_effect = lambda transaction=False: FakePipeline()
+
+    app = EchoApp()
+    stage = RateLimitStage(redis_client=redis, max_requests=2, tiered=True)
+    pipeline = ASGIPipeline(app, [RequestContextStage(), stage])
+
+    statuses = [(await call(pipeline, make_scope("/api/v1/projects")))[0] for _ in range(3)]
+
+    assert statuses == [200, 200, 429]
+    assert len(counters) == 2
+    assert app.calls == 2
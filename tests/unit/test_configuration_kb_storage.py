@@ -0,0 +1,110 @@
+"""
+Unit tests for journal storage of the configuration knowledge base
+"""
+
+import json
+
+from src.services.configuration_kb_storage import JournalKnowledgeBaseStore
+from src.services.configuration_knowledge_base import ConfigurationKnowledgeBase
+
+
+def test_journal_mode_appends_instead_of_rewriting(tmp_path):
+    """Test that each change is a single appended journal record"""
+    kb = ConfigurationKnowledgeBase(str(tmp_path), storage_mode="journal")
+
+    for i in range(10):
+        assert kb.add_best_practice("erp", "performance", {"title": f"practice {i}"})
+
+    shard = tmp_path / "erp" / "best_practices.jsonl"
+    assert len(shard.read_text(encoding="utf-8").splitlines()) == 10
+    assert not (tmp_path / "erp.json").exists()
+
+
+def test_journal_mode_reload_is_lazy_and_consistent(tmp_path):
+    """Test that a reopened KB sees the same data"""
+    kb = ConfigurationKnowledgeBase(str(tmp_path), storage_mode="journal")
+    kb.add_module_documentation("ut", "Common", {"description": "v1"})
+    kb.add_module_documentation("ut", "Common", {"description": "v2"})
+    kb.add_module_documentation("ut", "Sales", {"description": "sales"})
+
+    reopened = ConfigurationKnowledgeBase(str(tmp_path), storage_mode="journal")
+    assert reopened._cache["ut"]._lists == {}
+
+    info = reopened.get_configuration_info("ut")
+    assert [m["name"] for m in info["modules"]] == ["Common", "Sales"]
+    assert info["modules"][0]["documentation"] == {"description": "v2"}
+    assert info["name"] == ConfigurationKnowledgeBase.CONFIG_NAME_MAP["ut"]
+
+
+def test_journal_compaction(tmp_path):
+    """Test that repeated upserts are compacted"""
+    store = JournalKnowledgeBaseStore(tmp_path, compact_min_records=8)
+    config = store.create("erp", {"name": "ERP"})
+
+    for i in range(50):
+        module = {"name": "Common", "revision": i}
+        config["modules"][:] = [module]
+        config.upsert("modules", "Common", module)
+
+    lines = (tmp_path / "erp" / "modules.jsonl").read_text(encoding="utf-8").splitlines()
+    assert len(lines) <= 8
+
+    reopened = JournalKnowledgeBaseStore(tmp_path).open("erp")
+    assert reopened["modules"] == [{"name": "Common", "revision": 49}]
+
+
+def test_metadata_objects_sharded_by_type(tmp_path):
+    """Test one shard per metadata object type"""
+    kb = ConfigurationKnowledgeBase(str(tmp_path), storage_mode="journal")
+    kb._add_object_to_config("erp", {"name": "Товары", "type": "Catalog"})
+    kb._add_object_to_config("erp", {"name": "Заказ", "type": "Document"})
+
+    assert (tmp_path / "erp" / "objects" / "Catalog.jsonl").exists()
+    assert (tmp_path / "erp" / "objects" / "Document.jsonl").exists()
+
+    reopened = ConfigurationKnowledgeBase(str(tmp_path), storage_mode="journal")
+    objects = reopened.get_configuration_info("erp")["metadata_objects"]
+    assert objects["Catalog"][0]["name"] == "Товары"
+    assert objects["Document"][0]["name"] == "Заказ"
+
+
+def test_legacy_json_import_and_export(tmp_path):
+    """Test migration from <config>.json and export back to it"""
+    legacy = {
+        "name": "Бухгалтерия предприятия",
+        "modules": [{"name": "Common"}],
+        "best_practices": [],
+        "common_patterns": [{"name": "Pattern", "type": "query"}],
+        "api_usage": [],
+        "performance_tips": [],
+        "known_issues": [],
+    }
+    (tmp_path / "buh.json").write_text(json.dumps(legacy, ensure_ascii=False), encoding="utf-8")
+
+    kb = ConfigurationKnowledgeBase(str(tmp_path), storage_mode="journal")
+    assert kb.search_patterns(config_name="buh", pattern_type="query")[0]["name"] == "Pattern"
+
+    export_dir = tmp_path / "export"
+    exported = kb.export_configuration("buh", str(export_dir))
+    assert json.loads(exported.read_text(encoding="utf-8")) == legacy
+
+
+def test_keyed_replay_with_deletes_and_large_snapshot(tmp_path):
+    """Test keyed replay semantics and a single-record snapshot"""
+    store = JournalKnowledgeBaseStore(tmp_path)
+    modules = [{"name": f"Module{i}", "revision": 0} for i in range(8000)]
+    config = store.create("erp", {"name": "ERP", "modules": modules})
+
+    assert len((tmp_path / "erp" / "modules.jsonl").read_text(encoding="utf-8").splitlines()) == 1
+
+    config.upsert("modules", "Module5", {"name": "Module5", "revision": 1})
+    config.delete("modules", "Module7")
+    config.upsert("modules", "Module7", {"name": "Module7", "revision": 2})
+    config.delete("modules", "Missing")
+    store.close()
+
+    reopened = JournalKnowledgeBaseStore(tmp_path).open("erp")["modules"]
+    assert len(reopened) == 8000
+    assert reopened[5] == {"name": "Module5", "revision": 1}
+    assert reopened[7] == {"name": "Module8", "revision": 0}
+    assert reopened[-1] == {"name": "Module7", "revision": 2}
@@ -0,0 +1,176 @@
+"""
+Unit tests for DataLoader and UnifiedDataLayer loaders
+"""
+
+import asyncio
+
+import pytest
+
+from src.infrastructure.data_layer import DataLoader, QueryResult, UnifiedDataLayer
+
+
+class RecordingBatchFn:
+    """batch_fn, запоминающий полученные батчи"""
+
+    def __init__(self, delay: float = 0.0):
+        self.calls = []
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, keys):
+        self.calls.append(list(keys))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            return [f"value:{key}" for key in keys]
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_loads_coalesced_into_one_batch():
+    """Тест: load() из разных корутин за один проход loop - один вызов batch_fn"""
+    batch_fn = RecordingBatchFn()
+    loader = DataLoader(batch_fn)
+
+    results = await asyncio.gather(*(loader.load(key) for key in ["a", "b", "a", "c"]))
+
+    assert results == ["value:a", "value:b", "value:a", "value:c"]
+    assert batch_fn.calls == [["a", "b", "c"]]
+
+
+@pytest.mark.asyncio
+async def test_batches_split_and_concurrency_limited():
+    """Тест разбиения на батчи и ограничения параллелизма"""
+    batch_fn = RecordingBatchFn(delay=0.01)
+    loader = DataLoader(batch_fn, max_batch_size=2, max_concurrency=2)
+
+    results = await loader.load_many([str(i) for i in range(10)])
+
+    assert results == [f"value:{i}" for i in range(10)]
+    assert len(batch_fn.calls) == 5
+    assert batch_fn.max_in_flight == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_ttl_and_lru_bound():
+    """Тест TTL и ограничения размера кэша"""
+    batch_fn = RecordingBatchFn()
+    loader = DataLoader(batch_fn, cache_ttl=0.05, cache_max_size=2)
+
+    await loader.load_many(["a", "b", "c"])
+    assert len(loader._cache) == 2
+
+    await loader.load("c")
+    assert len(batch_fn.calls) == 1
+
+    await asyncio.sleep(0.06)
+    await loader.load("c")
+    assert batch_fn.calls[-1] == ["c"]
+
+
+@pytest.mark.asyncio
+async def test_batch_errors_propagate_per_key():
+    """Тест: исключение на месте значения - ошибка только для этого ключа"""
+
+    async def batch_fn(keys):
+        return [KeyError(key) if key == "bad" else key for key in keys]
+
+    loader = DataLoader(batch_fn)
+    good, bad = await asyncio.gather(loader.load("good"), loader.load("bad"), return_exceptions=True)
+
+    assert good == "good"
+    assert isinstance(bad, KeyError)
+    assert "bad" not in loader._cache
+
+
+@pytest.mark.asyncio
+async def test_postgres_row_loader_issues_single_query():
+    """Тест: загрузчик строк PostgreSQL делает один SELECT ... IN на батч"""
+    layer = UnifiedDataLayer()
+    queries = []
+
+    async def fake_query_postgres(query_type, query):
+        queries.append(query)
+        ids = query["where"]["id"]
+        return QueryResult(data=[{"id": i, "name": f"row {i}"} for i in ids if i != 3], total=0)
+
+    layer._query_postgres = fake_query_postgres
+    loader = layer.postgres_row_loader("users")
+
+    rows = await asyncio.gather(*(loader.load(i) for i in [1, 2, 3]))
+
+    assert [row and row["name"] for row in rows] == ["row 1", "row 2", None]
+    assert len(queries) == 1
+    assert queries[0]["count"] is False
+
+
+class FakeConnection:
+    """Соединение asyncpg, записывающее выполненный SQL"""
+
+    def __init__(self, log):
+        self.log = log
+
+    async def fetch(self, sql, *args):
+        self.log.append((sql, args))
+        return [{"id": 1, "name": "row"}]
+
+    async def fetchval(self, sql, *args):
+        self.log.append((sql, args))
+        return 42
+
+
+class FakePool:
+    """Пул asyncpg с интерфейсом acquire()"""
+
+    def __init__(self):
+        self.log = []
+
+    def acquire(self):
+        pool = self
+
+        class _Acquire:
+            async def __aenter__(self):
+                return FakeConnection(pool.log)
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Acquire()
+
+
+@pytest.mark.asyncio
+async def test_postgres_async_path_uses_stable_sql():
+    """Тест: асинхронный путь через пул и одинаковый SQL для списков разной длины"""
+    pool = FakePool()
+    layer = UnifiedDataLayer(postgres_pool=pool)
+
+    first = await layer.query("select", {"table": "users", "where": {"id": [1, 2]}, "limit": 10})
+    await layer.query("select", {"table": "users", "where": {"id": [1, 2, 3]}, "limit": 10})
+
+    assert first.total == 42
+    assert first.data == [{"id": 1, "name": "row"}]
+    select_sqls = {sql for sql, _ in pool.log if "LIMIT" in sql}
+    assert select_sqls == {"SELECT * FROM users WHERE id = ANY($1) ORDER BY id DESC LIMIT $2 OFFSET $3"}
+    assert len(layer._pg_sql_cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_explicit_postgres_conn_not_replaced_by_shared_pool(monkeypatch):
+    """Тест: переданное соединение psycopg2 не подменяется общим пулом приложения"""
+    from src.infrastructure.db import connection
+
+    shared = FakePool()
+    monkeypatch.setattr(connection, "get_pool", lambda: shared)
+
+    layer = UnifiedDataLayer(postgres_conn=object())
+    layer._query_postgres_sync = lambda query_type, query: QueryResult(data=[{"id": "sync"}], total=1)
+
+    result = await layer.query("select", {"table": "users"})
+
+    assert result.data == [{"id": "sync"}]
+    assert shared.log == []
+    assert UnifiedDataLayer()._get_postgres_pool() is shared
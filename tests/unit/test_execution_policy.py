@@ -0,0 +1,160 @@
+"""
+Unit tests for PolicyExecutor: latency budget, first-N answers and hedging
+"""
+
+import asyncio
+
+import pytest
+
+from src.ai.execution_policy import ExecutionPolicy, LatencyHistogram, PolicyExecutor, StrategyCall
+
+
+def service(delay, value=None, error=None, calls=None, name=""):
+    """Стратегия с задержкой; отмена фиксируется в calls"""
+
+    async def run():
+        if calls is not None:
+            calls.append(("start", name))
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            if calls is not None:
+                calls.append(("cancelled", name))
+            raise
+        if error:
+            raise RuntimeError(error)
+        return value if value is not None else {"text": name}
+
+    return run
+
+
+def warm_up(executor, name, seconds, count=50):
+    for _ in range(count):
+        executor._histogram(name).record(seconds)
+
+
+def test_histogram_quantiles_follow_bucket_bounds():
+    """Тест: квантили гистограммы в пределах точности корзин"""
+    histogram = LatencyHistogram()
+    for i in range(1, 101):
+        histogram.record(i / 100)
+
+    assert histogram.quantile(0.5) == pytest.approx(0.5, rel=0.13)
+    assert histogram.quantile(0.95) == pytest.approx(0.95, rel=0.13)
+    assert histogram.snapshot()["count"] == 100
+
+
+def test_histogram_decays_old_samples():
+    """Тест: при переполнении старые наблюдения теряют вес"""
+    histogram = LatencyHistogram(max_samples=100)
+    for _ in range(99):
+        histogram.record(1.0)
+    for _ in range(150):
+        histogram.record(0.01)
+
+    assert histogram.count < 100
+    assert histogram.quantile(0.5) == pytest.approx(0.01, rel=0.13)
+
+
+@pytest.mark.asyncio
+async def test_waits_for_all_calls_by_default():
+    """Тест: без бюджета и min_results ответы собираются со всех стратегий"""
+    executor = PolicyExecutor()
+    calls = [
+        StrategyCall("fast", service(0.01, name="fast")),
+        StrategyCall("failing", service(0.01, error="boom")),
+        StrategyCall("slow", service(0.05, name="slow")),
+    ]
+
+    outcome = await executor.run(calls, ExecutionPolicy())
+
+    assert set(outcome.results) == {"fast", "failing", "slow"}
+    assert isinstance(outcome.results["failing"], RuntimeError)
+    assert not outcome.partial and outcome.cancelled == []
+    assert executor.latency_stats()["failing"]["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_first_n_good_answers_cancel_stragglers():
+    """Тест: после N успешных ответов остальные вызовы отменяются"""
+    executor = PolicyExecutor()
+    log = []
+    calls = [
+        StrategyCall("a", service(0.01, calls=log, name="a")),
+        StrategyCall("error", service(0.005, value={"error": "unavailable"})),
+        StrategyCall("b", service(0.02, calls=log, name="b")),
+        StrategyCall("slow", service(5, calls=log, name="slow")),
+    ]
+
+    outcome = await executor.run(calls, ExecutionPolicy(min_results=2))
+
+    assert set(outcome.results) == {"a", "error", "b"}
+    assert outcome.cancelled == ["slow"]
+    assert ("cancelled", "slow") in log
+    assert not outcome.partial
+
+
+@pytest.mark.asyncio
+async def test_budget_returns_partial_results():
+    """Тест: по истечении бюджета возвращаются готовые ответы с флагом partial"""
+    executor = PolicyExecutor()
+    calls = [
+        StrategyCall("fast", service(0.01, name="fast")),
+        StrategyCall("slow", service(5, name="slow")),
+    ]
+
+    outcome = await executor.run(calls, ExecutionPolicy(budget_seconds=0.1))
+
+    assert outcome.partial
+    assert list(outcome.results) == ["fast"]
+    assert outcome.cancelled == ["slow"]
+    assert outcome.elapsed < 1
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_is_hedged_to_backup():
+    """Тест: медленнее своего p95 - запрос дублируется, побеждает резерв"""
+    executor = PolicyExecutor()
+    warm_up(executor, "primary", 0.02)
+    log = []
+    call = StrategyCall(
+        "primary",
+        service(5, calls=log, name="primary"),
+        backup_name="backup",
+        backup_run=service(0.01, name="backup"),
+    )
+
+    outcome = await executor.run([call], ExecutionPolicy())
+
+    assert outcome.results["primary"] == {"text": "backup"}
+    assert outcome.hedged == {"primary": "backup"}
+    assert outcome.answered_by == {"primary": "backup"}
+    assert ("cancelled", "primary") in log
+
+
+@pytest.mark.asyncio
+async def test_no_hedge_without_latency_history_or_when_disabled():
+    """Тест: без истории задержек или с hedge=False резерв не вызывается"""
+    executor = PolicyExecutor()
+    backup_calls = []
+    call = StrategyCall(
+        "primary",
+        service(0.1, name="primary"),
+        backup_name="backup",
+        backup_run=service(0.01, calls=backup_calls, name="backup"),
+    )
+
+    await executor.run([call], ExecutionPolicy())
+    warm_up(executor, "primary", 0.001)
+    await executor.run([call], ExecutionPolicy(hedge=False))
+
+    assert backup_calls == []
+
+
+def test_policy_overrides_from_context():
+    """Тест: параметры запроса переопределяют политику по умолчанию"""
+    policy = ExecutionPolicy(min_results=1)
+
+    assert policy.with_overrides({}) is policy
+    override = policy.with_overrides({"latency_budget": 2.5, "hedge": False})
+    assert (override.budget_seconds, override.min_results, override.hedge) == (2.5, 1, False)
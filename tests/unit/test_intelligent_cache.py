@@ -4,8 +4,12 @@
 Tests for IntelligentCache (intelligent_cache.py).
 """
 
+import asyncio
 import time
 
+import pytest
+
+from src.ai import intelligent_cache
 from src.ai.intelligent_cache import CacheEntry, IntelligentCache
 
 
@@ -195,3 +199,96 @@ def test_intelligent_cache_invalidate_by_query_type() -> None:
     assert cache.get("query1") is None
     assert cache.get("query2") == "value2"
     assert cache.get("query3") is None
+
+
+def test_intelligent_cache_tag_index_follows_entries() -> None:
+    """Тест обратного индекса тегов при перезаписи и вытеснении."""
+    cache = IntelligentCache(max_size=2)
+
+    cache.set("query1", "value1", tags={"old"}, query_type="general")
+    cache.set("query1", "value1b", tags={"new"}, query_type="reasoning")
+    cache.set("query2", "value2", tags={"new"})
+    cache.set("query3", "value3", tags={"other"})  # вытесняет query1
+
+    assert cache.invalidate_by_tags({"old"}) == 0
+    assert cache.invalidate_by_query_type("reasoning") == 0
+    assert cache._tag_index == {"new": {cache._generate_key("query2")}, "other": {cache._generate_key("query3")}}
+    assert cache.invalidate_by_tags({"new", "other"}) == 2
+    assert cache._tag_index == {} and cache._query_type_index == {}
+
+
+@pytest.mark.asyncio
+async def test_get_or_compute_single_flight() -> None:
+    """Тест: конкурентные промахи по одному ключу ждут одно вычисление."""
+    cache = IntelligentCache(max_size=10)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"text": "answer"}
+
+    results = await asyncio.gather(
+        *(cache.get_or_compute("query", compute, query_type="general") for _ in range(10))
+    )
+
+    assert len(calls) == 1
+    assert all(result == {"text": "answer"} for result in results)
+    assert cache.get_metrics()["coalesced"] == 9
+    assert cache.get("query") == {"text": "answer"}
+    assert cache._cache[cache._generate_key("query")].compute_seconds >= 0.04
+    assert cache._inflight == {}
+
+
+@pytest.mark.asyncio
+async def test_get_or_compute_errors_and_cache_if_not_cached() -> None:
+    """Тест: ошибки и отклоненные cache_if значения не сохраняются."""
+    cache = IntelligentCache(max_size=10)
+
+    async def failing():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_compute("query", failing)
+    partial = await cache.get_or_compute(
+        "query", lambda: {"partial": True}, cache_if=lambda value: not value.get("partial")
+    )
+    value = await cache.get_or_compute("query", lambda: "value")
+
+    assert partial == {"partial": True}
+    assert value == "value"
+    assert cache.get("query") == "value"
+
+
+@pytest.mark.asyncio
+async def test_get_or_compute_early_refresh_serves_stale(monkeypatch) -> None:
+    """Тест XFetch: досрочный пересчет, остальные получают текущее значение."""
+    cache = IntelligentCache(max_size=10)
+    cache.set("query", "old", ttl_seconds=60, compute_seconds=30.0)
+    refresh_started = asyncio.Event()
+
+    async def compute():
+        refresh_started.set()
+        await asyncio.sleep(0.05)
+        return "new"
+
+    # Далеко до истечения TTL и random() близко к 0 - пересчета нет
+    monkeypatch.setattr(intelligent_cache.random, "random", lambda: 0.01)
+    assert await cache.get_or_compute("query", compute) == "old"
+
+    monkeypatch.setattr(intelligent_cache.random, "random", lambda: 0.99)
+    refresh = asyncio.ensure_future(cache.get_or_compute("query", compute))
+    await refresh_started.wait()
+
+    assert await cache.get_or_compute("query", compute) == "old"
+    assert await refresh == "new"
+    assert cache.get("query") == "new"
+    assert cache.get_metrics()["early_refreshes"] == 1
+
+
+def test_metric_handles_resolved_once() -> None:
+    """Тест: обработчики метрик разрешаются один раз на процесс."""
+    first = IntelligentCache()
+    second = IntelligentCache()
+
+    assert first._track is second._track
@@ -53,3 +53,48 @@ def test_invalid_query_returns_unknown():
     assert intent.confidence == 0.0
     assert intent.preferred_services  # есть хотя бы naparnik по умолчанию
     assert intent.suggested_tools == []
+
+
+def test_pattern_anchors_cover_prefix_and_leading_group():
+    from src.ai.query_classifier import pattern_anchors
+
+    assert pattern_anchors(r"кто\s+вызывает") == ("кто",)
+    assert pattern_anchors(r"(создай|напиши)\s+(функци|процедур)") == ("создай", "напиши")
+    assert pattern_anchors(r"типов(ая|ой)\s+") == ("типов",)
+    # Необязательный последний символ и альтернатива верхнего уровня
+    assert pattern_anchors(r"графы?\s+") == ("граф",)
+    assert pattern_anchors(r"граф|связи") is None
+    assert pattern_anchors(r"[а-я]+ый") is None
+
+
+def test_repeated_query_served_from_cache():
+    classifier = QueryClassifier()
+
+    first = classifier.classify("Где используется этот метод?")
+    first.keywords.append("изменено")
+    second = classifier.classify("ГДЕ ИСПОЛЬЗУЕТСЯ этот метод?", {"type": "module"})
+
+    assert classifier.cache_stats == {"hits": 1, "misses": 1}
+    assert second.query_type == QueryType.GRAPH_QUERY
+    assert "изменено" not in second.keywords
+    assert second.context_type == "module"
+
+
+def test_cache_is_bounded():
+    classifier = QueryClassifier(cache_size=2)
+
+    for query in ("создай функцию", "оптимизируй код", "найди похожий код"):
+        classifier.classify(query)
+    classifier.classify("создай функцию")
+
+    assert classifier.cache_stats["hits"] == 0
+    assert len(classifier._cache) == 2
+
+
+def test_anchor_prefilter_keeps_ignorecase_matches():
+    # U+1C80 под IGNORECASE равна "в", а lower() ее не меняет
+    classifier = QueryClassifier(cache_size=0)
+    intent = classifier.classify("кто ᲀызывает")
+
+    assert intent.query_type == QueryType.GRAPH_QUERY
+    assert intent.confidence == 0.4
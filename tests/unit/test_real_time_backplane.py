@@ -0,0 +1,146 @@
+"""
+Unit tests for real-time backplane: broadcasts across workers and per-tick batching
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from src.services.real_time_backplane import InProcessBackplane, RedisBackplane
+from src.services.real_time_service import RealTimeManager
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+
+async def make_workers(count, **kwargs):
+    hub = InProcessBackplane.Hub()
+    workers = [RealTimeManager(**kwargs) for _ in range(count)]
+    for worker in workers:
+        await worker.attach_backplane(InProcessBackplane(hub))
+    return hub, workers
+
+
+async def settle(workers):
+    await asyncio.sleep(0.01)  # тик пачки, публикация и приём
+    for worker in workers:
+        await worker.fanout.drain()
+
+
+async def close(workers):
+    for worker in workers:
+        await worker.detach_backplane()
+        await worker.fanout.close()
+
+
+@pytest.mark.asyncio
+async def test_system_alert_reaches_clients_of_all_workers():
+    """Тест: алерт одного воркера получают клиенты всех воркеров, без дублей"""
+    hub, workers = await make_workers(3)
+    clients = [FakeWebSocket() for _ in workers]
+    for worker, ws in zip(workers, clients):
+        await worker.connect(ws, topic="system")
+
+    await workers[0].broadcast_system_alert({"level": "critical"})
+    await settle(workers)
+
+    for ws in clients:
+        assert len(ws.sent) == 2
+        assert '"alert":{"level":"critical"}' in ws.sent[1]
+    assert hub.published == 1
+    await close(workers)
+
+
+@pytest.mark.asyncio
+async def test_broadcasts_batched_per_topic_per_tick():
+    """Тест: за тик уходит одна пачка на топик, снимки дашборда схлопываются"""
+    hub, (sender, receiver) = await make_workers(2)
+    ws = FakeWebSocket()
+    await receiver.connect(ws, topic="dashboard_pm")
+
+    for version in range(10):
+        await sender.broadcast_dashboard_update("pm", {"v": version})
+    await sender.broadcast_notification("u1", {"text": "first"})
+    await sender.broadcast_notification("u1", {"text": "second"})
+    await settle([sender, receiver])
+
+    assert hub.published == 2
+    stats = sender.get_stats()["backplane"]
+    assert stats["batches_published"] == 2 and stats["messages_published"] == 3
+    assert len(ws.sent) == 2 and '"data":{"v":9}' in ws.sent[1]
+    assert receiver.get_stats()["backplane"]["messages_received"] == 3
+    await close([sender, receiver])
+
+
+@pytest.mark.asyncio
+async def test_local_delivery_without_backplane_unchanged():
+    """Тест: без backplane рассылка без подписчиков ничего не публикует"""
+    manager = RealTimeManager()
+    await manager.broadcast_system_alert({"level": "info"})
+
+    assert manager.get_stats()["backplane"]["pending_topics"] == 0
+    await manager.fanout.close()
+
+
+class FakePubSub:
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.patterns = []
+
+    async def psubscribe(self, pattern):
+        self.patterns.append(pattern)
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=1.0):
+        if self.messages:
+            return self.messages.pop(0)
+        await asyncio.sleep(0.01)
+        return None
+
+    async def punsubscribe(self):
+        self.patterns.clear()
+
+    async def close(self):
+        pass
+
+
+class FakeRedis:
+    def __init__(self, pubsub):
+        self._pubsub = pubsub
+        self.published = []
+
+    def pubsub(self, ignore_subscribe_messages=True):
+        return self._pubsub
+
+    async def publish(self, channel, data):
+        self.published.append((channel, data))
+
+
+@pytest.mark.asyncio
+async def test_redis_backplane_maps_channels_to_topics():
+    """Тест: Redis backplane публикует в канал с префиксом и снимает его при приёме"""
+    batch = json.dumps({"origin": "other", "messages": [{"text": '{"type":"alert"}', "type": "alert"}]})
+    pubsub = FakePubSub([{"type": "pmessage", "channel": b"realtime:system", "data": batch.encode()}])
+    redis_client = FakeRedis(pubsub)
+    manager = RealTimeManager()
+    ws = FakeWebSocket()
+    await manager.connect(ws, topic="system")
+
+    await manager.attach_backplane(RedisBackplane(redis_client))
+    await asyncio.sleep(0.02)
+    await manager.broadcast_system_alert({"level": "warning"})
+    await manager.flush_backplane()
+    await manager.fanout.drain()
+
+    assert pubsub.patterns == ["realtime:*"]
+    assert ws.sent[1] == '{"type":"alert"}'
+    assert [channel for channel, _ in redis_client.published] == ["realtime:system"]
+    await close([manager])
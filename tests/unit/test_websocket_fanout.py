@@ -0,0 +1,147 @@
+"""
+Unit tests for WebSocket fan-out engine and managers built on it
+"""
+
+import asyncio
+
+import pytest
+
+from src.services.real_time_service import RealTimeManager
+from src.services.websocket_fanout import FanoutEngine, SlowConsumerPolicy
+from src.services.websocket_manager import ConnectionManager
+
+
+class FakeWebSocket:
+    """WebSocket с управляемой задержкой и ошибками отправки"""
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.sent = []
+        self.gate = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("connection closed")
+        self.sent.append(text)
+
+
+@pytest.mark.asyncio
+async def test_message_serialized_once_for_all_connections():
+    """Тест: все клиенты получают один и тот же сериализованный payload"""
+    engine = FanoutEngine("test")
+    sockets = [FakeWebSocket() for _ in range(5)]
+    for ws in sockets:
+        engine.register(ws)
+
+    assert engine.publish(sockets, {"type": "update", "value": "значение"}) == 5
+    assert await engine.drain()
+
+    payloads = [ws.sent[0] for ws in sockets]
+    assert payloads[0] == '{"type":"update","value":"значение"}'
+    assert all(payload is payloads[0] for payload in payloads)
+    await engine.close()
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_does_not_delay_others():
+    """Тест: медленный клиент не задерживает доставку остальным"""
+    engine = FanoutEngine("test")
+    slow = FakeWebSocket(delay=1.0)
+    fast = [FakeWebSocket() for _ in range(3)]
+    for ws in [slow, *fast]:
+        engine.register(ws)
+
+    engine.publish([slow, *fast], {"type": "update"})
+    await asyncio.sleep(0.01)
+
+    assert all(len(ws.sent) == 1 for ws in fast)
+    assert slow.sent == []
+    await engine.close()
+
+
+@pytest.mark.asyncio
+async def test_coalesce_keeps_only_latest_snapshot_for_blocked_client():
+    """Тест: заблокированный клиент получает только последний снимок по ключу"""
+    engine = FanoutEngine("test", policy=SlowConsumerPolicy.COALESCE)
+    ws = FakeWebSocket()
+    ws.gate = asyncio.Event()
+    engine.register(ws)
+
+    engine.publish([ws], {"type": "first"})
+    await asyncio.sleep(0)  # писатель забрал первое сообщение и ждёт gate
+    for version in range(5):
+        engine.publish([ws], {"type": "dashboard", "v": version}, coalesce_key="dashboard")
+    assert engine.get_stats()["queued"] == 1
+
+    ws.gate.set()
+    assert await engine.drain()
+    assert ws.sent == ['{"type":"first"}', '{"type":"dashboard","v":4}']
+    assert engine.get_stats()["coalesced"] == 4
+    await engine.close()
+
+
+@pytest.mark.asyncio
+async def test_bounded_queue_drops_oldest():
+    """Тест: очередь ограничена, при переполнении выбрасываются старые сообщения"""
+    engine = FanoutEngine("test", max_queue_size=3, policy=SlowConsumerPolicy.DROP_OLDEST)
+    ws = FakeWebSocket()
+    ws.gate = asyncio.Event()
+    engine.register(ws)
+
+    engine.publish([ws], {"n": 0})
+    await asyncio.sleep(0)
+    for n in range(1, 7):
+        engine.publish([ws], {"n": n})
+
+    ws.gate.set()
+    assert await engine.drain()
+    assert ws.sent == ['{"n":0}', '{"n":4}', '{"n":5}', '{"n":6}']
+    assert engine.get_stats()["dropped"] == 3
+    await engine.close()
+
+
+@pytest.mark.asyncio
+async def test_connection_manager_removes_failed_connection_everywhere():
+    """Тест: ошибка отправки убирает соединение из пользователей, тенантов и комнат"""
+    manager = ConnectionManager()
+    broken = FakeWebSocket(fail=True)
+    healthy = FakeWebSocket()
+    await manager.connect(broken, user_id="u1", tenant_id="t1")
+    await manager.connect(healthy, user_id="u2", tenant_id="t1")
+    manager.join_room(broken, "room")
+
+    await manager.broadcast({"type": "ping"})
+    await manager.fanout.drain()
+    await asyncio.sleep(0)
+
+    assert manager.active_connections == {healthy}
+    assert "u1" not in manager.user_connections
+    assert manager.tenant_connections["t1"] == {healthy}
+    assert "room" not in manager.room_connections
+    assert healthy.sent == ['{"type":"ping"}']
+    await manager.fanout.close()
+
+
+@pytest.mark.asyncio
+async def test_real_time_manager_broadcasts_through_fanout():
+    """Тест: welcome и рассылка по топику идут через очередь соединения"""
+    manager = RealTimeManager()
+    ws = FakeWebSocket()
+    await manager.connect(ws, topic="dashboard_pm")
+
+    await manager.broadcast_dashboard_update("pm", {"tasks": 3})
+    await manager.fanout.drain()
+
+    assert len(ws.sent) == 2
+    assert '"type":"connected"' in ws.sent[0]
+    assert '"data":{"tasks":3}' in ws.sent[1]
+    assert manager.get_stats()["total_messages_sent"] == 2
+    await manager.fanout.close()
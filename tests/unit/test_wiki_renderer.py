@@ -0,0 +1,152 @@
+"""
+Unit tests for WikiRenderer render cache, transclusion dependencies and block-level rendering
+"""
+
+import pytest
+
+from src.services.wiki.renderer import WikiRenderer, split_blocks
+
+DOC = """Intro *text*
+
+# Install
+
+- step one
+- step two
+
+```bash
+# not a heading
+./install.sh
+```
+
+## Linux
+
+See [[setup|Setup]] and {{code:module.func}}
+
+# Usage
+
+Setext
+======
+"""
+
+
+class Pages:
+    """Хранилище страниц с ревизиями"""
+
+    def __init__(self, **pages):
+        self.pages = {slug: (1, content) for slug, content in pages.items()}
+
+    def save(self, slug, content):
+        revision = self.pages[slug][0] + 1 if slug in self.pages else 1
+        self.pages[slug] = (revision, content)
+
+    def __call__(self, slug):
+        return self.pages.get(slug)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        DOC,
+        "# Only heading",
+        "para\n\n1. a\n2. b\n# h\n<div>\nhtml\n</div>\n# x\n\n~~~\n# in tilde\n~~~\n",
+        "text [ref]\n\n# h\n\n[ref]: http://example.com\n",
+        "Intro text\n<details>\n# Not a heading\n</details>\n",
+        "Intro text\n<span>\n# Heading\n",
+    ],
+)
+def test_block_rendering_matches_full_conversion(text):
+    """Тест: рендер по разделам совпадает с конвертацией целиком"""
+    assert WikiRenderer().render(text) == WikiRenderer(incremental=False).render(text)
+
+
+def test_split_blocks_keeps_documents_with_link_references_whole():
+    """Тест: сноски действуют на весь документ - такой текст не режется"""
+    assert len(split_blocks(DOC)) == 4
+    assert split_blocks("[a]\n\n# h\n\n[a]: /x\n") is None
+
+
+def test_edit_rerenders_only_changed_section():
+    """Тест: после правки одного раздела остальные берутся из кэша"""
+    renderer = WikiRenderer()
+    renderer.render(DOC)
+
+    edited = DOC.replace("Setext", "Changed")
+    html = renderer.render(edited)
+
+    assert "<h1>Changed</h1>" in html
+    stats = renderer.get_stats()
+    assert (stats["block_misses"], stats["block_hits"]) == (5, 3)
+
+
+def test_page_render_cached_by_revision():
+    """Тест: повторный просмотр той же ревизии не конвертирует Markdown"""
+    renderer = WikiRenderer()
+
+    first = renderer.render_page("guide", 3, DOC)
+    second = renderer.render_page("guide", 3, DOC)
+
+    assert first is second
+    assert renderer.get_stats()["hits"] == 1
+
+
+def test_transclusion_expands_and_caches_included_page():
+    """Тест: {{page:slug}} раскрывается, включённая страница рендерится один раз"""
+    pages = Pages(footer="Footer *text*")
+    renderer = WikiRenderer(resolver=pages)
+
+    html = renderer.render_page("a", 1, "# A\n\n{{page:footer}}\n")
+    renderer.render_page("b", 1, "# B\n\n{{page:footer}}\n")
+
+    assert '<div class="page-transclusion" data-target="footer">' in html
+    assert "<p>Footer <em>text</em></p>" in html
+    assert renderer.get_stats()["hits"] == 1  # footer для страницы b
+
+
+def test_changed_transcluded_page_invalidates_dependents_transitively():
+    """Тест: правка включённой страницы сбрасывает кэш всех включающих"""
+    pages = Pages(c="Version one", b="{{page:c}}")
+    renderer = WikiRenderer(resolver=pages)
+    assert "Version one" in renderer.render_page("a", 1, "{{page:b}}")
+
+    pages.save("c", "Version two")
+    assert renderer.invalidate("c") == 3
+
+    html = renderer.render_page("a", 1, "{{page:b}}")
+    assert "Version two" in html and "Version one" not in html
+
+
+def test_new_revision_of_included_page_rerenders_without_invalidate():
+    """Тест: новая ревизия включённой страницы (правка на другом воркере) видна без invalidate"""
+    pages = Pages(c="old body", b="{{page:c}}")
+    renderer = WikiRenderer(resolver=pages)
+    assert "old body" in renderer.render_page("a", 1, "{{page:b}}")
+    assert "old body" in renderer.render_page("a", 1, "{{page:b}}")
+
+    pages.save("c", "new body")
+    html = renderer.render_page("a", 1, "{{page:b}}")
+
+    assert "new body" in html and "old body" not in html
+    assert renderer.get_stats()["stale"] == 2  # a и b
+
+
+def test_transclusion_cycle_is_not_expanded_forever():
+    """Тест: циклическое включение обрывается, промежуточный рендер не кэшируется"""
+    pages = Pages(a="{{page:b}}", b="{{page:a}}")
+    renderer = WikiRenderer(resolver=pages)
+
+    html = renderer.render_page("a", 1, pages.pages["a"][1])
+
+    assert "Transclusion loop: a" in html
+    assert renderer.get_stats()["pages"] == 1  # только корневая страница
+
+
+def test_missing_page_created_later_invalidates_includer():
+    """Тест: создание ранее отсутствующей страницы сбрасывает кэш включающей"""
+    pages = Pages()
+    renderer = WikiRenderer(resolver=pages)
+    assert "Page not found: new" in renderer.render("{{page:new}}")
+
+    pages.save("new", "Now exists")
+    renderer.invalidate("new")
+
+    assert "Now exists" in renderer.render("{{page:new}}")
@@ -0,0 +1,216 @@
+"""
+Unit tests for WikiSearchService chunked indexing and page-level retrieval
+"""
+
+import asyncio
+import math
+from types import SimpleNamespace
+
+import pytest
+from qdrant_client import models
+
+from src.services.wiki.search import WikiSearchService, chunk_page
+
+PAGE = """Intro paragraph about the wiki.
+
+# Installation
+
+Run the installer.
+
+## Linux
+
+```bash
+# not a heading
+./install.sh
+```
+
+# Usage
+
+Open the dashboard.
+"""
+
+
+class FakeEmbedding:
+    """Детерминированные эмбеддинги по частотам букв"""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts):
+        self.calls.append(list(texts))
+        vectors = []
+        for text in texts:
+            vector = [text.lower().count(c) + 0.01 for c in "abcdefghijklmnopqrstuvwxyz"]
+            norm = math.sqrt(sum(v * v for v in vector))
+            vectors.append([v / norm for v in vector])
+        return vectors
+
+
+class FakeQdrantSDK:
+    """Коллекция Qdrant в памяти"""
+
+    def __init__(self):
+        self.collections = {}
+        self.upserts = 0
+
+    def get_collection(self, collection_name):
+        if collection_name not in self.collections:
+            raise ValueError("not found")
+
+    def create_collection(self, collection_name, vectors_config):
+        self.collections[collection_name] = {}
+
+    def create_payload_index(self, collection_name, field_name, field_schema):
+        pass
+
+    def upsert(self, collection_name, points):
+        self.upserts += 1
+        for point in points:
+            self.collections[collection_name][point["id"]] = point
+
+    def delete(self, collection_name, points_selector):
+        # Как и настоящий SDK, словари вместо моделей не принимаем
+        points = self.collections[collection_name]
+        if isinstance(points_selector, list):
+            for point_id in points_selector:
+                points.pop(point_id, None)
+        elif isinstance(points_selector, models.FilterSelector):
+            page_id = points_selector.filter.must[0].match.value
+            for point_id in [i for i, p in points.items() if p["payload"]["page_id"] == page_id]:
+                del points[point_id]
+        else:
+            raise TypeError(f"Unsupported points_selector: {type(points_selector).__name__}")
+
+    def scroll(self, collection_name, scroll_filter, limit, offset, with_payload, with_vectors):
+        if not isinstance(scroll_filter, models.Filter):
+            raise TypeError(f"Unsupported scroll_filter: {type(scroll_filter).__name__}")
+        page_ids = scroll_filter.must[0].match.any
+        points = [
+            SimpleNamespace(id=point_id, payload=point["payload"])
+            for point_id, point in self.collections[collection_name].items()
+            if point["payload"]["page_id"] in page_ids
+        ]
+        return points, None
+
+    def search(self, collection_name, query_vector, limit, with_payload):
+        hits = [
+            SimpleNamespace(
+                id=point_id,
+                score=sum(a * b for a, b in zip(query_vector, point["vector"])),
+                payload=point["payload"],
+            )
+            for point_id, point in self.collections[collection_name].items()
+        ]
+        return sorted(hits, key=lambda hit: hit.score, reverse=True)[:limit]
+
+
+def make_service(sdk=None, **kwargs):
+    sdk = sdk or FakeQdrantSDK()
+    embedding = FakeEmbedding()
+    return WikiSearchService(SimpleNamespace(client=sdk), embedding, **kwargs), sdk, embedding
+
+
+def test_chunks_follow_headings_and_skip_code_comments():
+    """Тест: чанки режутся по заголовкам, # внутри блока кода не заголовок"""
+    chunks = chunk_page("p1", "Guide", PAGE)
+
+    assert [chunk.heading for chunk in chunks] == [
+        "",
+        "Installation",
+        "Installation > Linux",
+        "Usage",
+    ]
+    assert "# not a heading" in chunks[2].text
+    assert chunks[1].embed_text.startswith("Guide\nInstallation\n\n")
+
+
+def test_long_sections_split_by_paragraphs():
+    """Тест: длинный раздел делится по абзацам в пределах лимита"""
+    content = "# Big\n\n" + "\n\n".join("word " * 40 for _ in range(10))
+
+    chunks = chunk_page("p1", "Title", content, max_chars=500)
+
+    assert len(chunks) > 1
+    assert all(len(chunk.text) <= 500 and chunk.heading == "Big" for chunk in chunks)
+
+
+@pytest.mark.asyncio
+async def test_reindex_embeds_only_changed_chunks():
+    """Тест: при правке эмбеддятся только изменённые чанки, удалённые удаляются"""
+    service, sdk, embedding = make_service()
+    await service.index_page("p1", "Guide", PAGE)
+
+    edited = PAGE.replace("Open the dashboard.", "Open the admin dashboard.").replace(
+        "Intro paragraph about the wiki.\n", ""
+    )
+    stats = await service.index_pages([("p1", "Guide", edited)])
+
+    assert stats == {"pages": 1, "chunks": 3, "embedded": 1, "unchanged": 2, "deleted": 2}
+    assert len(sdk.collections["wiki_pages"]) == 3
+    assert embedding.calls[-1] == ["Guide\nUsage\n\nOpen the admin dashboard."]
+
+
+@pytest.mark.asyncio
+async def test_hashes_recovered_from_qdrant_after_restart():
+    """Тест: после рестарта хэши берутся из Qdrant, повторных эмбеддингов нет"""
+    service, sdk, _ = make_service()
+    await service.index_page("p1", "Guide", PAGE)
+
+    restarted, _, embedding = make_service(sdk)
+    stats = await restarted.index_pages([("p1", "Guide", PAGE)])
+
+    assert stats["embedded"] == 0 and stats["unchanged"] == 4
+    assert embedding.calls == []
+
+
+@pytest.mark.asyncio
+async def test_delete_page_removes_only_its_chunks():
+    """Тест: удаление страницы фильтром по page_id не трогает другие страницы"""
+    service, sdk, _ = make_service()
+    await service.index_pages([("p1", "Guide", PAGE), ("p2", "Other", "# Section\n\nOther text")])
+
+    await service.delete_page("p1")
+
+    pages = {point["payload"]["page_id"] for point in sdk.collections[service.COLLECTION_NAME].values()}
+    assert pages == {"p2"}
+
+
+@pytest.mark.asyncio
+async def test_background_indexing_batches_pages():
+    """Тест: фоновая индексация эмбеддит чанки нескольких страниц одной пачкой"""
+    service, sdk, embedding = make_service(index_delay=0.01)
+    for n in range(5):
+        service.schedule_index(f"p{n}", f"Page {n}", f"# Section\n\nText of page {n}")
+    service.schedule_index("p0", "Page 0", "# Section\n\nLatest text")
+    await service.flush()
+
+    assert len(embedding.calls) == 1 and len(embedding.calls[0]) == 5
+    assert sdk.upserts == 1
+    assert any("Latest text" in text for text in embedding.calls[0])
+
+
+@pytest.mark.asyncio
+async def test_search_aggregates_chunks_to_pages():
+    """Тест: поиск возвращает страницы с лучшим чанком, без дублей"""
+    service, _, _ = make_service()
+    await service.index_pages(
+        [
+            ("p1", "Guide", PAGE),
+            ("p2", "Zebra", "# Zoo\n\nzzz zebra zoo\n\n# More zoo\n\nzebra zone"),
+        ]
+    )
+
+    results = await service.search("zebra zoo", limit=2)
+
+    assert [r["page_id"] for r in results] == ["p2", "p1"]
+    assert results[0]["matched_chunks"] == 2
+    assert results[0]["heading"] == "Zoo"
+
+
+@pytest.mark.asyncio
+async def test_search_without_qdrant_returns_empty():
+    """Тест: без подключения к Qdrant поиск не отдаёт заглушки"""
+    service = WikiSearchService(None, FakeEmbedding())
+
+    assert await service.search("anything") == []
+    await asyncio.sleep(0)